@@ -0,0 +1,193 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Candidates of a translation, stored once per plan
+
+The demands of a plan often have the same candidates, e.g. every cloud
+demand has a candidate for each A&AI cloud region. In a pooled
+translation, each distinct candidate is kept once, in a candidate table
+under the 'candidate_pool' key of conductor_solver. The candidates of a
+demand are then references to the pool:
+
+    {"candidate_pool": 1,
+     "ordinals": [3, 0, 7],
+     "overrides": {"cost": 2.0},
+     "changes": [[1, {"uniqueness": "false"}, ["flavor_map"]]]}
+
+ordinals are the pool ordinals of the candidates of the demand, in
+order. overrides are values that all the candidates of the demand have
+and their pooled candidate does not (a cost or uniqueness of the
+demand). changes are the values still different for some candidates:
+their position in ordinals, the values to set and the keys to remove.
+
+Candidates are pooled by their identity (see IDENTITY_KEYS), the first
+demand to have a candidate gives its pooled values. Decoding gives back
+the exact candidate lists that were encoded.
+"""
+
+import copy
+
+import six
+
+from conductor.common import candidate_table
+
+ENCODING = 'candidate_pool'
+VERSION = 1
+
+# Keys telling candidates apart. Candidates with the same values share
+# their entry in the pool.
+IDENTITY_KEYS = ('inventory_provider', 'inventory_type', 'candidate_id',
+                 'cloud_owner', 'location_id')
+
+_MISSING = object()
+
+
+def _identity(candidate):
+    return tuple(candidate.get(key) for key in IDENTITY_KEYS)
+
+
+def _same(first, second):
+    if isinstance(first, six.string_types) and \
+            isinstance(second, six.string_types):
+        return first == second
+    # 1, 1.0 and True are equal, but are kept apart
+    return type(first) is type(second) and first == second
+
+
+def _set(candidate, values):
+    """Set values on a candidate, with its own copy of mutable ones"""
+    for key, value in values.items():
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+        candidate[key] = value
+
+
+def _diff(base, candidate):
+    """(values to set, keys to remove) that turn base into candidate"""
+    changed = dict((key, value) for key, value in candidate.items()
+                   if not _same(base.get(key, _MISSING), value))
+    removed = [key for key in base if key not in candidate]
+    return changed, removed
+
+
+def is_encoded(value):
+    return isinstance(value, dict) and ENCODING in value
+
+
+def is_pooled(conductor_solver):
+    """Whether the conductor_solver part of a translation is pooled"""
+    return is_encoded(conductor_solver.get(ENCODING))
+
+
+def encode(demands):
+    """Pool the candidates of parsed demands.
+
+    demands maps demand names to {'candidates': [...]}, as the
+    translator parses them. Returns the encoded pool and the demands
+    with references to it.
+    """
+    pool = candidate_table.CandidateTable()
+    rows = []
+    ordinals = {}
+    encoded = {}
+    for name, demand in demands.items():
+        refs = []
+        diffs = []
+        for candidate in demand.get('candidates') or []:
+            identity = _identity(candidate)
+            ordinal = ordinals.get(identity)
+            if ordinal is None:
+                ordinal = ordinals[identity] = pool.append(candidate)
+                rows.append(candidate)
+            refs.append(ordinal)
+            diffs.append(_diff(rows[ordinal], candidate))
+
+        # Values every candidate of the demand changes the same way
+        overrides = dict(diffs[0][0]) if diffs else {}
+        for changed, _removed in diffs[1:]:
+            for key in list(overrides):
+                if not _same(changed.get(key, _MISSING), overrides[key]):
+                    del overrides[key]
+        changes = []
+        for position, (changed, removed) in enumerate(diffs):
+            changed = dict((key, value) for key, value in changed.items()
+                           if key not in overrides)
+            if changed or removed:
+                changes.append([position, changed, removed])
+
+        references = {ENCODING: VERSION, 'ordinals': refs}
+        if overrides:
+            references['overrides'] = overrides
+        if changes:
+            references['changes'] = changes
+        encoded_demand = dict(demand)
+        encoded_demand['candidates'] = references
+        encoded[name] = encoded_demand
+    encoded_pool = pool.encode()
+    encoded_pool[ENCODING] = VERSION
+    return encoded_pool, encoded
+
+
+def load(conductor_solver):
+    """Candidate table of the pool of a translation, None if not pooled"""
+    encoded = conductor_solver.get(ENCODING)
+    if not is_encoded(encoded):
+        return None
+    if encoded.get(ENCODING) != VERSION:
+        raise ValueError("Unknown candidate pool encoding {}".format(
+            encoded.get(ENCODING)))
+    return candidate_table.CandidateTable.decode(encoded)
+
+
+def decode(value, pool):
+    """Candidate list of the candidates of a demand.
+
+    value is either a list of candidates, plain or as a candidate table,
+    or references to pool, the table load() returns.
+    """
+    if not is_encoded(value):
+        return candidate_table.decode(value)
+    if pool is None:
+        raise ValueError("Candidates reference a pool the translation "
+                         "does not have")
+    changes = dict((position, (changed, removed))
+                   for position, changed, removed
+                   in value.get('changes') or [])
+    overrides = value.get('overrides') or {}
+    candidates = []
+    for position, ordinal in enumerate(value['ordinals']):
+        candidate = pool.row(ordinal)
+        # Demands sharing a candidate do not share its mutable values
+        _set(candidate, candidate)
+        _set(candidate, overrides)
+        if position in changes:
+            changed, removed = changes[position]
+            _set(candidate, changed)
+            for key in removed:
+                candidate.pop(key, None)
+        candidates.append(candidate)
+    return candidates
+
+
+def demand_candidates(conductor_solver, name, pool=None):
+    """Candidate list of a demand of a translation, pooled or not"""
+    demand = conductor_solver['demands'][name]
+    if pool is None and is_encoded(demand.get('candidates')):
+        pool = load(conductor_solver)
+    return decode(demand.get('candidates') or [], pool)
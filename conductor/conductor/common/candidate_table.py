@@ -0,0 +1,220 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Columnar store of the candidates of a demand
+
+Candidates are dicts of about twenty keys, most of whose values are
+repeated across candidates (inventory provider and type, cloud owner,
+complex details, ...). A CandidateTable keeps one integer code per
+candidate and key, into a pool where each scalar value is kept once.
+Candidates are addressed by their ordinal, their position in the
+table.
+
+encode() gives a compact JSON form of a candidate list for transport,
+which decode() turns back into a list of candidate dicts. Lists that
+were not encoded are returned as is, so receivers take both.
+"""
+
+import array
+import math
+
+import six
+
+ENCODING = 'candidate_table'
+VERSION = 1
+
+# Code of a key a candidate does not have
+MISSING = -1
+
+
+def _pool_key(value):
+    """Key identifying a value in the pool, None if it is not shared
+
+    Mutable values are not shared, each candidate keeps its own copy.
+    """
+    if value is None or isinstance(value, (bool, float) +
+                                   six.integer_types + six.string_types):
+        # 1, 1.0 and True are equal, but are kept apart
+        return type(value), value
+    return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class CandidateTable(object):
+    """Candidates of a demand, stored column by column"""
+
+    def __init__(self, candidates=()):
+        # Columns, in the order their key was first seen
+        self.keys = []
+        self.values = []
+        self._columns = {}
+        self._codes = {}
+        self._floats = {}
+        self._size = 0
+        for candidate in candidates:
+            self.append(candidate)
+
+    def __len__(self):
+        return self._size
+
+    def _code(self, value):
+        key = _pool_key(value)
+        if key is not None:
+            code = self._codes.get(key)
+            if code is not None:
+                return code
+            self._codes[key] = len(self.values)
+        self.values.append(value)
+        return len(self.values) - 1
+
+    def _column(self, key):
+        column = self._columns.get(key)
+        if column is None:
+            column = array.array('i', [MISSING]) * self._size
+            self._columns[key] = column
+            self.keys.append(key)
+        return column
+
+    def append(self, candidate):
+        """Add a candidate, and return its ordinal"""
+        ordinal = self._size
+        self._size += 1
+        for column in self._columns.values():
+            column.append(MISSING)
+        for key, value in candidate.items():
+            self._column(key)[ordinal] = self._code(value)
+        self._floats.clear()
+        return ordinal
+
+    def set(self, ordinal, key, value):
+        self._column(key)[ordinal] = self._code(value)
+        self._floats.pop(key, None)
+
+    def get(self, ordinal, key, default=None):
+        column = self._columns.get(key)
+        if column is None or column[ordinal] == MISSING:
+            return default
+        return self.values[column[ordinal]]
+
+    def row(self, ordinal):
+        """The candidate dict of an ordinal.
+
+        Scalar values are shared with the other candidates, mutable
+        values with the table.
+        """
+        values = self.values
+        candidate = {}
+        for key in self.keys:
+            code = self._columns[key][ordinal]
+            if code != MISSING:
+                candidate[key] = values[code]
+        return candidate
+
+    def rows(self):
+        return [self.row(ordinal) for ordinal in range(self._size)]
+
+    def column(self, key):
+        """Values of a key, None for candidates without it"""
+        column = self._columns.get(key)
+        if column is None:
+            return [None] * self._size
+        values = self.values
+        return [values[code] if code != MISSING else None
+                for code in column]
+
+    def floats(self, key):
+        """Values of a key as an array of floats, NaN if not a number.
+
+        Meant for latitude, longitude and cost, which candidates keep
+        as strings or numbers. The array is kept until the column
+        changes.
+        """
+        floats = self._floats.get(key)
+        if floats is None:
+            # Parse each pooled value once
+            parsed = {}
+            floats = array.array('d')
+            for code in self._columns.get(key, [MISSING] * self._size):
+                if code not in parsed:
+                    parsed[code] = _float(self.values[code]) \
+                        if code != MISSING else float('nan')
+                floats.append(parsed[code])
+            self._floats[key] = floats
+        return floats
+
+    def coordinates(self, ordinal):
+        """(latitude, longitude) of a candidate, None if it has none"""
+        latitude = self.floats('latitude')[ordinal]
+        longitude = self.floats('longitude')[ordinal]
+        if math.isnan(latitude) or math.isnan(longitude):
+            return None
+        return latitude, longitude
+
+    def encode(self):
+        """Compact JSON-serializable form of the table"""
+        return {
+            ENCODING: VERSION,
+            'size': self._size,
+            'keys': list(self.keys),
+            'values': self.values,
+            'columns': [self._columns[key].tolist() for key in self.keys],
+        }
+
+    @classmethod
+    def decode(cls, encoded):
+        if encoded.get(ENCODING) != VERSION:
+            raise ValueError("Unknown candidate table encoding {}".format(
+                encoded.get(ENCODING)))
+        table = cls()
+        table.values = encoded['values']
+        table._size = encoded['size']
+        for key, codes in zip(encoded['keys'], encoded['columns']):
+            if len(codes) != table._size:
+                raise ValueError("Column {} has {} values for {} "
+                                 "candidates".format(key, len(codes),
+                                                     table._size))
+            table.keys.append(key)
+            table._columns[key] = array.array('i', codes)
+        for code, value in enumerate(table.values):
+            key = _pool_key(value)
+            if key is not None:
+                table._codes.setdefault(key, code)
+        return table
+
+
+def is_encoded(value):
+    return isinstance(value, dict) and ENCODING in value
+
+
+def encode(candidate_list):
+    """Compact form of a candidate list, for transport"""
+    return CandidateTable(candidate_list).encode()
+
+
+def decode(value):
+    """Candidate list of an encoded table, or value if not encoded"""
+    if is_encoded(value):
+        return CandidateTable.decode(value).rows()
+    return value
@@ -19,12 +19,13 @@
 
 """Plan Model"""
 
-import json
 import time
 import os
 
+import conductor.common.prometheus_metrics as PC
 from conductor.common.models import validate_uuid4
 from conductor.common.music.model import base
+from conductor.common import plan_queue
 
 
 def current_time_millis():
@@ -61,9 +62,9 @@ class Plan(base.Base):
     solver_counter = None
     reservation_owner = None
     reservation_counter = None
-    template = None
-    translation = None
-    solution = None
+    template = base.JSONColumn('template')
+    translation = base.JSONColumn('translation')
+    solution = base.JSONColumn('solution')
 
     # Status
     TEMPLATE = "template"  # Template ready for translation
@@ -87,6 +88,11 @@ class Plan(base.Base):
               ERROR, WAITING_SPINUP, RESERVING, DONE, ]
     WORKING = [TEMPLATE, TRANSLATING, SOLVING, RESERVING, ]
     FINISHED = [TRANSLATED, SOLVED, NOT_FOUND, ERROR, DONE, WAITING_SPINUP]
+    # Statuses a plan does not leave
+    ENDED = [NOT_FOUND, ERROR, DONE]
+    # Stage taking the plans of a status (see conductor.common.plan_queue)
+    QUEUES = {TEMPLATE: 'translator', TRANSLATED: 'solver',
+              SOLVED: 'reservation'}
 
     @classmethod
     def schema(cls):
@@ -173,13 +179,32 @@ class Plan(base.Base):
         self.translation = {}
         self.solution = {}
 
+    def insert(self):
+        """Insert plan
+
+        Side-effect: Notifies the stage that takes the plan status.
+        """
+        response = super(Plan, self).insert()
+        if self.status in self.QUEUES and self.id:
+            plan_queue.notify(self.QUEUES[self.status], self.id)
+        return response
+
     def update(self, condition=None):
         """Update plan
 
-        Side-effect: Sets the updated field to the current time.
+        Side-effect: Sets the updated field to the current time, and
+        notifies the stage that takes the new plan status.
         """
         self.updated = current_time_millis()
-        return super(Plan, self).update(condition)
+        result = super(Plan, self).update(condition)
+        if not result or 'FAILURE' in result:
+            return result
+        if self.status in self.QUEUES and self.id:
+            plan_queue.notify(self.QUEUES[self.status], self.id)
+        elif self.status in self.ENDED and self.created:
+            PC.PLAN_SECONDS.labels(self.status).observe(
+                (self.updated - self.created) / 1000.0)
+        return result
 
     def values(self):
         """Values"""
@@ -191,9 +216,9 @@ class Plan(base.Base):
             'timeout': self.timeout,
             'recommend_max': self.recommend_max,
             'message': self.message,
-            'template': json.dumps(self.template),
-            'translation': json.dumps(self.translation),
-            'solution': json.dumps(self.solution),
+            'template': self.json_text('template'),
+            'translation': self.json_text('translation'),
+            'solution': self.json_text('solution'),
             'translation_owner': self.translation_owner,
             'translation_counter': self.translation_counter,
             'translation_begin_timestamp': self.translation_begin_timestamp,
@@ -240,9 +265,9 @@ class Plan(base.Base):
             self.solution = solution or {}
             self.insert()
         else:
-            self.template = json.loads(template)
-            self.translation = json.loads(translation)
-            self.solution = json.loads(solution)
+            # Decoded when first read
+            self.stored({'template': template, 'translation': translation,
+                         'solution': solution})
 
     def __repr__(self):
         """Object representation"""
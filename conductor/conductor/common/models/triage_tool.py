@@ -17,7 +17,6 @@
 # -------------------------------------------------------------------------
 #
 
-import json
 from conductor.common.models import validate_uuid4
 from conductor.common.music.model import base
 from conductor.common.music import api
@@ -28,8 +27,8 @@ class TriageTool(base.Base):
     id =None
     name = None
     optimization_type = None
-    triage_solver = None
-    triage_translator = None
+    triage_solver = base.JSONColumn('triage_solver')
+    triage_translator = base.JSONColumn('triage_translator')
     @classmethod
     def schema(cls):
         schema = {
@@ -62,8 +61,8 @@ class TriageTool(base.Base):
             'id': self.id,
             'name': self.name,
             'optimization_type' : self.optimization_type,
-            'triage_translator': json.dumps(self.triage_translator),
-            'triage_solver': json.dumps(self.triage_solver)
+            'triage_translator': self.json_text('triage_translator'),
+            'triage_solver': self.json_text('triage_solver')
         }
         return value_dict
 
@@ -75,14 +74,9 @@ class TriageTool(base.Base):
         #self.triage_solver = triage_solver
         #self.triage_translator = triage_translator
         self.name = name
-        if triage_solver is not None:
-            self.triage_solver = json.loads(triage_solver)
-        else:
-            self.triage_solver = triage_solver
-        if triage_translator is not None:
-            self.triage_translator = json.loads(triage_translator)
-        else:
-            self.triage_translator = triage_translator
+        # Decoded when first read
+        self.stored({'triage_solver': triage_solver,
+                     'triage_translator': triage_translator})
         # if _insert:
         #    self.insert()
 
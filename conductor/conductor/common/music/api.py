@@ -22,6 +22,7 @@
 import copy
 import logging
 import json
+import threading
 import time
 
 from oslo_config import cfg
@@ -568,6 +569,9 @@ class MockAPI(object):
         'keyspaces': {}
     }
 
+    # Conditional updates of services sharing the mock in one process
+    lock = threading.RLock()
+
     def __init__(self):
         """Initializer."""
         LOG.info(_LI("Initializing Music Mock API"))
@@ -583,25 +587,30 @@ class MockAPI(object):
         return self.music.get('keyspaces')
 
     def _set_keyspace(self, keyspace):
-        self._keyspaces[keyspace] = {}
+        # Created if not exists, as services sharing the mock each
+        # create the keyspaces and tables they use
+        self._keyspaces.setdefault(keyspace, {})
 
     def _unset_keyspace(self, keyspace):
         self._keyspaces.pop(keyspace)
 
     def _set_table(self, keyspace, table):
-        self._keyspaces[keyspace][table] = {}
+        self._keyspaces[keyspace].setdefault(table, {})
 
     def _set_index(self, keyspace, table):
-        self._keyspaces[keyspace][table] = {}
+        self._keyspaces[keyspace].setdefault(table, {})
 
     def _unset_table(self, keyspace, table):
         self._keyspaces[keyspace].pop(table)
 
-    def _get_row(self, keyspace, table, key=None):
+    def _get_row(self, keyspace, table, key=None, column=None):
         rows = {}
         row_num = 0
-        for row_key, row in self._keyspaces[keyspace][table].items():
-            if not key or key == row_key:
+        for row_key, row in list(self._keyspaces[keyspace][table].items()):
+            # Like an indexed column in Music, rows may be read by the
+            # value of a column other than the primary key
+            if not key or key == row_key or \
+                    (column and row.get(column) == key):
                 row_num += 1
                 rows['row {}'.format(row_num)] = copy.deepcopy(row)
         return rows
@@ -627,7 +636,7 @@ class MockAPI(object):
         return True
 
     def row_create(self, keyspace, table,  # pylint: disable=R0913
-                   pk_name, pk_value, values, atomic=False):
+                   pk_name, pk_value, values, atomic=False, conditional=False):
         """Create a row."""
         if CONF.music_api.debug:
             LOG.debug("Creating row with pk_value {} in table "
@@ -636,20 +645,34 @@ class MockAPI(object):
         return True
 
     def row_update(self, keyspace, table,  # pylint: disable=R0913
-                   pk_name, pk_value, values, atomic=False):
-        """Update a row."""
+                   pk_name, pk_value, values, atomic=False, condition=None):
+        """Update a row.
+
+        Like Music, a conditional update only applies if every column
+        in the condition holds the given value. Returns the Music
+        status string (SUCCESS or FAILURE).
+        """
         if CONF.music_api.debug:
             LOG.debug("Updating row with pk_value {} in table "
                       "{}, keyspace {}".format(pk_value, table, keyspace))
-        self._set_row(keyspace, table, pk_value, values)
-        return True
+        with self.lock:
+            row = self._keyspaces[keyspace][table].get(pk_value)
+            if condition and row is not None:
+                for key, value in condition.items():
+                    if row.get(key) != value:
+                        return "FAILURE"
+            # Updates do not carry the primary key, so merge into the row.
+            updated_row = dict(row or {pk_name: pk_value})
+            updated_row.update(values)
+            self._set_row(keyspace, table, pk_value, updated_row)
+        return "SUCCESS"
 
     def row_read(self, keyspace, table, pk_name=None, pk_value=None):
         """Read one or more rows. Not atomic."""
         if CONF.music_api.debug:
             LOG.debug("Reading row with pk_value {} from table "
                       "{}, keyspace {}".format(pk_value, table, keyspace))
-        values = self._get_row(keyspace, table, pk_value)
+        values = self._get_row(keyspace, table, pk_value, pk_name)
         return values
 
     def row_delete(self, keyspace, table, pk_name, pk_value, atomic=False):
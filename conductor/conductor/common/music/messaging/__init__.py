@@ -20,3 +20,4 @@
 from .component import RPCClient  # noqa: F401
 from .component import RPCService  # noqa: F401
 from .component import Target  # noqa: F401
+from .component import thread_safe  # noqa: F401
@@ -22,6 +22,7 @@ import json
 import sys
 import time
 import socket
+import threading
 
 import cotyledon
 import futurist
@@ -29,9 +30,11 @@ from oslo_config import cfg
 from oslo_log import log
 from oslo_messaging._drivers import common as rpc_common
 
+import conductor.common.prometheus_metrics as PC
+from conductor.common.music.messaging import local
 from conductor.common.music.messaging import message
 from conductor.common.music.model import base
-from conductor.i18n import _LE, _LI  # pylint: disable=W0212
+from conductor.i18n import _LE, _LI, _LW  # pylint: disable=W0212
 
 LOG = log.getLogger(__name__)
 
@@ -70,6 +73,23 @@ MESSAGING_SERVER_OPTS = [
                 default=False,
                 help='Log debug messages. '
                      'Default value is False.'),
+    cfg.StrOpt('transport',
+               default='music',
+               choices=['music', 'local'],
+               help='Transport used for synchronous calls. "music" writes '
+                    'each call to a Music table and polls it for the '
+                    'response. "local" sends calls over a socket to the '
+                    'listening service and waits for the reply, falling '
+                    'back to Music if the service cannot be reached. '
+                    'Default value is music.'),
+    cfg.StrOpt('local_host',
+               default='127.0.0.1',
+               help='Host the local transport listens on and connects to. '
+                    'Default value is 127.0.0.1.'),
+    cfg.DictOpt('local_ports',
+                default={'controller': '9161', 'data': '9162'},
+                help='Local transport port per topic. Topics without a '
+                     'port use the Music transport only.'),
 ]
 
 CONF.register_opts(MESSAGING_SERVER_OPTS, group='messaging_server')
@@ -79,6 +99,19 @@ CONF.register_opts(MESSAGING_SERVER_OPTS, group='messaging_server')
 
 RPCSVRNAME = "Music-RPC Server"
 
+# Reserved method name for a batch of calls sent as one message.
+BATCH_METHOD = "rpc_batch"
+
+
+def thread_safe(method):
+    """Mark an endpoint method as safe to run in several threads at once.
+
+    The server does not serialize calls to such a method, so that calls
+    sent concurrently over the local transport are served in parallel.
+    """
+    method.thread_safe = True
+    return method
+
 
 class Target(object):
     """Returns a messaging target.
@@ -138,6 +171,10 @@ class RPCClient(object):
         self.target = target
         self.RPC = self.target.topic_class
 
+        self.local_client = None
+        if self.conf.messaging_server.transport == 'local':
+            self.local_client = local.LocalClient(conf, self.target.topic)
+
         # introduced as a quick means to cache messages
         # with the aim of preventing unnecessary communication
         # across conductor components.
@@ -190,6 +227,14 @@ class RPCClient(object):
         #               "{} from cache".format(method, args))
         #     return self.message_cache[key]
 
+        if self.local_client:
+            try:
+                return self._call_local(ctxt, method, args)
+            except local.TransportUnavailable as err:
+                LOG.warning(_LW("Local transport for topic {} unavailable, "
+                                "falling back to Music: {}").format(
+                    self.target.topic, err))
+
         rpc_start_time = time.time()
 
         rpc = self.RPC(action=self.RPC.CALL,
@@ -231,9 +276,9 @@ class RPCClient(object):
         rpc.delete()  # TODO(jdandrea): Put a TTL on the msg instead?
         # self.message_cache[key] = response
 
-        LOG.debug("Elapsed time: {0:.3f} sec".format(
-            time.time() - rpc_start_time)
-        )
+        elapsed = time.time() - rpc_start_time
+        PC.RPC_CALL_SECONDS.labels(topic, method, 'music').observe(elapsed)
+        LOG.debug("Elapsed time: {0:.3f} sec".format(elapsed))
         # If there's a failure, raise it as an exception
         allowed = []
         if failure is not None and failure != '':
@@ -241,6 +286,74 @@ class RPCClient(object):
             raise rpc_common.deserialize_remote_exception(failure, allowed)
         return response
 
+    def call_batch(self, ctxt, calls, pipe=None, pipe_value=None):
+        """Synchronous call of several methods in one message
+
+        calls is a list of {'method': ..., 'args': ...} dicts. The
+        server runs them in order and returns one response per call.
+
+        If pipe names an argument, pipe_value is passed as that argument
+        to the first call, and each call's response is passed as that
+        argument to the next one. A call may set 'keep_on_empty' so an
+        empty response leaves the piped value untouched. The batch
+        stops early once the piped value is empty.
+
+        Returns the list of responses, which is shorter than calls if
+        the batch stopped early. A failure in any call is raised as an
+        exception, just as call() does.
+        """
+        args = {'calls': calls, 'pipe': pipe, 'pipe_value': pipe_value}
+        response = self.call(ctxt, BATCH_METHOD, args)
+        if not isinstance(response, dict) or 'results' not in response:
+            # The server did not understand the batch (e.g. an error
+            # reply). Let the caller see it like any other response.
+            LOG.error(_LE("Batch on topic {} returned no results: "
+                          "{}").format(self.target.topic, response))
+            return None
+
+        responses = []
+        for result in response['results']:
+            failure = result.get('failure')
+            if failure is not None and failure != '':
+                allowed = []
+                raise rpc_common.deserialize_remote_exception(failure,
+                                                              allowed)
+            responses.append(result.get('response'))
+        return responses
+
+    def _call_local(self, ctxt, method, args):
+        """Synchronous call over the local transport"""
+        rpc_start_time = time.time()
+        if self.conf.messaging_server.debug:
+            LOG.debug("Calling method {} with args {} over the local "
+                      "transport".format(method, args))
+        try:
+            reply = self.local_client.call(ctxt, method, args)
+        except socket.timeout:
+            # As the Music transport does, the caller gets no response
+            LOG.error(_LE("Method {} on topic {} timed out at {} seconds "
+                          "over the local transport").format(
+                method, self.target.topic,
+                self.conf.messaging_server.response_timeout))
+            return None
+        except (socket.error, ValueError) as err:
+            # The connection broke or the reply was garbled once the
+            # request was out. It is not sent again, and as for a
+            # timeout the caller gets no response.
+            LOG.error(_LE("Method {} on topic {} failed over the local "
+                          "transport: {}").format(method, self.target.topic,
+                                                  err))
+            return None
+        elapsed = time.time() - rpc_start_time
+        PC.RPC_CALL_SECONDS.labels(
+            self.target.topic, method, 'local').observe(elapsed)
+        LOG.debug("Elapsed time: {0:.3f} sec".format(elapsed))
+        failure = reply.get('failure')
+        if failure is not None and failure != '':
+            allowed = []
+            raise rpc_common.deserialize_remote_exception(failure, allowed)
+        return reply.get('response')
+
 
 class RPCService(cotyledon.Service):
     """Listener for the RPC service.
@@ -275,6 +388,12 @@ class RPCService(cotyledon.Service):
         self.kwargs = kwargs
         self.RPC = self.target.topic_class
         self.name = "{}, topic({})".format(RPCSVRNAME, self.target.topic)
+        self.dispatch_lock = threading.RLock()
+
+        self.local_server = None
+        if self.conf.messaging_server.transport == 'local':
+            self.local_server = local.LocalServer(
+                conf, self.target.topic, self._dispatch_local)
 
         self.messaging_owner_condition = {
             "owner": socket.gethostname()
@@ -336,6 +455,138 @@ class RPCService(cotyledon.Service):
         self._do()
         return True
 
+    def _find_method(self, method_name, msg_id=None):
+        """Find the endpoint method for an RPC method name.
+
+        Returns a (method, error_msg) tuple. method is None on error.
+        """
+        if method_name == BATCH_METHOD:
+            return self._batch, None
+
+        # RPC methods must not start/end with an underscore.
+        if method_name.startswith('_') or method_name.endswith('_'):
+            error_msg = _LE("Method {} must not start or end"
+                            "with underscores").format(method_name)
+            return None, error_msg
+
+        # The first endpoint that supports the method wins.
+        method = None
+        for endpoint in self.endpoints:
+            if method_name not in dir(endpoint):
+                continue
+            endpoint_method = getattr(endpoint, method_name)
+            if callable(endpoint_method):
+                method = endpoint_method
+                if self.conf.messaging_server.debug:
+                    LOG.debug("Message {} method {} is "
+                              "handled by endpoint {}".
+                              format(msg_id, method_name,
+                                     method.__str__.__name__))
+                break
+        if not method:
+            error_msg = _LE("Message {} method {} unsupported "
+                            "in endpoints.").format(msg_id, method_name)
+            return None, error_msg
+
+        # All methods must take a ctxt and args param.
+        if inspect.getargspec(method).args != ['self', 'ctx', 'arg']:
+            error_msg = _LE("Method {} must take three args: "
+                            "self, ctx, arg").format(method_name)
+            return None, error_msg
+        return method, None
+
+    def _invoke(self, method, ctxt, args):
+        """Invoke an endpoint method.
+
+        Returns a (response, failure) tuple. failure is the exc_info
+        of an exception raised by the method, or None.
+        """
+        response = None
+        failure = None
+        try:
+            # Endpoints are not written to be thread-safe, and both
+            # transports may deliver calls at the same time. Batches
+            # re-enter this lock for each call they carry. Methods
+            # marked thread_safe run without it.
+            # Methods return an opaque dictionary
+            if getattr(method, 'thread_safe', False):
+                result = method(ctxt, args)
+            else:
+                with self.dispatch_lock:
+                    result = method(ctxt, args)
+
+            # FIXME(jdandrea): Remove response/error and make it opaque.
+            # That means this would just be assigned result outright.
+            response = result.get('response', result)
+        except Exception:
+            # Current sys.exc_info() content can be overridden
+            # by another exception raised by a log handler during
+            # LOG.exception(). So keep a copy and delete it later.
+            failure = sys.exc_info()
+
+            # Do not log details about the failure here. It will
+            # be returned later upstream.
+            LOG.exception(_LE('Exception during message handling'))
+        return response, failure
+
+    def _batch(self, ctx, arg):
+        """Serve a batch of calls sent with RPCClient.call_batch()"""
+        pipe = arg.get('pipe')
+        pipe_value = arg.get('pipe_value')
+        results = []
+        for call in arg.get('calls') or []:
+            if pipe and not pipe_value:
+                break
+            method_name = call.get('method')
+            method, error_msg = self._find_method(method_name)
+            if not method or method == self._batch:
+                LOG.error(error_msg or _LE("Batches can not be nested"))
+                results.append({'response': {'error': {
+                    'message': error_msg or "Batches can not be nested"}},
+                    'failure': None})
+                break
+
+            call_args = dict(call.get('args') or {})
+            if pipe:
+                call_args[pipe] = pipe_value
+            response, failure = self._invoke(method, ctx, call_args)
+            if failure is not None:
+                results.append({
+                    'response': None,
+                    'failure': rpc_common.serialize_remote_exception(failure)
+                })
+                del failure
+                break
+
+            results.append({'response': response, 'failure': None})
+            if pipe and (response or not call.get('keep_on_empty')):
+                pipe_value = response
+
+        LOG.info(_LI("Batch of {} call(s) served, {} ran").format(
+            len(arg.get('calls') or []), len(results)))
+        return {'response': {'results': results}}
+
+    def _dispatch_local(self, ctxt, method_name, args):
+        """Serve a call received over the local transport."""
+        method, error_msg = self._find_method(method_name)
+        if not method:
+            LOG.error(error_msg)
+            return {'response': {'error': {'message': error_msg}},
+                    'failure': None}
+
+        LOG.info(_LI("Local call method {} received").format(method_name))
+        response, failure = self._invoke(method, ctxt, args)
+        try:
+            if failure is not None:
+                return {'response': None,
+                        'failure':
+                            rpc_common.serialize_remote_exception(failure)}
+            return {'response': response, 'failure': None}
+        finally:
+            # Remove circular object reference between the current
+            # stack frame and the traceback in exc_info.
+            del failure
+
     # FIXME(jdandrea): Better name for this, please, kthx.
     def _do(self):
         """Look for a new RPC call and serve it"""
@@ -366,37 +617,8 @@ class RPCService(cotyledon.Service):
             if not _is_updated or 'FAILURE' in _is_updated:
                 continue
 
-            # RPC methods must not start/end with an underscore.
-            if msg.method.startswith('_') or msg.method.endswith('_'):
-                error_msg = _LE("Method {} must not start or end"
-                                "with underscores").format(msg.method)
-                self._log_error_and_update_msg(msg, error_msg)
-                return
-
-            # The first endpoint that supports the method wins.
-            method = None
-            for endpoint in self.endpoints:
-                if msg.method not in dir(endpoint):
-                    continue
-                endpoint_method = getattr(endpoint, msg.method)
-                if callable(endpoint_method):
-                    method = endpoint_method
-                    if self.conf.messaging_server.debug:
-                        LOG.debug("Message {} method {} is "
-                                  "handled by endpoint {}".
-                                  format(msg.id, msg.method,
-                                         method.__str__.__name__))
-                    break
+            method, error_msg = self._find_method(msg.method, msg.id)
             if not method:
-                error_msg = _LE("Message {} method {} unsupported "
-                                "in endpoints.").format(msg.id, msg.method)
-                self._log_error_and_update_msg(msg, error_msg)
-                return
-
-            # All methods must take a ctxt and args param.
-            if inspect.getargspec(method).args != ['self', 'ctx', 'arg']:
-                error_msg = _LE("Method {} must take three args: "
-                                "self, ctx, arg").format(msg.method)
                 self._log_error_and_update_msg(msg, error_msg)
                 return
 
@@ -407,25 +629,9 @@ class RPCService(cotyledon.Service):
                     _LI("Message {} method {} context: {}, args: {}").format(
                         msg.id, msg.method, msg.ctxt, msg.args))
 
-            failure = None
-            try:
-
-                # Add the template to conductor.plan table
-                # Methods return an opaque dictionary
-                result = method(msg.ctxt, msg.args)
-
-                # FIXME(jdandrea): Remove response/error and make it opaque.
-                # That means this would just be assigned result outright.
-                msg.response = result.get('response', result)
-            except Exception:
-                # Current sys.exc_info() content can be overridden
-                # by another exception raised by a log handler during
-                # LOG.exception(). So keep a copy and delete it later.
-                failure = sys.exc_info()
-
-                # Do not log details about the failure here. It will
-                # be returned later upstream.
-                LOG.exception(_LE('Exception during message handling'))
+            response, failure = self._invoke(method, msg.ctxt, msg.args)
+            if failure is None:
+                msg.response = response
 
             try:
                 if failure is None:
@@ -457,7 +663,8 @@ class RPCService(cotyledon.Service):
 
     def _gracefully_stop(self):
         """Gracefully stop working on things"""
-        pass
+        if self.local_server:
+            self.local_server.stop()
 
     def _restart(self):
         """Prepare to restart the RPC Server"""
@@ -471,6 +678,12 @@ class RPCService(cotyledon.Service):
         if self.conf.messaging_server.debug:
             LOG.debug("%s" % self.__class__.__name__)
 
+        # Calls over the local transport are served by their own thread.
+        # Music messages are still polled, since clients fall back to
+        # Music whenever the local endpoint is unreachable.
+        if self.local_server:
+            self.local_server.start()
+
         # Listen for messages within a thread
         executor = futurist.ThreadPoolExecutor()
         while self.running:
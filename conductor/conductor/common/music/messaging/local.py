@@ -0,0 +1,281 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Local socket request/reply transport for Music-RPC.
+
+The Music transport writes a message row and polls it until the
+server marks it finished. The local transport sends the same
+(ctxt, method, args) triple over a TCP socket and blocks on the
+reply, so the caller is notified as soon as the server is done.
+
+Frames are a 4-byte big-endian length followed by a JSON body.
+"""
+
+import errno
+import json
+import socket
+import struct
+import threading
+
+from oslo_log import log
+from six.moves import socketserver
+
+from conductor.i18n import _LI, _LW  # pylint: disable=W0212
+
+LOG = log.getLogger(__name__)
+
+HEADER = struct.Struct('!I')
+
+
+class TransportUnavailable(Exception):
+    """The local endpoint for a topic could not be reached."""
+    pass
+
+
+class ConnectionClosed(socket.error):
+    """The peer hung up while a frame was being received.
+
+    received is the number of bytes of the frame read before.
+    """
+
+    def __init__(self, received):
+        super(ConnectionClosed, self).__init__("Connection closed by peer")
+        self.received = received
+
+
+def _recv_exactly(sock, size, received=0):
+    """Read exactly size bytes or raise if the peer hung up.
+
+    received is the number of bytes of the frame already read.
+    """
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        try:
+            chunk = sock.recv(remaining)
+        except socket.error as err:
+            if err.errno != errno.ECONNRESET:
+                raise
+            chunk = b''
+        if not chunk:
+            raise ConnectionClosed(received + size - remaining)
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_frame(sock, payload):
+    """Serialize payload as JSON and send it as one frame."""
+    body = json.dumps(payload).encode('utf-8')
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+def recv_frame(sock):
+    """Receive one frame and return the decoded JSON payload."""
+    (size,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return json.loads(_recv_exactly(sock, size, HEADER.size).decode('utf-8'))
+
+
+def endpoint_for(conf, topic):
+    """Return the (host, port) pair configured for a topic, or None."""
+    port = conf.messaging_server.local_ports.get(topic)
+    if not port:
+        return None
+    return conf.messaging_server.local_host, int(port)
+
+
+class LocalClient(object):
+    """Request/reply client for a single topic.
+
+    Connections are kept open between calls. A call takes an idle
+    connection, or opens one if none is idle, and gives it back once
+    the reply is in, so concurrent calls each have their own connection
+    and are served in parallel. The reply frame is the completion
+    notification.
+    """
+
+    def __init__(self, conf, topic):
+        self.conf = conf
+        self.topic = topic
+        self.address = endpoint_for(conf, topic)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if not self.address:
+            raise TransportUnavailable(
+                "No local port configured for topic {}".format(self.topic))
+        try:
+            sock = socket.create_connection(
+                self.address, self.conf.messaging_server.response_timeout)
+        except socket.error as err:
+            raise TransportUnavailable(
+                "Topic {} endpoint {}:{} unreachable: {}".format(
+                    self.topic, self.address[0], self.address[1], err))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _acquire(self):
+        """(connection, reused): an idle connection, else a new one"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _release(self, sock):
+        with self._lock:
+            self._idle.append(sock)
+
+    @staticmethod
+    def _close(sock):
+        try:
+            sock.close()
+        except socket.error:
+            pass
+
+    def call(self, ctxt, method, args):
+        """Send a call and wait for its reply.
+
+        Returns a dict with 'response' and 'failure' keys, exactly as
+        the server produced them. Raises TransportUnavailable if the
+        request could not be delivered, so the caller may fall back to
+        the Music transport. A reconnect is attempted once, since the
+        server may have restarted since the last call: the request then
+        fails to send, or an idle connection is closed before any reply.
+        Other socket errors, e.g. a timeout waiting for the reply, are
+        raised.
+        """
+        request = {'ctxt': ctxt, 'method': method, 'args': args}
+        for attempt in (1, 2):
+            sock, reused = self._acquire()
+            try:
+                send_frame(sock, request)
+            except socket.error as err:
+                # The server may have restarted, the idle connections
+                # are then stale too
+                self._close(sock)
+                self.close()
+                if attempt == 2:
+                    raise TransportUnavailable(str(err))
+                continue
+            # Once the request is out, a broken reply is not retried.
+            # Re-sending could run a non-idempotent method twice. A
+            # kept-alive connection the server closed before reading
+            # the request is the exception.
+            try:
+                reply = recv_frame(sock)
+            except ConnectionClosed as err:
+                self._close(sock)
+                if reused and not err.received:
+                    self.close()
+                    if attempt == 2:
+                        raise TransportUnavailable(str(err))
+                    continue
+                raise
+            except (socket.error, ValueError):
+                self._close(sock)
+                raise
+            self._release(sock)
+            return reply
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            self._close(sock)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serve frames on one connection until the client hangs up."""
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except socket.error:
+                return
+            reply = self.server.dispatch(request.get('ctxt') or {},
+                                         request.get('method'),
+                                         request.get('args') or {})
+            try:
+                send_frame(self.request, reply)
+            except socket.error:
+                return
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class LocalServer(object):
+    """Listens for local transport requests for a single topic.
+
+    dispatch is a callable taking (ctxt, method, args) and returning
+    a dict with 'response' and 'failure' keys.
+    """
+
+    def __init__(self, conf, topic, dispatch):
+        self.conf = conf
+        self.topic = topic
+        self.dispatch = dispatch
+        self.address = endpoint_for(conf, topic)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Bind and serve in a background thread.
+
+        Returns False if the endpoint could not be bound, e.g. because
+        another worker of the same service already owns it. That worker
+        keeps serving the Music transport only.
+        """
+        if not self.address:
+            LOG.warning(_LW("No local port configured for topic {}, "
+                            "serving the Music transport only").format(
+                self.topic))
+            return False
+        try:
+            self._server = _ThreadingServer(self.address, _RequestHandler)
+        except socket.error as err:
+            LOG.warning(_LW("Topic {} could not listen on {}:{} ({}), "
+                            "serving the Music transport only").format(
+                self.topic, self.address[0], self.address[1], err))
+            self._server = None
+            return False
+        self._server.dispatch = self.dispatch
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="local-rpc-" + self.topic)
+        self._thread.daemon = True
+        self._thread.start()
+        LOG.info(_LI("Topic {} listening on {}:{}").format(
+            self.topic, self.address[0], self._server.server_address[1]))
+        return True
+
+    @property
+    def port(self):
+        """Port actually bound (useful when configured as 0)."""
+        return self._server and self._server.server_address[1]
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -19,7 +19,6 @@
 
 """Message Model"""
 
-import json
 import time
 
 from conductor.common.music.model import base
@@ -50,12 +49,12 @@ class Message(base.Base):
     action = None
     created = None
     updated = None
-    ctxt = None
+    ctxt = base.JSONColumn('ctxt')
     method = None
-    args = None
+    args = base.JSONColumn('args')
     status = None
     owner = None
-    response = None
+    response = base.JSONColumn('response')
     failure = None
 
     # Actions
@@ -134,12 +133,12 @@ class Message(base.Base):
             'action': self.action,
             'created': self.created,
             'updated': self.updated,
-            'ctxt': json.dumps(self.ctxt),
+            'ctxt': self.json_text('ctxt'),
             'method': self.method,
-            'args': json.dumps(self.args),
+            'args': self.json_text('args'),
             'status': self.status,
             'owner': self.owner,
-            'response': json.dumps(self.response),
+            'response': self.json_text('response'),
             'failure': self.failure,  # already serialized by oslo_messaging
         }
 
@@ -161,9 +160,8 @@ class Message(base.Base):
             self.failure = failure or ""
             self.insert()
         else:
-            self.ctxt = json.loads(ctxt)
-            self.args = json.loads(args)
-            self.response = json.loads(response)
+            # Decoded when first read
+            self.stored({'ctxt': ctxt, 'args': args, 'response': response})
             self.failure = failure  # oslo_messaging will deserialize this
 
     def __repr__(self):
@@ -30,6 +30,7 @@ import six
 from conductor.common.classes import abstractclassmethod
 from conductor.common.classes import classproperty
 from conductor.common.music import api
+from conductor.common.music.model import codec
 from conductor.common.music.model import search
 
 LOG = logging.getLogger(__name__)
@@ -37,17 +38,60 @@ LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
 
+class JSONColumn(object):
+    """A text column holding a JSON document.
+
+    The document is decoded from the stored text when first read, so
+    the columns a caller does not use are never decoded. A column that
+    was not read is written back as the text it was stored with, so
+    that updates do not send it (see Base.changed_values). Only values
+    that were set or decoded are compressed, if the codec compresses
+    them, and rows are compressed once inserted (see codec).
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            pass
+        value = codec.loads(obj._stored.get(self.name))
+        obj.__dict__[self.name] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+    def text(self, obj):
+        """Text of the column of an object, as stored"""
+        stored = obj._stored.get(self.name)
+        if self.name not in obj.__dict__ and stored is not None:
+            return stored
+        return codec.dumps(self.__get__(obj, type(obj)))
+
+
 @six.add_metaclass(ABCMeta)
 class Base(object):
     """A custom declarative base ORM-style class.
 
     Provides some Elixir-inspired shortcuts as well.
+
+    An object remembers the values of its row as last read or written.
+    update() only sends the columns whose value changed since.
     """
 
     # These must be set in the derived class!
     __tablename__ = None
     __keyspace__ = None
 
+    def __init__(self):
+        # Column values as stored in Music (JSON columns as text)
+        self._stored = {}
+
     @classproperty
     def query(cls):  # pylint: disable=E0213
         """Return a query object a la sqlalchemy"""
@@ -107,6 +151,27 @@ class Base(object):
         """Values"""
         pass
 
+    @classmethod
+    def json_columns(cls):
+        """Names of the JSON columns of the model"""
+        return [name for klass in cls.__mro__
+                for name, attr in vars(klass).items()
+                if isinstance(attr, JSONColumn)]
+
+    def json_text(self, name):
+        """JSON text of a JSON column, for values()"""
+        return getattr(type(self), name).text(self)
+
+    def stored(self, values):
+        """Record column values as stored in Music"""
+        self._stored.update(values)
+
+    def changed_values(self):
+        """Values of the columns changed since last read or written"""
+        stored = self._stored
+        return dict((name, value) for name, value in self.values().items()
+                    if name not in stored or stored[name] != value)
+
     def insert(self):
         """Insert row"""
         kwargs = self.__kwargs()
@@ -114,6 +179,10 @@ class Base(object):
         kwargs['values'] = self.values()
         kwargs['atomic'] = self.atomic()
         pk_name = kwargs['pk_name']
+        # A new row, its JSON columns given as text are compressed too
+        for name in self.json_columns():
+            if name in kwargs['values']:
+                kwargs['values'][name] = codec.encode(kwargs['values'][name])
 
         if pk_name not in kwargs['values']:
             # TODO(jdandrea): Make uuid4() generation a default method in Base.
@@ -124,14 +193,20 @@ class Base(object):
         else:
             kwargs['pk_value'] = kwargs['values'][pk_name]
         response = api.MUSIC_API.row_create(**kwargs)
+        if response:
+            self.stored(kwargs['values'])
         return response
 
     def update(self, condition=None):
-        """Update row"""
+        """Update row
+
+        Only the columns changed since the row was last read or written
+        are sent, or the whole row if none changed.
+        """
         kwargs = self.__kwargs()
         kwargs['pk_name'] = self.pk_name()
         kwargs['pk_value'] = self.pk_value()
-        kwargs['values'] = self.values()
+        kwargs['values'] = self.changed_values() or self.values()
 
         # In active-active, all update operations should be atomic
         kwargs['atomic'] = True
@@ -141,7 +216,10 @@ class Base(object):
         if kwargs['table'] != ('order_locks'):
             if pk_name in kwargs['values']:
                 kwargs['values'].pop(pk_name)
-        return api.MUSIC_API.row_update(**kwargs)
+        response = api.MUSIC_API.row_update(**kwargs)
+        if response and 'FAILURE' not in response:
+            self.stored(kwargs['values'])
+        return response
 
     def delete(self):
         """Delete row"""
@@ -163,8 +241,11 @@ class Base(object):
 
     def as_dict(self):
         """Return object representation as a dictionary"""
-        return dict((k, v) for k, v in self.__dict__.items()
-                    if not k.startswith('_'))
+        as_dict = dict((k, v) for k, v in self.__dict__.items()
+                       if not k.startswith('_'))
+        for name in self.json_columns():
+            as_dict[name] = getattr(self, name)
+        return as_dict
 
 
 def create_dynamic_model(keyspace, classname, baseclass):
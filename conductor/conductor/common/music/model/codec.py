@@ -0,0 +1,116 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Music ORM - Codec of JSON text columns
+
+With compress_columns set, JSON text of at least compress_min_size
+characters is stored zlib compressed, base64 encoded (Music columns
+hold text) after a 'zlib:' prefix:
+
+    zlib:eJyrVspMUbJSUEpJLElVqgUAI8gEmw==
+
+No JSON text starts with this prefix, so the stored text tells whether
+it is compressed and rows written before, or by workers without the
+option, stay readable. Compressed text is always read, whatever the
+option: every worker sharing a keyspace must run a version that knows
+this codec before the option is set on any of them.
+"""
+
+import base64
+import json
+import zlib
+
+from oslo_config import cfg
+import six
+
+CONF = cfg.CONF
+
+CODEC_OPTS = [
+    cfg.BoolOpt('compress_columns',
+                default=False,
+                help='Store large JSON columns (plan template, '
+                     'translation and solution, triage data, message '
+                     'arguments and responses) zlib compressed. All the '
+                     'conductor services sharing the keyspace must '
+                     'support compressed columns. Default value is '
+                     'False.'),
+    cfg.IntOpt('compress_min_size',
+               default=4096,
+               min=0,
+               help='Size, in characters, from which JSON columns are '
+                    'compressed. Default value is 4096.'),
+    cfg.IntOpt('compress_level',
+               default=6,
+               min=1,
+               max=9,
+               help='zlib compression level of JSON columns, from 1 '
+                    '(fastest) to 9 (smallest). Default value is 6.'),
+]
+
+CONF.register_opts(CODEC_OPTS, group='music_api')
+
+PREFIX = 'zlib:'
+
+
+def is_compressed(text):
+    return isinstance(text, six.string_types) and text.startswith(PREFIX)
+
+
+def compress(text, level=6):
+    """Compressed form of a text, prefix included"""
+    if isinstance(text, six.text_type):
+        text = text.encode('utf-8')
+    data = base64.b64encode(zlib.compress(text, level))
+    if not isinstance(data, str):
+        data = data.decode('ascii')
+    return PREFIX + data
+
+
+def encode(text, conf=None):
+    """Text of a JSON column as stored, compressed if configured"""
+    conf = conf or CONF
+    if not conf.music_api.compress_columns or text is None or \
+            is_compressed(text) or \
+            len(text) < conf.music_api.compress_min_size:
+        return text
+    compressed = compress(text, conf.music_api.compress_level)
+    return compressed if len(compressed) < len(text) else text
+
+
+def decode(text):
+    """JSON text of a stored column, compressed or not"""
+    if not is_compressed(text):
+        return text
+    data = zlib.decompress(base64.b64decode(text[len(PREFIX):]))
+    # json.loads takes UTF-8 encoded text as it is on Python 2
+    if six.PY3:
+        data = data.decode('utf-8')
+    return data
+
+
+def dumps(value, conf=None):
+    """Stored text of a JSON column value"""
+    return encode(json.dumps(value), conf)
+
+
+def loads(text):
+    """Value of a stored JSON column, None if there is none"""
+    if text is None:
+        return None
+    return json.loads(decode(text))
@@ -25,6 +25,7 @@ from oslo_config import cfg
 from oslo_log import log as logging
 
 from conductor.common.music import api
+from conductor.common.music.model import codec
 
 # FIXME(jdandrea): Keep for the __init__
 # from conductor.common.classes import get_class
@@ -35,11 +36,17 @@ CONF = cfg.CONF
 
 
 class Query(object):
-    """Data Query"""
+    """Data Query
+
+    Queries return model objects, whose JSON columns are only decoded
+    when read. A query restricted to some columns with columns()
+    returns dicts of these columns instead.
+    """
     model = None
 
-    def __init__(self, model):
+    def __init__(self, model, columns=None):
         """Initializer"""
+        self._columns = columns
         if inspect.isclass(model):
             self.model = model
         # FIXME(jdandrea): Bring this back so it's path-agnostic.
@@ -55,14 +62,40 @@ class Query(object):
         }
         return kwargs
 
+    def columns(self, *names):
+        """Query returning dicts of the given columns instead of objects.
+
+        JSON columns among them are decoded. Music still sends whole
+        rows, the objects are just not built.
+        """
+        return Query(self.model, columns=names)
+
+    def __rows_to_dicts(self, rows):
+        """Convert query response rows to dicts of the query columns"""
+        json_columns = set(self.model.json_columns())
+        results = []
+        for row in rows.values():
+            result = {}
+            for name in self._columns:
+                value = row.get(name)
+                if name in json_columns:
+                    value = codec.loads(value)
+                result[name] = value
+            results.append(result)
+        return Results(results)
+
     def __rows_to_objects(self, rows):
         """Convert query response rows to objects"""
+        if self._columns:
+            return self.__rows_to_dicts(rows)
         results = []
         pk_name = self.model.pk_name()  # pylint: disable=E1101
         for row_id, row in rows.items():# pylint: disable=W0612
             the_id = row.pop(pk_name)
             result = self.model(_insert=False, **row)
             setattr(result, pk_name, the_id)
+            row[pk_name] = the_id
+            result.stored(row)
             results.append(result)
         return Results(results)
 
@@ -99,7 +132,9 @@ class Query(object):
             passes = True
             # All filters are AND-ed.
             for key, value in kwargs.items():
-                if getattr(item, key) != value:
+                actual = item.get(key) if isinstance(item, dict) \
+                    else getattr(item, key)
+                if actual != value:
                     passes = False
                     break
             if passes:
@@ -0,0 +1,281 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Handoff of plans between the conductor stages
+
+A plan moves from one stage to the next through its status: the
+translator takes plans in TEMPLATE status, the solver plans in
+TRANSLATED status and the reservation service plans in SOLVED status.
+The status index in Music remains the durable record of the work to
+do. A PlanQueue adds to it, for the workers of a stage:
+
+- Wake on enqueue. Whenever a plan is written with the status a stage
+  takes, a datagram is sent to each worker of that stage on this host,
+  which then looks for the plan right away. Idle workers still scan
+  the index every idle_scan_interval seconds, for plans queued from
+  another host or whose notification was lost.
+- Fetch. The plans of the stage are read as (id, status, updated)
+  entries, the plan itself is only loaded once picked.
+- Claim with lease. A worker claims a plan with a conditional update
+  of its status, which fails if another worker claimed it first. The
+  claim is a lease renewed by every update of the plan. A plan whose
+  lease expired is released back to the queue.
+
+Workers of a stage listen on consecutive ports from the port of the
+stage, worker N on the port plus N.
+"""
+
+import collections
+import errno
+import select
+import socket
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log
+
+from conductor.i18n import _LI, _LW  # pylint: disable=W0212
+
+LOG = log.getLogger(__name__)
+
+CONF = cfg.CONF
+
+PLAN_QUEUE_OPTS = [
+    cfg.BoolOpt('notify',
+                default=True,
+                help='Notify the workers of a stage on this host as soon '
+                     'as a plan is queued for it. When False, workers '
+                     'scan the plan status index at their polling '
+                     'interval. Default value is True.'),
+    cfg.StrOpt('host',
+               default='127.0.0.1',
+               help='Host the workers listen on for notifications. '
+                    'Default value is 127.0.0.1.'),
+    cfg.DictOpt('ports',
+                default={'translator': '9170', 'solver': '9270',
+                         'reservation': '9370'},
+                help='Notification port of the first worker of each '
+                     'stage. The other workers listen on the following '
+                     'ports.'),
+    cfg.IntOpt('idle_scan_interval',
+               default=30,
+               min=1,
+               help='Time between scans of the plan status index by an '
+                    'idle worker which listens for notifications. '
+                    'Default value is 30 seconds.'),
+]
+
+CONF.register_opts(PLAN_QUEUE_OPTS, group='plan_queue')
+
+# Option group and module of the number of workers of each stage
+STAGE_WORKERS = {
+    'translator': ('controller', 'conductor.controller.service'),
+    'solver': ('solver', 'conductor.solver.service'),
+    'reservation': ('reservation', 'conductor.reservation.service'),
+}
+
+MAX_DATAGRAM = 512
+
+Entry = collections.namedtuple('Entry', ['id', 'status', 'updated'])
+
+_notifier = threading.local()
+
+
+def stage_workers(conf, stage):
+    """Number of workers of a stage, 1 if the stage is unknown here"""
+    group, module = STAGE_WORKERS[stage]
+    try:
+        conf.import_opt('workers', module, group=group)
+        return conf[group].workers
+    except (ImportError, cfg.NoSuchOptError, cfg.NoSuchGroupError):
+        return 1
+
+
+def stage_address(conf, stage, worker_id=0):
+    """(host, port) a worker of a stage listens on, or None"""
+    port = conf.plan_queue.ports.get(stage)
+    if not port:
+        return None
+    return conf.plan_queue.host, int(port) + worker_id
+
+
+def notify(stage, plan_id, conf=None):
+    """Tell the workers of a stage on this host that a plan is queued.
+
+    Best effort: a notification that is lost only delays the plan to
+    the next scan of the workers.
+    """
+    conf = conf or CONF
+    if not conf.plan_queue.notify or not stage_address(conf, stage):
+        return
+    sock = getattr(_notifier, 'sock', None)
+    if sock is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(0)
+        _notifier.sock = sock
+    payload = plan_id.encode('utf-8')
+    for worker_id in range(stage_workers(conf, stage)):
+        try:
+            sock.sendto(payload, stage_address(conf, stage, worker_id))
+        except socket.error as err:
+            LOG.debug("Notification of plan {} to {} worker {} failed: "
+                      "{}".format(plan_id, stage, worker_id, err))
+
+
+class PlanQueue(object):
+    """Plans queued for a stage, as seen by one of its workers.
+
+    queued is the status of the plans the stage takes, claimed the
+    status of the plans its workers work on. lease is the time, in
+    seconds, after which a claimed plan that was not updated is
+    released. poll_interval is the time between scans when the worker
+    does not get notifications.
+    """
+
+    def __init__(self, conf, plan_class, stage, worker_id, queued, claimed,
+                 lease, poll_interval):
+        self.conf = conf
+        self.Plan = plan_class
+        self.stage = stage
+        self.worker_id = worker_id
+        self.queued = queued
+        self.claimed = claimed
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.queued_condition = {'status': queued}
+        self.claimed_condition = {'status': claimed}
+        self._sock = None
+        self._listening = not conf.plan_queue.notify
+        self._busy = False
+        self._pending = False
+
+    def _listen(self):
+        """Bind the notification socket of the worker, if it can be"""
+        self._listening = True
+        address = stage_address(self.conf, self.stage, self.worker_id)
+        if not address:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind(address)
+        except socket.error as err:
+            LOG.warning(_LW("{} worker {} could not listen for plan "
+                            "notifications on {}:{} ({}), scanning for "
+                            "plans every {} seconds").format(
+                self.stage, self.worker_id, address[0], address[1], err,
+                self.poll_interval))
+            sock.close()
+            return
+        sock.setblocking(0)
+        self._sock = sock
+        LOG.info(_LI("{} worker {} listening for plan notifications on "
+                     "{}:{}").format(self.stage, self.worker_id,
+                                     address[0], address[1]))
+
+    def _drain(self):
+        """Discard the pending notifications, the scan covers them"""
+        while True:
+            try:
+                self._sock.recv(MAX_DATAGRAM)
+            except socket.error as err:
+                if err.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+
+    def wait(self):
+        """Wait until plans may be queued for the stage.
+
+        Returns at once after a claim, since more plans may be queued.
+        Otherwise waits for a notification, or for the polling interval
+        if the last fetch left queued plans behind (e.g. plans another
+        worker was claiming), or else for the scan interval.
+        """
+        if not self._listening:
+            self._listen()
+        if self._busy:
+            self._busy = False
+            return
+        if self._sock is None:
+            time.sleep(self.poll_interval)
+            return
+        timeout = self.poll_interval if self._pending else \
+            self.conf.plan_queue.idle_scan_interval
+        try:
+            readable = select.select([self._sock], [], [], timeout)[0]
+        except select.error as err:
+            if err.args[0] != errno.EINTR:
+                raise
+            return
+        if readable:
+            self._drain()
+
+    def fetch(self):
+        """Entries of the queued plans, then of the claimed plans.
+
+        Only the id, status and update time of the rows are kept, the
+        plans are not built. Entries are oldest first within a status.
+        """
+        entries = []
+        query = self.Plan.query.columns('id', 'status', 'updated')
+        for status in (self.queued, self.claimed):
+            rows = query.get_plan_by_col('status', status)
+            entries.extend(sorted(
+                (Entry(row['id'], row['status'], row['updated'] or 0)
+                 for row in rows),
+                key=lambda entry: entry.updated))
+        self._pending = any(entry.status == self.queued
+                            for entry in entries)
+        return entries
+
+    def expired(self, entry):
+        """Whether an entry is a claimed plan whose lease ran out"""
+        return entry.status == self.claimed and \
+            time.time() - entry.updated / 1000.0 > self.lease
+
+    def load(self, entry):
+        """Plan of an entry, None if it left the status of the entry"""
+        plan = self.Plan.query.one(entry.id)
+        if plan is None or plan.status != entry.status:
+            return None
+        return plan
+
+    def claim(self, plan):
+        """Claim a queued plan for this worker.
+
+        The caller sets its own fields on the plan (owner, counter,
+        ...) beforehand. Returns the response of the conditional
+        update, which holds FAILURE if another worker claimed the plan
+        first.
+        """
+        plan.status = self.claimed
+        response = plan.update(condition=self.queued_condition)
+        if response and 'FAILURE' not in response:
+            self._busy = True
+        return response
+
+    def release(self, plan):
+        """Queue a claimed plan again, e.g. once its lease expired"""
+        plan.status = self.queued
+        return plan.update(condition=self.claimed_condition)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
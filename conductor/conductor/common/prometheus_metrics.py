@@ -21,6 +21,8 @@
 from oslo_config import cfg
 from oslo_log import log
 from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import Summary
 from prometheus_client import start_http_server
 
 LOG = log.getLogger(__name__)
@@ -95,6 +97,132 @@ HPA_CLOUD_REGION_UNSUCCESSFUL = Counter(
     ['customer_name', 'service_name', 'cloud_region']
 )
 
+# Counters updated while matching flavors, which HPA match processes
+# report back to the data worker
+HPA_MATCH_COUNTERS = (HPA_FLAVOR_MATCH_SUCCESSFUL,
+                      HPA_FLAVOR_MATCH_UNSUCCESSFUL)
+
+# Solver constraint cache stats
+CONSTRAINT_CACHE_HITS = Counter(
+    'constraint_cache_hits',
+    'Number of constraint evaluations served from the plan cache',
+    ['constraint_type']
+)
+
+CONSTRAINT_CACHE_MISSES = Counter(
+    'constraint_cache_misses',
+    'Number of constraint evaluations not found in the plan cache',
+    ['constraint_type']
+)
+
+# A&AI response cache stats
+AAI_RESPONSE_CACHE_LOOKUPS = Counter(
+    'aai_response_cache_lookups',
+    'Number of A&AI requests looked up in the response cache, by result',
+    ['resource_type', 'result']
+)
+
+# Latency metrics
+# Label values are taken from literals in the code (RPC methods, A&AI
+# request contexts, plan statuses) or from the registered constraint
+# types, never from request data, so that the number of series stays
+# bounded.
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0, float('inf'))
+PLAN_BUCKETS = (1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+                float('inf'))
+
+PLAN_SECONDS = Histogram(
+    'plan_seconds',
+    'Time from plan creation to its final status, by status',
+    ['status'],
+    buckets=PLAN_BUCKETS
+)
+
+TRANSLATION_SECONDS = Histogram(
+    'translation_seconds',
+    'Time taken to translate a plan template, by resulting status',
+    ['status'],
+    buckets=LATENCY_BUCKETS
+)
+
+RPC_CALL_SECONDS = Histogram(
+    'rpc_call_seconds',
+    'Time taken by synchronous RPC calls, by topic, method and transport',
+    ['topic', 'method', 'transport'],
+    buckets=LATENCY_BUCKETS
+)
+
+AAI_REQUEST_SECONDS = Histogram(
+    'aai_request_seconds',
+    'Time taken by A&AI requests, cache lookups included, by context',
+    ['context'],
+    buckets=LATENCY_BUCKETS
+)
+
+CONSTRAINT_SOLVE_SECONDS = Histogram(
+    'constraint_solve_seconds',
+    'Time taken to solve a constraint for a decision, by constraint type',
+    ['constraint_type'],
+    buckets=LATENCY_BUCKETS
+)
+
+# Solver search effort
+FIT_FIRST_SEARCH_DEPTH = Histogram(
+    'fit_first_search_depth',
+    'Deepest decision reached by a fit first search',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, float('inf'))
+)
+
+FIT_FIRST_BACKTRACKS = Summary(
+    'fit_first_backtracks',
+    'Number of decisions undone by a fit first search'
+)
+
+
+def counter_values(counters):
+    '''
+    Snapshot of the value of each labelled child of counters
+    :param counters: sequence of Counters
+    :return: dict from (counter position, label pairs) to value
+    '''
+    values = {}
+    for position, counter in enumerate(counters):
+        for metric in counter.collect():
+            for sample in metric.samples:
+                # Counter values are reported as <name>_total by newer
+                # prometheus clients, along with a _created sample
+                if sample[0] not in (metric.name, metric.name + '_total'):
+                    continue
+                labels = tuple(sorted(sample[1].items()))
+                values[(position, labels)] = sample[2]
+    return values
+
+
+def counter_increments(counters, before):
+    '''
+    Increments of counters since a snapshot taken by counter_values
+    :param counters: sequence of Counters
+    :param before: snapshot of the counters
+    :return: list of (counter position, label pairs, increment)
+    '''
+    increments = []
+    for key, value in sorted(counter_values(counters).items()):
+        increment = value - before.get(key, 0)
+        if increment:
+            increments.append((key[0], key[1], increment))
+    return increments
+
+
+def add_counter_increments(counters, increments):
+    '''
+    Apply the increments of counters made by another process
+    :param counters: sequence of Counters, in the order of the snapshot
+    :param increments: list returned by counter_increments
+    '''
+    for position, labels, increment in increments:
+        counters[position].labels(**dict(labels)).inc(increment)
+
 
 def _init_metrics(port_index):
     '''
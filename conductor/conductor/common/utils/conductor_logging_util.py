@@ -17,9 +17,9 @@
 # -------------------------------------------------------------------------
 #
 
-import json
 import logging
 from conductor.common.music import api
+from conductor.common.music.model import codec
 
 class LoggerFilter(logging.Filter):
     transaction_id = None
@@ -38,7 +38,7 @@ def getTransactionId(keyspace, plan_id):
     for row_id, row_value in rows.items():
             template = row_value['template']
             if template:
-                data = json.loads(template)
+                data = codec.loads(template)
                 if "transaction-id" in data:
                     return data["transaction-id"]
 
@@ -23,12 +23,14 @@ import json
 import os
 import uuid
 
+import futurist
 import six
 import yaml
 from conductor import __file__ as conductor_root
 from conductor import messaging
 from conductor import service
 
+from conductor.common import candidate_pool
 from conductor.common import threshold
 from conductor.common.music import messaging as music_messaging
 from conductor.data.plugins.triage_translator.triage_translator_data import TraigeTranslatorData
@@ -40,6 +42,23 @@ LOG = log.getLogger(__name__)
 
 CONF = cfg.CONF
 
+TRANSLATOR_OPTS = [
+    cfg.IntOpt('resolve_workers',
+               default=8,
+               min=1,
+               help='Number of demand and location resolutions sent to '
+                    'the data service at once while translating a '
+                    'template. 1 sends them one after another.'),
+    cfg.BoolOpt('pool_candidates',
+                default=False,
+                help='Set to True to keep each distinct candidate once '
+                     'per translation, the demands referring to it. The '
+                     'solver and reservation services must be recent '
+                     'enough to read pooled translations.'),
+]
+
+CONF.register_opts(TRANSLATOR_OPTS, group='controller')
+
 VERSIONS = ["2016-11-01", "2017-10-10", "2018-02-01"]
 LOCATION_KEYS = ['latitude', 'longitude', 'host_name', 'clli_code']
 INVENTORY_PROVIDERS = ['aai']
@@ -326,34 +345,58 @@ class Translator(object):
         self._reservations = self._parse_parameters(reservations,
                                                     'reservations')
 
+    def _call_data_service(self, method, calls):
+        """Call a data service method once per (ctxt, args) pair.
+
+        Up to resolve_workers calls are sent at once. Returns the
+        responses in the order of the calls. An exception raised by a
+        call is raised once all calls are done.
+        """
+        if self.conf.controller.resolve_workers < 2 or len(calls) < 2:
+            return [self.data_service.call(ctxt=ctxt, method=method,
+                                           args=args)
+                    for ctxt, args in calls]
+        executor = futurist.ThreadPoolExecutor(
+            max_workers=min(self.conf.controller.resolve_workers,
+                            len(calls)))
+        try:
+            futures = [executor.submit(self.data_service.call, ctxt=ctxt,
+                                       method=method, args=args)
+                       for ctxt, args in calls]
+            return [future.result() for future in futures]
+        finally:
+            executor.shutdown()
+
     def parse_locations(self, locations):
         """Prepare the locations for use by the solver."""
         parsed = {}
+        unresolved = []
         for location, args in locations.items():
-            ctxt = {
-                'plan_id': self._plan_id,
-                'keyspace': self.conf.keyspace
-            }
-
             latitude = args.get("latitude")
             longitude = args.get("longitude")
 
             if latitude and longitude:
-                resolved_location = {"latitude": latitude, "longitude": longitude}
+                parsed[location] = {"latitude": latitude,
+                                    "longitude": longitude}
             else:
-                # ctxt = {}
-                response = self.data_service.call(
-                    ctxt=ctxt,
-                    method="resolve_location",
-                    args=args)
-
-                resolved_location = \
-                    response and response.get('resolved_location')
-            if not resolved_location:
+                unresolved.append(location)
+
+        ctxt = {
+            'plan_id': self._plan_id,
+            'keyspace': self.conf.keyspace
+        }
+        responses = self._call_data_service(
+            "resolve_location",
+            [(ctxt, locations[location]) for location in unresolved])
+        for location, response in zip(unresolved, responses):
+            parsed[location] = \
+                response and response.get('resolved_location')
+
+        for location in locations:
+            if not parsed.get(location):
                 raise TranslatorException(
                     "Unable to resolve location {}".format(location)
                 )
-            parsed[location] = resolved_location
         return parsed
 
     def parse_demands(self, demands):
@@ -365,6 +408,7 @@ class Translator(object):
         # Look at each demand
         demands_copy = copy.deepcopy(demands)
         parsed = {}
+        pending = []
         for name, requirements in demands_copy.items():
             inventory_candidates = []
             for requirement in requirements:
@@ -489,24 +533,6 @@ class Translator(object):
                 #     # Add to our list of parsed candidates
                 #     inventory_candidates.append(candidate)
 
-            # Ask conductor-data for one or more candidates.
-            ctxt = {
-                "plan_id": self._plan_id,
-                "plan_name": self._plan_name,
-                "keyspace": self.conf.keyspace,
-            }
-            args = {
-                "demands": {
-                    name: requirements,
-                },
-                "plan_info":{
-                    "plan_id": self._plan_id,
-                    "plan_name": self._plan_name
-                },
-                "triage_translator_data": self.triageTranslatorData.__dict__
-
-            }
-
             # Check if required_candidate and excluded candidate
             # are mutually exclusive.
             for requirement in requirements:
@@ -523,18 +549,45 @@ class Translator(object):
                         " list are not mutually exclusive for demand"
                         " {}".format(name)
                     )
-            response = self.data_service.call(
-                ctxt=ctxt,
-                method="resolve_demands",
-                args=args)
 
+            # Ask conductor-data for one or more candidates.
+            ctxt = {
+                "plan_id": self._plan_id,
+                "plan_name": self._plan_name,
+                "keyspace": self.conf.keyspace,
+            }
+            args = {
+                "demands": {
+                    name: requirements,
+                },
+                "plan_info":{
+                    "plan_id": self._plan_id,
+                    "plan_name": self._plan_name
+                },
+                "triage_translator_data":
+                    dict(self.triageTranslatorData.__dict__)
+
+            }
+            pending.append((name, inventory_candidates, ctxt, args))
+
+        # The demands are resolved concurrently, their candidates and
+        # dropped candidates are then merged in the order of the demands.
+        responses = self._call_data_service(
+            "resolve_demands",
+            [(call_ctxt, call_args)
+             for _, _, call_ctxt, call_args in pending])
+        triage_data_trans = {
+            'plan_id': self._plan_id,
+            'plan_name': self._plan_name,
+            'translator_triage': [
+                response.get('dropped_candidates') for response in responses
+                if response and response.get('dropped_candidates')],
+        }
+
+        for (name, inventory_candidates, _, _), response in \
+                zip(pending, responses):
             resolved_demands = \
                 response and response.get('resolved_demands')
-            triage_data_trans = \
-                response and response.get('trans')
-
-            required_candidates = resolved_demands \
-                .get('required_candidates')
             if not resolved_demands:
                 self.triageTranslator.thefinalCallTrans(triage_data_trans)
                 raise TranslatorException(
@@ -542,6 +595,8 @@ class Translator(object):
                     "candidates for demand {}"
                     .format(name)
                 )
+            required_candidates = resolved_demands \
+                .get('required_candidates')
             resolved_candidates = resolved_demands.get(name)
             for candidate in resolved_candidates:
                 inventory_candidates.append(candidate)
@@ -938,12 +993,16 @@ class Translator(object):
         request_type = self._parameters.get("request_type") \
                        or self._parameters.get("REQUEST_TYPE") \
                        or ""
+        # Optional choice of the solver search, see [solver]
+        # search_algorithm
+        search_algorithm = self._parameters.get("search_algorithm") or ""
 
         self._translation = {
             "conductor_solver": {
                 "version": self._version,
                 "plan_id": self._plan_id,
                 "request_type": request_type,
+                "search_algorithm": search_algorithm,
                 "locations": self.parse_locations(self._locations),
                 "demands": self.parse_demands(self._demands),
                 "objective": self.parse_optimization(self._optmization),
@@ -952,6 +1011,11 @@ class Translator(object):
                 "reservations": self.parse_reservations(self._reservations),
             }
         }
+        if self.conf.controller.pool_candidates:
+            conductor_solver = self._translation["conductor_solver"]
+            pool, demands = candidate_pool.encode(conductor_solver["demands"])
+            conductor_solver["candidate_pool"] = pool
+            conductor_solver["demands"] = demands
 
     def translate(self):
         """Translate the template for the solver."""
@@ -27,8 +27,10 @@ import futurist
 from oslo_config import cfg
 from oslo_log import log
 
+import conductor.common.prometheus_metrics as PC
 from conductor.common.music import api
 from conductor.common.music import messaging as music_messaging
+from conductor.common import plan_queue
 from conductor.controller import translator
 from conductor.i18n import _LE, _LI
 from conductor import messaging
@@ -92,6 +94,13 @@ class TranslatorService(cotyledon.Service):
             "status": self.Plan.TRANSLATING
         }
 
+        # New plans are handed over to the translator workers
+        self.plan_queue = plan_queue.PlanQueue(
+            conf, self.Plan, 'translator', self.worker_id,
+            queued=self.Plan.TEMPLATE, claimed=self.Plan.TRANSLATING,
+            lease=conf.messaging_server.timeout,
+            poll_interval=conf.controller.polling_interval)
+
         if not self.conf.controller.concurrent:
             self._reset_template_status()
 
@@ -135,6 +144,7 @@ class TranslatorService(cotyledon.Service):
     def translate(self, plan):
         """Translate the plan to a format the solver can use"""
         # Update the translation field and set status to TRANSLATED.
+        start_time = time.time()
         try:
             LOG.info(_LI("Requesting plan {} translation").format(
                 plan.id))
@@ -162,6 +172,8 @@ class TranslatorService(cotyledon.Service):
             template = "An exception of type {0} occurred, arguments:\n{1!r}"
             plan.message = template.format(type(ex).__name__, ex.args)
             plan.status = self.Plan.ERROR
+        PC.TRANSLATION_SECONDS.labels(plan.status).observe(
+            time.time() - start_time)
 
         _is_success = 'FAILURE'
         while 'FAILURE' in _is_success and (self.current_time_seconds() - self.millisec_to_sec(plan.updated)) <= self.conf.messaging_server.timeout:
@@ -170,24 +182,20 @@ class TranslatorService(cotyledon.Service):
                          "atomic update response from MUSIC {}").format(plan.status, _is_success))
 
     def __check_for_templates(self):
-        """Wait for the polling interval, then do the real template check."""
-
-        # Wait for at least poll_interval sec
-        polling_interval = self.conf.controller.polling_interval
-        time.sleep(polling_interval)
-        # Look for plans with the status set to TEMPLATE
-
-        # Instead of using the query.all() method, now creating an index for 'status'
-        # field in conductor.plans table, and query plans by status columns
-        template_plans = self.Plan.query.get_plan_by_col("status", self.Plan.TEMPLATE)
-        translating_plans = self.Plan.query.get_plan_by_col("status", self.Plan.TRANSLATING)
+        """Wait for a plan to be queued, then do the real template check."""
 
-        # combine the plans with status = 'template' and 'translating' together
-        plans = template_plans + translating_plans
+        # Wait for a notification, or for the next scan
+        self.plan_queue.wait()
 
-        for plan in plans:
+        # Look for plans with the status set to TEMPLATE. Only their
+        # ids and statuses are read, the plan is loaded once picked.
+        for entry in self.plan_queue.fetch():
             # If there's a template to be translated, do it!
-            if plan.status == self.Plan.TEMPLATE:
+            if entry.status == self.Plan.TEMPLATE:
+                plan = self.plan_queue.load(entry)
+                if plan is None:
+                    # Claimed by another worker meanwhile
+                    continue
                 if plan.translation_counter >= self.conf.controller.max_translation_counter:
                     message = _LE("Tried {} times. Plan {} is unable to translate") \
                         .format(self.conf.controller.max_translation_counter, plan.id)
@@ -198,11 +206,10 @@ class TranslatorService(cotyledon.Service):
                     break
                 else:
                     # change the plan status to "translating" and assign the current machine as translation owner
-                    plan.status = self.Plan.TRANSLATING
                     plan.translation_counter += 1
                     plan.translation_owner = socket.gethostname()
                     plan.translation_begin_timestamp = int(round(time.time() * 1000))
-                    _is_updated = plan.update(condition=self.template_status_condition)
+                    _is_updated = self.plan_queue.claim(plan)
                     log_util.setLoggerFilter(LOG, self.conf.keyspace, plan.id)
                     LOG.info(_LE("Plan {} is trying to update the status from 'template' to 'translating',"
                                  " get {} response from MUSIC").format(plan.id, _is_updated))
@@ -214,19 +221,12 @@ class TranslatorService(cotyledon.Service):
                 break
 
             # TODO(larry): sychronized clock among Conducotr VMs, or use an offset
-            elif plan.status == self.Plan.TRANSLATING and \
-                (self.current_time_seconds() - self.millisec_to_sec(plan.updated)) > self.conf.messaging_server.timeout:
-                plan.status = self.Plan.TEMPLATE
-                plan.update(condition=self.translating_status_condition)
+            elif self.plan_queue.expired(entry):
+                plan = self.plan_queue.load(entry)
+                if plan is not None:
+                    self.plan_queue.release(plan)
                 break
 
-
-
-            elif plan.timedout:
-                # TODO(jdandrea): How to tell all involved to stop working?
-                # Not enough to just set status.
-                continue
-
     def run(self):
         """Run"""
         LOG.debug("%s" % self.__class__.__name__)
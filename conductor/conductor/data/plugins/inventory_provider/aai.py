@@ -17,21 +17,28 @@
 # -------------------------------------------------------------------------
 #
 
+import gzip
+import os
 import re
+import tempfile
+import threading
 import time
 import uuid
 import copy
 
+import futurist
 import json
 from oslo_config import cfg
 from oslo_log import log
 
+import conductor.common.prometheus_metrics as PC
 from conductor.common import rest
 from conductor.data.plugins import constants
 from conductor.data.plugins.inventory_provider import base
 from conductor.data.plugins.inventory_provider import hpa_utils
+from conductor.data.plugins.inventory_provider import response_cache
 from conductor.data.plugins.triage_translator.triage_translator import TraigeTranslator
-from conductor.i18n import _LE, _LI
+from conductor.i18n import _LE, _LI, _LW
 from oslo_config import cfg
 from oslo_log import log
 
@@ -48,6 +55,78 @@ AAI_OPTS = [
                default=1440,
                help='Interval with which to refresh the local complex cache, '
                     'in minutes.'),
+    cfg.IntOpt('cache_refresh_workers',
+               default=8,
+               min=1,
+               help='Number of concurrent A&AI requests made while '
+                    'refreshing the local cache.'),
+    cfg.IntOpt('cache_entry_max_age',
+               default=1440,
+               min=0,
+               help='Time, in minutes, after which a cloud region is '
+                    'fetched again with its flavors and complex at the '
+                    'next cache refresh, even if its resource-version did '
+                    'not change. Flavor changes do not change the '
+                    'resource-version of their region. 0 fetches every '
+                    'region at every refresh.'),
+    cfg.StrOpt('cache_snapshot_file',
+               default='',
+               help='File where the A&AI cache is saved after each '
+                    'refresh. Data workers starting with the file in '
+                    'place serve the saved cache while it is refreshed in '
+                    'the background. Empty to always refresh at start.'),
+    cfg.IntOpt('resolve_workers',
+               default=8,
+               min=1,
+               help='Number of concurrent A&AI requests made while '
+                    'resolving the generic-vnfs of service and vfmodule '
+                    'demands. 1 resolves them one request at a time.'),
+    cfg.BoolOpt('resolve_memo',
+                default=True,
+                help='Keep the A&AI responses fetched while resolving the '
+                     'demands of a plan, so that a link shared by several '
+                     'demands is fetched once by a data worker. When '
+                     'False, they are kept for one requirement of a '
+                     'demand.'),
+    cfg.IntOpt('resolve_memo_ttl',
+               default=60,
+               min=1,
+               help='Time, in seconds, the A&AI responses of a plan are '
+                    'kept once none of its demands is being resolved. '
+                    'Default value is 60.'),
+    cfg.BoolOpt('response_cache',
+                default=False,
+                help='Keep the A&AI responses of generic-vnfs, vservers, '
+                     'pservers, complexes, flavors and host queries '
+                     'across plans, for the time to live of their type.'),
+    cfg.IntOpt('response_cache_size',
+               default=10000,
+               min=1,
+               help='Number of A&AI responses kept in memory, the least '
+                    'recently used are dropped first.'),
+    cfg.DictOpt('response_cache_ttl',
+                default={'generic-vnf': '300',
+                         'vserver': '300',
+                         'pserver': '3600',
+                         'complex': '3600',
+                         'flavor': '3600',
+                         'query': '300'},
+                help='Time to live of the cached A&AI responses, in '
+                     'seconds, by resource type. Types not listed are not '
+                     'cached. Expired responses with a resource-version, '
+                     'asked without a depth, are kept if A&AI still has '
+                     'the same one.'),
+    cfg.StrOpt('response_cache_dir',
+               default='',
+               help='Directory where the A&AI response cache is also '
+                    'kept, for the data workers of a host and their '
+                    'restarts to share. Empty to keep it in memory only.'),
+    cfg.IntOpt('response_cache_dir_files',
+               default=100000,
+               min=0,
+               help='Number of A&AI responses kept in response_cache_dir, '
+                    'the least recently written are removed first. 0 for '
+                    'no limit.'),
     cfg.StrOpt('table_prefix',
                default='aai',
                help='Data Store table prefix.'),
@@ -117,6 +196,28 @@ class AAI(base.InventoryProviderBase):
         # Cache is initially empty
         self._aai_cache = {}
         self._aai_complex_cache = {}
+        # resource-version of each cached cloud region
+        self._aai_cache_versions = {}
+        # Time each cached cloud region was fetched
+        self._aai_cache_fetched = {}
+        # Compiled HPA flavor capabilities of each cached cloud region
+        self._aai_flavor_index = {}
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        # A&AI responses of the demands being resolved by each thread
+        self._resolve_memo = threading.local()
+        # Responses and last use time of the plans being resolved, by
+        # plan id, see resolve_demands
+        self._plan_memos = {}
+        self._plan_memos_lock = threading.Lock()
+        # A&AI responses kept across plans, if enabled
+        self._response_cache = None
+        if self.conf.aai.response_cache:
+            self._response_cache = response_cache.ResponseCache(
+                self.conf.aai.response_cache_size,
+                self.conf.aai.response_cache_ttl,
+                self.conf.aai.response_cache_dir,
+                self.conf.aai.response_cache_dir_files)
 
     def initialize(self):
 
@@ -124,6 +225,9 @@ class AAI(base.InventoryProviderBase):
         # Initialize the Python requests
         self._init_python_request()
 
+        # Serve the last snapshot, if any, while the cache is revalidated
+        self._load_snapshot()
+
         # Refresh the cache once for now
         self._refresh_cache()
 
@@ -154,6 +258,34 @@ class AAI(base.InventoryProviderBase):
     def _request(self, method='get', path='/', data=None,
                  context=None, value=None):
         """Performs HTTP request."""
+        memo = None
+        if method == 'get' and data is None:
+            memo = getattr(self._resolve_memo, 'responses', None)
+        if memo is not None and path in memo:
+            LOG.debug("A&AI request ({}: {}) found in the plan memo".format(
+                context, value))
+            return memo[path]
+
+        start_time = time.time()
+        rtype = None
+        if self._response_cache is not None:
+            rtype = self._cacheable_type(method, path, data)
+        if rtype:
+            response = self._cached_request(method, path, data, rtype,
+                                            context, value)
+        else:
+            response = self._send(method, path, data, context, value)
+        PC.AAI_REQUEST_SECONDS.labels(context or 'none').observe(
+            time.time() - start_time)
+
+        # Failures are not kept, the next request for the path retries
+        if memo is not None and response is not None and \
+                response.status_code == 200:
+            memo[path] = response
+        return response
+
+    def _send(self, method, path, data, context, value):
+        """Sends a request to A&AI, and logs its failure."""
         headers = {
             'X-FromAppId': 'CONDUCTOR',
             'X-TransactionId': str(uuid.uuid4()),
@@ -183,6 +315,61 @@ class AAI(base.InventoryProviderBase):
                              self.base, path))
         return response
 
+    def _cacheable_type(self, method, path, data):
+        """Resource type of a request kept in the response cache, or None.
+
+        GET requests are cached, as well as the custom queries, which
+        A&AI takes with a PUT but which do not change anything.
+        """
+        rtype = response_cache.resource_type(path)
+        if not self._response_cache.ttl(rtype):
+            return None
+        if method == 'get' and data is None:
+            return rtype
+        if method == 'put' and rtype == 'query':
+            return rtype
+        return None
+
+    def _cached_request(self, method, path, data, rtype, context, value):
+        """Performs HTTP request through the response cache.
+
+        An expired response asked without a depth is revalidated with
+        the depth=0 form of its resource when it has a resource-version:
+        it is kept if the resource-version did not change, and fetched
+        again otherwise. Expired responses asked with a depth, which
+        may hold changed children, are always fetched again.
+        """
+        cache = self._response_cache
+        key = response_cache.cache_key(path, data)
+        entry = cache.get(key)
+        if entry is not None and not entry.expired():
+            cache.record(rtype, response_cache.HIT)
+            return response_cache.CachedResponse(entry.body)
+        if entry is not None and entry.resource_version:
+            check = response_cache.revalidation_path(path)
+            response = check and self._send('get', check, None,
+                                            context, value)
+            if response is not None and response.status_code == 200:
+                try:
+                    current = response.json().get('resource-version')
+                except (ValueError, AttributeError):
+                    current = None
+                if current == entry.resource_version:
+                    cache.renew(key, entry)
+                    cache.record(rtype, response_cache.REVALIDATED)
+                    return response_cache.CachedResponse(entry.body)
+
+        cache.record(rtype, response_cache.MISS)
+        response = self._send(method, path, data, context, value)
+        if response is not None and response.status_code == 200:
+            try:
+                cache.put(key, rtype, response.json())
+            except ValueError:
+                cache.discard(key)
+        elif entry is not None:
+            cache.discard(key)
+        return response
+
     def _init_python_request(self):
 
         kwargs = {
@@ -195,139 +382,353 @@ class AAI(base.InventoryProviderBase):
             "ca_bundle_file": self.verify,
             "log_debug": self.conf.debug,
             "read_timeout": self.timeout,
+            "pool_maxsize": self.conf.aai.cache_refresh_workers,
         }
         self.rest = rest.REST(**kwargs)
 
 
     def _refresh_cache(self):
-        """Refresh the A&AI cache."""
-        if not self.last_refresh_time or \
-            (time.time() - self.last_refresh_time) > \
+        """Refresh the A&AI cache if it is due.
+
+        The first refresh runs inline, since there is nothing to serve
+        yet. Later refreshes run in a background thread, and the current
+        cache keeps being served until the new one is swapped in.
+        """
+        if self.last_refresh_time and \
+            (time.time() - self.last_refresh_time) <= \
                 self.cache_refresh_interval * 60:
-            # TODO(jdandrea): This is presently brute force.
-            # It does not persist to Music. A general purpose ORM caching
-            # object likely needs to be made, with a key (hopefully we
-            # can use one that is not just a UUID), a value, and a
-            # timestamp. The other alternative is to not use the ORM
-            # layer and call the API directly, but that is
-            # also trading one set of todos for another ...
-
-            # Get all A&AI sites
-            LOG.info(_LI("**** Refreshing A&AI cache *****"))
-            path = self._aai_versioned_path(
-                '/cloud-infrastructure/cloud-regions/?depth=0')
-            response = self._request(
-                path=path, context="cloud regions", value="all")
-            if response is None:
-                return
-            regions = {}
-            if response.status_code == 200:
-                body = response.json()
-                regions = body.get('cloud-region', {})
-            if not regions:
-                # Nothing to update the cache with
-                LOG.error(_LE("A&AI returned no regions, link: {}{}").
-                          format(self.base, path))
+            return
+        if not self._aai_cache:
+            with self._refresh_lock:
+                if not self._aai_cache:
+                    self._refresh_regions()
+            return
+        with self._refresh_lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
                 return
-            cache = {
-                'cloud_region': {},
-                'service': {},
-            }
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_in_background, name="aai-cache-refresh")
+            self._refresh_thread.daemon = True
+            self._refresh_thread.start()
+
+    def _refresh_in_background(self):
+        """Refresh the cache, logging what the thread would lose"""
+        try:
+            self._refresh_regions()
+        except Exception:
+            LOG.exception(_LE("A&AI cache refresh failed, serving the "
+                              "current cache"))
+
+    def _refresh_regions(self):
+        """Rebuild the cloud region cache from A&AI."""
+        # TODO(jdandrea): This is presently brute force.
+        # It does not persist to Music. A general purpose ORM caching
+        # object likely needs to be made, with a key (hopefully we
+        # can use one that is not just a UUID), a value, and a
+        # timestamp. The other alternative is to not use the ORM
+        # layer and call the API directly, but that is
+        # also trading one set of todos for another ...
+
+        # Get all A&AI sites
+        LOG.info(_LI("**** Refreshing A&AI cache *****"))
+        start_time = time.time()
+        path = self._aai_versioned_path(
+            '/cloud-infrastructure/cloud-regions/?depth=0')
+        response = self._request(
+            path=path, context="cloud regions", value="all")
+        if response is None:
+            return
+        regions = {}
+        if response.status_code == 200:
+            body = response.json()
+            regions = body.get('cloud-region', {})
+        if not regions:
+            # Nothing to update the cache with
+            LOG.error(_LE("A&AI returned no regions, link: {}{}").
+                      format(self.base, path))
+            return
+
+        # Regions whose resource-version did not change keep their
+        # entry, so their flavors are not fetched again, until the
+        # entry is older than cache_entry_max_age
+        previous = self._aai_cache.get('cloud_region', {})
+        versions = self._aai_cache_versions
+        fetched_times = self._aai_cache_fetched
+        oldest = start_time - self.conf.aai.cache_entry_max_age * 60
+
+        cache = {
+            'cloud_region': {},
+            'service': {},
+        }
+        new_versions = {}
+        new_fetched_times = {}
+        fetched = 0
+        executor = futurist.ThreadPoolExecutor(
+            max_workers=self.conf.aai.cache_refresh_workers)
+        try:
+            futures = []
             for region in regions:
                 cloud_region_id = region.get('cloud-region-id')
+                resource_version = region.get('resource-version')
+                if resource_version and cloud_region_id in previous and \
+                        versions.get(cloud_region_id) == resource_version \
+                        and fetched_times.get(cloud_region_id,
+                                              oldest) > oldest:
+                    futures.append((region, None))
+                else:
+                    futures.append((region, executor.submit(
+                        self._get_region_cache_entry, region)))
 
-                LOG.debug("Working on region '{}' ".format(cloud_region_id))
+            for region, future in futures:
+                cloud_region_id = region.get('cloud-region-id')
+                if future is None:
+                    entry = previous[cloud_region_id]
+                    fetched_time = fetched_times[cloud_region_id]
+                else:
+                    entry = future.result()
+                    fetched_time = start_time
+                    fetched += 1
+                if entry is None:
+                    continue
+                cache['cloud_region'][cloud_region_id] = entry
+                new_versions[cloud_region_id] = \
+                    region.get('resource-version')
+                new_fetched_times[cloud_region_id] = fetched_time
+        finally:
+            executor.shutdown()
+
+        flavor_index = {}
+        if self.conf.HPA_enabled:
+            flavor_index = self._build_flavor_index(cache, previous)
+
+        # Swap the new cache in at once
+        self._aai_cache = cache
+        self._aai_cache_versions = new_versions
+        self._aai_cache_fetched = new_fetched_times
+        self._aai_flavor_index = flavor_index
+        self.last_refresh_time = time.time()
+        LOG.info(_LI("**** A&AI cache refresh complete: {} regions, {} "
+                     "fetched, in {:.3f} sec *****").format(
+            len(cache['cloud_region']), fetched,
+            self.last_refresh_time - start_time))
+
+        snapshot_file = self.conf.aai.cache_snapshot_file
+        if snapshot_file and (fetched or not os.path.exists(snapshot_file) or
+                              set(cache['cloud_region']) != set(previous)):
+            self._write_snapshot(snapshot_file)
+
+    def _snapshot_header(self):
+        """What a snapshot must have been taken with to be loaded"""
+        return {
+            'format': 1,
+            'server_url': self.base,
+            'version': self.version,
+            'hpa_enabled': bool(self.conf.HPA_enabled),
+        }
 
-                cloud_region_version = region.get('cloud-region-version')
-                cloud_owner = region.get('cloud-owner')
-                cloud_type = region.get('cloud-type')
-                cloud_zone = region.get('cloud-zone')
+    def _write_snapshot(self, snapshot_file):
+        """Save the cache, for the data workers started next.
 
-                physical_location_list = self._get_aai_rel_link_data(data = region, related_to = 'complex', search_key = 'complex.physical-location-id')
-                if len(physical_location_list) > 0:
-                    physical_location_id = physical_location_list[0].get('d_value')
+        The file is replaced at once, so that a worker starting while
+        another one writes it reads a whole snapshot.
+        """
+        snapshot = self._snapshot_header()
+        snapshot.update({
+            'time': self.last_refresh_time,
+            'cache': self._aai_cache,
+            'versions': self._aai_cache_versions,
+            'fetched': self._aai_cache_fetched,
+            # Complexes are looked up by plans while this runs
+            'complexes': dict(self._aai_complex_cache),
+            'complex_time': self.complex_last_refresh_time,
+        })
+        directory = os.path.dirname(os.path.abspath(snapshot_file))
+        temp = None
+        try:
+            fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            os.close(fd)
+            with gzip.open(temp, 'wb') as f:
+                f.write(json.dumps(snapshot,
+                                   separators=(',', ':')).encode('utf-8'))
+            os.rename(temp, snapshot_file)
+        except (IOError, OSError, TypeError, ValueError) as exc:
+            LOG.warning(_LW("Could not write the A&AI cache snapshot {}: "
+                            "{}").format(snapshot_file, exc))
+            if temp and os.path.exists(temp):
+                os.remove(temp)
+
+    def _load_snapshot(self):
+        """Load the cache saved by the last refresh, if it is usable.
+
+        The snapshot is left for the next refresh to revalidate: cloud
+        regions whose resource-version did not change keep their entry,
+        so only the region list is fetched again for them.
+        """
+        snapshot_file = self.conf.aai.cache_snapshot_file
+        if not snapshot_file or not os.path.exists(snapshot_file):
+            return False
+        try:
+            with gzip.open(snapshot_file, 'rb') as f:
+                snapshot = json.loads(f.read().decode('utf-8'))
+            header = self._snapshot_header()
+            if any(snapshot.get(k) != v for k, v in header.items()):
+                LOG.info(_LI("A&AI cache snapshot {} was taken with "
+                             "another configuration, not loading it").
+                         format(snapshot_file))
+                return False
+            cache = snapshot['cache']
+            versions = snapshot['versions']
+            # Regions of older snapshots were fetched by then at last
+            fetched_times = snapshot.get('fetched') or dict(
+                (region_id, snapshot.get('time') or 0)
+                for region_id in versions)
+            complexes = snapshot['complexes']
+        except (IOError, OSError, ValueError, KeyError, TypeError) as exc:
+            LOG.warning(_LW("Could not load the A&AI cache snapshot {}: "
+                            "{}").format(snapshot_file, exc))
+            return False
+        if not cache.get('cloud_region'):
+            return False
 
-                if not (cloud_region_version and
-                        cloud_region_id):
-                    continue
-                rel_link_data_list = \
-                    self._get_aai_rel_link_data(
-                        data=region,
-                        related_to='complex',
-                        search_key='complex.physical-location-id')
-                if len(rel_link_data_list) > 1:
-                    LOG.error(_LE("Region {} has more than one complex").
-                              format(cloud_region_id))
-                    LOG.debug("Region {}: {}".format(cloud_region_id, region))
+        flavor_index = {}
+        if self.conf.HPA_enabled:
+            flavor_index = self._build_flavor_index(cache, {})
+        self._aai_cache = cache
+        self._aai_cache_versions = versions
+        self._aai_cache_fetched = fetched_times
+        self._aai_flavor_index = flavor_index
+        self._aai_complex_cache.update(complexes)
+        self.complex_last_refresh_time = snapshot.get('complex_time')
+        # Due, so that initialize revalidates it in the background
+        self.last_refresh_time = None
+        LOG.info(_LI("Loaded {} regions from the A&AI cache snapshot {} "
+                     "taken at {}").format(len(cache['cloud_region']),
+                                           snapshot_file,
+                                           time.ctime(snapshot.get('time'))))
+        return True
 
-                    continue
-                rel_link_data = rel_link_data_list[0]
-                complex_id = rel_link_data.get("d_value")
-                complex_link = rel_link_data.get("link")
-                if complex_id and complex_link:
-                    complex_info = self._get_complex(
-                        complex_link=complex_link,
-                        complex_id=complex_id)
-                else:  # no complex information
-                    LOG.error(_LE("Region {} does not reference a complex").
-                              format(cloud_region_id))
-                    continue
-                if not complex_info:
-                    LOG.error(_LE("Region {}, complex {} info not found, "
-                                  "link {}").format(cloud_region_id,
-                                                    complex_id, complex_link))
-                    continue
+    def _build_flavor_index(self, cache, previous):
+        """Index the HPA capabilities of the flavors of each region.
 
-                latitude = complex_info.get('latitude')
-                longitude = complex_info.get('longitude')
-                city = complex_info.get('city')
-                state = complex_info.get('state')
-                region = complex_info.get('region')
-                country = complex_info.get('country')
-                complex_name = complex_info.get('complex-name')
+        Attribute values are parsed when first matched, and kept with
+        the index. Regions whose cache entry was kept from the previous
+        refresh keep their index, and the values parsed so far.
+        """
+        flavor_index = {}
+        for cloud_region_id, entry in cache['cloud_region'].items():
+            index = self._aai_flavor_index.get(cloud_region_id)
+            if index is not None and \
+                    previous.get(cloud_region_id) is entry:
+                flavor_index[cloud_region_id] = index
+                continue
+            try:
+                flavor_index[cloud_region_id] = \
+                    hpa_utils.FlavorCapabilityIndex(entry.get('flavors'),
+                                                    parse=False)
+            except Exception as exc:
+                # Matching falls back to the flavors of the candidate
+                LOG.error(_LE("Could not index the flavors of region {}: "
+                              "{}").format(cloud_region_id, exc))
+        return flavor_index
+
+    def _get_region_cache_entry(self, region):
+        """Build the cache entry for one cloud region.
+
+        Returns None if the region can not be cached. Runs in the
+        refresh thread pool.
+        """
+        cloud_region_id = region.get('cloud-region-id')
 
-                if not (latitude and longitude and city and country
-                        and complex_name):
-                    keys = ('latitude', 'longitude', 'city', 'country',
-                            'complex_name')
-                    missing_keys = \
-                        list(set(keys).difference(complex_info.keys()))
-                    LOG.error(_LE("Complex {} is missing {}, link: {}").
-                              format(complex_id, missing_keys, complex_link))
-                    LOG.debug("Complex {}: {}".
-                              format(complex_id, complex_info))
+        LOG.debug("Working on region '{}' ".format(cloud_region_id))
 
-                    continue
-                cache['cloud_region'][cloud_region_id] = {
-                    'cloud_region_version': cloud_region_version,
-                    'cloud_owner': cloud_owner,
-                    'cloud_type': cloud_type,
-                    'cloud_zone': cloud_zone,
-                    'complex_name': complex_name,
-                    'physical_location_id': physical_location_id,
-                    'complex': {
-                        'complex_id': complex_id,
-                        'complex_name': complex_name,
-                        'latitude': latitude,
-                        'longitude': longitude,
-                        'city': city,
-                        'state': state,
-                        'region': region,
-                        'country': country,
-                    }
-                }
+        cloud_region_version = region.get('cloud-region-version')
+        cloud_owner = region.get('cloud-owner')
+        cloud_type = region.get('cloud-type')
+        cloud_zone = region.get('cloud-zone')
 
-                # Added for HPA support
-                if self.conf.HPA_enabled:
-                    flavors = self._get_flavors(cloud_owner, cloud_region_id)
-                    cache['cloud_region'][cloud_region_id]['flavors'] = flavors
+        physical_location_list = self._get_aai_rel_link_data(data = region, related_to = 'complex', search_key = 'complex.physical-location-id')
+        if len(physical_location_list) > 0:
+            physical_location_id = physical_location_list[0].get('d_value')
 
-                LOG.debug("Candidate with cloud_region_id '{}' selected "
-                          "as a potential candidate - ".format(cloud_region_id))
-            LOG.debug("Done with region '{}' ".format(cloud_region_id))
-            self._aai_cache = cache
-            self.last_refresh_time = time.time()
-            LOG.info(_LI("**** A&AI cache refresh complete *****"))
+        if not (cloud_region_version and
+                cloud_region_id):
+            return None
+        rel_link_data_list = \
+            self._get_aai_rel_link_data(
+                data=region,
+                related_to='complex',
+                search_key='complex.physical-location-id')
+        if len(rel_link_data_list) > 1:
+            LOG.error(_LE("Region {} has more than one complex").
+                      format(cloud_region_id))
+            LOG.debug("Region {}: {}".format(cloud_region_id, region))
+
+            return None
+        rel_link_data = rel_link_data_list[0]
+        complex_id = rel_link_data.get("d_value")
+        complex_link = rel_link_data.get("link")
+        if complex_id and complex_link:
+            complex_info = self._get_complex(
+                complex_link=complex_link,
+                complex_id=complex_id)
+        else:  # no complex information
+            LOG.error(_LE("Region {} does not reference a complex").
+                      format(cloud_region_id))
+            return None
+        if not complex_info:
+            LOG.error(_LE("Region {}, complex {} info not found, "
+                          "link {}").format(cloud_region_id,
+                                            complex_id, complex_link))
+            return None
+
+        latitude = complex_info.get('latitude')
+        longitude = complex_info.get('longitude')
+        city = complex_info.get('city')
+        state = complex_info.get('state')
+        region = complex_info.get('region')
+        country = complex_info.get('country')
+        complex_name = complex_info.get('complex-name')
+
+        if not (latitude and longitude and city and country
+                and complex_name):
+            keys = ('latitude', 'longitude', 'city', 'country',
+                    'complex_name')
+            missing_keys = \
+                list(set(keys).difference(complex_info.keys()))
+            LOG.error(_LE("Complex {} is missing {}, link: {}").
+                      format(complex_id, missing_keys, complex_link))
+            LOG.debug("Complex {}: {}".
+                      format(complex_id, complex_info))
+
+            return None
+        entry = {
+            'cloud_region_version': cloud_region_version,
+            'cloud_owner': cloud_owner,
+            'cloud_type': cloud_type,
+            'cloud_zone': cloud_zone,
+            'complex_name': complex_name,
+            'physical_location_id': physical_location_id,
+            'complex': {
+                'complex_id': complex_id,
+                'complex_name': complex_name,
+                'latitude': latitude,
+                'longitude': longitude,
+                'city': city,
+                'state': state,
+                'region': region,
+                'country': country,
+            }
+        }
+
+        # Added for HPA support
+        if self.conf.HPA_enabled:
+            flavors = self._get_flavors(cloud_owner, cloud_region_id)
+            entry['flavors'] = flavors
+
+        LOG.debug("Candidate with cloud_region_id '{}' selected "
+                  "as a potential candidate - ".format(cloud_region_id))
+        LOG.debug("Done with region '{}' ".format(cloud_region_id))
+        return entry
 
     @staticmethod
     def _get_aai_rel_link(data, related_to):
@@ -396,8 +797,11 @@ class AAI(base.InventoryProviderBase):
            (time.time() - self.complex_last_refresh_time) > \
            self.complex_cache_refresh_interval * 60:
             self._aai_complex_cache.clear()
-        if complex_id and complex_id in self._aai_complex_cache:
-            return self._aai_complex_cache[complex_id]
+        # The cache refresh looks complexes up from several threads
+        cached = self._aai_complex_cache.get(complex_id) \
+            if complex_id else None
+        if cached:
+            return cached
         else:
             path = self._aai_versioned_path(
                 self._get_aai_path_from_link(complex_link))
@@ -822,9 +1226,12 @@ class AAI(base.InventoryProviderBase):
             return None
         return response.json()
 
-    def resolve_vf_modules_for_generic_vnf(self, candidate, vnf, demand_name, triage_translator_data):
+    def _generic_vnf_path(self, vnf):
         raw_path = '/network/generic-vnfs/generic-vnf/{}?depth=1'.format(vnf.get("vnf-id"))
-        path = self._aai_versioned_path(raw_path)
+        return self._aai_versioned_path(raw_path)
+
+    def resolve_vf_modules_for_generic_vnf(self, candidate, vnf, demand_name, triage_translator_data):
+        path = self._generic_vnf_path(vnf)
 
         response = self._request('get', path=path, data=None)
         if response is None or response.status_code != 200:
@@ -845,11 +1252,14 @@ class AAI(base.InventoryProviderBase):
         else:
             return generic_vnf_details.get('vf-modules').get('vf-module')
 
-    def resolve_cloud_regions_by_cloud_region_id(self, cloud_region_id):
+    def _cloud_regions_by_id_path(self, cloud_region_id):
         cloud_region_uri = '/cloud-infrastructure/cloud-regions' \
                            '/?cloud-region-id=' \
                            + cloud_region_id
-        path = self._aai_versioned_path(cloud_region_uri)
+        return self._aai_versioned_path(cloud_region_uri)
+
+    def resolve_cloud_regions_by_cloud_region_id(self, cloud_region_id):
+        path = self._cloud_regions_by_id_path(cloud_region_id)
 
         response = self._request('get',
                                  path=path,
@@ -901,6 +1311,13 @@ class AAI(base.InventoryProviderBase):
             vs_link_list.append(rl_data_list[i].get('link'))
         return vs_link_list
 
+    def _cloud_region_path(self, cloud_owner, cloud_region_id):
+        cloud_region_uri = \
+            '/cloud-infrastructure/cloud-regions/cloud-region' \
+            '/?cloud-owner=' + cloud_owner \
+            + '&cloud-region-id=' + cloud_region_id
+        return self._aai_versioned_path(cloud_region_uri)
+
     def resolve_complex_info_link_for_v_server(self, candidate, v_server, cloud_owner, cloud_region_id, service_type,
                                                demand_name, triage_translator_data):
         related_to = "pserver"
@@ -945,11 +1362,7 @@ class AAI(base.InventoryProviderBase):
                                                                   reason="Cloud owner and cloud region "
                                                                          "id not found")
                     return None  # move ahead with the next vnf
-                cloud_region_uri = \
-                    '/cloud-infrastructure/cloud-regions/cloud-region' \
-                    '/?cloud-owner=' + cloud_owner \
-                    + '&cloud-region-id=' + cloud_region_id
-                path = self._aai_versioned_path(cloud_region_uri)
+                path = self._cloud_region_path(cloud_owner, cloud_region_id)
                 response = self._request('get',
                                          path=path,
                                          data=None)
@@ -1174,9 +1587,179 @@ class AAI(base.InventoryProviderBase):
             candidate['region'] = \
                 complex_info.get('region')
 
+    def _prefetch(self, paths):
+        """Fetch A&AI paths concurrently into the plan memo.
+
+        Paths already in the memo are not fetched again. Returns the
+        JSON body of each path found, for the next stage to follow the
+        links of. Failures are left for resolve_demands to report.
+        """
+        memo = self._resolve_memo.responses
+        todo = []
+        queued = set()
+        for path in paths:
+            if path and path not in memo and path not in queued:
+                queued.add(path)
+                todo.append(path)
+        if todo:
+            executor = futurist.ThreadPoolExecutor(
+                max_workers=min(self.conf.aai.resolve_workers, len(todo)))
+            try:
+                futures = [(path, executor.submit(self._request, path=path,
+                                                  context="prefetch",
+                                                  value=path))
+                           for path in todo]
+                for path, future in futures:
+                    try:
+                        response = future.result()
+                    except Exception as exc:
+                        LOG.debug("A&AI prefetch of {} failed: {}".format(
+                            path, exc))
+                        continue
+                    if response is not None and response.status_code == 200:
+                        memo[path] = response
+            finally:
+                executor.shutdown()
+
+        bodies = {}
+        for path in paths:
+            if path in memo and path not in bodies:
+                try:
+                    bodies[path] = memo[path].json()
+                except ValueError:
+                    continue
+        return bodies
+
+    def _prefetch_generic_vnfs(self, generic_vnf, customer_id,
+                               vf_modules=False):
+        """Fetch what resolve_demands looks up for generic-vnfs.
+
+        The vf-modules (for vfmodule demands), cloud regions, vservers,
+        pservers and complexes are fetched a stage at a time, each stage
+        concurrently, and kept in the plan memo. resolve_demands then
+        walks the generic-vnfs in order as before, finding the responses
+        in the memo, so the candidates and triage records are the same.
+        """
+        if self.conf.aai.resolve_workers < 2:
+            return
+        vnfs = list()
+        vnf_ids = set()
+        for vnf in generic_vnf:
+            vnf_id = vnf.get('vnf-id')
+            if vnf_id in vnf_ids:
+                continue
+            vnf_ids.add(vnf_id)
+            # vnfs of other customers are dropped before any lookup
+            rl_data = self._get_aai_rel_link_data(
+                data=vnf, related_to="service-instance",
+                search_key="customer.global-customer-id",
+                match_dict={'key': "customer.global-customer-id",
+                            'value': customer_id})
+            if rl_data[0].get('d_value') == customer_id:
+                vnfs.append(vnf)
+
+        if vf_modules:
+            sources = list()
+            bodies = self._prefetch(
+                [self._generic_vnf_path(vnf) for vnf in vnfs])
+            for body in bodies.values():
+                vf_module_list = (body or {}).get('vf-modules') or {}
+                sources.extend(vf_module_list.get('vf-module') or [])
+        else:
+            sources = vnfs
+
+        paths = list()
+        vservers = list()
+        for source in sources:
+            cloud_owner = self._get_aai_rel_link_data(
+                data=source, related_to="vserver",
+                search_key="cloud-region.cloud-owner")[0].get('d_value')
+            cloud_region_id = self._get_aai_rel_link_data(
+                data=source, related_to="vserver",
+                search_key="cloud-region.cloud-region-id")[0].get('d_value')
+            if cloud_region_id:
+                paths.append(self._cloud_regions_by_id_path(cloud_region_id))
+            for vs_link in self.resolve_v_server_links_for_vnf(source):
+                vs_path = vs_link and \
+                    self._get_aai_path_from_link(vs_link + '?depth=2')
+                if vs_path:
+                    path = self._aai_versioned_path(vs_path)
+                    paths.append(path)
+                    vservers.append((cloud_owner, cloud_region_id, path))
+        bodies = self._prefetch(paths)
+
+        paths = list()
+        for cloud_owner, cloud_region_id, path in vservers:
+            if not bodies.get(path):
+                continue
+            rl_data_list = self._get_aai_rel_link_data(
+                data=bodies[path], related_to="pserver")
+            if len(rl_data_list) > 1:
+                continue
+            ps_link = rl_data_list[0].get('link')
+            if ps_link:
+                ps_path = self._get_aai_path_from_link(ps_link)
+                if ps_path:
+                    paths.append(self._aai_versioned_path(ps_path))
+            elif self.conf.HPA_enabled and cloud_owner and cloud_region_id:
+                paths.append(self._cloud_region_path(cloud_owner,
+                                                     cloud_region_id))
+        bodies = self._prefetch(paths)
+
+        paths = list()
+        for body in bodies.values():
+            rl_data = self._get_aai_rel_link_data(
+                data=body, related_to="complex",
+                search_key="complex.physical-location-id")[0]
+            complex_link = rl_data.get('link')
+            complex_id = rl_data.get('d_value')
+            if complex_link and complex_id and \
+                    complex_id not in self._aai_complex_cache:
+                complex_path = self._get_aai_path_from_link(complex_link)
+                if complex_path:
+                    paths.append(self._aai_versioned_path(complex_path))
+        self._prefetch(paths)
+
     def resolve_demands(self, demands, plan_info, triage_translator_data):
-        """Resolve demands into inventory candidate lists"""
+        """Resolve demands into inventory candidate lists
 
+        The translator resolves the demands of a plan one call at a
+        time. With resolve_memo, the A&AI responses fetched are kept for
+        the plan until none of its demands was resolved for
+        resolve_memo_ttl seconds.
+        """
+        plan_id = plan_info.get('plan_id')
+        self._resolve_memo.responses = self._plan_memo(plan_id)
+        try:
+            return self._resolve_demands(demands, plan_info,
+                                         triage_translator_data)
+        finally:
+            self._resolve_memo.responses = None
+            self._plan_memo_used(plan_id)
+            if self._response_cache is not None:
+                LOG.debug("A&AI response cache: {}".format(
+                    self._response_cache.stats()))
+
+    def _plan_memo(self, plan_id):
+        """Memo of the A&AI responses of a plan, dropping unused ones"""
+        if not self.conf.aai.resolve_memo or plan_id is None:
+            return {}
+        now = time.time()
+        with self._plan_memos_lock:
+            for key, (memo, used) in list(self._plan_memos.items()):
+                if now - used > self.conf.aai.resolve_memo_ttl:
+                    del self._plan_memos[key]
+            memo = self._plan_memos.get(plan_id, ({}, now))[0]
+            self._plan_memos[plan_id] = (memo, now)
+        return memo
+
+    def _plan_memo_used(self, plan_id):
+        with self._plan_memos_lock:
+            if plan_id in self._plan_memos:
+                self._plan_memos[plan_id] = (self._plan_memos[plan_id][0],
+                                             time.time())
+
+    def _resolve_demands(self, demands, plan_info, triage_translator_data):
         self.triage_translator.getPlanIdNAme(plan_info['plan_name'], plan_info['plan_id'],triage_translator_data)
 
         resolved_demands = {}
@@ -1184,6 +1767,8 @@ class AAI(base.InventoryProviderBase):
             self.triage_translator.addDemandsTriageTranslator(name, triage_translator_data)
             resolved_demands[name] = []
             for requirement in requirements:
+                if not self.conf.aai.resolve_memo:
+                    self._resolve_memo.responses.clear()
                 inventory_type = requirement.get('inventory_type').lower()
                 service_subscription = requirement.get('service_subscription')
                 candidate_uniqueness = requirement.get('unique', 'true')
@@ -1358,6 +1943,7 @@ class AAI(base.InventoryProviderBase):
                         vnf_by_service_type = self.first_level_service_call(path, name, service_type)
 
                     generic_vnf = vnf_by_model_invariant + vnf_by_service_type
+                    self._prefetch_generic_vnfs(generic_vnf, customer_id)
                     vnf_dict = dict()
 
                     for vnf in generic_vnf:
@@ -1530,6 +2116,8 @@ class AAI(base.InventoryProviderBase):
                         vnf_by_service_type = self.first_level_service_call(path, name, service_type)
 
                     generic_vnf = vnf_by_model_invariant + vnf_by_service_type
+                    self._prefetch_generic_vnfs(generic_vnf, customer_id,
+                                                vf_modules=True)
                     vnf_dict = dict()
 
                     for vnf in generic_vnf:
@@ -1923,7 +2511,12 @@ class AAI(base.InventoryProviderBase):
 
     def match_hpa(self, candidate, features):
         """Match HPA features requirement with the candidate flavors """
-        hpa_provider = hpa_utils.HpaMatchProvider(candidate, features)
+        # The compiled flavors of the region are used when the candidate
+        # still carries the flavors they were built from
+        index = self._aai_flavor_index.get(candidate.get('location_id'))
+        if index is not None and not index.matches(candidate.get('flavors')):
+            index = None
+        hpa_provider = hpa_utils.HpaMatchProvider(candidate, features, index)
         if hpa_provider.init_verify():
             directives = hpa_provider.match_flavor()
         else:
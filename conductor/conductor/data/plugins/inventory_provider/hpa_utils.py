@@ -50,15 +50,163 @@ def  match_all_operator(big_list, small_list):
     return small_set.issubset(big_set)
 
 
+# Keys identifying a capability, for the capability match
+HPA_KEYS = ('hpa-feature', 'architecture', 'hpa-version')
+
+
+def capability_key(capability):
+    """(key, value) pairs of the HPA_KEYS found in a capability"""
+    return tuple((k, capability[k]) for k in HPA_KEYS if k in capability)
+
+
+def normalize_value(unit, value):
+    """Convert to bytes value using unit"""
+    if not value.isdigit():
+        return value
+    value = int(value)
+    if unit == 'KB':
+        value = value * 1024
+    elif unit == 'MB':
+        value = value * 1024 * 1024
+    elif unit == 'GB':
+        value = value * 1024 * 1024 * 1024
+    return str(value)
+
+
+def parse_flavor_attribute(flavor_attr):
+    """Normalized value of a flavor hpa-feature-attribute, or None"""
+    try:
+        attrib_value = yaml.load(flavor_attr['hpa-attribute-value'])
+    except Exception:
+        return None
+
+    f_unit = None
+    f_value = None
+    try:
+        for key, value in attrib_value.iteritems():
+            if key == 'value':
+                f_value = value
+            elif key == 'unit':
+                f_unit = value
+        if f_unit:
+            f_value = normalize_value(f_unit, f_value)
+    except AttributeError:
+        return None
+    return f_value
+
+
+def flavor_signature(flavors_info):
+    """Ids and resource versions of the flavors of a region"""
+    if not isinstance(flavors_info, dict) or not flavors_info.get('flavor'):
+        return ()
+    return tuple((f.get('flavor-id'), f.get('resource-version'))
+                 for f in flavors_info['flavor'])
+
+
+class AttributeValues(object):
+    """Normalized values of the attributes of one flavor capability.
+
+    Values are parsed on first use, or all at once by parse().
+    """
+
+    def __init__(self, feature_attributes):
+        self._attributes = {}
+        self._values = {}
+        for attr in feature_attributes or []:
+            # The first attribute with a key is the one compared
+            self._attributes.setdefault(attr.get('hpa-attribute-key'), attr)
+
+    def __contains__(self, key):
+        return key in self._attributes
+
+    def get(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            value = parse_flavor_attribute(self._attributes[key])
+            self._values[key] = value
+            return value
+
+    def parse(self):
+        for key in self._attributes:
+            self.get(key)
+
+
+class CompiledFlavor(object):
+    """HPA capabilities of a flavor.
+
+    capability_keys is None when the flavor has no hpa-capabilities.
+    features maps each hpa-feature to the AttributeValues of each
+    capability of that feature.
+    """
+
+    def __init__(self, flavor, parse=True):
+        self.flavor_id = flavor.get('flavor-id')
+        self.flavor_name = flavor.get('flavor-name')
+        self.capability_keys = None
+        self.features = {}
+        try:
+            flavor_cap_list = flavor['hpa-capabilities']
+        except KeyError:
+            return
+        self.capability_keys = set()
+        for capability in CapabilityDataParser.get_item(flavor_cap_list,
+                                                        'hpa-capability'):
+            self.capability_keys.add(capability_key(capability.item))
+            feature, feature_attributes = capability.get_fields()
+            values = AttributeValues(feature_attributes)
+            if parse:
+                values.parse()
+            self.features.setdefault(feature, []).append(values)
+
+
+class FlavorCapabilityIndex(object):
+    """Compiled HPA capabilities of the flavors of a cloud region.
+
+    The flavors are indexed by capability (hpa-feature, architecture
+    and hpa-version), and the attribute values are parsed and
+    normalized once, so matching a request again does not go through
+    YAML. With parse=False, each value is parsed when first compared.
+    """
+
+    def __init__(self, flavors_info, parse=True):
+        flavor_list = []
+        if isinstance(flavors_info, dict) and flavors_info.get('flavor'):
+            flavor_list = flavors_info['flavor']
+        self.signature = flavor_signature(flavors_info)
+        self.flavors = [CompiledFlavor(f, parse) for f in flavor_list]
+        self._by_capability = {}
+        for position, flavor in enumerate(self.flavors):
+            for key in flavor.capability_keys or ():
+                self._by_capability.setdefault(key, set()).add(position)
+
+    def matches(self, flavors_info):
+        """Whether the index was built from these flavors"""
+        return self.signature == flavor_signature(flavors_info)
+
+    def supporting(self, keys):
+        """Positions of the flavors having all the capabilities keys"""
+        if not keys:
+            return set(position for position, flavor
+                       in enumerate(self.flavors)
+                       if flavor.capability_keys is not None)
+        positions = sorted((self._by_capability.get(key, set())
+                            for key in keys), key=len)
+        return set.intersection(*positions)
+
+
 class HpaMatchProvider(object):
 
-    def __init__(self, candidate, req_cap_list):
+    def __init__(self, candidate, req_cap_list, index=None):
         self.flavors_list = None
         if isinstance(candidate.get('flavors'), dict) \
                 and candidate.get('flavors').get('flavor'):
             self.flavors_list = candidate.get('flavors').get('flavor')
         self.req_cap_list = req_cap_list
         self.m_vim_id = candidate.get('vim-id')
+        # index is the compiled form of the candidate flavors, when
+        # the inventory provider has one
+        self.index = index
 
     # Find out whether there is flavor info inside the candidate
     def init_verify(self):
@@ -69,92 +217,63 @@ class HpaMatchProvider(object):
 
     # Find the flavor which has all the required capabilities
     def match_flavor(self):
-        # Keys to find capability match
-        hpa_keys = ['hpa-feature', 'architecture', 'hpa-version']
+        if self.index is None:
+            self.index = FlavorCapabilityIndex(
+                {'flavor': self.flavors_list}, parse=False)
         req_filter_list = []
         for capability in CapabilityDataParser.get_item(self.req_cap_list,
                                                         None):
             if capability.item['mandatory'].lower() == 'true':
-                hpa_list = {k: capability.item[k] \
-                            for k in hpa_keys if k in capability.item}
-                if hpa_list not in req_filter_list:
-                    req_filter_list.append(hpa_list)
+                hpa_key = capability_key(capability.item)
+                if hpa_key not in req_filter_list:
+                    req_filter_list.append(hpa_key)
+        supported = self.index.supporting(req_filter_list)
         max_score = -1
         directives = None
-        for flavor in self.flavors_list:
-            flavor_filter_list = []
-            try:
-                flavor_cap_list = flavor['hpa-capabilities']
-            except KeyError:
+        for position, flavor in enumerate(self.index.flavors):
+            m_flavor_name = flavor.flavor_name
+            if flavor.capability_keys is None:
                 LOG.info(_LI("hpa-capabilities not found in flavor "))
                 # Metrics to Prometheus
-                m_flavor_name = flavor['flavor-name']
                 PC.HPA_FLAVOR_MATCH_UNSUCCESSFUL.labels('ONAP', 'N/A', 'N/A',
                                                       'N/A', self.m_vim_id,
                                                       m_flavor_name).inc()
                 continue
-            for capability in CapabilityDataParser.get_item(flavor_cap_list,
-                                                            'hpa-capability'):
-                hpa_list = {k: capability.item[k] \
-                               for k in hpa_keys if k in capability.item}
-                flavor_filter_list.append(hpa_list)
             # if flavor has the matching capability compare attributes
-            if self._is_cap_supported(flavor_filter_list, req_filter_list):
-                match_found, score, req_directives = self._compare_feature_attributes(flavor_cap_list)
+            if position in supported:
+                match_found, score, req_directives = \
+                    self._compare_feature_attributes(flavor)
                 if match_found:
                     LOG.info(_LI("Matching Flavor found '{}' for request - {}").
-                             format(flavor['flavor-name'], self.req_cap_list))
+                             format(m_flavor_name, self.req_cap_list))
                     # Metrics to Prometheus
-                    m_flavor_name = flavor['flavor-name']
                     PC.HPA_FLAVOR_MATCH_SUCCESSFUL.labels('ONAP', 'N/A', 'N/A',
                                                           'N/A', self.m_vim_id,
                                                           m_flavor_name).inc()
                     if score > max_score:
                         max_score = score
-                        flavor_map = {"flavor-id": flavor['flavor-id'],
-                                      "flavor-name": flavor['flavor-name'],
+                        flavor_map = {"flavor-id": flavor.flavor_id,
+                                      "flavor-name": m_flavor_name,
                                       "score": max_score}
                         directives = {"flavor_map": flavor_map,
                                       "directives": req_directives}
                 else:
                     # Metrics to Prometheus
-                    m_flavor_name = flavor['flavor-name']
                     PC.HPA_FLAVOR_MATCH_UNSUCCESSFUL.labels('ONAP', 'N/A',
                                                             'N/A', 'N/A',
                                                             self.m_vim_id,
                                                             m_flavor_name).inc()
             else:
                 # Metrics to Prometheus
-                m_flavor_name = flavor['flavor-name']
                 PC.HPA_FLAVOR_MATCH_UNSUCCESSFUL.labels('ONAP', 'N/A',
                                                         'N/A', 'N/A',
                                                         self.m_vim_id,
                                                         m_flavor_name).inc()
         return directives
 
-
-    def _is_cap_supported(self, flavor, cap):
-        try:
-            for elem in cap:
-                flavor.remove(elem)
-        except ValueError:
-            return False
-        # Found all capabilities in Flavor
-        return True
-
     # Convert to bytes value using unit
     def _get_normalized_value(self, unit, value):
-
-        if not value.isdigit():
-            return value
-        value = int(value)
-        if unit == 'KB':
-            value = value * 1024
-        elif unit == 'MB':
-            value = value * 1024 * 1024
-        elif unit == 'GB':
-            value = value * 1024 * 1024 * 1024
-        return str(value)
+        return normalize_value(unit, value)
 
     def _get_req_attribute(self, req_attr):
         try:
@@ -171,23 +290,6 @@ class HpaMatchProvider(object):
             c_value = self._get_normalized_value(c_unit, c_value)
         return c_value, c_op
 
-    def _get_flavor_attribute(self, flavor_attr):
-        try:
-            attrib_value = yaml.load(flavor_attr['hpa-attribute-value'])
-        except:
-            return None
-
-        f_unit = None
-        f_value = None
-        for key, value in attrib_value.iteritems():
-            if key == 'value':
-                f_value = value
-            elif key == 'unit':
-                f_unit = value
-        if f_unit:
-            f_value = self._get_normalized_value(f_unit, f_value)
-        return f_value
-
     def _get_operator(self, req_op):
 
         operator_list = ['=', '<', '>', '<=', '>=', 'ALL']
@@ -211,10 +313,9 @@ class HpaMatchProvider(object):
         return op
 
 
-    def _compare_attribute(self, flavor_attr, req_attr):
+    def _compare_attribute(self, flavor_value, req_attr):
 
         req_value, req_op = self._get_req_attribute(req_attr)
-        flavor_value = self._get_flavor_attribute(flavor_attr)
 
         if req_value is None or flavor_value is None:
             return False
@@ -244,21 +345,10 @@ class HpaMatchProvider(object):
 
         return False
 
-    # for the feature get the capabilty feature attribute list
-    def _get_flavor_cfa_list(self, feature, flavor_cap_list):
-        feature_attr_list = []
-        for capability in CapabilityDataParser.get_item(flavor_cap_list,
-                                                        'hpa-capability'):
-            flavor_feature, feature_attributes = capability.get_fields()
-            # Multiple features that match this condition will be filtered
-            if feature == flavor_feature:
-                feature_attr_list.append(feature_attributes)
-        return feature_attr_list
-
     # flavor has all the required capabilties
     # For each required capability find capability in flavor
     # and compare each attribute
-    def _compare_feature_attributes(self, flavor_cap_list):
+    def _compare_feature_attributes(self, flavor):
         score = 0
         directives = []
         for capability in CapabilityDataParser.get_item(self.req_cap_list, None):
@@ -269,27 +359,23 @@ class HpaMatchProvider(object):
                                         if d.get("type") != ""]
                 for item in feature_directive:
                     directives.append(item)
-            flavor_cfa_list = self._get_flavor_cfa_list(hpa_feature, flavor_cap_list)
+            # Multiple features that match this condition will be filtered
+            flavor_cfa_list = flavor.features.get(hpa_feature, [])
             req_flag = False
-            if flavor_cfa_list is not None:
-                for flavor_cfa in flavor_cfa_list:
-                    flavor_flag = True
-                    for req_feature_attr in req_cfa_list:
-                        req_attr_key = req_feature_attr['hpa-attribute-key']
-                        # filter to get the attribute being compared
-                        flavor_feature_attr = \
-                            filter(lambda ele: ele['hpa-attribute-key'] ==
-                                               req_attr_key, flavor_cfa)
-                        if not flavor_feature_attr:
-                            flavor_flag = False
-                        elif not self._compare_attribute(flavor_feature_attr[0],
-                                                       req_feature_attr):
-                            flavor_flag = False
-                    if not flavor_flag:
-                        continue
-                    else:
-                        req_flag = True
-                        break
+            for flavor_cfa in flavor_cfa_list:
+                flavor_flag = True
+                for req_feature_attr in req_cfa_list:
+                    req_attr_key = req_feature_attr['hpa-attribute-key']
+                    if req_attr_key not in flavor_cfa:
+                        flavor_flag = False
+                    elif not self._compare_attribute(
+                            flavor_cfa.get(req_attr_key), req_feature_attr):
+                        flavor_flag = False
+                if not flavor_flag:
+                    continue
+                else:
+                    req_flag = True
+                    break
             if not req_flag and capability.item['mandatory'].lower() == 'true':
                 return False, 0, None
             if req_flag and capability.item['mandatory'].lower() == 'false':
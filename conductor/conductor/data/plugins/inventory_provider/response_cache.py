@@ -0,0 +1,317 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+'''Cache of A&AI responses, kept in memory and optionally on disk'''
+
+import collections
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from oslo_log import log
+from six.moves.urllib import parse
+
+import conductor.common.prometheus_metrics as PC
+
+LOG = log.getLogger(__name__)
+
+# Path segments naming the type of the resource a path leads to
+RESOURCE_TYPES = {
+    'generic-vnf': 'generic-vnf',
+    'generic-vnfs': 'generic-vnf',
+    'vserver': 'vserver',
+    'vservers': 'vserver',
+    'pserver': 'pserver',
+    'pservers': 'pserver',
+    'complex': 'complex',
+    'complexes': 'complex',
+    'flavor': 'flavor',
+    'flavors': 'flavor',
+    'cloud-region': 'cloud-region',
+    'cloud-regions': 'cloud-region',
+    'query': 'query',
+}
+
+# Time, in seconds, between two prunings of the cache directory by a
+# worker, and after which a temporary file is taken as left over
+PRUNE_INTERVAL = 60
+
+HIT = 'hit'
+MISS = 'miss'
+REVALIDATED = 'revalidated'
+
+
+def resource_type(path):
+    """Type of the resource of an A&AI path, or None if not known"""
+    segments = parse.urlsplit(path).path.strip('/').split('/')
+    for segment in reversed(segments):
+        if segment in RESOURCE_TYPES:
+            return RESOURCE_TYPES[segment]
+
+
+def cache_key(path, data=None):
+    """Key of the response to a request"""
+    if data is None:
+        return path
+    return '{}#{}'.format(path, json.dumps(data, sort_keys=True))
+
+
+def revalidation_path(path):
+    """Path of the depth=0 form of a resource, or None if not revalidated
+
+    Only the resource itself is returned at depth 0, which is enough to
+    compare its resource-version with the one of a cached response.
+    A&AI does not change the resource-version of a resource when its
+    children change, so responses asked with a depth are not
+    revalidated: at depth 0 it would cost a request as well.
+    """
+    parts = parse.urlsplit(path)
+    if parts.query:
+        return None
+    return parse.urlunsplit((parts.scheme, parts.netloc, parts.path,
+                             'depth=0', parts.fragment))
+
+
+class CachedResponse(object):
+    """The parts of a requests response read by the A&AI plugin"""
+
+    status_code = 200
+    reason = 'OK'
+    ok = True
+
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        # Callers may change what they get, as with a fresh response
+        return copy.deepcopy(self._body)
+
+
+class Entry(object):
+    """A cached response body"""
+
+    __slots__ = ('resource_type', 'body', 'resource_version', 'expires')
+
+    def __init__(self, resource_type, body, resource_version, expires):
+        self.resource_type = resource_type
+        self.body = body
+        self.resource_version = resource_version
+        self.expires = expires
+
+    def expired(self, now=None):
+        return (now or time.time()) >= self.expires
+
+    def to_dict(self):
+        return dict((k, getattr(self, k)) for k in self.__slots__)
+
+
+class ResponseCache(object):
+    """LRU cache of A&AI response bodies, with a TTL per resource type.
+
+    Entries are also written to directory when one is given, one file
+    per key, so that the data workers of a host and their restarts
+    share them. Files are replaced atomically, and an expired or
+    unreadable file is treated as a miss. With max_files, the least
+    recently written files over it are removed, see prune().
+    """
+
+    def __init__(self, size, ttls, directory=None, max_files=0):
+        self.size = size
+        self.ttls = dict((t, int(ttl)) for t, ttl in ttls.items())
+        self.directory = directory or None
+        self.max_files = max_files
+        self._pruned = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = collections.defaultdict(collections.Counter)
+        if self.directory and not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError as exc:
+                LOG.warning("A&AI response cache directory {} is not "
+                            "usable, caching in memory only: {}".format(
+                                self.directory, exc))
+                self.directory = None
+
+    def ttl(self, rtype):
+        """Time to live of a resource type, 0 if it is not cached"""
+        return self.ttls.get(rtype, 0) if rtype else 0
+
+    def get(self, key):
+        """The entry of key, expired or not, or None"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+                return entry
+        entry = self._read(key)
+        if entry is not None:
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key, rtype, body):
+        resource_version = None
+        if isinstance(body, dict):
+            resource_version = body.get('resource-version')
+        entry = Entry(rtype, body, resource_version,
+                      time.time() + self.ttl(rtype))
+        self._insert(key, entry)
+        self._write(key, entry)
+        return entry
+
+    def renew(self, key, entry):
+        """Start a new TTL for an entry found to be unchanged"""
+        entry.expires = time.time() + self.ttl(entry.resource_type)
+        self._write(key, entry)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        self._remove(key)
+
+    def record(self, rtype, result):
+        """Count a lookup, result is HIT, MISS or REVALIDATED"""
+        with self._lock:
+            self._stats[rtype][result] += 1
+        PC.AAI_RESPONSE_CACHE_LOOKUPS.labels(rtype, result).inc()
+
+    def stats(self):
+        """Lookups and hit rate of each resource type"""
+        with self._lock:
+            stats = {}
+            for rtype, counts in self._stats.items():
+                total = sum(counts.values())
+                stats[rtype] = {
+                    HIT: counts[HIT],
+                    MISS: counts[MISS],
+                    REVALIDATED: counts[REVALIDATED],
+                    'hit_rate': float(counts[HIT] + counts[REVALIDATED]) /
+                    total if total else 0.0,
+                }
+            return stats
+
+    def _insert(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def _file(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.json')
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        filename = self._file(key)
+        try:
+            with open(filename) as f:
+                stored = json.load(f)
+            if stored.pop('key') != key:
+                return None
+            entry = Entry(**stored)
+        except (IOError, OSError):
+            return None
+        except (ValueError, TypeError, KeyError) as exc:
+            LOG.debug("Dropping unreadable A&AI response cache file "
+                      "{}: {}".format(filename, exc))
+            self._remove(key)
+            return None
+        if entry.expired() and not entry.resource_version:
+            # Nothing to revalidate it with
+            self._remove(key)
+            return None
+        return entry
+
+    def _write(self, key, entry):
+        if not self.directory:
+            return
+        stored = entry.to_dict()
+        stored['key'] = key
+        temp = None
+        try:
+            fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(stored, f)
+            # Readers in other workers see the old file or the new one
+            os.rename(temp, self._file(key))
+        except (IOError, OSError, TypeError, ValueError) as exc:
+            LOG.debug("Could not write the A&AI response cache file of "
+                      "{}: {}".format(key, exc))
+            if temp and os.path.exists(temp):
+                os.remove(temp)
+        now = time.time()
+        with self._lock:
+            due = now - self._pruned >= PRUNE_INTERVAL
+            if due:
+                self._pruned = now
+        if due:
+            self.prune(now)
+
+    def prune(self, now=None):
+        """Remove the files over max_files, and left over temporary files
+
+        The workers sharing the directory each prune it at most every
+        PRUNE_INTERVAL seconds, when they write to it. Files are
+        removed least recently written first: renew() writes them
+        again.
+        """
+        if not self.directory:
+            return
+        now = now or time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        files = []
+        for name in names:
+            filename = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(filename)
+            except OSError:
+                # Removed by another worker
+                continue
+            if name.endswith('.json'):
+                files.append((mtime, filename))
+            elif name.endswith('.tmp') and now - mtime >= PRUNE_INTERVAL:
+                self._unlink(filename)
+        excess = len(files) - self.max_files
+        if self.max_files and excess > 0:
+            files.sort()
+            for _mtime, filename in files[:excess]:
+                self._unlink(filename)
+            LOG.debug("Removed {} A&AI response cache files over {}".format(
+                excess, self.max_files))
+
+    def _remove(self, key):
+        if not self.directory:
+            return
+        self._unlink(self._file(key))
+
+    @staticmethod
+    def _unlink(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
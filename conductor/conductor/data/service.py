@@ -21,8 +21,14 @@
 # import os
 
 import conductor.common.prometheus_metrics as PC
+import copy
 import cotyledon
+import multiprocessing
+import signal
+import threading
+import time
 from conductor import messaging
+from conductor.common import candidate_table
 # from conductor import __file__ as conductor_root
 from conductor.common.music import messaging as music_messaging
 from conductor.common.utils import conductor_logging_util as log_util
@@ -60,10 +66,72 @@ DATA_OPTS = [
                default=2.0),
     cfg.FloatOpt('service_candidate_cost',
                default=1.0),
+    cfg.IntOpt('hpa_match_workers',
+               default=0,
+               min=0,
+               help='Number of processes matching the HPA capabilities of '
+                    'the candidates of get_candidates_with_hpa calls. Each '
+                    'data worker forks them once, when it starts. Default '
+                    'value is 0, to match them in the data worker.'),
+    cfg.IntOpt('hpa_match_chunk_size',
+               default=200,
+               min=1,
+               help='Number of candidates sent to an HPA match process at '
+                    'once. Candidate lists no longer than this are matched '
+                    'in the data worker.'),
+    cfg.IntOpt('inventory_group_refresh_interval',
+               default=300,
+               min=0,
+               help='Time, in seconds, the inventory group pairs are kept '
+                    'before they are fetched again from the inventory '
+                    'provider. 0 fetches them for every call. Default '
+                    'value is 300.'),
 ]
 
 CONF.register_opts(DATA_OPTS, group='data')
 
+# Description of the instance groups pairing inventory group candidates
+INVENTORY_GROUP_SERVICE = 'DHV_VVIG_PAIR'
+
+
+# Inventory provider manager of an HPA match process, set once by
+# _init_hpa_match_process() when the process starts.
+_hpa_ip_ext_manager = None
+
+
+def _start_data_worker(service_id, worker_id, service):
+    """Prepare a data worker, before it starts its threads"""
+    for endpoint in service.endpoints:
+        endpoint.start_hpa_match_pool()
+
+
+def _init_hpa_match_process(ip_ext_manager):
+    """Initialize an HPA match process.
+
+    The process is forked with the inventory provider manager of its
+    data worker, along with its A&AI cache and flavor index. The
+    signals are handled by the data worker.
+    """
+    global _hpa_ip_ext_manager
+    _hpa_ip_ext_manager = ip_ext_manager
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _match_hpa_chunk(candidate_list, features):
+    """Match a chunk of candidates in an HPA match process.
+
+    Returns the match_hpa results of each candidate, and the increments
+    of the HPA match counters, which would be lost with the process.
+    """
+    before = PC.counter_values(PC.HPA_MATCH_COUNTERS)
+    results = [_hpa_ip_ext_manager.map_method('match_hpa',
+                                              candidate=candidate,
+                                              features=features)
+               for candidate in candidate_list]
+    return results, PC.counter_increments(PC.HPA_MATCH_COUNTERS, before)
+
 
 class DataServiceLauncher(object):
     """Listener for the data service."""
@@ -108,6 +176,7 @@ class DataServiceLauncher(object):
             svcmgr.add(music_messaging.RPCService,
                        workers=self.conf.data.workers,
                        args=(self.conf,), kwargs=kwargs)
+            svcmgr.register_hooks(on_new_worker=_start_data_worker)
             svcmgr.run()
 
 
@@ -123,6 +192,27 @@ class DataEndpoint(object):
             'plan_name': None,
             'translator_triage': []
         }
+        self.triage_lock = threading.Lock()
+        # Inventory group pair index and fetch time, by service
+        self.inventory_groups = {}
+        self.inventory_group_lock = threading.Lock()
+        # HPA match processes, see start_hpa_match_pool()
+        self.hpa_match_pool = None
+
+    def start_hpa_match_pool(self):
+        '''
+        Fork the HPA match processes, if configured. Each data worker
+        does it once, when it starts, before its threads hold any lock.
+        The processes keep the A&AI flavor index of the time they were
+        forked, match_hpa() checks it against the candidate flavors.
+        '''
+        workers = CONF.data.hpa_match_workers
+        if workers < 1 or self.hpa_match_pool is not None:
+            return
+        self.hpa_match_pool = multiprocessing.Pool(
+            workers, initializer=_init_hpa_match_process,
+            initargs=(self.ip_ext_manager,))
+        LOG.info(_LI("Started {} HPA match processes").format(workers))
 
     def get_candidate_location(self, ctx, arg):
         # candidates should have lat long info already
@@ -160,7 +250,7 @@ class DataEndpoint(object):
 
     def get_candidates_from_service(self, ctx, arg):
 
-        candidate_list = arg["candidate_list"]
+        candidate_list = candidate_table.decode(arg["candidate_list"])
         constraint_name = arg["constraint_name"]
         constraint_type = arg["constraint_type"]
         controller = arg["controller"]
@@ -258,12 +348,8 @@ class DataEndpoint(object):
         return discard_set
 
 
-    def get_inventory_group_candidates(self, ctx, arg):
-        candidate_list = arg["candidate_list"]
-        resolved_candidate = arg["resolved_candidate"]
-        candidate_names = []
-        error = False
-        service_description = 'DHV_VVIG_PAIR'
+    def _fetch_inventory_group_index(self, service_description):
+        """Pair index of the inventory groups of a service, or None"""
         results = self.ip_ext_manager.map_method(
             'get_inventory_group_pairs',
             service_description=service_description
@@ -272,29 +358,74 @@ class DataEndpoint(object):
             LOG.error(
                 _LE("Empty inventory group response for service: {}").format(
                     service_description))
-            error = True
-        else:
-            pairs = results[0]
-            if not pairs or len(pairs) < 1:
-                LOG.error(
-                    _LE("No inventory group candidates found for service: {}, "
-                        "inventory provider: {}").format(
-                        service_description, self.ip_ext_manager.names()[0]))
-                error = True
-            else:
-                LOG.debug(
-                    "Inventory group pairs: {}, service: {}, "
-                    "inventory provider: {}".format(
-                        pairs, service_description,
-                        self.ip_ext_manager.names()[0]))
-                for pair in pairs:
-                    if resolved_candidate.get("candidate_id") == pair[0]:
-                        candidate_names.append(pair[1])
-                    elif resolved_candidate.get("candidate_id") == pair[1]:
-                        candidate_names.append(pair[0])
+            return None
+        pairs = results[0]
+        if not pairs or len(pairs) < 1:
+            LOG.error(
+                _LE("No inventory group candidates found for service: {}, "
+                    "inventory provider: {}").format(
+                    service_description, self.ip_ext_manager.names()[0]))
+            return None
+        LOG.debug(
+            "Inventory group pairs: {}, service: {}, "
+            "inventory provider: {}".format(
+                pairs, service_description, self.ip_ext_manager.names()[0]))
+        index = {}
+        for first, second in pairs:
+            index.setdefault(first, set()).add(second)
+            index.setdefault(second, set()).add(first)
+        return index
+
+    def inventory_group_index(self, service_description):
+        """Inventory group pair index of a service.
+
+        Maps each candidate id to the set of candidate ids it is paired
+        with, in either direction. The index is fetched again once it
+        is older than inventory_group_refresh_interval. If that fails,
+        the previous index is kept. Returns None if there is none.
+        """
+        with self.inventory_group_lock:
+            fetched_at, index = self.inventory_groups.get(
+                service_description, (None, None))
+            if fetched_at is not None and time.time() - fetched_at < \
+                    CONF.data.inventory_group_refresh_interval:
+                return index
+            fetched = self._fetch_inventory_group_index(service_description)
+            if fetched is None:
+                if index is not None:
+                    LOG.warning(_LW("Keeping the inventory group pairs of "
+                                    "service {} fetched {:.0f} seconds "
+                                    "ago").format(service_description,
+                                                  time.time() - fetched_at))
+                return index
+            self.inventory_groups[service_description] = (time.time(),
+                                                          fetched)
+            return fetched
+
+    @music_messaging.thread_safe
+    def get_inventory_group_pairs(self, ctx, arg):
+        """Inventory group pair index, for the solver to keep for a plan"""
+        service_description = arg.get('service_description') or \
+            INVENTORY_GROUP_SERVICE
+        index = self.inventory_group_index(service_description)
+        if index is None:
+            return {'response': {}, 'error': True}
+        return {'response': dict((candidate_id, sorted(partners))
+                                 for candidate_id, partners in index.items()),
+                'error': False}
+
+    @music_messaging.thread_safe
+    def get_inventory_group_candidates(self, ctx, arg):
+        candidate_list = candidate_table.decode(arg["candidate_list"])
+        resolved_candidate = arg["resolved_candidate"]
+        service_description = INVENTORY_GROUP_SERVICE
+        index = self.inventory_group_index(service_description)
+        error = index is None
+        partners = (index or {}).get(resolved_candidate.get("candidate_id"),
+                                     set())
 
         candidate_list = [c for c in candidate_list
-                          if c["candidate_id"] in candidate_names]
+                          if c["candidate_id"] in partners]
         LOG.info(
             _LI("Inventory group candidates: {}, service: {}, "
                 "inventory provider: {}").format(
@@ -303,7 +434,7 @@ class DataEndpoint(object):
         return {'response': candidate_list, 'error': error}
 
     def get_candidates_by_attributes(self, ctx, arg):
-        candidate_list = arg["candidate_list"]
+        candidate_list = candidate_table.decode(arg["candidate_list"])
         # demand_name = arg["demand_name"]
         properties = arg["properties"]
         discard_set = set()
@@ -456,7 +587,7 @@ class DataEndpoint(object):
         :return: response candidate_list with matching label to flavor mapping
         '''
         error = False
-        candidate_list = arg["candidate_list"]
+        candidate_list = candidate_table.decode(arg["candidate_list"])
         id = arg["id"]
         type = arg["type"]
         directives = arg["directives"]
@@ -464,6 +595,7 @@ class DataEndpoint(object):
         label_name = attr[0].get("attribute_name")
         flavorProperties = arg["flavorProperties"]
         discard_set = set()
+        matched = []
         for i in range(len(candidate_list)):
             # perform this check only for cloud candidates
             if candidate_list[i]["inventory_type"] != "cloud":
@@ -476,14 +608,13 @@ class DataEndpoint(object):
                 LOG.error(_LE("Flavor mapping for label name {} already"
                               "exists").format(label_name))
                 continue
+            matched.append(i)
 
-            # RPC call to inventory provider for matching hpa capabilities
-            results = self.ip_ext_manager.map_method(
-                'match_hpa',
-                candidate=candidate_list[i],
-                features=flavorProperties
-            )
+        # RPC call to inventory provider for matching hpa capabilities
+        match_results = self._match_hpa(
+            [candidate_list[i] for i in matched], flavorProperties)
 
+        for i, results in zip(matched, match_results):
             flavor_name = None
             if results and len(results) > 0 and results[0] is not None:
                 LOG.debug("Find results {} and results length {}".format(results, len(results)))
@@ -541,6 +672,35 @@ class DataEndpoint(object):
                                              self.ip_ext_manager.names()[0]))
         return {'response': candidate_list, 'error': error}
 
+    def _match_hpa(self, candidate_list, features):
+        '''
+        Match the HPA capabilities of candidates, in order
+        :param candidate_list: candidates to match
+        :param features: required HPA capabilities (flavorProperties)
+        :return: the match_hpa results of each candidate
+        '''
+        chunk_size = CONF.data.hpa_match_chunk_size
+        if self.hpa_match_pool is None or len(candidate_list) <= chunk_size:
+            return [self.ip_ext_manager.map_method('match_hpa',
+                                                   candidate=candidate,
+                                                   features=features)
+                    for candidate in candidate_list]
+
+        chunks = [candidate_list[i:i + chunk_size]
+                  for i in range(0, len(candidate_list), chunk_size)]
+        pending = [self.hpa_match_pool.apply_async(_match_hpa_chunk,
+                                                   (chunk, features))
+                   for chunk in chunks]
+        match_results = []
+        # Chunks are merged in order, whichever finishes first
+        for result in pending:
+            results, increments = result.get()
+            PC.add_counter_increments(PC.HPA_MATCH_COUNTERS, increments)
+            match_results.extend(results)
+        LOG.debug("Matched {} candidates in {} chunks".format(
+            len(candidate_list), len(chunks)))
+        return match_results
+
     def merge_directives(self, candidate_list, index, id, type, directives, feature_directives):
         '''
         Merge the flavor_directives with other diectives listed under hpa capabilities in the policy
@@ -579,7 +739,7 @@ class DataEndpoint(object):
         :return: response candidate_list with with required vim capacity
         '''
         error = False
-        candidate_list = arg["candidate_list"]
+        candidate_list = candidate_table.decode(arg["candidate_list"])
         vim_request = arg["request"]
         vim_list = set()
         discard_set = set()
@@ -616,6 +776,7 @@ class DataEndpoint(object):
 
         return {'response': candidate_list, 'error': error}
 
+    @music_messaging.thread_safe
     def resolve_demands(self, ctx, arg):
 
         log_util.setLoggerFilter(LOG, ctx.get('keyspace'), ctx.get('plan_id'))
@@ -625,34 +786,44 @@ class DataEndpoint(object):
         plan_info = arg.get('plan_info')
         triage_translator_data = arg.get('triage_translator_data')
         resolved_demands = None
+        dropped_candidates = None
         results = self.ip_ext_manager.map_method(
             'resolve_demands',
             demands, plan_info, triage_translator_data
         )
         if results and len(results) > 0:
             resolved_demands = results[0]
-            if self.triage_data_trans['plan_id']== None :
-                self.triage_data_trans['plan_name'] = triage_translator_data['plan_name']
-                self.triage_data_trans['plan_id'] = triage_translator_data['plan_id']
-                self.triage_data_trans['translator_triage'].append(triage_translator_data['dropped_candidates'])
-            elif (not self.triage_data_trans['plan_id'] == triage_translator_data['plan_id']) :
-                self.triage_data_trans = {
-                    'plan_id': None,
-                    'plan_name': None,
-                    'translator_triage': []
-                }
-                self.triage_data_trans['plan_name']  = triage_translator_data['plan_name']
-                self.triage_data_trans['plan_id'] = triage_translator_data['plan_id']
-                self.triage_data_trans['translator_triage'].append(triage_translator_data['dropped_candidates'])
-            else:
-                self.triage_data_trans['translator_triage'].append(triage_translator_data['dropped_candidates'])
+            dropped_candidates = triage_translator_data['dropped_candidates']
+            # The candidates dropped by this call are returned with it,
+            # trans accumulates them over the calls of a plan served
+            # by this worker.
+            with self.triage_lock:
+                if self.triage_data_trans['plan_id']== None :
+                    self.triage_data_trans['plan_name'] = triage_translator_data['plan_name']
+                    self.triage_data_trans['plan_id'] = triage_translator_data['plan_id']
+                    self.triage_data_trans['translator_triage'].append(dropped_candidates)
+                elif (not self.triage_data_trans['plan_id'] == triage_translator_data['plan_id']) :
+                    self.triage_data_trans = {
+                        'plan_id': None,
+                        'plan_name': None,
+                        'translator_triage': []
+                    }
+                    self.triage_data_trans['plan_name']  = triage_translator_data['plan_name']
+                    self.triage_data_trans['plan_id'] = triage_translator_data['plan_id']
+                    self.triage_data_trans['translator_triage'].append(dropped_candidates)
+                else:
+                    self.triage_data_trans['translator_triage'].append(dropped_candidates)
+                trans = copy.deepcopy(self.triage_data_trans)
         else:
             error = True
+            trans = self.triage_data_trans
 
         return {'response': {'resolved_demands': resolved_demands,
-                             'trans': self.triage_data_trans},
+                             'dropped_candidates': dropped_candidates,
+                             'trans': trans},
                 'error': error  }
 
+    @music_messaging.thread_safe
     def resolve_location(self, ctx, arg):
 
         log_util.setLoggerFilter(LOG, ctx.get('keyspace'), ctx.get('plan_id'))
@@ -24,18 +24,22 @@ import conductor.api.app
 import conductor.api.controllers.v1.plans
 import conductor.common.music.api
 import conductor.common.music.messaging.component
+import conductor.common.music.model.codec
+import conductor.common.plan_queue
 import conductor.common.prometheus_metrics
 import conductor.common.sms
 import conductor.conf.inventory_provider
 import conductor.conf.service_controller
 import conductor.conf.vim_controller
 import conductor.controller.service
+import conductor.controller.translator
 import conductor.controller.translator_svc
 import conductor.data.plugins.inventory_provider.aai
 import conductor.data.plugins.service_controller.sdnc
 import conductor.data.plugins.vim_controller.multicloud
 import conductor.reservation.service
 import conductor.service
+import conductor.solver.optimizer.optimizer
 import conductor.solver.service
 
 
@@ -49,6 +53,7 @@ def list_opts():
          conductor.api.controllers.v1.plans.CONDUCTOR_API_OPTS),
         ('controller', itertools.chain(
             conductor.controller.service.CONTROLLER_OPTS,
+            conductor.controller.translator.TRANSLATOR_OPTS,
             conductor.controller.translator_svc.CONTROLLER_OPTS)),
         ('data', conductor.data.service.DATA_OPTS),
         ('inventory_provider',
@@ -71,8 +76,13 @@ def list_opts():
         ('sdnc', conductor.data.plugins.service_controller.sdnc.SDNC_OPTS),
         ('messaging_server',
          conductor.common.music.messaging.component.MESSAGING_SERVER_OPTS),
-        ('music_api', conductor.common.music.api.MUSIC_API_OPTS),
-        ('solver', conductor.solver.service.SOLVER_OPTS),
+        ('music_api', itertools.chain(
+            conductor.common.music.api.MUSIC_API_OPTS,
+            conductor.common.music.model.codec.CODEC_OPTS)),
+        ('plan_queue', conductor.common.plan_queue.PLAN_QUEUE_OPTS),
+        ('solver', itertools.chain(
+            conductor.solver.service.SOLVER_OPTS,
+            conductor.solver.optimizer.optimizer.SOLVER_OPTS)),
         ('reservation', conductor.reservation.service.reservation_OPTS),
         ('aaf_sms', conductor.common.sms.AAF_SMS_OPTS),
         ('aaf_api',
@@ -24,10 +24,12 @@ import socket
 from oslo_config import cfg
 from oslo_log import log
 
+from conductor.common import candidate_pool
 from conductor.common.models import plan
 from conductor.common.music import api
 from conductor.common.music import messaging as music_messaging
 from conductor.common.music.model import base
+from conductor.common import plan_queue
 from conductor.i18n import _LE, _LI
 from conductor import messaging
 from conductor import service
@@ -142,6 +144,12 @@ class ReservationService(cotyledon.Service):
         # Number of retries for reservation/release
         self.reservation_retries = self.conf.reservation.reserve_retries
 
+        # Solved plans are handed over to the reservation workers
+        self.plan_queue = plan_queue.PlanQueue(
+            conf, self.Plan, 'reservation', self.worker_id,
+            queued=self.Plan.SOLVED, claimed=self.Plan.RESERVING,
+            lease=conf.reservation.timeout, poll_interval=conf.delay_time)
+
         if not self.conf.reservation.concurrent:
             self._reset_reserving_status()
 
@@ -247,10 +255,9 @@ class ReservationService(cotyledon.Service):
 
         while self.running:
 
-            # Delay time (Seconds) for MUSIC requests.
-            time.sleep(self.conf.delay_time)
+            # Wait for a plan to be queued, or for the next scan
+            self.plan_queue.wait()
 
-            # plans = Plan.query().all()
             # Find the first plan with a status of SOLVED.
             # Change its status to RESERVING.
 
@@ -259,25 +266,23 @@ class ReservationService(cotyledon.Service):
             p = None
             # requests_to_reserve = dict()
 
-            # Instead of using the query.all() method, now creating an index for 'status'
-            # field in conductor.plans table, and query plans by status columns
-            solved_plans = self.Plan.query.get_plan_by_col("status", self.Plan.SOLVED)
-            reserving_plans = self.Plan.query.get_plan_by_col("status", self.Plan.RESERVING)
-
-            # combine the plans with status = 'solved' and 'reserving' together
-            plans = solved_plans + reserving_plans
-
+            # Only the ids and statuses of the solved and reserving
+            # plans are read, the plan is loaded once picked
             found_solved_template = False
 
-            for p in plans:
+            for entry in self.plan_queue.fetch():
                 # when a plan is in RESERVING status more than timeout value
-                if p.status == self.Plan.RESERVING and \
-                (self.current_time_seconds() - self.millisec_to_sec(p.updated)) > self.conf.reservation.timeout:
+                if self.plan_queue.expired(entry):
                     # change the plan status to SOLVED for another VM to reserve
-                    p.status = self.Plan.SOLVED
-                    p.update(condition=self.reservating_status_condition)
+                    p = self.plan_queue.load(entry)
+                    if p is not None:
+                        self.plan_queue.release(p)
                     break
-                elif p.status == self.Plan.SOLVED:
+                elif entry.status == self.Plan.SOLVED:
+                    p = self.plan_queue.load(entry)
+                    if p is None:
+                        # Claimed by another worker meanwhile
+                        continue
                     solution = p.solution
                     translation = p.translation
                     found_solved_template = True
@@ -305,11 +310,9 @@ class ReservationService(cotyledon.Service):
             log_util.setLoggerFilter(LOG, self.conf.keyspace, p.id)
 
             # update status to reserving
-            p.status = self.Plan.RESERVING
-
             p.reservation_counter += 1
             p.reservation_owner = socket.gethostname()
-            _is_updated = p.update(condition=self.solved_status_condition)
+            _is_updated = self.plan_queue.claim(p)
 
             if not _is_updated:
                 continue
@@ -338,6 +341,8 @@ class ReservationService(cotyledon.Service):
 
             if reservations:
 
+                # Candidates of a pooled translation refer to its pool
+                pool = candidate_pool.load(conductor_solver)
                 recommendations = solution.get("recommendations")
                 reservation_list = list()
                 # TODO(larry) combine the two reservation logic as one, make the code service independent
@@ -364,7 +369,8 @@ class ReservationService(cotyledon.Service):
                                 for demand_name, d_resource in demands.items():
                                     if demand_name == demand:
 
-                                        for candidate in d_resource.get("candidates"):
+                                        for candidate in candidate_pool.demand_candidates(
+                                                conductor_solver, demand_name, pool):
                                             if candidate.get("candidate_id") == selected_candidate_id:
                                                 candidate['request'] = request
                                                 candidates.append(candidate)
@@ -17,7 +17,6 @@
 # -------------------------------------------------------------------------
 #
 
-import copy
 import operator
 from oslo_log import log
 import sys
@@ -34,7 +33,8 @@ class BestFirst(search.Search):
         search.Search.__init__(self, conf)
 
     def search(self, _demand_list, _objective):
-        dlist = copy.deepcopy(_demand_list)
+        # the fit first search only pops demands off its list
+        dlist = list(_demand_list)
         heuristic_solution = self._search_by_fit_first(dlist, _objective)
         if heuristic_solution is None:
             LOG.debug("no solution")
@@ -79,9 +79,7 @@ class BestFirst(search.Search):
             if len(candidate_list) > 0:
                 for candidate in candidate_list:
                     # create path for each candidate for given demand
-                    np = dpath.DecisionPath()
-                    np.set_decisions(p.decisions)
-                    np.decisions[p.current_demand.name] = candidate
+                    np = p.extend(p.current_demand.name, candidate)
                     _objective.compute(np)
 
                     valid_candidate = True
@@ -0,0 +1,132 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+import heapq
+import itertools
+import time
+
+from oslo_log import log
+
+from conductor.i18n import _LI, _LW  # pylint: disable=W0212
+from conductor.solver.optimizer import decision_path as dpath
+from conductor.solver.optimizer import fit_first
+
+LOG = log.getLogger(__name__)
+
+
+class BranchAndBound(fit_first.FitFirst):
+    """Best first branch and bound search for "min" objectives.
+
+    The fit first search gives the first solution, which bounds the
+    value of the solutions worth exploring. Partial paths are then
+    expanded in order of their value plus the objective's heuristic
+    to go, a lower bound of what the remaining demands add. The first
+    complete path taken off the open list is optimal.
+
+    When solver_timeout is reached, or the open list grows past
+    branch_and_bound_max_open, the best solution found so far is
+    returned.
+    """
+
+    def __init__(self, conf):
+        fit_first.FitFirst.__init__(self, conf)
+        self.expanded = 0
+        self.optimal = False
+
+    def search(self, _demand_list, _objective, _request):
+        if _objective.goal != "min":
+            LOG.debug("Branch and bound only supports the min goal, "
+                      "using fit first")
+            return fit_first.FitFirst.search(self, _demand_list,
+                                             _objective, _request)
+
+        begin_time = time.time()
+        demand_list = list(_demand_list)
+        best_path = fit_first.FitFirst.search(self, list(_demand_list),
+                                              _objective, _request)
+        bound_value = float('inf')
+        if best_path is not None:
+            bound_value = best_path.total_value
+        LOG.debug("fit first value = {}".format(bound_value))
+
+        _objective.compute_bounds(
+            dict((d.name, d) for d in demand_list), _request)
+
+        root = dpath.DecisionPath()
+        root.set_decisions({})
+        root.heuristic_to_go_value = _objective.heuristic_to_go(root,
+                                                                _request)
+        _objective.set_value(root, 0.0)
+
+        # Entries are (value, -depth, order, parent path, candidate,
+        # cumulated value). Deeper paths go first among equal values,
+        # to reach complete solutions sooner. The path of an entry is
+        # only built when it is taken off the list.
+        order = itertools.count()
+        open_list = [(root.total_value, 0, next(order), root, None, 0.0)]
+        self.expanded = 0
+        self.optimal = False
+
+        while open_list:
+            if time.time() - begin_time > self.conf.solver.solver_timeout:
+                LOG.warning(_LW("Branch and bound timed out after {} "
+                                "expansions, returning the best solution "
+                                "so far").format(self.expanded))
+                return best_path
+            if len(open_list) > self.conf.solver.branch_and_bound_max_open:
+                LOG.warning(_LW("Branch and bound open list is over {} "
+                                "paths, returning the best solution so "
+                                "far").format(
+                    self.conf.solver.branch_and_bound_max_open))
+                return best_path
+
+            value, depth, _order, path, candidate, cumulated = \
+                heapq.heappop(open_list)
+            if value >= bound_value:
+                # Nothing left can improve on the best solution
+                break
+            depth = -depth
+            if candidate is not None:
+                path = path.extend(demand_list[depth - 1].name, candidate)
+                path.heuristic_to_go_value = value - cumulated
+                _objective.set_value(path, cumulated)
+            if depth == len(demand_list):
+                best_path = path
+                bound_value = value
+                continue
+
+            demand = demand_list[depth]
+            path.current_demand = demand
+            candidate_list = self._solve_constraints(path, _request)
+            values = _objective.compute_candidates(
+                path, demand.name, candidate_list, _request)
+            heuristics = _objective.heuristic_to_go_candidates(
+                path, demand.name, candidate_list, _request)
+            self.expanded += 1
+            for candidate, candidate_value, heuristic in zip(
+                    candidate_list, values, heuristics):
+                if candidate_value + heuristic < bound_value:
+                    heapq.heappush(open_list, (
+                        candidate_value + heuristic, -(depth + 1),
+                        next(order), path, candidate, candidate_value))
+
+        self.optimal = True
+        LOG.info(_LI("Branch and bound done after {} expansions, "
+                     "value = {}").format(self.expanded, bound_value))
+        return best_path
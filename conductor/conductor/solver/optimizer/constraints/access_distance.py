@@ -29,6 +29,9 @@ LOG = log.getLogger(__name__)
 
 
 class AccessDistance(constraint.Constraint):
+
+    decision_independent = True
+
     def __init__(self, _name, _type, _demand_list, _priority=0,
                  _comparison_operator=operator.le,
                  _threshold=None, _location=None):
@@ -48,19 +51,15 @@ class AccessDistance(constraint.Constraint):
             LOG.debug("Empty candidate list, need to get " +
                       "the candidate list for the demand/service")
             return _candidate_list
-        conflict_list = []
         cei = _request.cei
-        for candidate in _candidate_list:
-            air_distance = utils.compute_air_distance(
-                self.location.value,
-                cei.get_candidate_location(candidate))
-            if not self.comparison_operator(air_distance,
-                                            self.distance_threshold):
-                if candidate not in conflict_list:
-                    conflict_list.append(candidate)
+        air_distances = utils.compute_air_distances(
+            self.location.value,
+            [cei.get_candidate_location(c) for c in _candidate_list])
 
         _candidate_list = \
-            [c for c in _candidate_list if c not in conflict_list]
+            [c for c, air_distance in zip(_candidate_list, air_distances)
+             if self.comparison_operator(air_distance,
+                                         self.distance_threshold)]
         # self.distance_threshold
         # cei = _request.constraint_engine_interface
         # _candidate_list = \
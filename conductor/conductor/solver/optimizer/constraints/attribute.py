@@ -31,6 +31,9 @@ LOG = log.getLogger(__name__)
 
 
 class Attribute(constraint.Constraint):
+
+    decision_independent = True
+
     def __init__(self, _name, _type, _demand_list, _priority=0,
                  _properties=None):
         constraint.Constraint.__init__(
@@ -45,5 +48,18 @@ class Attribute(constraint.Constraint):
                                                        _candidate_list,
                                                        self.properties)
         _candidate_list[:] = \
-            [c for c in _candidate_list if c in select_list]
+            constraint.select_candidates(_candidate_list, select_list)
+        return _candidate_list
+
+    def rpc_calls(self, _decision_path, _request):
+        demand_name = _decision_path.current_demand.name
+        return [{'method': 'get_candidates_by_attributes',
+                 'args': {'properties': self.properties,
+                          'demand_name': demand_name}}]
+
+    def rpc_result(self, _decision_path, _candidate_list, _responses,
+                   _request):
+        select_list = _responses[0]
+        _candidate_list[:] = \
+            constraint.select_candidates(_candidate_list, select_list)
         return _candidate_list
@@ -18,17 +18,69 @@
 #
 
 import abc
+import itertools
 
 from oslo_log import log
 import six
 
 LOG = log.getLogger(__name__)
 
+# Key of the integer id given to each candidate by Search.assignNodeId.
+# The id is kept by the candidate dicts sent to and returned by the
+# data service, so candidates are matched by id instead of comparing
+# whole dicts.
+NODE_INDEX = 'node_index'
+
+_node_indexes = itertools.count()
+
+
+def next_node_index():
+    """New candidate id, unique within the process"""
+    return next(_node_indexes)
+
+
+def _member(_candidates):
+    """Membership test for _candidates.
+
+    Candidates are looked up by id when they all have one. Otherwise
+    they are compared as dicts, like the list membership test.
+    """
+    ids = set()
+    for candidate in _candidates:
+        index = candidate.get(NODE_INDEX)
+        if index is None:
+            return lambda c: c in _candidates
+        ids.add(index)
+    return lambda c: c.get(NODE_INDEX) in ids
+
+
+def select_candidates(_candidate_list, _select_list):
+    """Candidates of _candidate_list also in _select_list, in order"""
+    member = _member(_select_list)
+    return [c for c in _candidate_list if member(c)]
+
+
+def reject_candidates(_candidate_list, _reject_list):
+    """Candidates of _candidate_list not in _reject_list, in order"""
+    member = _member(_reject_list)
+    return [c for c in _candidate_list if not member(c)]
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Constraint(object):
     """Base class for Constraints"""
 
+    # True if solve() only depends on the candidate list, and not on
+    # the decisions made so far. The results of such constraints are
+    # cached for the plan (see solver.utils.constraint_cache).
+    decision_independent = False
+
+    # True if solve() keeps or drops each candidate whatever the other
+    # candidates of the list: on fewer candidates, it returns the same
+    # result less the removed ones. FitFirst.search_solutions relies on
+    # it to keep its search tree when candidates are removed.
+    filters = True
+
     def __init__(self, _name, _type, _demand_list, _priority=0):
         """Common initializer.
 
@@ -48,3 +100,22 @@ class Constraint(object):
         """
 
         return _candidate_list
+
+    def rpc_calls(self, _decision_path, _request):
+        """Data service calls made by solve(), for batching.
+
+        Constraints that only filter the candidate list through the
+        data service return the calls solve() would make, as dicts of
+        method and args (without candidate_list), so calls for several
+        constraints can be sent in one message. Return None if the
+        constraint can not be batched.
+        """
+        return None
+
+    def rpc_result(self, _decision_path, _candidate_list, _responses,
+                   _request):
+        """Apply the responses to the calls from rpc_calls().
+
+        Must leave the candidate list exactly as solve() would.
+        """
+        return _candidate_list
@@ -34,6 +34,9 @@ LOG = log.getLogger(__name__)
 
 
 class HPA(constraint.Constraint):
+
+    decision_independent = True
+
     def __init__(self, _name, _type, _demand_list, _priority=0,
                  _properties=None):
         constraint.Constraint.__init__(
@@ -76,3 +79,49 @@ class HPA(constraint.Constraint):
                 # No need to continue.
 
         return _candidate_list
+
+    def max_score(self):
+        '''
+        Largest hpa_score solve() adds to a candidate. For each VM, the
+        flavor chosen scores the optional capabilities it has, at most
+        all of them.
+        :return: sum of the scores of the optional capabilities
+        '''
+        score = 0
+        for vm_demand in self.properties.get('evaluate', []):
+            for capability in vm_demand.get('flavorProperties', []):
+                try:
+                    if capability['mandatory'].lower() == 'false':
+                        score += max(int(capability['score']), 0)
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    # No flavor matches such a capability
+                    continue
+        return score
+
+    def rpc_calls(self, _decision_path, _request):
+        calls = []
+        for vm_demand in self.properties.get('evaluate'):
+            calls.append({
+                'method': 'get_candidates_with_hpa',
+                'args': {'flavorProperties': vm_demand['flavorProperties'],
+                         'id': vm_demand['id'],
+                         'type': vm_demand['type'],
+                         'directives': vm_demand['directives']}})
+        return calls
+
+    def rpc_result(self, _decision_path, _candidate_list, _responses,
+                   _request):
+        LOG.info(_LI("Solved constraint type '{}' for demand - [{}] "
+                     "in batch").format(self.constraint_type,
+                                        _decision_path.current_demand.name))
+        # The batch stops at the first empty response, as solve() does
+        for response in _responses:
+            _candidate_list = response
+            if not response:
+                LOG.error(_LE("No matching candidates for HPA exists"))
+
+                # Metrics to Prometheus
+                PC.HPA_CLOUD_REGION_UNSUCCESSFUL.labels('ONAP', 'N/A',
+                                                        'ALL').inc()
+                break
+        return _candidate_list
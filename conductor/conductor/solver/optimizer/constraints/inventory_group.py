@@ -33,6 +33,16 @@ class InventoryGroup(Constraint):
             LOG.debug("More than two demands in the list")
             raise ValueError
 
+    @staticmethod
+    def _pairs(_request):
+        """Inventory group pair index of the plan, as sets of ids"""
+        if _request.inventory_group_pairs is None:
+            pairs = _request.cei.get_inventory_group_pairs() or {}
+            _request.inventory_group_pairs = dict(
+                (candidate_id, set(partners))
+                for candidate_id, partners in pairs.items())
+        return _request.inventory_group_pairs
+
     def solve(self, _decision_path, _candidate_list, _request):
 
         # check if other demand in the demand pair has been already solved
@@ -45,13 +55,10 @@ class InventoryGroup(Constraint):
             return _candidate_list
         # expect only one candidate per demand in decision
         resolved_candidate = _decision_path.decisions[other_demand]
-        cei = _request.cei
-        inventory_group_candidates = cei.get_inventory_group_candidates(
-            _candidate_list,
-            _decision_path.current_demand.name,
-            resolved_candidate)
-        _candidate_list = [candidate for candidate in _candidate_list if
-                           (candidate in inventory_group_candidates)]
+        partners = self._pairs(_request).get(
+            resolved_candidate.get('candidate_id'), ())
+        _candidate_list = [c for c in _candidate_list
+                           if c.get('candidate_id') in partners]
 
         '''
         # Alternate implementation that *may* be more efficient
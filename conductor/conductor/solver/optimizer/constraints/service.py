@@ -26,6 +26,9 @@ LOG = log.getLogger(__name__)
 
 
 class Service(constraint.Constraint):
+
+    decision_independent = True
+
     def __init__(self, _name, _type, _demand_list, _priority=0,
                  _controller=None, _request=None, _cost=None,
                  _inventory_type=None):
@@ -78,5 +81,6 @@ class Service(constraint.Constraint):
                 self.inventory_type, demand_name)
             )
 
-        _candidate_list[:] = [c for c in _candidate_list if c in select_list]
+        _candidate_list[:] = constraint.select_candidates(_candidate_list,
+                                                          select_list)
         return _candidate_list
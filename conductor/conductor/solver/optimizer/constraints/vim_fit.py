@@ -33,6 +33,11 @@ LOG = log.getLogger(__name__)
 
 
 class VimFit(constraint.Constraint):
+
+    decision_independent = True
+    # All the candidates are kept when none fits, see keep_on_empty
+    filters = False
+
     def __init__(self, _name, _type, _demand_list, _priority=0,
                  _properties=None):
         constraint.Constraint.__init__(
@@ -58,3 +63,19 @@ class VimFit(constraint.Constraint):
         if response:
             _candidate_list = response
         return _candidate_list
+
+    def rpc_calls(self, _decision_path, _request):
+        # An empty response leaves the candidates untouched, see solve()
+        return [{'method': 'get_candidates_with_vim_capacity',
+                 'args': {'request': self.properties.get('request')},
+                 'keep_on_empty': True}]
+
+    def rpc_result(self, _decision_path, _candidate_list, _responses,
+                   _request):
+        LOG.info(_LI("Solved constraint type '{}' for demand - [{}] "
+                     "in batch").format(self.constraint_type,
+                                        _decision_path.current_demand.name))
+        response = _responses[0]
+        if response:
+            _candidate_list = response
+        return _candidate_list
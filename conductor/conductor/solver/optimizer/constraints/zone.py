@@ -23,6 +23,7 @@ import operator
 from oslo_log import log
 
 from constraint import Constraint
+from constraint import reject_candidates
 
 LOG = log.getLogger(__name__)
 
@@ -74,12 +75,10 @@ class Zone(Constraint):
                     is_candidate = False
 
             if not is_candidate:
-                if candidate not in conflict_list:
-                    conflict_list.append(candidate)
-                    # _candidate_list.remove(candidate)
+                conflict_list.append(candidate)
+                # _candidate_list.remove(candidate)
 
-        _candidate_list[:] =\
-            [c for c in _candidate_list if c not in conflict_list]
+        _candidate_list[:] = reject_candidates(_candidate_list, conflict_list)
 
         # msg = "final candidate list for demand {} is "
         # LOG.debug(msg.format(_decision_path.current_demand.name))
@@ -19,19 +19,25 @@
 #
 
 
-import copy
-
-
 class DecisionPath(object):
 
     def __init__(self):
         """local copy of decisions so far
 
         key = demand.name, value = region or service instance
+
+        Candidates are shared by reference with the demands and with
+        the other paths, never copied. Paths of a search are either
+        branched with extend(), which copies the (small) decision map
+        only, or changed in place with decide() and rolled back with
+        undo().
         """
 
         self.decisions = None
 
+        ''' (demand name, previous candidate) pairs, see decide() '''
+        self.undo_log = []
+
         ''' to identify this decision path in the search '''
         self.decision_id = ""
 
@@ -49,7 +55,34 @@ class DecisionPath(object):
         self.total_cost = 0.0
 
     def set_decisions(self, _prior_decisions):
-        self.decisions = copy.deepcopy(_prior_decisions)
+        self.decisions = dict(_prior_decisions)
+        self.undo_log = []
+
+    def extend(self, _demand_name, _candidate):
+        """New path with one more decision, sharing the candidates"""
+        path = DecisionPath()
+        path.set_decisions(self.decisions)
+        path.decisions[_demand_name] = _candidate
+        return path
+
+    def decide(self, _demand_name, _candidate):
+        """Set the decision for a demand, remembering the previous one"""
+        self.undo_log.append((_demand_name,
+                              self.decisions.get(_demand_name)))
+        self.decisions[_demand_name] = _candidate
+
+    def mark(self):
+        """Position in the undo log, to pass to undo()"""
+        return len(self.undo_log)
+
+    def undo(self, _mark=0):
+        """Roll the decisions back to the state they had at _mark"""
+        while len(self.undo_log) > _mark:
+            demand_name, previous = self.undo_log.pop()
+            if previous is None:
+                self.decisions.pop(demand_name, None)
+            else:
+                self.decisions[demand_name] = previous
 
     def set_decision_id(self, _dk, _rk):
         self.decision_id += (str(_dk) + ":" + str(_rk) + ">")
@@ -21,6 +21,7 @@ from oslo_log import log
 import sys
 import time
 
+import conductor.common.prometheus_metrics as PC
 from conductor.solver.optimizer import decision_path as dpath
 from conductor.solver.optimizer import search
 from conductor.solver.triage_tool.triage_data import TriageData
@@ -33,6 +34,10 @@ class FitFirst(search.Search):
     def __init__(self, conf):
         search.Search.__init__(self, conf)
 
+        # Effort of the current search, exported when it ends
+        self.max_depth = 0
+        self.backtracks = 0
+
     def search(self, _demand_list, _objective, _request):
         decision_path = dpath.DecisionPath()
         decision_path.set_decisions({})
@@ -40,8 +45,24 @@ class FitFirst(search.Search):
         _begin_time = int(round(time.time()))
 
         # Begin the recursive serarch
-        return self._find_current_best(
-            _demand_list, _objective, decision_path, _request, _begin_time)
+        self._start_search_stats()
+        try:
+            return self._find_current_best(
+                _demand_list, _objective, decision_path, _request,
+                _begin_time)
+        finally:
+            self._observe_search_stats()
+
+    def _start_search_stats(self):
+        self.max_depth = 0
+        self.backtracks = 0
+
+    def _observe_search_stats(self):
+        PC.FIT_FIRST_SEARCH_DEPTH.observe(self.max_depth)
+        PC.FIT_FIRST_BACKTRACKS.observe(self.backtracks)
+
+    def _decided(self, _decision_path):
+        self.max_depth = max(self.max_depth, len(_decision_path.decisions))
 
     def _find_current_best(self, _demand_list, _objective,
                            _decision_path, _request, _begin_time):
@@ -63,58 +84,19 @@ class FitFirst(search.Search):
         demand = _demand_list.pop(0)
         LOG.debug("demand = {}".format(demand.name))
         _decision_path.current_demand = demand
+        # decisions made from here on are undone on rollback
+        mark = _decision_path.mark()
 
         # call constraints to whittle initial candidates
         # candidate_list meets all constraints for the demand
         candidate_list = self._solve_constraints(_decision_path, _request)
         # find the best candidate among the list
 
-        # bound_value keeps track of the max value discovered
-        # thus far for the _decision_path. For every demand
-        # added to the _decision_path bound_value will be set
-        # to a really large value to begin with
-        bound_value = 0.0
-        version_value = "0.0"
-
-        if "min" in _objective.goal:
-            bound_value = sys.float_info.max
-
         # Start recursive search
         while True:
-            best_resource = None
-            # Find best candidate that optimizes the cost for demand.
-            # The candidate list can be empty if the constraints
-            # rule out all candidates
-            for candidate in candidate_list:
-                _decision_path.decisions[demand.name] = candidate
-                _objective.compute(_decision_path, _request)
-                # this will set the total_value of the _decision_path
-                # thus far up to the demand
-                if _objective.goal is None:
-                    best_resource = candidate
-
-                elif _objective.goal == "min_aic":
-                    # convert the unicode to string
-                    candidate_version = candidate \
-                        .get("cloud_region_version").encode('utf-8')
-                    if _decision_path.total_value < bound_value or \
-                       (_decision_path.total_value == bound_value and
-                       self._compare_version(candidate_version,
-                                             version_value) > 0):
-                        bound_value = _decision_path.total_value
-                        version_value = candidate_version
-                        best_resource = candidate
-
-                elif _objective.goal == "min":
-                    # if the path value is less than bound value
-                    # we have found the better candidate
-                    if _decision_path.total_value < bound_value:
-                        # relax the bound_value to the value of
-                        # the path - this will ensure a future
-                        # candidate will be picked only if it has
-                        # a value lesser than the current best candidate
-                        bound_value = _decision_path.total_value
-                        best_resource = candidate
+            best_resource, bound_value = self._find_best_candidate(
+                demand, candidate_list, _objective, _decision_path,
+                _request)
 
             # Rollback if we don't have any candidate picked for
             # the demand.
@@ -125,11 +107,13 @@ class FitFirst(search.Search):
                 # up in the next iteration of the recursion
                 _demand_list.insert(0, demand)
                 self.triageSolver.rollBackStatus(_decision_path.current_demand,_decision_path)
+                _decision_path.undo(mark)
                 return None  # return None back to the recursion
             else:
                 # best resource is found, add to the decision path
-                _decision_path.decisions[demand.name] = best_resource
+                _decision_path.decide(demand.name, best_resource)
                 _decision_path.total_value = bound_value
+                self._decided(_decision_path)
 
                 # Begin the next recursive call to find candidate
                 # for the next demand in the list
@@ -142,23 +126,184 @@ class FitFirst(search.Search):
                 # current best_resource and remove it from the list
                 # of potential candidates.
                 if decision_path is None:
-                    candidate_list.remove(best_resource)
-                    # reset bound_value to a large value so that
+                    # forget the decisions of the failed subtree
+                    _decision_path.undo(mark)
+                    self.backtracks += 1
                     # the next iteration of the current recursion
                     # will pick the next best candidate, which
                     # will have a value larger than the current
                     # bound_value (proof by contradiction:
                     # it cannot have a smaller value, if it wasn't
                     # the best_resource.
-                    if "min" in _objective.goal:
-                        bound_value = sys.float_info.max
-                        version_value = "0.0"
+                    candidate_list.remove(best_resource)
                 else:
                     # A candidate was found for the demand, and
                     # was added to the decision path. Return current
                     # path back to the recursion.
                     return decision_path
 
+    def search_solutions(self, _demand_list, _objective, _request):
+        """Generate the solutions that repeated searches would find.
+
+        The caller may remove candidates from the demand resources
+        between solutions, as the optimizer does with the unique
+        candidates of a solution. The next solution is then the one
+        search() would find on the remaining candidates, but the search
+        tree is kept: only the demands whose decision was removed, and
+        the demands after them, are searched again.
+
+        The tree only holds while the constraints filter the candidates
+        (see Constraint.filters). A constraint that does not may keep
+        candidates it dropped before once others are removed, anywhere
+        in the tree. When candidates of a demand with such a constraint
+        are removed, the search starts again from scratch.
+        """
+        self.triageSolver.getSortedDemand(_demand_list)
+        return self._observed_solutions(self._restarted_solutions(
+            list(_demand_list), _objective, _request))
+
+    def _restarted_solutions(self, _demand_list, _objective, _request):
+        """Solutions of _find_solutions, searching again when needed"""
+        unfiltered = [demand for demand in _demand_list
+                      if not all(c.filters for c in demand.constraint_list)]
+        while True:
+            decision_path = dpath.DecisionPath()
+            decision_path.set_decisions({})
+            _begin_time = int(round(time.time()))
+            resources = [set(demand.resources) for demand in unfiltered]
+            solutions = self._find_solutions(
+                _demand_list, 0, _objective, decision_path, _request,
+                _begin_time)
+            try:
+                for solution in solutions:
+                    yield solution
+                    if [set(demand.resources) for demand in unfiltered] \
+                            != resources:
+                        LOG.debug("candidates of unfiltered demands were "
+                                  "removed, searching again")
+                        break
+                else:
+                    return
+            finally:
+                solutions.close()
+
+    def _observed_solutions(self, solutions):
+        """Solutions, with the search effort exported once closed"""
+        self._start_search_stats()
+        try:
+            for solution in solutions:
+                yield solution
+        finally:
+            self._observe_search_stats()
+
+    def _find_solutions(self, _demand_list, _depth, _objective,
+                        _decision_path, _request, _begin_time):
+        if (int(round(time.time())) - _begin_time) > \
+                self.conf.solver.solver_timeout:
+            return
+
+        if _depth == len(_demand_list):
+            LOG.debug("search done")
+            # Nothing was removed from the path, a new search would
+            # find the same solution again
+            while True:
+                solution = dpath.DecisionPath()
+                solution.set_decisions(_decision_path.decisions)
+                solution.total_value = _decision_path.total_value
+                yield solution
+
+        demand = _demand_list[_depth]
+        LOG.debug("demand = {}".format(demand.name))
+        _decision_path.current_demand = demand
+        mark = _decision_path.mark()
+        candidate_list = self._solve_constraints(_decision_path, _request)
+
+        while True:
+            # Candidates removed from the demand since the constraints
+            # were solved are not eligible anymore
+            candidate_list[:] = [c for c in candidate_list if
+                                 c.get('candidate_id') in demand.resources]
+            best_resource, bound_value = self._find_best_candidate(
+                demand, candidate_list, _objective, _decision_path,
+                _request)
+            if best_resource is None:
+                LOG.debug("no resource, rollback")
+                self.triageSolver.rollBackStatus(demand, _decision_path)
+                _decision_path.undo(mark)
+                return
+
+            _decision_path.decide(demand.name, best_resource)
+            _decision_path.total_value = bound_value
+            self._decided(_decision_path)
+            for solution in self._find_solutions(
+                    _demand_list, _depth + 1, _objective, _decision_path,
+                    _request, _begin_time):
+                yield solution
+                if best_resource.get('candidate_id') not in \
+                        demand.resources:
+                    # Look for the next best candidate of this demand
+                    break
+            # No more solutions with best_resource
+            _decision_path.undo(mark)
+            self.backtracks += 1
+            candidate_list.remove(best_resource)
+
+    def _find_best_candidate(self, _demand, _candidate_list, _objective,
+                             _decision_path, _request):
+        """Best candidate for the demand and the resulting path value.
+
+        Returns (None, bound) if no candidate is left.
+        """
+        # bound_value keeps track of the max value discovered
+        # thus far for the _decision_path. For every demand
+        # added to the _decision_path bound_value will be set
+        # to a really large value to begin with
+        bound_value = 0.0
+        version_value = "0.0"
+
+        if "min" in _objective.goal:
+            bound_value = sys.float_info.max
+
+        best_resource = None
+        # The objective value of every candidate is computed
+        # in one batch
+        values = _objective.compute_candidates(
+            _decision_path, _demand.name, _candidate_list, _request)
+        # Find best candidate that optimizes the cost for demand.
+        # The candidate list can be empty if the constraints
+        # rule out all candidates
+        for candidate, value in zip(_candidate_list, values):
+            _objective.set_value(_decision_path, value)
+            # this will set the total_value of the _decision_path
+            # thus far up to the demand
+            if _objective.goal is None:
+                best_resource = candidate
+
+            elif _objective.goal == "min_aic":
+                # convert the unicode to string
+                candidate_version = candidate \
+                    .get("cloud_region_version").encode('utf-8')
+                if _decision_path.total_value < bound_value or \
+                   (_decision_path.total_value == bound_value and
+                   self._compare_version(candidate_version,
+                                         version_value) > 0):
+                    bound_value = _decision_path.total_value
+                    version_value = candidate_version
+                    best_resource = candidate
+
+            elif _objective.goal == "min":
+                # if the path value is less than bound value
+                # we have found the better candidate
+                if _decision_path.total_value < bound_value:
+                    # relax the bound_value to the value of
+                    # the path - this will ensure a future
+                    # candidate will be picked only if it has
+                    # a value lesser than the current best candidate
+                    bound_value = _decision_path.total_value
+                    best_resource = candidate
+
+        return best_resource, bound_value
+
     def _compare_version(self, version1, version2):
         version1 = version1.split('.')
         version2 = version2.split('.')
@@ -19,24 +19,77 @@
 
 from oslo_config import cfg
 from oslo_log import log
-import copy
 import time
 
 from conductor import service
+from conductor.i18n import _LW
 # from conductor.solver.optimizer import decision_path as dpath
 # from conductor.solver.optimizer import best_first
 # from conductor.solver.optimizer import greedy
+from conductor.solver.optimizer import branch_and_bound
 from conductor.solver.optimizer import fit_first
 from conductor.solver.optimizer import random_pick
 from conductor.solver.request import demand
 from conductor.solver.triage_tool.triage_data import TriageData
+from conductor.solver.utils import constraint_cache
 
 LOG = log.getLogger(__name__)
 
 CONF = cfg.CONF
 
-SOLVER_OPTS = [
+SEARCH_ALGORITHMS = ('fit_first', 'branch_and_bound')
 
+SOLVER_OPTS = [
+    cfg.BoolOpt('batch_constraints',
+                default=False,
+                help='Set to True to send the leading data service '
+                     'constraints of a demand (attribute, hpa, vim_fit) '
+                     'to the data service in one batched call instead '
+                     'of one call per constraint.'),
+    cfg.IntOpt('constraint_cache_size',
+               default=1000,
+               min=0,
+               help='Maximum number of constraint results cached per plan, '
+                    'for constraints that do not depend on the decisions '
+                    'made so far. Set to 0 to disable the cache.'),
+    cfg.StrOpt('search_algorithm',
+               default='fit_first',
+               choices=SEARCH_ALGORITHMS,
+               help='Search used for plans with an objective function. '
+                    'fit_first is greedy with backtracking. '
+                    'branch_and_bound returns an optimal solution, '
+                    'or the best one found within solver_timeout. '
+                    'A plan can choose with its search_algorithm '
+                    'parameter.'),
+    cfg.IntOpt('branch_and_bound_max_open',
+               default=200000,
+               min=1,
+               help='Maximum number of partial solutions kept by the '
+                    'branch and bound search. When reached, the best '
+                    'solution found so far is returned.'),
+    cfg.BoolOpt('incremental_solutions',
+                default=False,
+                help='Set to True to find the solutions of a plan with '
+                     'the fit first algorithm in one search, keeping the '
+                     'search tree from one solution to the next instead '
+                     'of searching again from scratch. The solutions are '
+                     'the same: when candidates of a demand with a '
+                     'vim_fit constraint are removed, which may bring '
+                     'back candidates it dropped, the search starts '
+                     'again.'),
+    cfg.IntOpt('objective_table_max_size',
+               default=4000000,
+               min=0,
+               help='Maximum number of values in a precomputed distance '
+                    'or latency table of the objective function. Larger '
+                    'tables are computed on the fly. Set to 0 to disable '
+                    'the tables.'),
+    cfg.BoolOpt('compact_candidates',
+                default=False,
+                help='Set to True to send candidate lists to the data '
+                     'service as candidate tables, where a value shared '
+                     'by several candidates is sent once. The data '
+                     'service must be recent enough to read them.'),
 ]
 
 CONF.register_opts(SOLVER_OPTS, group='solver')
@@ -77,6 +130,17 @@ class Optimizer(object):
         for rk in self.requests:
             request = self.requests[rk]
             LOG.debug("--- request = {}".format(rk))
+            if request.constraint_cache is None:
+                request.constraint_cache = constraint_cache.ConstraintCache(
+                    self.conf.solver.constraint_cache_size)
+            if request.objective and request.objective.goal and \
+                    self.conf.solver.objective_table_max_size:
+                st = time.time()
+                request.objective.precompute(
+                    request.demands, request.cei,
+                    self.conf.solver.objective_table_max_size)
+                LOG.debug("objective precompute delay = {} sec".format(
+                    time.time() - st))
 
             decision_list = list()
 
@@ -88,28 +152,43 @@ class Optimizer(object):
             LOG.debug("2. search")
 
             rand_counter = 10
+            solutions = None
             while num_solutions == 'all' or num_solutions > 0:
 
                 LOG.debug("searching for the solution {}".format(len(decision_list) + 1))
 
                 st = time.time()
-                _copy_demand_list = copy.deepcopy(demand_list)
+                # The search pops demands off the list it is given. It
+                # shares the candidates, and only keeps its triage
+                # records and node ids in them (see Search.assignNodeId)
+                search_list = list(demand_list)
 
                 if not request.objective.goal:
                     LOG.debug("No objective function is provided. "
                               "Random pick algorithm is used")
                     self.search = random_pick.RandomPick(self.conf)
-                    best_path = self.search.search(demand_list, request)
+                    best_path = self.search.search(search_list, request)
+                elif self._search_algorithm(request) == "branch_and_bound":
+                    LOG.debug("Branch and bound algorithm is used")
+                    self.search = branch_and_bound.BranchAndBound(self.conf)
+                    best_path = self.search.search(search_list,
+                                                   request.objective, request)
+                elif self.conf.solver.incremental_solutions:
+                    LOG.debug("Fit first algorithm is used, "
+                              "keeping the search tree")
+                    if solutions is None:
+                        self.search = fit_first.FitFirst(self.conf)
+                        solutions = self.search.search_solutions(
+                            search_list, request.objective, request)
+                    best_path = next(solutions, None)
                 else:
                     LOG.debug("Fit first algorithm is used")
                     self.search = fit_first.FitFirst(self.conf)
-                    best_path = self.search.search(demand_list,
+                    best_path = self.search.search(search_list,
                                                    request.objective, request)
 
                 LOG.debug("search delay = {} sec".format(time.time() - st))
 
-                demand_list = copy.deepcopy(_copy_demand_list)
-
                 if best_path is not None:
                     self.search.print_decisions(best_path)
                     rand_counter = 10
@@ -132,9 +211,24 @@ class Optimizer(object):
 
                 if num_solutions != 'all':
                     num_solutions -= 1
+            if solutions is not None:
+                solutions.close()
+            LOG.debug("constraint cache {}".format(
+                request.constraint_cache.stats()))
             self.search.triageSolver.getSolution(decision_list)
             return decision_list
 
+    def _search_algorithm(self, request):
+        """Search chosen by the plan, or else by the configuration"""
+        algorithm = getattr(request, 'search_algorithm', None)
+        if algorithm and algorithm not in SEARCH_ALGORITHMS:
+            LOG.warning(_LW("Unknown search algorithm {} for plan {}, "
+                            "using {}").format(
+                algorithm, request.plan_id,
+                self.conf.solver.search_algorithm))
+            algorithm = None
+        return algorithm or self.conf.solver.search_algorithm
+
     def _has_candidates(self, request):
         for demand_name, demand in request.demands.items():
             LOG.debug("Req Available resources: {} {}".format(demand_name, len(request.demands[demand_name].resources)))
@@ -19,7 +19,11 @@
 
 from operator import itemgetter
 from oslo_log import log
+import time
 
+import conductor.common.prometheus_metrics as PC
+
+from conductor.solver.optimizer.constraints import constraint as cstr
 from conductor.solver.optimizer import decision_path as dpath
 from conductor.solver.triage_tool.triage_data import TriageData
 
@@ -31,6 +35,8 @@ class Search(object):
     def __init__(self, conf):
         self.conf = conf
         self.triageSolver = TriageData()
+        # node ids of the candidates whose triage records this search keeps
+        self._triage_node_ids = set()
 
     def search(self, _demand_list, _objective):
         decision_path = dpath.DecisionPath()
@@ -50,6 +56,13 @@ class Search(object):
         self.triageSolver.aasignNodeIdToCandidate(candidate_list, _decision_path.current_demand, _request.request_id,
                                                   _request.plan_id)
 
+        cache = _request.constraint_cache
+        demand_name = _decision_path.current_demand.name
+        batched = {}
+        if self.conf.solver.batch_constraints:
+            batched = self._batch_constraints(_decision_path, candidate_list,
+                                              _request)
+
         for constraint in _decision_path.current_demand.constraint_list:
             LOG.debug("Evaluating constraint = {}".format(constraint.name))
             LOG.debug("Available candidates before solving "
@@ -57,8 +70,31 @@ class Search(object):
             candidates_before = candidate_list
 
             solver['candidate_before_list'] = candidate_list
-            candidate_list =\
-                constraint.solve(_decision_path, candidate_list, _request)
+            key = None
+            cached = None
+            if cache is not None:
+                key = cache.key(constraint, demand_name, candidate_list)
+                cached = cache.get(key, constraint, candidate_list)
+            if cached is not None:
+                LOG.debug("Constraint {} result found in the plan "
+                          "cache".format(constraint.name))
+                candidate_list = cached
+            else:
+                candidates_in = list(candidate_list) if key else None
+                start_time = time.time()
+                if constraint.name in batched:
+                    candidate_list = constraint.rpc_result(
+                        _decision_path, candidate_list,
+                        batched[constraint.name], _request)
+                else:
+                    candidate_list = constraint.solve(
+                        _decision_path, candidate_list, _request)
+                PC.CONSTRAINT_SOLVE_SECONDS.labels(
+                    constraint.constraint_type).observe(
+                    time.time() - start_time)
+                if key:
+                    cache.put(key, candidates_in, candidate_list,
+                              candidate_list is candidates_before)
             LOG.debug("Available candidates after solving "
                       "constraint {}".format(candidate_list))
             solver['constraint_name_for_can'] = constraint.name
@@ -81,24 +117,77 @@ class Search(object):
             self._set_candidate_cost(candidate_list)
         return candidate_list
 
+    def _batch_constraints(self, _decision_path, _candidate_list, _request):
+        """Evaluate the leading data service constraints in one call.
+
+        Constraints are solved in order, each on the candidates left by
+        the previous one, so only the leading run of constraints that
+        support rpc_calls() can be sent ahead. The batch pipes the
+        candidate list from one call to the next on the data service.
+
+        Returns a dict of constraint name to the responses for its
+        calls. Constraints missing from it (including those the batch
+        stopped before) are solved one by one as usual.
+        """
+        run = []
+        for constraint in _decision_path.current_demand.constraint_list:
+            calls = constraint.rpc_calls(_decision_path, _request)
+            if not calls:
+                break
+            run.append((constraint, calls))
+        if len(run) < 2:
+            return {}
+        cache = _request.constraint_cache
+        if cache is not None:
+            # Seen before, the results are most likely all cached
+            key = cache.key(run[0][0], _decision_path.current_demand.name,
+                            _candidate_list)
+            if key and key in cache:
+                return {}
+
+        calls = []
+        for _constraint, constraint_calls in run:
+            calls.extend(constraint_calls)
+        responses = _request.cei.get_candidates_in_batch(_candidate_list,
+                                                         calls)
+        if responses is None:
+            return {}
+
+        batched = {}
+        for constraint, constraint_calls in run:
+            count = len(constraint_calls)
+            if not responses:
+                break
+            # A short response list means the batch stopped early,
+            # which rpc_result() handles as solve() would
+            batched[constraint.name] = responses[:count]
+            responses = responses[count:]
+        return batched
+
     def _set_candidate_cost(self, _candidate_list):
         _candidate_list[:] = sorted(_candidate_list, key=itemgetter("cost"))
     def dropped_candidate(self,candidates_before, candidate_after, constraint_name, demand_name):
         dropped_candidate = []
-        for dc in candidates_before:
-            if dc not in candidate_after:
-                dropped_details={}
-                dropped_details['constraint_name_dropped'] = constraint_name
-                dropped_details['name'] = demand_name
-                dc['constraints'].append(dropped_details)
-                dropped_candidate.append(dc)
+        for dc in cstr.reject_candidates(candidates_before, candidate_after):
+            dropped_details={}
+            dropped_details['constraint_name_dropped'] = constraint_name
+            dropped_details['name'] = demand_name
+            dc['constraints'].append(dropped_details)
+            dropped_candidate.append(dc)
         self.triageSolver.droppedCadidatesStatus(dropped_candidate)
     def assignNodeId(self, candidate_list, demand_name):
         for cr in candidate_list:
             if not 'node_id' in cr:
                 cr['name'] = demand_name
                 cr['node_id'] = (demand_name + '|' + cr['candidate_id'])
+            # The candidates are shared by the searches of a plan, their
+            # triage records start afresh in each search
+            if cr['node_id'] not in self._triage_node_ids:
+                self._triage_node_ids.add(cr['node_id'])
                 cr['constraints'] = []
+                cr.pop('status', None)
+            if cstr.NODE_INDEX not in cr:
+                cr[cstr.NODE_INDEX] = cstr.next_node_index()
     def print_decisions(self, _best_path):
         if _best_path:
             msg = "--- demand = {}, chosen resource = {} at {}"
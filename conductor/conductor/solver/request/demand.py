@@ -29,6 +29,10 @@ class Demand(object):
         # value = region (or service) instance
         self.resources = {}
 
+        # CandidateTable the initial candidates were read from, if any.
+        # Candidates dropped from resources stay in the table.
+        self.table = None
+
         # applicable constraint checkers
         # a list of constraint instances to be applied
         self.constraint_list = []
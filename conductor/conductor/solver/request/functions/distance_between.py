@@ -33,3 +33,26 @@ class DistanceBetween(object):
         distance = utils.compute_air_distance(_loc_a, _loc_z)
 
         return distance
+
+    def compute_to(self, _loc_a, _locations, _coordinates):
+        """compute(_loc_a, loc) for each loc of _locations
+
+        _coordinates are the Coordinates of _locations.
+        """
+        return utils.compute_air_distances(_loc_a, _coordinates)
+
+    def compute_from(self, _locations, _loc_z, _coordinates):
+        """compute(loc, _loc_z) for each loc of _locations
+
+        _coordinates are the Coordinates of _locations.
+        """
+        return utils.compute_air_distances(_loc_z, _coordinates)
+
+    def compute_table(self, _locations_a, _locations_z, _coordinates_a,
+                      _coordinates_z):
+        """compute(loc_a, loc_z) for each pair of locations
+
+        Returns a table to read as table[i][j].
+        """
+        return utils.compute_air_distance_table(_coordinates_a,
+                                                _coordinates_z)
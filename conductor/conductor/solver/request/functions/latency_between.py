@@ -32,4 +32,31 @@ class LatencyBetween(object):
 
         return latency
 
+    def compute_to(self, _loc_a, _locations, _coordinates):
+        """compute(_loc_a, loc) for each loc of _locations
+
+        _coordinates are the Coordinates of _locations.
+        """
+        return utils.compute_latency_scores(
+            _loc_a, _locations, self.region_group, _coordinates)
+
+    def compute_from(self, _locations, _loc_z, _coordinates):
+        """compute(loc, _loc_z) for each loc of _locations
+
+        _coordinates are the Coordinates of _locations.
+        """
+        penalty = utils.compute_latency_penalty(_loc_z, self.region_group)
+        return [distance + penalty for distance in
+                utils.compute_air_distances(_loc_z, _coordinates)]
+
+    def compute_table(self, _locations_a, _locations_z, _coordinates_a,
+                      _coordinates_z):
+        """compute(loc_a, loc_z) for each pair of locations
+
+        Returns a table to read as table[i][j].
+        """
+        return utils.compute_latency_score_table(
+            _locations_a, _locations_z, self.region_group,
+            _coordinates_a, _coordinates_z)
+
 
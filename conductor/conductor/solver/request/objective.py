@@ -17,10 +17,18 @@
 # -------------------------------------------------------------------------
 #
 
+from oslo_log import log
+
+from conductor.solver.optimizer import decision_path as dpath
 from conductor.solver.request import demand
+from conductor.solver.utils import utils
 # from conductor.solver.resource import region
 # from conductor.solver.resource import service
 
+LOG = log.getLogger(__name__)
+
+DISTANCE_FUNCTIONS = ("latency_between", "distance_between")
+
 
 class Objective(object):
 
@@ -36,7 +44,111 @@ class Objective(object):
             if self.operation == "sum":
                 value += op.compute(_decision_path, _request)
 
-        _decision_path.cumulated_value = value
+        self.set_value(_decision_path, value)
+
+    def precompute(self, _demands, _cei, _max_size):
+        """Tabulate the distance and latency operands of a plan.
+
+        Each candidate with coordinates gets an ordinal within its
+        demand, and each operand computes its function for all the
+        candidates at once (see Operand.precompute). Evaluating the
+        objective then only looks values up. Candidates without
+        coordinates are left out and evaluated as before.
+        """
+        ordinals = {}
+        locations = {}
+        for name, dmd in _demands.items():
+            ordinals[name] = {}
+            demand_locations = []
+            # Coordinates parsed once per distinct value by the table
+            table = getattr(dmd, 'table', None)
+            table_ordinals = {}
+            if table is not None:
+                table_ordinals = dict(
+                    (c, i) for i, c in enumerate(table.column('candidate_id')))
+            for candidate in dmd.resources.values():
+                if candidate.get('latitude') and candidate.get('longitude'):
+                    candidate_id = candidate.get('candidate_id')
+                    location = None
+                    if candidate_id in table_ordinals:
+                        location = table.coordinates(
+                            table_ordinals[candidate_id])
+                    if location is None:
+                        location = _cei.get_candidate_location(candidate)
+                    ordinals[name][candidate_id] = len(demand_locations)
+                    demand_locations.append(location)
+            locations[name] = (demand_locations,
+                               utils.Coordinates(demand_locations))
+
+        for op in self.operand_list:
+            op.precompute(locations, ordinals, _max_size)
+
+    def compute_candidates(self, _decision_path, _demand_name,
+                           _candidate_list, _request):
+        """Objective value for each candidate of a demand.
+
+        Same as calling compute() with each candidate decided for
+        _demand_name in turn, but the distances to all candidates are
+        computed in one batch. Returns the values in candidate order;
+        use set_value() to apply one to the decision path.
+        """
+        values = [0.0] * len(_candidate_list)
+        locations = {}
+        for op in self.operand_list:
+            if self.operation == "sum" and not op.depends_on(_demand_name):
+                # The same for every candidate
+                value = op.compute(_decision_path, _request)
+                values = [v + value for v in values]
+            elif self.operation == "sum":
+                op_values = op.compute_candidates(
+                    _decision_path, _demand_name, _candidate_list,
+                    locations, _request)
+                values = [v + o for v, o in zip(values, op_values)]
+        return values
+
+    def compute_bounds(self, _demands, _request):
+        """Prepare the lower bounds used by heuristic_to_go().
+
+        The bounds are taken over all the candidates of each demand,
+        so they hold for any subset the constraints leave.
+        """
+        for op in self.operand_list:
+            op.compute_bounds(_demands, _request)
+
+    def heuristic_to_go(self, _decision_path, _request):
+        """Lower bound of what the undecided demands add to the value.
+
+        Admissible for a "min" goal: the value of any completion of
+        _decision_path is at least its current value plus this bound.
+        Returns infinity if a demand has no candidate left.
+        """
+        value = 0.0
+        for op in self.operand_list:
+            if self.operation == "sum":
+                value += op.heuristic_to_go(_decision_path, _request)
+        return value
+
+    def heuristic_to_go_candidates(self, _decision_path, _demand_name,
+                                   _candidate_list, _request):
+        """heuristic_to_go() for each candidate of a demand, as if decided.
+
+        Only the operands of the demand are evaluated per candidate.
+        """
+        values = [0.0] * len(_candidate_list)
+        for op in self.operand_list:
+            if self.operation != "sum":
+                continue
+            if op.depends_on(_demand_name):
+                op_values = op.heuristic_to_go_candidates(
+                    _decision_path, _demand_name, _candidate_list, _request)
+                values = [v + o for v, o in zip(values, op_values)]
+            else:
+                value = op.heuristic_to_go(_decision_path, _request)
+                values = [v + value for v in values]
+        return values
+
+    def set_value(self, _decision_path, _value):
+        _decision_path.cumulated_value = _value
         _decision_path.total_value = \
             _decision_path.cumulated_value + \
             _decision_path.heuristic_to_go_value
@@ -49,7 +161,265 @@ class Operand(object):
         self.weight = 0
         self.function = None
 
+        # Values of the function for all candidates, see precompute()
+        self.table = None
+        self.ordinals = None
+
+        # Lower bounds of the value, see compute_bounds()
+        self.bounds = None
+
+    def depends_on(self, _demand_name):
+        """Whether the value changes with the decision for a demand"""
+        func_type = self.function.func_type
+        if func_type in DISTANCE_FUNCTIONS:
+            return any(not isinstance(loc, demand.Location) and
+                       loc.name == _demand_name
+                       for loc in (self.function.loc_a, self.function.loc_z))
+        return func_type == "hpa_score"
+
+    def precompute(self, _locations, _ordinals, _max_size):
+        """Tabulate the function for all candidates of its demands.
+
+        _locations maps a demand name to the locations of its candidates
+        and their Coordinates, in ordinal order. _ordinals maps a demand
+        name to {candidate_id: ordinal}. Tables larger than _max_size
+        values are not built.
+        """
+        self.table = None
+        self.ordinals = _ordinals
+        func = self.function
+        if func.func_type not in DISTANCE_FUNCTIONS:
+            return
+        loc_a = func.loc_a
+        loc_z = func.loc_z
+        try:
+            if isinstance(loc_a, demand.Location):
+                if not isinstance(loc_z, demand.Location) and \
+                        loc_z.name in _locations:
+                    locations, coordinates = _locations[loc_z.name]
+                    if len(locations) <= _max_size:
+                        self.table = func.compute_to(
+                            loc_a.value, locations, coordinates)
+            elif isinstance(loc_z, demand.Location):
+                if loc_a.name in _locations:
+                    locations, coordinates = _locations[loc_a.name]
+                    if len(locations) <= _max_size:
+                        self.table = func.compute_to(
+                            loc_z.value, locations, coordinates)
+            elif loc_a.name != loc_z.name and \
+                    loc_a.name in _locations and loc_z.name in _locations:
+                locations_a, coordinates_a = _locations[loc_a.name]
+                locations_z, coordinates_z = _locations[loc_z.name]
+                if len(locations_a) * len(locations_z) <= _max_size:
+                    self.table = func.compute_table(
+                        locations_a, locations_z,
+                        coordinates_a, coordinates_z)
+                else:
+                    LOG.info("Table for {} between {} and {} is too "
+                             "large, not precomputed".format(
+                                 func.func_type, loc_a.name, loc_z.name))
+        except (IndexError, TypeError, ValueError) as err:
+            LOG.warning("Could not precompute {} between {} and {}: "
+                        "{}".format(func.func_type, loc_a.name, loc_z.name,
+                                    err))
+            self.table = None
+
+    def _demand_names(self):
+        """Names of the demands the function is computed for"""
+        if self.function.func_type in DISTANCE_FUNCTIONS:
+            return [loc.name for loc in (self.function.loc_a,
+                                         self.function.loc_z)
+                    if not isinstance(loc, demand.Location)]
+        return []
+
+    def compute_bounds(self, _demands, _request):
+        """Lower bounds of the value, per undecided demand.
+
+        For an operand between a location and a demand (and for
+        hpa_score, per demand) the bound is the smallest value of a
+        candidate. The HPA constraints of a demand add to the
+        hpa_score of the candidates they return, so the hpa_score
+        bound also takes off the most they can add. Between two
+        demands, it is the smallest value in the table, or 0 for a
+        non-negative weight without a table.
+        Once one of the two demands is decided, the smallest value
+        for the other one is computed on demand and remembered.
+        """
+        names = self._demand_names()
+        self.bounds = {'demand': {}, 'pair': None, 'decided': {},
+                       'candidates': {}, 'names': names}
+        func_type = self.function.func_type
+        if func_type == "hpa_score":
+            names = list(_demands)
+        elif func_type not in DISTANCE_FUNCTIONS:
+            # compute() does not handle other functions, their value is 0
+            return
+        for name in set(names):
+            candidates = list(_demands[name].resources.values())
+            self.bounds['candidates'][name] = candidates
+
+        if func_type == "hpa_score" or len(names) == 1:
+            path = dpath.DecisionPath()
+            path.set_decisions({})
+            for name in set(names):
+                values = self.compute_candidates(
+                    path, name, self.bounds['candidates'][name], {},
+                    _request)
+                bound = min(values) if values else float('inf')
+                if func_type == "hpa_score" and values:
+                    bound -= self._hpa_score_gain(_demands[name])
+                self.bounds['demand'][name] = bound
+        elif len(set(names)) == 2:
+            pair = float('-inf')
+            if not all(self.bounds['candidates'][name] for name in names):
+                pair = float('inf')
+            elif self.weight >= 0 or self.operation != "product":
+                pair = 0.0
+                if self.table is not None and self._tabulated(names):
+                    pair = utils.table_min(self.table)
+                    if self.operation == "product":
+                        pair *= self.weight
+            self.bounds['pair'] = pair
+
+    def _hpa_score_gain(self, _demand):
+        """Most the HPA constraints of a demand lower the hpa_score value"""
+        score = sum(c.max_score() for c in _demand.constraint_list
+                    if c.constraint_type == "hpa")
+        # compute() inverts the score, see there
+        weight = self.weight if self.operation == "product" else 1.0
+        return max(weight, 0.0) * score
+
+    def _tabulated(self, _names):
+        """Whether all the candidates of the demands are in the table"""
+        return all(len(self.ordinals.get(name, {})) ==
+                   len(self.bounds['candidates'][name]) for name in _names)
+
+    def heuristic_to_go(self, _decision_path, _request):
+        """Lower bound of what the operand adds once all is decided"""
+        if self.bounds is None:
+            return 0.0
+        decisions = _decision_path.decisions
+        if self.function.func_type == "hpa_score":
+            return sum(bound for name, bound in self.bounds['demand'].items()
+                       if name not in decisions)
+        names = self.bounds['names']
+        undecided = [name for name in names if name not in decisions]
+        if not undecided:
+            return 0.0
+        if len(names) == 1:
+            return self.bounds['demand'].get(undecided[0], 0.0)
+        if len(set(names)) == 1:
+            return 0.0
+        if len(undecided) == 2:
+            return self.bounds['pair']
+
+        # One of the two demands is decided
+        other = undecided[0]
+        decided = names[1] if names[0] == other else names[0]
+        key = (decided, decisions[decided].get('candidate_id'))
+        if key not in self.bounds['decided']:
+            values = self.compute_candidates(
+                _decision_path, other, self.bounds['candidates'][other],
+                {}, _request)
+            self.bounds['decided'][key] = \
+                min(values) if values else float('inf')
+        return self.bounds['decided'][key]
+
+    def heuristic_to_go_candidates(self, _decision_path, _demand_name,
+                                   _candidate_list, _request):
+        """heuristic_to_go() for each candidate of a demand, as if decided"""
+        if not _candidate_list:
+            return []
+        decisions = _decision_path.decisions
+        previous = decisions.get(_demand_name)
+        names = self.bounds['names'] if self.bounds else []
+        if len(set(names)) == 2 and _demand_name in names and \
+                not all(name in decisions for name in names
+                        if name != _demand_name):
+            # The bound for the other demand depends on the candidate
+            candidates = _candidate_list
+        else:
+            candidates = _candidate_list[:1]
+        values = []
+        for candidate in candidates:
+            decisions[_demand_name] = candidate
+            values.append(self.heuristic_to_go(_decision_path, _request))
+        if previous is None:
+            decisions.pop(_demand_name, None)
+        else:
+            decisions[_demand_name] = previous
+        if len(values) < len(_candidate_list):
+            values = values * len(_candidate_list)
+        return values
+
+    def _ordinal(self, _demand_name, _candidate):
+        return self.ordinals.get(_demand_name, {}).get(
+            _candidate.get('candidate_id'))
+
+    def _lookup(self, _decision_path):
+        """compute() from the table, or None if a candidate is missing"""
+        func = self.function
+        decisions = _decision_path.decisions
+        if isinstance(func.loc_a, demand.Location) or \
+                isinstance(func.loc_z, demand.Location):
+            if isinstance(func.loc_a, demand.Location):
+                name = func.loc_z.name
+            else:
+                name = func.loc_a.name
+            if name not in decisions:
+                return 0.0
+            resource = decisions[name]
+            i = self._ordinal(name, resource)
+            if i is None:
+                return None
+            return float(self.table[i]) + resource.get('cost')
+
+        if func.loc_a.name not in decisions or \
+                func.loc_z.name not in decisions:
+            return 0.0
+        i = self._ordinal(func.loc_a.name, decisions[func.loc_a.name])
+        j = self._ordinal(func.loc_z.name, decisions[func.loc_z.name])
+        if i is None or j is None:
+            return None
+        return float(self.table[i][j])
+
+    def _lookup_candidates(self, _decision_path, _demand_name,
+                           _candidate_list):
+        """_compute_distances() from the table, or None"""
+        func = self.function
+        decisions = _decision_path.decisions
+        demand_ordinals = self.ordinals.get(_demand_name, {})
+        ordinals = [demand_ordinals.get(c.get('candidate_id'))
+                    for c in _candidate_list]
+        if None in ordinals:
+            return None
+        if isinstance(func.loc_a, demand.Location) or \
+                isinstance(func.loc_z, demand.Location):
+            return [float(self.table[i]) + candidate.get('cost')
+                    for i, candidate in zip(ordinals, _candidate_list)]
+        if func.loc_a.name == _demand_name:
+            other = func.loc_z.name
+        else:
+            other = func.loc_a.name
+        if other not in decisions:
+            return None
+        k = self._ordinal(other, decisions[other])
+        if k is None:
+            return None
+        if func.loc_a.name == _demand_name:
+            values = utils.table_column(self.table, k)
+        else:
+            values = utils.table_row(self.table, k)
+        return [values[i] for i in ordinals]
+
     def compute(self, _decision_path, _request):
+        if self.table is not None:
+            value = self._lookup(_decision_path)
+            if value is not None:
+                if self.operation == "product":
+                    value *= self.weight
+                return value
+
         value = 0.0
         cei = _request.cei
         if self.function.func_type == "latency_between":
@@ -178,3 +548,114 @@ class Operand(object):
             value *= self.weight
 
         return value
+
+    def compute_candidates(self, _decision_path, _demand_name,
+                           _candidate_list, _locations, _request):
+        """compute() for each candidate of a demand, as if decided.
+
+        _locations is shared by the operands of one evaluation, to
+        look the candidate locations up only once.
+        """
+        values = None
+        if self.function.func_type == "hpa_score":
+            values = self._compute_hpa_scores(_decision_path, _demand_name,
+                                              _candidate_list)
+        elif self.function.func_type in DISTANCE_FUNCTIONS:
+            values = self._compute_distances(
+                _decision_path, _demand_name, _candidate_list,
+                _locations, _request)
+
+        if values is None:
+            decisions = _decision_path.decisions
+            previous = decisions.get(_demand_name)
+            values = []
+            for candidate in _candidate_list:
+                decisions[_demand_name] = candidate
+                values.append(self.compute(_decision_path, _request))
+            if previous is None:
+                decisions.pop(_demand_name, None)
+            else:
+                decisions[_demand_name] = previous
+            return values
+
+        if self.operation == "product":
+            values = [value * self.weight for value in values]
+        return values
+
+    def _compute_hpa_scores(self, _decision_path, _demand_name,
+                            _candidate_list):
+        """Batch version of compute() for the hpa_score function."""
+        # Currently only minimize objective goal is supported,
+        # see compute()
+        invert = -1
+        value = 0.0
+        for demand_name, candidate_info in _decision_path.decisions.items():
+            if demand_name != _demand_name:
+                value += invert * float(candidate_info.get('hpa_score', 0))
+        return [value + invert * float(candidate.get('hpa_score', 0))
+                for candidate in _candidate_list]
+
+    def _compute_distances(self, _decision_path, _demand_name,
+                           _candidate_list, _locations, _request):
+        """Batch version of compute() for distance functions.
+
+        Returns None if the operand does not measure the distance
+        between the demand and a fixed point.
+        """
+        func = self.function
+        decisions = _decision_path.decisions
+        if not isinstance(func.loc_a, demand.Location) and \
+                not isinstance(func.loc_z, demand.Location) and \
+                func.loc_a.name != func.loc_z.name:
+            names = (func.loc_a.name, func.loc_z.name)
+            if _demand_name in names and not all(
+                    name == _demand_name or name in decisions
+                    for name in names):
+                # The other demand is not decided yet
+                return [0.0] * len(_candidate_list)
+
+        if self.table is not None:
+            values = self._lookup_candidates(_decision_path, _demand_name,
+                                             _candidate_list)
+            if values is not None:
+                return values
+
+        cei = _request.cei
+
+        def candidate_locations():
+            if 'coordinates' not in _locations:
+                _locations['values'] = \
+                    [cei.get_candidate_location(c) for c in _candidate_list]
+                _locations['coordinates'] = \
+                    utils.Coordinates(_locations['values'])
+            return _locations['values'], _locations['coordinates']
+
+        if isinstance(func.loc_a, demand.Location):
+            if func.loc_z.name != _demand_name:
+                return None
+            locations, coordinates = candidate_locations()
+            values = func.compute_to(func.loc_a.value, locations,
+                                     coordinates)
+        elif isinstance(func.loc_z, demand.Location):
+            if func.loc_a.name != _demand_name:
+                return None
+            locations, coordinates = candidate_locations()
+            values = func.compute_to(func.loc_z.value, locations,
+                                     coordinates)
+        elif func.loc_a.name == _demand_name and \
+                func.loc_z.name != _demand_name and \
+                func.loc_z.name in decisions:
+            loc_z = cei.get_candidate_location(decisions[func.loc_z.name])
+            locations, coordinates = candidate_locations()
+            return func.compute_from(locations, loc_z, coordinates)
+        elif func.loc_z.name == _demand_name and \
+                func.loc_a.name != _demand_name and \
+                func.loc_a.name in decisions:
+            loc_a = cei.get_candidate_location(decisions[func.loc_a.name])
+            locations, coordinates = candidate_locations()
+            return func.compute_to(loc_a, locations, coordinates)
+        else:
+            return None
+
+        return [value + candidate.get('cost')
+                for value, candidate in zip(values, _candidate_list)]
@@ -24,6 +24,9 @@ import collections
 import operator
 import random
 
+from conductor.common import candidate_pool
+from conductor.common import candidate_table
+
 from conductor.solver.optimizer.constraints \
     import access_distance as access_dist
 from conductor.solver.optimizer.constraints \
@@ -66,8 +69,12 @@ class Parser(object):
         self.objective = None
         self.obj_func_param = list()
         self.cei = None
+        self.constraint_cache = None
+        # Inventory group pair index, fetched once for the plan
+        self.inventory_group_pairs = None
         self.request_id = None
         self.request_type = None
+        self.search_algorithm = None
         self.region_group = None
 
     # def get_data_engine_interface(self):
@@ -81,15 +88,25 @@ class Parser(object):
 
         # get request type
         self.request_type = json_template['conductor_solver']['request_type']
+        self.search_algorithm = \
+            json_template['conductor_solver'].get('search_algorithm')
 
         # get demands
         demand_list = json_template["conductor_solver"]["demands"]
+        # Candidates of a pooled translation refer to its pool
+        pool = candidate_pool.load(json_template["conductor_solver"])
         for demand_id, candidate_list in demand_list.items():
             current_demand = demand.Demand(demand_id)
             # candidate should only have minimal information like location_id
-            for candidate in candidate_list["candidates"]:
+            # The candidates share the values they have in common through
+            # the table of the demand
+            table = candidate_table.CandidateTable(
+                candidate_pool.decode(candidate_list["candidates"], pool))
+            for ordinal in range(len(table)):
+                candidate = table.row(ordinal)
                 candidate_id = candidate["candidate_id"]
                 current_demand.resources[candidate_id] = candidate
+            current_demand.table = table
             current_demand.sort_base = 0  # this is only for testing
             self.demands[demand_id] = current_demand
 
@@ -36,6 +36,7 @@ from conductor.common.models import order_lock_history
 from conductor.common.music import api
 from conductor.common.music import messaging as music_messaging
 from conductor.common.music.model import base
+from conductor.common import plan_queue
 from conductor.i18n import _LE, _LI
 from conductor import messaging
 from conductor import service
@@ -227,7 +228,9 @@ class SolverService(cotyledon.Service):
         self.data_service = self.setup_rpc(conf, "data")
 
         # Set up the cei and optimizer
-        self.cei = cei.ConstraintEngineInterface(self.data_service)
+        self.cei = cei.ConstraintEngineInterface(
+            self.data_service,
+            compact_candidates=conf.solver.compact_candidates)
         # self.optimizer = optimizer.Optimizer(conf)
 
         # Set up Music access.
@@ -242,6 +245,12 @@ class SolverService(cotyledon.Service):
             "status": self.Plan.SOLVING
         }
 
+        # Translated plans are handed over to the solver workers
+        self.plan_queue = plan_queue.PlanQueue(
+            conf, self.Plan, 'solver', self.worker_id,
+            queued=self.Plan.TRANSLATED, claimed=self.Plan.SOLVING,
+            lease=conf.solver.timeout, poll_interval=conf.delay_time)
+
         if not self.conf.solver.concurrent:
             self._reset_solving_status()
 
@@ -292,10 +301,9 @@ class SolverService(cotyledon.Service):
 
         while self.running:
 
-            # Delay time (Seconds) for MUSIC requests.
-            time.sleep(self.conf.delay_time)
+            # Wait for a plan to be queued, or for the next scan
+            self.plan_queue.wait()
 
-            # plans = Plan.query().all()
             # Find the first plan with a status of TRANSLATED.
             # Change its status to SOLVING.
             # Then, read the "translated" field as "template".
@@ -306,26 +314,25 @@ class SolverService(cotyledon.Service):
             regions_maps = dict()
             country_groups = list()
 
-            # Instead of using the query.all() method, now creating an index for 'status'
-            # field in conductor.plans table, and query plans by status columns
-            translated_plans = self.Plan.query.get_plan_by_col("status", self.Plan.TRANSLATED)
-            solving_plans = self.Plan.query.get_plan_by_col("status", self.Plan.SOLVING)
-
-
-            # combine the plans with status = 'translated' and 'solving' together
-            plans = translated_plans + solving_plans
-
+            # Only the ids and statuses of the translated and solving
+            # plans are read, the plan is loaded once picked
             found_translated_template = False
 
-            for p in plans:
-                if p.status == self.Plan.TRANSLATED:
+            for entry in self.plan_queue.fetch():
+                if entry.status == self.Plan.TRANSLATED:
+                    p = self.plan_queue.load(entry)
+                    if p is None:
+                        # Claimed by another worker meanwhile
+                        continue
                     json_template = p.translation
                     found_translated_template = True
                     break
-                elif p.status == self.Plan.SOLVING and \
-                    (self.current_time_seconds() - self.millisec_to_sec(p.updated)) > self.conf.solver.timeout:
-                    p.status = self.Plan.TRANSLATED
-                    p.update(condition=self.solving_status_condition)
+                elif self.plan_queue.expired(entry):
+                    # Solving took longer than the solver timeout, let
+                    # another worker solve the plan
+                    p = self.plan_queue.load(entry)
+                    if p is not None:
+                        self.plan_queue.release(p)
                     break
 
             if not json_template:
@@ -349,11 +356,10 @@ class SolverService(cotyledon.Service):
 
             log_util.setLoggerFilter(LOG, self.conf.keyspace, p.id)
 
-            p.status = self.Plan.SOLVING
             p.solver_counter += 1
             p.solver_owner = socket.gethostname()
 
-            _is_updated = p.update(condition=self.translated_status_condition)
+            _is_updated = self.plan_queue.claim(p)
             if not _is_updated:
                 continue
 
@@ -0,0 +1,140 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Per-plan cache of constraint evaluation results.
+
+The search solves the constraints of a demand every time it reaches
+that demand, after each backtrack and for each extra solution. The
+result of a decision independent constraint only depends on the
+candidates it is given, so it is cached under the constraint name,
+the demand name and a fingerprint of the candidate ids.
+"""
+
+import collections
+import copy
+import hashlib
+
+from oslo_log import log
+import six
+
+import conductor.common.prometheus_metrics as PC
+
+LOG = log.getLogger(__name__)
+
+
+def candidate_key(candidate):
+    """Stable id of a candidate within a demand"""
+    return candidate.get('node_id') or candidate.get('candidate_id')
+
+
+def fingerprint(candidate_list):
+    """Hash of the ids of candidate_list, in order"""
+    digest = hashlib.sha1()
+    for candidate in candidate_list:
+        digest.update(six.text_type(candidate_key(candidate)).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ConstraintCache(object):
+    """LRU cache of constraint results for one plan.
+
+    Results are stored per candidate. A candidate the constraint
+    returned as is (filtering) is stored as a reference and resolved
+    against the candidate list of the lookup, so the search keeps
+    working on its own candidate objects. A candidate the constraint
+    rebuilt (e.g. HPA adds the flavor map) is stored as a copy, and
+    handed out as a fresh copy on every hit.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def key(self, constraint, demand_name, candidate_list):
+        """Cache key, or None if the result can not be cached"""
+        if self.max_size <= 0 or not constraint.decision_independent:
+            return None
+        return (constraint.name, demand_name, fingerprint(candidate_list))
+
+    def get(self, key, constraint, candidate_list):
+        """Cached result for candidate_list, or None on a miss"""
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        result = None
+        if entry is not None:
+            result = self._resolve(entry, candidate_list)
+        if result is None:
+            self.misses += 1
+            PC.CONSTRAINT_CACHE_MISSES.labels(
+                constraint.constraint_type).inc()
+            return None
+
+        # Most recently used entries go last
+        del self._entries[key]
+        self._entries[key] = entry
+        self.hits += 1
+        PC.CONSTRAINT_CACHE_HITS.labels(constraint.constraint_type).inc()
+        return result
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def put(self, key, candidate_list, result, in_place=False):
+        """Store the result of solving a constraint on candidate_list.
+
+        in_place tells that the constraint filtered the list it was
+        given, rather than returning a new one.
+        """
+        if key is None or result is None:
+            return
+        inputs = set(id(c) for c in candidate_list)
+        items = []
+        for candidate in result:
+            if id(candidate) in inputs:
+                items.append((candidate_key(candidate), None))
+            else:
+                items.append((None, copy.deepcopy(candidate)))
+        self._entries.pop(key, None)
+        self._entries[key] = (in_place, items)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _resolve(self, entry, candidate_list):
+        in_place, items = entry
+        candidates = dict((candidate_key(c), c) for c in candidate_list)
+        result = []
+        for ref, value in items:
+            if ref is None:
+                result.append(copy.deepcopy(value))
+            elif ref in candidates:
+                result.append(candidates[ref])
+            else:
+                return None
+        if in_place:
+            candidate_list[:] = result
+            return candidate_list
+        return result
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries)}
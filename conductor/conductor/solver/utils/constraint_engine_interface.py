@@ -28,12 +28,21 @@ the constraints and the conductor data engine.
 
 from oslo_log import log
 
+from conductor.common import candidate_table
+
 LOG = log.getLogger(__name__)
 
 
 class ConstraintEngineInterface(object):
-    def __init__(self, client):
+    def __init__(self, client, compact_candidates=False):
         self.client = client
+        # Send candidate lists as candidate tables
+        self.compact_candidates = compact_candidates
+
+    def _candidate_list_arg(self, candidate_list):
+        if self.compact_candidates:
+            return candidate_table.encode(candidate_list)
+        return candidate_list
 
     def get_candidate_location(self, candidate):
         # Try calling a method (remember, "calls" are synchronous)
@@ -76,7 +85,7 @@ class ConstraintEngineInterface(object):
         ctxt = {}
         args = {"constraint_name": constraint_name,
                 "constraint_type": constraint_type,
-                "candidate_list": candidate_list,
+                "candidate_list": self._candidate_list_arg(candidate_list),
                 "controller": controller,
                 "inventory_type": inventory_type,
                 "request": request,
@@ -94,7 +103,7 @@ class ConstraintEngineInterface(object):
                                        demand_name, resolved_candidate):
         # return a list of the "pair" candidates for the given candidate
         ctxt = {}
-        args = {"candidate_list": candidate_list,
+        args = {"candidate_list": self._candidate_list_arg(candidate_list),
                 "demand_name": demand_name,
                 "resolved_candidate": resolved_candidate}
         response = self.client.call(ctxt=ctxt,
@@ -104,10 +113,21 @@ class ConstraintEngineInterface(object):
                    response: {}".format(response))
         return response
 
+    def get_inventory_group_pairs(self):
+        # return the inventory group pair index: each candidate id with
+        # the ids of the candidates it is paired with
+        ctxt = {}
+        args = {}
+        response = self.client.call(ctxt=ctxt,
+                                    method="get_inventory_group_pairs",
+                                    args=args)
+        LOG.debug("get_inventory_group_pairs response: {}".format(response))
+        return response
+
     def get_candidates_by_attributes(self, demand_name,
                                      candidate_list, properties):
         ctxt = {}
-        args = {"candidate_list": candidate_list,
+        args = {"candidate_list": self._candidate_list_arg(candidate_list),
                 "properties": properties,
                 "demand_name": demand_name}
         response = self.client.call(ctxt=ctxt,
@@ -128,7 +148,7 @@ class ConstraintEngineInterface(object):
         :return: candidate_list with hpa features and flavor mapping
         '''
         ctxt = {}
-        args = {"candidate_list": candidate_list,
+        args = {"candidate_list": self._candidate_list_arg(candidate_list),
                 "flavorProperties": flavorProperties,
                 "id": id,
                 "type": type,
@@ -147,7 +167,7 @@ class ConstraintEngineInterface(object):
         :return: candidate_list with required vim capacity.
         '''
         ctxt = {}
-        args = {"candidate_list": candidate_list,
+        args = {"candidate_list": self._candidate_list_arg(candidate_list),
                 "request": vim_request}
         response = self.client.call(ctxt=ctxt,
                                     method="get_candidates_with_vim_capacity",
@@ -155,3 +175,20 @@ class ConstraintEngineInterface(object):
         LOG.debug(
             "get_candidates_with_vim_capacity response: {}".format(response))
         return response
+
+    def get_candidates_in_batch(self, candidate_list, calls):
+        '''
+        Runs several candidate filtering calls in a single message.
+        Each call gets the candidate_list returned by the previous one.
+        :param candidate_list: list of candidates to process
+        :param calls: list of {'method', 'args'} dicts, without the
+                      candidate_list argument
+        :return: list of candidate_list responses, one per call that ran,
+                 or None if the batch could not be served
+        '''
+        ctxt = {}
+        response = self.client.call_batch(
+            ctxt=ctxt, calls=calls, pipe="candidate_list",
+            pipe_value=self._candidate_list_arg(candidate_list))
+        LOG.debug("get_candidates_in_batch response: {}".format(response))
+        return response
@@ -20,9 +20,17 @@
 import math
 from oslo_log import log
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 LOG = log.getLogger(__name__)
 
+EARTH_RADIUS = 6371.0  # km
+EARTH_HALF_CIRCUMFERENCE = 20000  # km
+
 
 def compute_air_distance(_src, _dst):
     """Compute Air Distance
@@ -52,6 +60,160 @@ def compute_air_distance(_src, _dst):
     return distance
 
 
+class Coordinates(object):
+    """Coordinates of several points, for batch distance computation
+
+    Latitudes and longitudes are converted to radians once, and kept
+    in contiguous arrays (NumPy arrays when NumPy is available).
+    input: a list of (lat, lon)s, or a Coordinates instance
+    """
+
+    def __init__(self, _locations):
+        if isinstance(_locations, Coordinates):
+            self.lat = _locations.lat
+            self.lon = _locations.lon
+            self.cos_lat = _locations.cos_lat
+            return
+        lat = [float(loc[0]) for loc in _locations]
+        lon = [float(loc[1]) for loc in _locations]
+        if numpy is not None:
+            self.lat = numpy.radians(numpy.array(lat, dtype=float))
+            self.lon = numpy.radians(numpy.array(lon, dtype=float))
+            self.cos_lat = numpy.cos(self.lat)
+        else:
+            self.lat = [math.radians(x) for x in lat]
+            self.lon = [math.radians(x) for x in lon]
+            self.cos_lat = [math.cos(x) for x in self.lat]
+
+    def __len__(self):
+        return len(self.lat)
+
+
+def _air_distances_from(_lat, _lon, _cos_lat, _dst):
+    """Distances from one point (in radians) to Coordinates _dst"""
+    if numpy is not None:
+        dlat = numpy.sin((_dst.lat - _lat) / 2.0)
+        dlon = numpy.sin((_dst.lon - _lon) / 2.0)
+        a = dlat * dlat + _cos_lat * _dst.cos_lat * dlon * dlon
+        a = numpy.clip(a, 0.0, 1.0)
+        c = 2.0 * numpy.arctan2(numpy.sqrt(a), numpy.sqrt(1.0 - a))
+        return (EARTH_RADIUS * c).tolist()
+
+    distances = []
+    for lat, lon, cos_lat in zip(_dst.lat, _dst.lon, _dst.cos_lat):
+        dlat = math.sin((lat - _lat) / 2.0)
+        dlon = math.sin((lon - _lon) / 2.0)
+        a = min(1.0, dlat * dlat + _cos_lat * cos_lat * dlon * dlon)
+        c = 2.0 * math.atan2(math.sqrt(a), math.sqrt(1.0 - a))
+        distances.append(EARTH_RADIUS * c)
+    return distances
+
+
+def compute_air_distances(_src, _dst):
+    """Compute Air Distances from one point to many
+
+    input: a (lat, lon) pair, and a list of (lat, lon)s or Coordinates
+    output: list of air distances as km, in the order of _dst
+    """
+    dst = Coordinates(_dst)
+    lat = math.radians(float(_src[0]))
+    lon = math.radians(float(_src[1]))
+    return _air_distances_from(lat, lon, math.cos(lat), dst)
+
+
+def compute_air_distance_matrix(_src, _dst):
+    """Compute Air Distances between every pair of points
+
+    input: two lists of (lat, lon)s or Coordinates
+    output: list of rows of air distances as km, one row per
+            point of _src and one column per point of _dst
+    """
+    table = compute_air_distance_table(_src, _dst)
+    if numpy is not None:
+        return table.tolist()
+    return table
+
+
+def compute_air_distance_table(_src, _dst):
+    """Compute Air Distances between every pair of points, for lookups
+
+    Same as compute_air_distance_matrix, but returns a 2-D NumPy array
+    when NumPy is available. Use table[i][j] to read it.
+    """
+    src = Coordinates(_src)
+    dst = Coordinates(_dst)
+    if numpy is not None:
+        dlat = numpy.sin((dst.lat[numpy.newaxis, :] -
+                          src.lat[:, numpy.newaxis]) / 2.0)
+        dlon = numpy.sin((dst.lon[numpy.newaxis, :] -
+                          src.lon[:, numpy.newaxis]) / 2.0)
+        a = dlat * dlat + numpy.outer(src.cos_lat, dst.cos_lat) * dlon * dlon
+        a = numpy.clip(a, 0.0, 1.0)
+        c = 2.0 * numpy.arctan2(numpy.sqrt(a), numpy.sqrt(1.0 - a))
+        return EARTH_RADIUS * c
+    return [_air_distances_from(lat, lon, cos_lat, dst)
+            for lat, lon, cos_lat in zip(src.lat, src.lon, src.cos_lat)]
+
+
+def table_row(_table, _i):
+    """Row _i of a table from compute_air_distance_table, as a list"""
+    if numpy is not None:
+        return _table[_i].tolist()
+    return _table[_i]
+
+
+def table_column(_table, _j):
+    """Column _j of a table from compute_air_distance_table, as a list"""
+    if numpy is not None:
+        return _table[:, _j].tolist()
+    return [row[_j] for row in _table]
+
+
+def table_min(_table):
+    """Smallest value of a table from compute_air_distance_table"""
+    if numpy is not None:
+        return float(_table.min())
+    return min(min(row) for row in _table)
+
+
+def compute_latency_scores(_src, _dst, _region_group, _coordinates=None):
+    """Compute the Network latency scores from src to many dst
+
+    Batch version of compute_latency_score. _coordinates may hold the
+    Coordinates of _dst if already known.
+    """
+    distances = compute_air_distances(_src, _coordinates or _dst)
+    return [distance + compute_latency_penalty(dst, _region_group)
+            for dst, distance in zip(_dst, distances)]
+
+
+def compute_latency_score_table(_src, _dst, _region_group,
+                                _src_coordinates=None,
+                                _dst_coordinates=None):
+    """Compute the Network latency scores between every pair of points
+
+    Table version of compute_latency_score, see
+    compute_air_distance_table.
+    """
+    table = compute_air_distance_table(_src_coordinates or _src,
+                                       _dst_coordinates or _dst)
+    penalties = [compute_latency_penalty(dst, _region_group)
+                 for dst in _dst]
+    if numpy is not None:
+        return table + numpy.array(penalties, dtype=float)[numpy.newaxis, :]
+    return [[distance + penalty
+             for distance, penalty in zip(row, penalties)]
+            for row in table]
+
+
+def compute_latency_penalty(_dst, _region_group):
+    """Latency score added to the distance for the region group of dst"""
+    region_group_weight = _region_group.get(_dst[2])
+    if region_group_weight == 0 or region_group_weight is None:
+        return 0.0
+    return region_group_weight * EARTH_HALF_CIRCUMFERENCE
+
+
 def compute_latency_score(_src,_dst, _region_group):
     """Compute the Network latency score between src and dst"""
     earth_half_circumference = 20000
@@ -0,0 +1,201 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""HPA flavor matching time, with and without the compiled flavor index.
+
+A synthetic inventory is built where every cloud region has the same
+number of flavors, each with a random set of HPA capabilities. Every
+region is then matched against a few HPA requirements: once by parsing
+the flavors the way match_hpa does without an index, and twice from
+the FlavorCapabilityIndex of the region.
+
+The indexes are built when the A&AI cache is refreshed, and parse
+the attribute values the first time they are compared (the cold pass).
+Later plans find them parsed (the warm pass).
+
+Usage:
+    python -m conductor.tests.benchmark.hpa_matching \
+        [--regions 2000] [--flavors 50] [--json]
+"""
+
+import argparse
+import copy
+import json
+import random
+import time
+
+from conductor.data.plugins.inventory_provider import hpa_utils
+
+FEATURES = {
+    'basicCapabilities': [('numVirtualCpu', 'int', None),
+                          ('virtualMemSize', 'int', 'GB')],
+    'numa': [('numaNodes', 'int', None),
+             ('numaCpu-0', 'int', None),
+             ('numaMem-0', 'int', 'MB')],
+    'cpuPinning': [('logicalCpuThreadPinningPolicy', 'str', None),
+                   ('logicalCpuPinningPolicy', 'str', None)],
+    'hugePages': [('memoryPageSize', 'int', 'MB')],
+    'instructionSetExtensions': [('instructionSetExtensions', 'list', None)],
+}
+EXTENSIONS = ['aes', 'sse', 'avx', 'smt', 'pcmulqdq', 'sha']
+
+
+def make_value(rng, kind, unit):
+    if kind == 'int':
+        value = '"{}"'.format(rng.choice([1, 2, 4, 8, 16]))
+    elif kind == 'str':
+        value = '"{}"'.format(rng.choice(['dedicated', 'shared']))
+    else:
+        value = str(rng.sample(EXTENSIONS, 3))
+    if unit:
+        return '{{"value": {}, "unit": "{}"}}'.format(value, unit)
+    return '{{"value": {}}}'.format(value)
+
+
+def make_flavors(rng, region, flavors):
+    flavor_list = []
+    for f in range(flavors):
+        capabilities = []
+        for feature in rng.sample(sorted(FEATURES), 3):
+            capabilities.append({
+                'hpa-feature': feature,
+                'hpa-version': 'v1',
+                'architecture': 'generic',
+                'hpa-feature-attributes': [
+                    {'hpa-attribute-key': key,
+                     'hpa-attribute-value': make_value(rng, kind, unit)}
+                    for key, kind, unit in FEATURES[feature]],
+            })
+        flavor_list.append({
+            'flavor-id': '{}-flavor{}'.format(region, f),
+            'flavor-name': 'flavor{}'.format(f),
+            'resource-version': '1',
+            'hpa-capabilities': {'hpa-capability': capabilities},
+        })
+    return {'flavor': flavor_list}
+
+
+def make_requirements():
+    def capability(feature, mandatory, attributes, score='0'):
+        return {'hpa-feature': feature, 'hpa-version': 'v1',
+                'architecture': 'generic', 'mandatory': mandatory,
+                'score': score, 'directives': [],
+                'hpa-feature-attributes': attributes}
+
+    return [
+        [capability('basicCapabilities', 'True', [
+            {'hpa-attribute-key': 'numVirtualCpu',
+             'hpa-attribute-value': '4', 'operator': '>='},
+            {'hpa-attribute-key': 'virtualMemSize',
+             'hpa-attribute-value': '4096', 'unit': 'MB',
+             'operator': '>='}])],
+        [capability('numa', 'True', [
+            {'hpa-attribute-key': 'numaNodes',
+             'hpa-attribute-value': '2', 'operator': '='}]),
+         capability('hugePages', 'True', [
+             {'hpa-attribute-key': 'memoryPageSize',
+              'hpa-attribute-value': '16', 'unit': 'MB',
+              'operator': '='}])],
+        [capability('instructionSetExtensions', 'True', [
+            {'hpa-attribute-key': 'instructionSetExtensions',
+             'hpa-attribute-value': ['aes'], 'operator': 'ALL'}]),
+         capability('cpuPinning', 'False', [
+             {'hpa-attribute-key': 'logicalCpuPinningPolicy',
+              'hpa-attribute-value': 'dedicated', 'operator': '='}],
+             score='10')],
+    ]
+
+
+def match(candidates, requirements, indexes):
+    results = []
+    for candidate in candidates:
+        index = indexes.get(candidate['location_id'])
+        for features in requirements:
+            provider = hpa_utils.HpaMatchProvider(
+                candidate, copy.deepcopy(features), index)
+            results.append(provider.match_flavor())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--regions', type=int, default=2000)
+    parser.add_argument('--flavors', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    candidates = []
+    for r in range(args.regions):
+        region = 'region{}'.format(r)
+        candidates.append({'location_id': region,
+                           'vim-id': 'owner_' + region,
+                           'flavors': make_flavors(rng, region,
+                                                   args.flavors)})
+    requirements = make_requirements()
+
+    start = time.time()
+    parsed = match(candidates, requirements, {})
+    parsed_seconds = time.time() - start
+
+    start = time.time()
+    indexes = dict(
+        (c['location_id'],
+         hpa_utils.FlavorCapabilityIndex(c['flavors'], parse=False))
+        for c in candidates)
+    build_seconds = time.time() - start
+
+    start = time.time()
+    cold = match(candidates, requirements, indexes)
+    cold_seconds = time.time() - start
+
+    start = time.time()
+    warm = match(candidates, requirements, indexes)
+    warm_seconds = time.time() - start
+
+    results = {
+        'regions': args.regions,
+        'flavors': args.flavors,
+        'requirements': len(requirements),
+        'matched': sum(1 for r in warm if r),
+        'parsed_seconds': parsed_seconds,
+        'index_build_seconds': build_seconds,
+        'cold_seconds': cold_seconds,
+        'warm_seconds': warm_seconds,
+        'same_results': parsed == cold == warm,
+        'speedup': parsed_seconds / max(warm_seconds, 1e-9),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print("{} regions x {} flavors, {} requirements, {} matches".format(
+        args.regions, args.flavors, len(requirements), results['matched']))
+    print("  parsed     : {:8.3f} s".format(parsed_seconds))
+    print("  index cold : {:8.3f} s (+{:.3f} s index build at refresh)".format(
+        cold_seconds, build_seconds))
+    print("  index warm : {:8.3f} s".format(warm_seconds))
+    print("  speedup    : {:8.1f}x, same results: {}".format(
+        results['speedup'], results['same_results']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Size and cost of the compressed Music JSON columns.
+
+The columns of a synthetic plan are stored as the Music ORM stores
+them, as plain JSON text and compressed at each --levels zlib level:
+
+    translation  translation of the plan, every demand with all its
+                 candidates (see solver_suite)
+    pooled       the same translation, its candidates pooled once per
+                 plan (pool_candidates)
+    triage       translator triage data, a dropped candidate record for
+                 half of the candidates of every demand
+
+For each, the stored size and the time to encode (json.dumps and
+compress) and decode (decompress and json.loads) the column are
+reported, the best of --repeat runs.
+
+Usage:
+    python -m conductor.tests.benchmark.music_codec \
+        [--demands 4] [--candidates 500] [--levels 1,6,9] \
+        [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import time
+
+from oslo_config import cfg
+
+from conductor.common import candidate_pool
+from conductor.common.music.model import codec
+from conductor.tests.benchmark import solver_suite
+
+
+def make_columns(demands, candidates):
+    """JSON columns of a plan, by name"""
+    translation = solver_suite.make_template(
+        demands, candidates, 'mixed', seed=0)
+    conductor_solver = translation['conductor_solver']
+    pooled_solver = dict(conductor_solver)
+    pooled_solver[candidate_pool.ENCODING], pooled_solver['demands'] = \
+        candidate_pool.encode(conductor_solver['demands'])
+    dropped = []
+    for name, demand in sorted(conductor_solver['demands'].items()):
+        dropped.append({
+            'name': name,
+            'translation_dropped': [
+                {'inventory_provider': candidate['inventory_provider'],
+                 'candidate_id': candidate['candidate_id'],
+                 'location_id': candidate['location_id'],
+                 'reason': 'distance to customer_loc'}
+                for candidate in demand['candidates'][::2]],
+            'latency_dropped': [],
+        })
+    return [
+        ('translation', translation),
+        ('pooled', {'conductor_solver': pooled_solver}),
+        ('triage', {'dropped_candidates': dropped}),
+    ]
+
+
+def best_time(repeat, function, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = function(*args)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(value, level, repeat):
+    """Stored size, encode and decode time of a column value"""
+    conf = cfg.CONF
+    if level:
+        conf.set_override('compress_columns', True, 'music_api')
+        conf.set_override('compress_level', level, 'music_api')
+    else:
+        conf.set_override('compress_columns', False, 'music_api')
+    encode_seconds, text = best_time(repeat, codec.dumps, value)
+    decode_seconds, decoded = best_time(repeat, codec.loads, text)
+    assert decoded == json.loads(json.dumps(value))
+    return {'level': level, 'bytes': len(text),
+            'encode_ms': encode_seconds * 1000.0,
+            'decode_ms': decode_seconds * 1000.0}
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--demands', type=int, default=4)
+    parser.add_argument('--candidates', type=int, default=500)
+    parser.add_argument('--levels', type=int_list, default=[1, 6, 9])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+    cfg.CONF([], project='conductor')
+    cfg.CONF.set_override('compress_min_size', 0, 'music_api')
+
+    results = []
+    for column, value in make_columns(args.demands, args.candidates):
+        plain = None
+        for level in [0] + args.levels:
+            result = measure(value, level, args.repeat)
+            result['column'] = column
+            plain = plain or result['bytes']
+            result['ratio'] = float(plain) / result['bytes']
+            results.append(result)
+            if not args.json:
+                print("{:<12} {:<5} {:10d} bytes  x{:5.1f}  encode "
+                      "{:8.2f} ms  decode {:8.2f} ms".format(
+                          column, 'plain' if not level else
+                          'zlib{}'.format(level), result['bytes'],
+                          result['ratio'], result['encode_ms'],
+                          result['decode_ms']))
+
+    if args.json:
+        print(json.dumps({'demands': args.demands,
+                          'candidates': args.candidates,
+                          'results': results}, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
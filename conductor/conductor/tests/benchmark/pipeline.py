@@ -0,0 +1,628 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Plan latency and throughput of the whole pipeline, in one process.
+
+The API, controller, data, solver and reservation services are started
+as threads of this process, with the workers each service is configured
+with. They share the Music mock API, and reach A&AI, Multicloud and AAF
+through an HTTP stand-in serving the canned responses of the simulators
+in conductor/tests/functional/simulators.
+
+Plans are posted to the API by --concurrency clients, each posting its
+next plan once the previous one is finished. The time each plan enters
+a status is taken from its updates in Music, and reported per stage:
+
+    api        posting the plan to the API
+    translate  template to translated
+    solve      translated to solved
+    reserve    solved to done
+    total      posting the plan to done
+
+The intervals the services poll Music at (delay_time, polling_interval
+and check_interval) come from --config-file, as in production. With
+--no-notify, the translator, solver and reservation workers are not
+notified of the plans queued for them, and these intervals account for
+most of the latency of a stage.
+
+With --demands N, the template has N cloud demands instead of one,
+each with its own distance constraint. The translator resolves up to
+--resolve-workers of them at once.
+
+Usage:
+    python -m conductor.tests.benchmark.pipeline \
+        [--plans 20] [--concurrency 5] \
+        [--workers solver=2,reservation=1] [--transport local] \
+        [--no-notify] [--demands 1] [--resolve-workers 8] \
+        [--stand-in-latency-ms 0] [--config-file conductor.conf] [--json]
+"""
+
+import argparse
+import collections
+import copy
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import cotyledon
+import mock
+from oslo_config import cfg
+import requests
+from six.moves import BaseHTTPServer
+from six.moves import queue
+from six.moves import socketserver
+from six.moves.urllib import parse
+from wsgiref import simple_server
+
+from conductor.api import app
+from conductor.common.models import plan
+from conductor.common.music import api
+import conductor.common.prometheus_metrics as PC
+from conductor.controller import service as controller_service
+from conductor.data import service as data_service
+from conductor.reservation import service as reservation_service
+from conductor import service
+from conductor.solver import service as solver_service
+from conductor.tests.benchmark import rpc_transport
+from conductor.tests import functional
+
+SIMULATORS = os.path.join(os.path.dirname(functional.__file__),
+                          'simulators')
+
+AAF_USER = 'oof@oof.onap.org'
+USERNAME = 'admin'
+PASSWORD = 'benchmark'
+
+# Routes of the simulators, to the simulator and file answering them
+ROUTES = {
+    ('GET', '/aai/v14/cloud-infrastructure/cloud-regions/'):
+        ('aaisim', 'get_onap_regions.json'),
+    ('GET', '/aai/v14/cloud-infrastructure/complexes/complex/DLLSTX233'):
+        ('aaisim', 'get_onap_complex_DLLSTX233.json'),
+    ('GET', '/aai/v14/cloud-infrastructure/cloud-regions/cloud-region/'
+            'HPA-cloud/cloud-region-1/flavors/'):
+        ('aaisim', 'get_flavors_cloud_region_1.json'),
+    ('GET', '/aai/v14/cloud-infrastructure/cloud-regions/cloud-region/'
+            'HPA-cloud/cloud-region-2/flavors/'):
+        ('aaisim', 'get_flavors_cloud_region_2.json'),
+    ('POST', '/api/multicloud/v0/check_vim_capacity'):
+        ('multicloudsim', 'post_check_vim_capacity.json'),
+    ('GET', '/authz/perms/user/' + AAF_USER):
+        ('aafsim', 'get_perms_user.json'),
+}
+
+TEMPLATE = {
+    'homing_template_version': '2017-10-10',
+    'parameters': {
+        'service_name': 'Residential vCPE',
+        'service_id': 'vcpe_service_id',
+        'customer_lat': 32.89748,
+        'customer_long': -97.040443,
+        'REQUIRED_MEM': 4,
+        'REQUIRED_DISK': 100,
+    },
+    'locations': {
+        'customer_loc': {
+            'latitude': {'get_param': 'customer_lat'},
+            'longitude': {'get_param': 'customer_long'},
+        },
+    },
+    'demands': {
+        'vG': [{'inventory_provider': 'aai', 'inventory_type': 'cloud'}],
+    },
+    'constraints': {
+        'constraint_vg_customer': {
+            'type': 'distance_to_location',
+            'demands': ['vG'],
+            'properties': {'distance': '< 5000 km',
+                           'location': 'customer_loc'},
+        },
+        'check_cloud_capacity': {
+            'type': 'vim_fit',
+            'demands': ['vG'],
+            'properties': {
+                'controller': 'multicloud',
+                'request': {
+                    'vCPU': 10,
+                    'Memory': {'quantity': {'get_param': 'REQUIRED_MEM'},
+                               'unit': 'GB'},
+                    'Storage': {'quantity': {'get_param': 'REQUIRED_DISK'},
+                                'unit': 'GB'},
+                },
+            },
+        },
+    },
+    'optimization': {
+        'minimize': {
+            'sum': [{'distance_between': ['customer_loc', 'vG']}],
+        },
+    },
+}
+
+
+def make_template(demands):
+    """TEMPLATE with its vG demand repeated, demands in all"""
+    template = copy.deepcopy(TEMPLATE)
+    for number in range(1, demands):
+        name = 'vG{}'.format(number)
+        template['demands'][name] = copy.deepcopy(template['demands']['vG'])
+        template['constraints']['constraint_{}_customer'.format(
+            name.lower())] = {
+            'type': 'distance_to_location',
+            'demands': [name],
+            'properties': {'distance': '< 5000 km',
+                           'location': 'customer_loc'},
+        }
+        template['optimization']['minimize']['sum'].append(
+            {'distance_between': ['customer_loc', name]})
+    return template
+
+
+STAGES = (
+    ('translate', plan.Plan.TEMPLATE, plan.Plan.TRANSLATED),
+    ('solve', plan.Plan.TRANSLATED, plan.Plan.SOLVED),
+    ('reserve', plan.Plan.SOLVED, plan.Plan.DONE),
+)
+FINISHED = (plan.Plan.DONE, plan.Plan.NOT_FOUND, plan.Plan.ERROR)
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        # Clients differ on trailing slashes, the simulators do not care
+        path = parse.urlsplit(self.path).path.rstrip('/')
+        body = self.server.responses.get((self.command, path))
+        with self.server.lock:
+            self.server.requests[(self.command, path)] += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if body is None:
+            self.send_response(404)
+            body = '{}'
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class StandIn(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """A&AI, Multicloud and AAF, answering with the simulator responses"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           StandInHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = collections.Counter()
+        self.responses = {}
+        for route, (simulator, filename) in ROUTES.items():
+            path = os.path.join(SIMULATORS, simulator, 'responses', filename)
+            with open(path) as f:
+                self.responses[(route[0], route[1].rstrip('/'))] = \
+                    json.dumps(json.load(f))
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn,
+                          simple_server.WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(simple_server.WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadServiceManager(object):
+    """Runs the workers added to a cotyledon ServiceManager as threads"""
+
+    services = []
+
+    def __init__(self, *args, **kwargs):
+        self.workers = []
+        self.new_worker_hooks = []
+
+    def add(self, service, workers=1, args=None, kwargs=None):
+        for worker_id in range(workers):
+            # Workers pop what they need from their kwargs
+            self.workers.append(service(worker_id, *(args or ()),
+                                        **dict(kwargs or {})))
+
+    def register_hooks(self, on_new_worker=None, **kwargs):
+        if on_new_worker is not None:
+            self.new_worker_hooks.append(on_new_worker)
+
+    def run(self):
+        for worker_id, worker in enumerate(self.workers):
+            for hook in self.new_worker_hooks:
+                hook(0, worker_id, worker)
+            thread = threading.Thread(target=worker.run, name=worker.name)
+            thread.daemon = True
+            thread.start()
+            self.services.append(worker)
+
+
+class PlanRecorder(object):
+    """First time each plan is written with each status"""
+
+    def __init__(self, music, keyspace):
+        self.keyspace = keyspace
+        self.table = plan.Plan.__tablename__
+        self.times = collections.defaultdict(dict)
+        self.condition = threading.Condition()
+
+        row_create = music.row_create
+        row_update = music.row_update
+
+        def recording_row_create(keyspace, table, pk_name, pk_value, values,
+                                 *args, **kwargs):
+            result = row_create(keyspace, table, pk_name, pk_value, values,
+                                *args, **kwargs)
+            self.record(keyspace, table, pk_value, values)
+            return result
+
+        def recording_row_update(keyspace, table, pk_name, pk_value, values,
+                                 *args, **kwargs):
+            result = row_update(keyspace, table, pk_name, pk_value, values,
+                                *args, **kwargs)
+            if result == 'SUCCESS':
+                self.record(keyspace, table, pk_value, values)
+            return result
+
+        music.row_create = recording_row_create
+        music.row_update = recording_row_update
+
+    def record(self, keyspace, table, pk_value, values):
+        status = values.get('status')
+        if keyspace != self.keyspace or table != self.table or not status:
+            return
+        with self.condition:
+            self.times[pk_value].setdefault(status, time.time())
+            self.condition.notify_all()
+
+    def wait(self, plan_id, timeout):
+        """Final status of a plan, None if not finished within timeout"""
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                for status in FINISHED:
+                    if status in self.times[plan_id]:
+                        return status
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+
+def configure(conf, args, stand_in):
+    conf.import_group('aai',
+                      'conductor.data.plugins.inventory_provider.aai')
+    conf.import_group('multicloud',
+                      'conductor.data.plugins.vim_controller.multicloud')
+    conf.import_group('conductor_api', 'conductor.api.controllers.v1.plans')
+    conf.import_group('aaf_api',
+                      'conductor.api.adapters.aaf.aaf_authentication')
+    conf.import_group('aaf_sms', 'conductor.common.sms')
+    # Secrets are not loaded from AAF SMS
+    conf.set_override('is_enabled', False, 'aaf_sms')
+    service.prepare_service(
+        argv=[], config_files=[args.config_file] if args.config_file else [])
+    # The services log at INFO for every plan and message
+    logging.getLogger().setLevel(logging.ERROR)
+    conf.set_override('mock', True, 'music_api')
+    conf.set_override('transport', args.transport, 'messaging_server')
+    conf.set_override('local_ports',
+                      {'controller': str(rpc_transport.free_port()),
+                       'data': str(rpc_transport.free_port())},
+                      'messaging_server')
+    conf.set_override('server_url', stand_in.url + '/aai', 'aai')
+    conf.set_override('server_url_version', 'v14', 'aai')
+    for option in ('certificate_file', 'certificate_key_file',
+                   'certificate_authority_bundle_file'):
+        conf.set_override(option, '', 'aai')
+    conf.set_override('server_url', stand_in.url + '/api/multicloud',
+                      'multicloud')
+    conf.set_override('server_url_version', 'v0', 'multicloud')
+    conf.set_override('username', USERNAME, 'conductor_api')
+    conf.set_override('password', PASSWORD, 'conductor_api')
+    conf.set_override('is_aaf_enabled', True, 'aaf_api')
+    conf.set_override('aaf_url', stand_in.url + '/authz/perms/user/',
+                      'aaf_api')
+    conf.set_override('aaf_conductor_user', AAF_USER, 'aaf_api')
+    conf.set_override('aaf_permissions',
+                      ['{"type": "org.onap.oof", "instance": "plans", '
+                       '"action": "POST"}'], 'aaf_api')
+    for name, workers in args.workers.items():
+        conf.set_override('workers', workers, name)
+    conf.set_override('notify', args.notify, 'plan_queue')
+    conf.set_override('ports', dict(
+        (stage, str(free_port_range(conf[group].workers)))
+        for stage, group in (('translator', 'controller'),
+                             ('solver', 'solver'),
+                             ('reservation', 'reservation'))),
+        'plan_queue')
+    if args.delay_time is not None:
+        conf.set_override('delay_time', args.delay_time)
+    if args.resolve_workers is not None:
+        conf.set_override('resolve_workers', args.resolve_workers,
+                          'controller')
+
+
+def free_port_range(size):
+    """First of size consecutive free UDP ports"""
+    while True:
+        first = rpc_transport.free_port()
+        socks = []
+        try:
+            for port in range(first, first + size):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                socks.append(sock)
+                sock.bind(('127.0.0.1', port))
+            return first
+        except socket.error:
+            continue
+        finally:
+            for sock in socks:
+                sock.close()
+
+
+def start_services(conf):
+    """Start the services, return the URL of the API"""
+    with mock.patch.object(PC, '_init_metrics'), \
+            mock.patch.object(cotyledon, 'ServiceManager',
+                              ThreadServiceManager):
+        for launcher in (controller_service.ControllerServiceLauncher,
+                         data_service.DataServiceLauncher,
+                         solver_service.SolverServiceLauncher,
+                         reservation_service.ReservationServiceLauncher):
+            launcher(conf).run()
+
+    server = simple_server.make_server(
+        '127.0.0.1', 0, app.setup_app(conf=conf),
+        server_class=ThreadingWSGIServer,
+        handler_class=QuietWSGIRequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://127.0.0.1:{}'.format(server.server_port)
+
+
+def stop_services(server):
+    server.shutdown()
+    for worker in ThreadServiceManager.services:
+        worker.terminate()
+
+
+def post_plan(url, number, template):
+    body = {'name': 'benchmark-{}'.format(number), 'template': template,
+            'timeout': 600, 'num_solution': '1'}
+    response = requests.post(url + '/v1/plans', json=body,
+                             auth=(USERNAME, PASSWORD))
+    response.raise_for_status()
+    return response.json()['id']
+
+
+def client(url, template, recorder, numbers, results, timeout):
+    while True:
+        try:
+            number = numbers.get_nowait()
+        except queue.Empty:
+            return
+        result = {'plan': number, 'submitted': time.time()}
+        try:
+            result['id'] = post_plan(url, number, template)
+            result['posted'] = time.time()
+            result['status'] = recorder.wait(result['id'], timeout)
+        except Exception as exc:
+            result['error'] = repr(exc)
+        result['finished'] = time.time()
+        results.append(result)
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': 1000.0 * sum(samples) / len(samples),
+        'p50_ms': 1000.0 * samples[len(samples) // 2],
+        'p90_ms': 1000.0 * samples[int(len(samples) * 0.9)],
+        'max_ms': 1000.0 * samples[-1],
+    }
+
+
+def summarize(results, recorder):
+    stages = collections.defaultdict(list)
+    statuses = collections.Counter()
+    for result in results:
+        statuses[result.get('status') or result.get('error') or 'timeout'] \
+            += 1
+        if 'posted' not in result:
+            continue
+        stages['api'].append(result['posted'] - result['submitted'])
+        times = recorder.times[result['id']]
+        for stage, start, end in STAGES:
+            if start in times and end in times:
+                stages[stage].append(times[end] - times[start])
+        if plan.Plan.DONE in times:
+            stages['total'].append(times[plan.Plan.DONE] -
+                                   result['submitted'])
+
+    done = statuses[plan.Plan.DONE]
+    elapsed = max(r['finished'] for r in results) - \
+        min(r['submitted'] for r in results)
+    return {
+        'plans': len(results),
+        'statuses': dict(statuses),
+        'elapsed_seconds': elapsed,
+        'throughput_per_minute': 60.0 * done / elapsed if elapsed else 0.0,
+        'stages': dict((stage, percentiles(samples))
+                       for stage, samples in stages.items()),
+    }
+
+
+def run(args):
+    conf = cfg.CONF
+    stand_in = StandIn(args.stand_in_latency_ms / 1000.0)
+    thread = threading.Thread(target=stand_in.serve_forever)
+    thread.daemon = True
+    thread.start()
+    configure(conf, args, stand_in)
+
+    # One Music mock, shared by the services as Music would be
+    music = api.MockAPI()
+    recorder = PlanRecorder(music, conf.keyspace)
+    with mock.patch.object(api, 'API', return_value=music):
+        server, url = start_services(conf)
+
+        numbers = queue.Queue()
+        for number in range(args.plans):
+            numbers.put(number)
+        results = []
+        clients = [threading.Thread(target=client,
+                                    args=(url, make_template(args.demands),
+                                          recorder, numbers, results,
+                                          args.timeout))
+                   for _ in range(args.concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        stop_services(server)
+    stand_in.shutdown()
+
+    summary = summarize(results, recorder)
+    summary['workers'] = dict(
+        (name, conf[name].workers)
+        for name in ('controller', 'data', 'solver', 'reservation'))
+    summary['concurrency'] = args.concurrency
+    summary['transport'] = args.transport
+    summary['notify'] = args.notify
+    summary['demands'] = args.demands
+    summary['resolve_workers'] = conf.controller.resolve_workers
+    summary['intervals'] = {
+        'delay_time': conf.delay_time,
+        'controller.polling_interval': conf.controller.polling_interval,
+        'messaging_server.polling_interval':
+            conf.messaging_server.polling_interval,
+        'messaging_server.check_interval':
+            conf.messaging_server.check_interval,
+    }
+    summary['stand_in_requests'] = dict(
+        ('{} {}'.format(*route), count)
+        for route, count in stand_in.requests.items())
+    return summary
+
+
+def worker_counts(value):
+    workers = {}
+    for item in value.split(','):
+        name, _sep, count = item.partition('=')
+        if name not in ('controller', 'data', 'solver', 'reservation'):
+            raise argparse.ArgumentTypeError(
+                'unknown service {}'.format(name))
+        workers[name] = int(count)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plans', type=int, default=20,
+                        help='plans to post')
+    parser.add_argument('--concurrency', type=int, default=5,
+                        help='clients posting plans at the same time')
+    parser.add_argument('--workers', type=worker_counts, default={},
+                        help='workers per service, e.g. solver=2,data=2')
+    parser.add_argument('--transport', choices=['music', 'local'],
+                        default='local',
+                        help='transport of the synchronous RPC calls')
+    parser.add_argument('--delay-time', type=int,
+                        help='override delay_time, the seconds the solver '
+                             'and reservation services wait between polls')
+    parser.add_argument('--no-notify', dest='notify',
+                        action='store_false',
+                        help='do not notify workers of queued plans, they '
+                             'find them when polling Music')
+    parser.add_argument('--demands', type=int, default=1,
+                        help='cloud demands in the template')
+    parser.add_argument('--resolve-workers', type=int,
+                        help='override controller resolve_workers, the '
+                             'demands the translator resolves at once')
+    parser.add_argument('--stand-in-latency-ms', type=float, default=0.0,
+                        help='time the stand-in takes for each request')
+    parser.add_argument('--timeout', type=float, default=300.0,
+                        help='seconds to wait for each plan to finish')
+    parser.add_argument('--config-file',
+                        help='conductor configuration to start from')
+    parser.add_argument('--json', action='store_true',
+                        help='print machine-readable results')
+    args = parser.parse_args()
+
+    summary = run(args)
+    if args.json:
+        print(json.dumps(summary, indent=2, sort_keys=True))
+        return
+
+    print("workers {}  concurrency {}  transport {}  notify {}".format(
+        ', '.join('{}={}'.format(*w) for w in sorted(
+            summary['workers'].items())),
+        summary['concurrency'], summary['transport'], summary['notify']))
+    print("demands {}  resolve_workers {}".format(
+        summary['demands'], summary['resolve_workers']))
+    print("intervals {}".format(', '.join(
+        '{}={}'.format(*i) for i in sorted(summary['intervals'].items()))))
+    print("plans {}  statuses {}  elapsed {:.1f} s  "
+          "throughput {:.1f} plans/min".format(
+              summary['plans'], summary['statuses'],
+              summary['elapsed_seconds'],
+              summary['throughput_per_minute']))
+    print("{:<10} {:>6} {:>11} {:>11} {:>11} {:>11}".format(
+        'stage', 'plans', 'mean (ms)', 'p50 (ms)', 'p90 (ms)', 'max (ms)'))
+    for stage in ('api', 'translate', 'solve', 'reserve', 'total'):
+        s = summary['stages'].get(stage)
+        if not s:
+            continue
+        print("{:<10} {:>6} {:>11.1f} {:>11.1f} {:>11.1f} {:>11.1f}".format(
+            stage, s['count'], s['mean_ms'], s['p50_ms'], s['p90_ms'],
+            s['max_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Per-call latency of the Music and local RPC transports.
+
+An RPC service is run in-process against the Music mock API, and
+synchronous calls carrying a candidate list are timed over each
+transport. The Music transport pays at least one check_interval per
+call, so keep --music-calls small.
+
+Usage:
+    python -m conductor.tests.benchmark.rpc_transport \
+        [--calls 200] [--music-calls 5] [--candidates 100] [--json]
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+
+from oslo_config import cfg
+
+from conductor.common.music import api
+from conductor.common.music import messaging as music_messaging
+
+TOPIC = 'benchmark'
+
+
+class EchoEndpoint(object):
+
+    def get_candidates_by_attributes(self, ctx, arg):
+        return {'response': arg['candidate_list'], 'error': False}
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def make_candidates(count):
+    return [{'candidate_id': 'region-{}'.format(i),
+             'inventory_type': 'cloud',
+             'location_id': 'region-{}'.format(i),
+             'latitude': '32.89', 'longitude': '-97.04',
+             'cost': 2.0} for i in range(count)]
+
+
+def time_calls(client, calls, candidates):
+    args = {'candidate_list': candidates, 'properties': {},
+            'demand_name': 'vGMuxInfra'}
+    samples = []
+    for _ in range(calls):
+        start = time.time()
+        client.call(ctxt={}, method='get_candidates_by_attributes',
+                    args=args)
+        samples.append(time.time() - start)
+    samples.sort()
+    return {
+        'calls': calls,
+        'mean_ms': 1000.0 * sum(samples) / len(samples),
+        'p50_ms': 1000.0 * samples[len(samples) // 2],
+        'max_ms': 1000.0 * samples[-1],
+    }
+
+
+def run(calls, music_calls, candidate_count):
+    conf = cfg.CONF
+    conf([], project='conductor')
+    conf.set_override('mock', True, 'music_api')
+    conf.set_override('local_ports', {TOPIC: str(free_port())},
+                      'messaging_server')
+    music = api.API()
+    music.keyspace_create(keyspace=conf.messaging_server.keyspace)
+    target = music_messaging.Target(topic=TOPIC)
+
+    conf.set_override('transport', 'local', 'messaging_server')
+    service = music_messaging.RPCService(
+        0, conf, transport=music, target=target,
+        endpoints=[EchoEndpoint()], flush=False)
+    thread = threading.Thread(target=service.run)
+    thread.daemon = True
+    thread.start()
+    time.sleep(0.5)
+
+    candidates = make_candidates(candidate_count)
+    results = {}
+
+    local_client = music_messaging.RPCClient(
+        conf=conf, transport=music, target=target)
+    results['local'] = time_calls(local_client, calls, candidates)
+    local_client.local_client.close()
+
+    conf.set_override('transport', 'music', 'messaging_server')
+    music_client = music_messaging.RPCClient(
+        conf=conf, transport=music, target=target)
+    results['music'] = time_calls(music_client, music_calls, candidates)
+
+    service.running = False
+    service.local_server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200,
+                        help='calls over the local transport')
+    parser.add_argument('--music-calls', type=int, default=5,
+                        help='calls over the Music transport')
+    parser.add_argument('--candidates', type=int, default=100,
+                        help='candidates carried by each call')
+    parser.add_argument('--json', action='store_true',
+                        help='print machine-readable results')
+    args = parser.parse_args()
+
+    results = run(args.calls, args.music_calls, args.candidates)
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print("{:<10} {:>6} {:>12} {:>12} {:>12}".format(
+        'transport', 'calls', 'mean (ms)', 'p50 (ms)', 'max (ms)'))
+    for name in ('music', 'local'):
+        r = results[name]
+        print("{:<10} {:>6} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            name, r['calls'], r['mean_ms'], r['p50_ms'], r['max_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Evaluation time of the objective function, with and without tables.
+
+A synthetic plan is built where every demand has the same number of
+candidates spread over the globe, and the objective sums the distance
+from the customer to each demand and the distance between consecutive
+demands. Decision paths are then walked the way the search does: the
+objective of all the candidates of each demand is computed, and one
+candidate is picked at random before moving to the next demand.
+
+The tables are built by Objective.precompute, whose time is reported
+separately and is paid once per plan.
+
+Usage:
+    python -m conductor.tests.benchmark.solver_objective \
+        [--demands 4] [--candidates 500] [--paths 200] \
+        [--table-max-size 4000000] [--json]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from conductor.solver.optimizer import decision_path as dpath
+from conductor.solver.request import demand
+from conductor.solver.request.functions import distance_between
+from conductor.solver.request import objective
+from conductor.solver.utils import constraint_engine_interface as cei
+
+
+class Request(object):
+    """The parts of a parsed plan the optimizer looks at"""
+
+    def __init__(self, demands, objective):
+        self.demands = demands
+        self.objective = objective
+        self.constraints = {}
+        self.cei = cei.ConstraintEngineInterface(None)
+        self.constraint_cache = None
+        self.request_id = 'benchmark'
+        self.plan_id = 'benchmark'
+
+
+def make_request(demands, candidates, seed):
+    rng = random.Random(seed)
+    customer = demand.Location('customer')
+    customer.value = (40.7128, -74.0059)
+
+    obj = objective.Objective()
+    obj.goal = 'min'
+    obj.operation = 'sum'
+
+    def add_operand(loc_a, loc_z, weight):
+        function = distance_between.DistanceBetween('distance_between')
+        function.loc_a = loc_a
+        function.loc_z = loc_z
+        operand = objective.Operand()
+        operand.operation = 'product'
+        operand.weight = weight
+        operand.function = function
+        obj.operand_list.append(operand)
+
+    demand_map = {}
+    previous = None
+    for d in range(demands):
+        dmd = demand.Demand('demand{}'.format(d))
+        for c in range(candidates):
+            candidate_id = '{}-{}'.format(dmd.name, c)
+            dmd.resources[candidate_id] = {
+                'candidate_id': candidate_id,
+                'inventory_type': 'cloud',
+                'location_id': candidate_id,
+                'latitude': str(rng.uniform(-60.0, 70.0)),
+                'longitude': str(rng.uniform(-180.0, 180.0)),
+                'cost': rng.uniform(0.0, 10.0),
+            }
+        demand_map[dmd.name] = dmd
+        add_operand(customer, dmd, 1.0)
+        if previous is not None:
+            add_operand(previous, dmd, 0.5)
+        previous = dmd
+    return Request(demand_map, obj)
+
+
+def walk(request, paths, seed):
+    """Objective values of the last candidates of each random path"""
+    rng = random.Random(seed)
+    obj = request.objective
+    values = []
+    for _ in range(paths):
+        decision_path = dpath.DecisionPath()
+        decision_path.set_decisions({})
+        for name in sorted(request.demands):
+            candidate_list = list(request.demands[name].resources.values())
+            candidate_values = obj.compute_candidates(
+                decision_path, name, candidate_list, request)
+            pick = rng.randrange(len(candidate_list))
+            decision_path.decisions[name] = candidate_list[pick]
+            obj.set_value(decision_path, candidate_values[pick])
+        obj.compute(decision_path, request)
+        values.append(decision_path.total_value)
+    return values
+
+
+def run(args, table_max_size):
+    request = make_request(args.demands, args.candidates, args.seed)
+    precompute = 0.0
+    if table_max_size:
+        start = time.time()
+        request.objective.precompute(request.demands, request.cei,
+                                     table_max_size)
+        precompute = time.time() - start
+    start = time.time()
+    values = walk(request, args.paths, args.seed)
+    return {
+        'objective_table_max_size': table_max_size,
+        'precompute_seconds': precompute,
+        'seconds': time.time() - start,
+        'values': values,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--demands', type=int, default=4)
+    parser.add_argument('--candidates', type=int, default=500)
+    parser.add_argument('--paths', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--table-max-size', type=int, default=4000000)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    on_the_fly = run(args, 0)
+    tables = run(args, args.table_max_size)
+    expected = on_the_fly.pop('values')
+    values = tables.pop('values')
+    max_error = max(abs(a - b) for a, b in zip(expected, values))
+    results = {
+        'demands': args.demands,
+        'candidates': args.candidates,
+        'paths': args.paths,
+        'on_the_fly': on_the_fly,
+        'tables': tables,
+        'max_error': max_error,
+        'speedup': on_the_fly['seconds'] / max(tables['seconds'], 1e-9),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print("{} demands x {} candidates, {} paths".format(
+        args.demands, args.candidates, args.paths))
+    print("  on the fly : {:8.3f} s".format(on_the_fly['seconds']))
+    print("  tables     : {:8.3f} s (+{:.3f} s precompute)".format(
+        tables['seconds'], tables['precompute_seconds']))
+    print("  speedup    : {:8.1f}x, max error: {:.2e}".format(
+        results['speedup'], max_error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+
+"""Solver time, memory and search effort over synthetic plans.
+
+Each case generates the conductor_solver part of a translated plan,
+with a number of demands, candidates per demand and a mix of
+constraints, parses it with the solver's Parser and asks the Optimizer
+for recommend_max solutions. Calls to the data service are served in
+process by a stub, and the Music backed triage is left out.
+
+For every case, the parse and solve wall times, the peak resident
+memory of the process running the case, the number of search nodes
+(constraint evaluations of a partial path), objective evaluations and
+data service calls are reported. Cases run in a forked process each,
+so that their peak memory does not carry over.
+
+Constraint mixes:
+    none      no constraint
+    distance  distance_to_location on every demand
+    mixed     distance_to_location, attribute and vim_fit on every
+              demand, zone and distance_between_demands on each pair of
+              consecutive demands
+
+Usage:
+    python -m conductor.tests.benchmark.solver_suite \
+        [--demands 2,3] [--candidates 50,200] \
+        [--constraints none,distance,mixed] [--recommend-max 1,3] \
+        [--algorithms fit_first,branch_and_bound] [--serialize] \
+        [--compact-candidates] [--in-process] [--json]
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import logging
+import multiprocessing
+import random
+import resource
+import time
+
+import mock
+from oslo_config import cfg
+
+from conductor.common import candidate_table
+from conductor.solver.optimizer import decision_path as dpath
+from conductor.solver.optimizer import optimizer
+from conductor.solver.optimizer import search
+from conductor.solver.request import objective
+from conductor.solver.request import parser
+from conductor.solver.utils import constraint_engine_interface as cei
+
+CONSTRAINT_MIXES = ('none', 'distance', 'mixed')
+CUSTOMER = {'latitude': 40.7128, 'longitude': -74.0059, 'country': 'USA'}
+
+
+def make_template(demands, candidates, constraints, seed):
+    """conductor_solver part of a translated plan"""
+    rng = random.Random(seed)
+    names = ['demand{}'.format(d) for d in range(demands)]
+    template = {
+        'request_type': 'create',
+        'demands': {},
+        'locations': {'customer_loc': CUSTOMER},
+        'constraints': {},
+        'objective': {
+            'goal': 'min',
+            'operation': 'sum',
+            'operands': [],
+        },
+    }
+    for name in names:
+        candidate_list = []
+        for c in range(candidates):
+            region = 'region{}'.format(rng.randrange(candidates // 2 + 1))
+            candidate_list.append({
+                'candidate_id': '{}-{}'.format(name, c),
+                'inventory_provider': 'aai',
+                'inventory_type': 'cloud',
+                'location_type': 'att_aic',
+                'location_id': region,
+                'vim-id': 'CloudOwner_' + region,
+                'cloud_owner': 'CloudOwner',
+                'cloud_region_version': rng.choice(['1', '1', '2']),
+                'complex_name': 'complex{}'.format(rng.randrange(50)),
+                'physical_location_id': 'clli{}'.format(rng.randrange(50)),
+                'city': 'city', 'state': 'state', 'country': 'USA',
+                'region': 'US',
+                'latitude': str(rng.uniform(25.0, 50.0)),
+                'longitude': str(rng.uniform(-125.0, -65.0)),
+                'cost': 1.0,
+                'existing_placement': 'false',
+                'sriov_automation': 'false',
+                'uniqueness': 'true',
+            })
+        template['demands'][name] = {'candidates': candidate_list}
+        template['objective']['operands'].append({
+            'operation': 'product', 'weight': 1.0,
+            'function': 'distance_between',
+            'function_param': ['customer_loc', name]})
+
+    constraint_list = template['constraints']
+    if constraints in ('distance', 'mixed'):
+        for name in names:
+            constraint_list['distance_' + name] = {
+                'type': 'distance_to_location', 'demands': [name],
+                'properties': {'location': 'customer_loc',
+                               'distance': {'operator': '<',
+                                            'value': 1500}}}
+    if constraints == 'mixed':
+        for name in names:
+            constraint_list['attribute_' + name] = {
+                'type': 'attribute', 'demands': [name],
+                'properties': {'evaluate': {'cloud_region_version': '1'}}}
+            constraint_list['vim_fit_' + name] = {
+                'type': 'vim_fit', 'demands': [name],
+                'properties': {'controller': 'multicloud',
+                               'request': {'vCPU': 10, 'Memory': 16}}}
+        for first, second in zip(names, names[1:]):
+            pair = '{}_{}'.format(first, second)
+            constraint_list['zone_' + pair] = {
+                'type': 'zone', 'demands': [first, second],
+                'properties': {'qualifier': 'different',
+                               'category': 'region'}}
+            constraint_list['distance_' + pair] = {
+                'type': 'distance_between_demands',
+                'demands': [first, second],
+                'properties': {'distance': {'operator': '<',
+                                            'value': 2000}}}
+    return {'conductor_solver': template}
+
+
+class StubDataClient(object):
+    """Serves the data service calls of the solver in process.
+
+    Attribute constraints keep the candidates with the evaluated
+    values, vim_fit keeps the regions whose name is an even number.
+    """
+
+    def __init__(self, serialize=False):
+        self.calls = collections.Counter()
+        self.serialize = serialize
+
+    def call(self, ctxt, method, args):
+        self.calls[method] += 1
+        if self.serialize:
+            # As the RPC transport does with its messages
+            args = json.loads(json.dumps(args))
+            return json.loads(json.dumps(getattr(self, method)(args)))
+        return getattr(self, method)(args)
+
+    def call_batch(self, ctxt, calls, pipe=None, pipe_value=None):
+        self.calls['batch'] += 1
+        responses = []
+        for call in calls:
+            if pipe and not pipe_value:
+                break
+            args = dict(call['args'])
+            if pipe:
+                args[pipe] = pipe_value
+            response = self.call(ctxt, call['method'], args)
+            responses.append(response)
+            if pipe and (response or not call.get('keep_on_empty')):
+                pipe_value = response
+        return responses
+
+    def get_candidates_by_attributes(self, args):
+        evaluate = args['properties'].get('evaluate', {})
+        return [c for c in candidate_table.decode(args['candidate_list'])
+                if all(c.get(k) == v for k, v in evaluate.items())]
+
+    def get_candidates_with_vim_capacity(self, args):
+        return [c for c in candidate_table.decode(args['candidate_list'])
+                if int(c['location_id'][len('region'):]) % 2 == 0]
+
+
+def counting(counter, key, function):
+    def wrapper(*args, **kwargs):
+        counter[key] += 1
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def run_case(case):
+    """Parse and solve the plan of a case, in the current process"""
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    template = make_template(case['demands'], case['candidates'],
+                             case['constraints'], case['seed'])
+    client = StubDataClient(case['serialize'])
+    counts = collections.Counter()
+
+    with mock.patch.object(parser, 'TriageLatency'), \
+            mock.patch.object(search, 'TriageData'), \
+            mock.patch.object(search.Search, '_solve_constraints',
+                              counting(counts, 'search_nodes',
+                                       search.Search._solve_constraints)), \
+            mock.patch.object(objective.Objective, 'compute_candidates',
+                              counting(counts, 'objective_evaluations',
+                                       objective.Objective.
+                                       compute_candidates)):
+        start = time.time()
+        request = parser.Parser()
+        request.cei = cei.ConstraintEngineInterface(
+            client, compact_candidates=case['compact_candidates'])
+        request.request_id = request.plan_id = 'benchmark'
+        request.parse_template(template)
+        request.assgin_constraints_to_demands()
+        request.search_algorithm = case['algorithm']
+        parse_seconds = time.time() - start
+
+        start = time.time()
+        opt = optimizer.Optimizer(cfg.CONF, _requests={'benchmark': request})
+        solutions = opt.get_solution(case['recommend_max'])
+        solve_seconds = time.time() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = dict(case)
+    result.update({
+        'parse_seconds': parse_seconds,
+        'solve_seconds': solve_seconds,
+        'solutions': len(solutions),
+        'objective_values': [objective_value(request, solution)
+                             for solution in solutions],
+        'peak_rss_kb': peak_rss,
+        'rss_growth_kb': peak_rss - start_rss,
+        'search_nodes': counts['search_nodes'],
+        'objective_evaluations': counts['objective_evaluations'],
+        'data_service_calls': sum(c for m, c in client.calls.items()
+                                  if m != 'batch'),
+    })
+    return result
+
+
+def objective_value(request, solution):
+    path = dpath.DecisionPath()
+    path.set_decisions(solution)
+    request.objective.compute(path, request)
+    return path.total_value
+
+
+def _run_forked(case, queue):
+    try:
+        queue.put(run_case(case))
+    except Exception as exc:
+        result = dict(case)
+        result['error'] = repr(exc)
+        queue.put(result)
+
+
+def run_isolated(case):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_forked,
+                                      args=(case, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def str_list(value):
+    return value.split(',')
+
+
+def main():
+    parser_ = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser_.add_argument('--demands', type=int_list, default=[2, 3])
+    parser_.add_argument('--candidates', type=int_list, default=[50, 200])
+    parser_.add_argument('--constraints', type=str_list,
+                         default=list(CONSTRAINT_MIXES))
+    parser_.add_argument('--recommend-max', type=int_list, default=[1, 3])
+    parser_.add_argument('--algorithms', type=str_list,
+                         default=list(optimizer.SEARCH_ALGORITHMS))
+    parser_.add_argument('--seed', type=int, default=0)
+    parser_.add_argument('--serialize', action='store_true',
+                         help='pass the data service calls through JSON, '
+                              'as the RPC transport does')
+    parser_.add_argument('--compact-candidates', action='store_true',
+                         help='send candidate lists as candidate tables')
+    parser_.add_argument('--in-process', action='store_true',
+                         help='run the cases in this process, the peak '
+                              'memory then only grows')
+    parser_.add_argument('--json', action='store_true',
+                         help='print the results as JSON')
+    args = parser_.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    for mix in args.constraints:
+        if mix not in CONSTRAINT_MIXES:
+            parser_.error('unknown constraint mix {}'.format(mix))
+
+    results = []
+    for demands, candidates, constraints, recommend_max, algorithm in \
+            itertools.product(args.demands, args.candidates,
+                              args.constraints, args.recommend_max,
+                              args.algorithms):
+        case = {'demands': demands, 'candidates': candidates,
+                'constraints': constraints, 'recommend_max': recommend_max,
+                'algorithm': algorithm, 'seed': args.seed,
+                'serialize': args.serialize,
+                'compact_candidates': args.compact_candidates}
+        if args.in_process:
+            results.append(run_case(case))
+        else:
+            results.append(run_isolated(case))
+        if not args.json:
+            print_result(results[-1])
+
+    if args.json:
+        print(json.dumps({'seed': args.seed, 'results': results},
+                         indent=2, sort_keys=True))
+
+
+def print_result(result):
+    name = "{demands}x{candidates} {constraints:<8} max={recommend_max} " \
+           "{algorithm:<16}".format(**result)
+    if 'error' in result:
+        print("{} error: {}".format(name, result['error']))
+        return
+    print("{} parse {:7.3f} s  solve {:7.3f} s  peak {:8d} KB  "
+          "nodes {:6d}  objective {:6d}  rpc {:5d}  solutions {}".format(
+              name, result['parse_seconds'], result['solve_seconds'],
+              result['peak_rss_kb'], result['search_nodes'],
+              result['objective_evaluations'],
+              result['data_service_calls'], result['solutions']))
+
+
+if __name__ == '__main__':
+    main()
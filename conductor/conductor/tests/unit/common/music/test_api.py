@@ -0,0 +1,64 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the Music mock API"""
+
+import unittest
+
+from oslo_config import cfg
+
+from conductor.common.music import api
+
+
+class TestMockAPI(unittest.TestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('mock', True, 'music_api')
+        self.music = api.MockAPI()
+        self.music.keyspace_create('ks')
+        self.music.table_create('ks', 'plans', {})
+
+    def test_read_by_column(self):
+        self.music.row_create('ks', 'plans', 'id', 'p1',
+                              {'id': 'p1', 'status': 'translated'})
+        self.music.row_create('ks', 'plans', 'id', 'p2',
+                              {'id': 'p2', 'status': 'solved'})
+        rows = self.music.row_read('ks', 'plans', 'status', 'solved')
+        self.assertEqual([{'id': 'p2', 'status': 'solved'}],
+                         list(rows.values()))
+        rows = self.music.row_read('ks', 'plans', 'id', 'p1')
+        self.assertEqual([{'id': 'p1', 'status': 'translated'}],
+                         list(rows.values()))
+        self.assertEqual(2, len(self.music.row_read('ks', 'plans')))
+
+    def test_create_keeps_existing(self):
+        self.music.row_create('ks', 'plans', 'id', 'p1', {'id': 'p1'})
+        self.music.keyspace_create('ks')
+        self.music.table_create('ks', 'plans', {})
+        self.music.index_create('ks', 'plans', 'status')
+        self.assertEqual(1, len(self.music.row_read('ks', 'plans')))
+
+    def test_conditional_update(self):
+        self.music.row_create('ks', 'plans', 'id', 'p1',
+                              {'id': 'p1', 'status': 'translated'})
+        self.assertEqual("SUCCESS", self.music.row_update(
+            'ks', 'plans', 'id', 'p1', {'status': 'solving'},
+            condition={'status': 'translated'}))
+        self.assertEqual("FAILURE", self.music.row_update(
+            'ks', 'plans', 'id', 'p1', {'status': 'solving'},
+            condition={'status': 'translated'}))
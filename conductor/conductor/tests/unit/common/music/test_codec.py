@@ -0,0 +1,68 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the codec of Music JSON columns"""
+
+import base64
+import json
+import os
+import unittest
+
+from oslo_config import cfg
+
+from conductor.common.music.model import codec
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.value = {'candidates': [{'candidate_id': 'region{}'.format(i),
+                                      'cloud_owner': u'CloudOwner\u00e9'}
+                                     for i in range(100)]}
+        self.text = json.dumps(self.value, ensure_ascii=False)
+
+    def override(self, name, value):
+        cfg.CONF.set_override(name, value, 'music_api')
+        self.addCleanup(cfg.CONF.clear_override, name, 'music_api')
+
+    def test_disabled(self):
+        self.assertEqual(self.text, codec.encode(self.text))
+        self.assertEqual(json.dumps(self.value), codec.dumps(self.value))
+
+    def test_round_trip(self):
+        self.override('compress_columns', True)
+        encoded = codec.encode(self.text)
+        self.assertTrue(codec.is_compressed(encoded))
+        self.assertLess(len(encoded), len(self.text) / 4)
+        self.assertEqual(self.value, codec.loads(encoded))
+        # Compressed text is not compressed again
+        self.assertEqual(encoded, codec.encode(encoded))
+
+    def test_small_text(self):
+        self.override('compress_columns', True)
+        self.override('compress_min_size', 64)
+        self.assertEqual('{"a": 1}', codec.encode('{"a": 1}'))
+        # Text which does not compress is kept as it is
+        text = json.dumps(base64.b64encode(os.urandom(300)).decode('ascii'))
+        self.assertEqual(text, codec.encode(text))
+
+    def test_plain_text(self):
+        self.override('compress_columns', True)
+        self.assertEqual(self.value, codec.loads(self.text))
+        self.assertEqual('null', codec.decode('null'))
+        self.assertIsNone(codec.loads(None))
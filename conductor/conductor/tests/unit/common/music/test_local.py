@@ -0,0 +1,228 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the local Music-RPC transport"""
+
+import errno
+import socket
+import threading
+import time
+import unittest
+
+import mock
+from oslo_config import cfg
+from prometheus_client import REGISTRY
+
+from conductor.common.music import api
+from conductor.common.music import messaging as music_messaging
+from conductor.common.music.messaging import local
+
+
+class EchoEndpoint(object):
+
+    def __init__(self):
+        self.arrived = 0
+        self.condition = threading.Condition()
+
+    def echo(self, ctx, arg):
+        return {'response': {'ctx': ctx, 'arg': arg}, 'error': False}
+
+    def explode(self, ctx, arg):
+        raise ValueError("boom")
+
+    def sleep(self, ctx, arg):
+        time.sleep(arg['seconds'])
+        return {'response': True, 'error': False}
+
+    def drop_first(self, ctx, arg):
+        return {'response': arg['candidate_list'][1:], 'error': False}
+
+    @music_messaging.thread_safe
+    def rendezvous(self, ctx, arg):
+        """Wait for the other callers, True if they all came"""
+        with self.condition:
+            self.arrived += 1
+            self.condition.notify_all()
+            deadline = time.time() + 5
+            while self.arrived < arg['callers'] and time.time() < deadline:
+                self.condition.wait(deadline - time.time())
+            return {'response': self.arrived >= arg['callers'],
+                    'error': False}
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestLocalTransport(unittest.TestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('mock', True, 'music_api')
+        cfg.CONF.set_override('transport', 'local', 'messaging_server')
+        self.port = free_port()
+        cfg.CONF.set_override('local_ports', {'echo': str(self.port)},
+                              'messaging_server')
+        music = api.API()
+        music.keyspace_create(keyspace=cfg.CONF.messaging_server.keyspace)
+
+        target = music_messaging.Target(topic='echo')
+        self.service = music_messaging.RPCService(
+            0, cfg.CONF, transport=None, target=target,
+            endpoints=[EchoEndpoint()], flush=False)
+        self.assertTrue(self.service.local_server.start())
+        self.client = music_messaging.RPCClient(
+            conf=cfg.CONF, transport=None, target=target)
+
+    def tearDown(self):
+        self.client.local_client.close()
+        self.service.local_server.stop()
+        cfg.CONF.clear_override('transport', 'messaging_server')
+        cfg.CONF.clear_override('local_ports', 'messaging_server')
+
+    def test_call(self):
+        labels = {'topic': 'echo', 'method': 'echo', 'transport': 'local'}
+        calls = REGISTRY.get_sample_value('rpc_call_seconds_count',
+                                          labels) or 0
+        response = self.client.call(ctxt={'plan_id': 'p1'}, method='echo',
+                                    args={'candidate_list': [1, 2]})
+        self.assertEqual({'ctx': {'plan_id': 'p1'},
+                          'arg': {'candidate_list': [1, 2]}}, response)
+        # The connection is reused for the next call
+        response = self.client.call(ctxt={}, method='echo', args={})
+        self.assertEqual({'ctx': {}, 'arg': {}}, response)
+        self.assertEqual(calls + 2, REGISTRY.get_sample_value(
+            'rpc_call_seconds_count', labels))
+
+    def test_concurrent_calls(self):
+        results = []
+
+        def call():
+            results.append(self.client.call(
+                ctxt={}, method='rendezvous', args={'callers': 3}))
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Each call had its own connection, none waited for another
+        self.assertEqual([True] * 3, results)
+        self.assertEqual(3, len(self.client.local_client._idle))
+
+    def test_call_remote_exception(self):
+        self.assertRaises(ValueError, self.client.call,
+                          ctxt={}, method='explode', args={})
+
+    def test_call_unsupported_method(self):
+        response = self.client.call(ctxt={}, method='missing', args={})
+        self.assertIn('error', response)
+
+    def test_call_batch(self):
+        calls = [{'method': 'drop_first', 'args': {}},
+                 {'method': 'drop_first', 'args': {},
+                  'keep_on_empty': True},
+                 {'method': 'drop_first', 'args': {}}]
+        responses = self.client.call_batch(ctxt={}, calls=calls,
+                                           pipe='candidate_list',
+                                           pipe_value=[1, 2])
+        # The second call emptied the list, but asked to keep its input
+        self.assertEqual([[2], [], []], responses)
+
+        responses = self.client.call_batch(ctxt={}, calls=calls[:1] * 3,
+                                           pipe='candidate_list',
+                                           pipe_value=[1, 2])
+        # The batch stops once there is nothing left to pipe
+        self.assertEqual([[2], []], responses)
+
+    def test_call_batch_failure(self):
+        calls = [{'method': 'echo', 'args': {}},
+                 {'method': 'explode', 'args': {}}]
+        self.assertRaises(ValueError, self.client.call_batch,
+                          ctxt={}, calls=calls)
+
+    def test_call_batch_unsupported_method(self):
+        calls = [{'method': 'missing', 'args': {}}]
+        responses = self.client.call_batch(ctxt={}, calls=calls)
+        self.assertIn('error', responses[0])
+
+    def test_stale_connection(self):
+        # An idle connection the restarted server closed is replaced
+        stale = mock.Mock()
+        stale.recv.return_value = b''
+        self.client.local_client._idle.append(stale)
+        response = self.client.call(ctxt={}, method='echo', args={'a': 1})
+        self.assertEqual({'ctx': {}, 'arg': {'a': 1}}, response)
+        stale.sendall.assert_called_once_with(mock.ANY)
+        stale.close.assert_called_once_with()
+
+        # but a reply cut short is not sent again
+        broken = mock.Mock()
+        broken.recv.side_effect = [b'\x00\x00', b'']
+        self.client.local_client._idle.append(broken)
+        self.assertRaises(socket.error, self.client.local_client.call,
+                          {}, 'echo', {})
+
+    def test_timeout(self):
+        cfg.CONF.set_override('response_timeout', 1, 'messaging_server')
+        self.addCleanup(cfg.CONF.clear_override, 'response_timeout',
+                        'messaging_server')
+        client = music_messaging.RPCClient(
+            conf=cfg.CONF, transport=None,
+            target=music_messaging.Target(topic='echo'))
+        self.addCleanup(client.local_client.close)
+        self.assertIsNone(client.call(ctxt={}, method='sleep',
+                                      args={'seconds': 1.5}))
+        self.assertEqual({'ctx': {}, 'arg': {}},
+                         client.call(ctxt={}, method='echo', args={}))
+
+    def test_reset_after_request(self):
+        reset = mock.Mock()
+        reset.recv.side_effect = [
+            b'\x00\x00', socket.error(errno.ECONNRESET, 'reset')]
+        self.client.local_client._idle.append(reset)
+        # The request may have run, the caller gets no response
+        self.assertIsNone(self.client.call(ctxt={}, method='echo', args={}))
+        reset.sendall.assert_called_once_with(mock.ANY)
+        reset.close.assert_called_once_with()
+        self.assertEqual({'ctx': {}, 'arg': {}},
+                         self.client.call(ctxt={}, method='echo', args={}))
+
+    def test_garbled_reply(self):
+        garbled = mock.Mock()
+        garbled.recv.side_effect = [local.HEADER.pack(3), b'{x}']
+        self.client.local_client._idle.append(garbled)
+        self.assertIsNone(self.client.call(ctxt={}, method='echo', args={}))
+        garbled.close.assert_called_once_with()
+        self.assertEqual({'ctx': {}, 'arg': {}},
+                         self.client.call(ctxt={}, method='echo', args={}))
+
+    def test_unreachable(self):
+        self.service.local_server.stop()
+        client = local.LocalClient(cfg.CONF, 'echo')
+        self.assertRaises(local.TransportUnavailable,
+                          client.call, {}, 'echo', {})
+        client = local.LocalClient(cfg.CONF, 'unknown')
+        self.assertRaises(local.TransportUnavailable,
+                          client.call, {}, 'echo', {})
+
+
+if __name__ == '__main__':
+    unittest.main()
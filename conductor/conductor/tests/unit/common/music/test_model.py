@@ -0,0 +1,168 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the Music ORM models"""
+
+import json
+import unittest
+
+import mock
+from oslo_config import cfg
+
+from conductor.common.models import plan
+from conductor.common.music import api
+from conductor.common.music.model import base
+from conductor.common.music.model import codec
+
+
+class TestModel(unittest.TestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('mock', True, 'music_api')
+        api.MockAPI().keyspace_create('model')
+        self.Plan = base.create_dynamic_model(
+            keyspace='model', baseclass=plan.Plan, classname='Plan')
+        self.plan = self.Plan('plan', 3600, '1', {'x': 1})
+
+    def row(self):
+        rows = api.MUSIC_API.row_read('model', 'plans', 'id', self.plan.id)
+        return list(rows.values())[0]
+
+    def test_update_sends_changed_columns(self):
+        self.plan.status = self.Plan.TRANSLATED
+        self.plan.translation = {'y': 2}
+        with mock.patch.object(api.MUSIC_API, 'row_update',
+                               return_value='SUCCESS') as row_update:
+            with mock.patch.object(plan, 'current_time_millis',
+                                   return_value=self.plan.updated + 1):
+                self.plan.update()
+        values = row_update.call_args[1]['values']
+        self.assertEqual(['status', 'translation', 'updated'],
+                         sorted(values))
+        self.assertEqual({'y': 2}, json.loads(values['translation']))
+
+        # Nothing changed since, the whole row is sent again
+        with mock.patch.object(api.MUSIC_API, 'row_update',
+                               return_value='SUCCESS') as row_update:
+            with mock.patch.object(plan, 'current_time_millis',
+                                   return_value=self.plan.updated):
+                self.plan.update()
+        self.assertIn('template', row_update.call_args[1]['values'])
+
+    def test_update_keeps_other_changes(self):
+        first = self.Plan.query.one(self.plan.id)
+        second = self.Plan.query.one(self.plan.id)
+        first.message = 'first'
+        first.update()
+        second.status = self.Plan.TRANSLATED
+        second.update()
+        row = self.row()
+        self.assertEqual('first', row['message'])
+        self.assertEqual(self.Plan.TRANSLATED, row['status'])
+
+    def test_failed_update_is_sent_again(self):
+        loaded = self.Plan.query.one(self.plan.id)
+        loaded.status = self.Plan.TRANSLATING
+        self.assertIn('FAILURE', loaded.update(
+            condition={'status': self.Plan.TRANSLATED}))
+        with mock.patch.object(api.MUSIC_API, 'row_update',
+                               return_value='SUCCESS') as row_update:
+            loaded.update()
+        self.assertIn('status', row_update.call_args[1]['values'])
+
+    def test_json_columns_decoded_when_read(self):
+        with mock.patch.object(codec.json, 'loads',
+                               wraps=json.loads) as loads:
+            loaded = self.Plan.query.one(self.plan.id)
+            loads.assert_not_called()
+            self.assertEqual({'x': 1}, loaded.template)
+        loads.assert_called_once_with(self.row()['template'])
+        self.assertEqual({}, loaded.translation)
+
+        # Columns that were not read are written back as stored
+        with mock.patch.object(codec.json, 'dumps') as dumps:
+            values = loaded.values()
+        self.assertEqual(2, dumps.call_count)
+        self.assertEqual(self.row()['solution'], values['solution'])
+
+    def test_query_columns(self):
+        self.Plan('other', 3600, '1', {'x': 2})
+        with mock.patch.object(self.Plan, '__init__') as init:
+            rows = self.Plan.query.columns('id', 'template').all()
+        init.assert_not_called()
+        self.assertEqual([{'id': self.plan.id, 'template': {'x': 1}}],
+                         [row for row in rows if row['id'] == self.plan.id])
+        self.assertEqual(2, len(rows))
+        self.assertEqual([{'id': self.plan.id, 'template': {'x': 1}}],
+                         self.Plan.query.columns('id', 'template')
+                         .filter_by(id=self.plan.id).all())
+
+    def test_compressed_columns(self):
+        cfg.CONF.set_override('compress_columns', True, 'music_api')
+        cfg.CONF.set_override('compress_min_size', 64, 'music_api')
+        self.addCleanup(cfg.CONF.clear_override, 'compress_columns',
+                        'music_api')
+        self.addCleanup(cfg.CONF.clear_override, 'compress_min_size',
+                        'music_api')
+        # Columns of rows written before are compressed once set again
+        self.assertFalse(codec.is_compressed(self.row()['template']))
+        template = {'demands': ['vG'] * 100}
+        loaded = self.Plan.query.one(self.plan.id)
+        loaded.template = template
+        loaded.update()
+        row = self.row()
+        self.assertTrue(codec.is_compressed(row['template']))
+
+        # Columns not read are not sent, compressed or not
+        solution = {'recommendations': ['vG'] * 100}
+        api.MUSIC_API.row_update('model', 'plans', 'id', self.plan.id,
+                                 {'solution': json.dumps(solution)})
+        loaded = self.Plan.query.one(self.plan.id)
+        loaded.status = self.Plan.TRANSLATED
+        with mock.patch.object(api.MUSIC_API, 'row_update',
+                               return_value='SUCCESS') as row_update:
+            with mock.patch.object(plan, 'current_time_millis',
+                                   return_value=loaded.updated + 1):
+                loaded.update()
+        self.assertEqual(['status', 'updated'],
+                         sorted(row_update.call_args[1]['values']))
+        self.assertEqual(solution, json.loads(self.row()['solution']))
+        self.assertEqual(template,
+                         self.Plan.query.one(self.plan.id).template)
+
+        # and stay readable without the option
+        cfg.CONF.set_override('compress_columns', False, 'music_api')
+        loaded = self.Plan.query.one(self.plan.id)
+        self.assertEqual(template, loaded.template)
+        rows = self.Plan.query.columns('id', 'template').all()
+        self.assertIn({'id': self.plan.id, 'template': template}, rows)
+
+    def test_insert_compressed(self):
+        cfg.CONF.set_override('compress_columns', True, 'music_api')
+        cfg.CONF.set_override('compress_min_size', 64, 'music_api')
+        self.addCleanup(cfg.CONF.clear_override, 'compress_columns',
+                        'music_api')
+        self.addCleanup(cfg.CONF.clear_override, 'compress_min_size',
+                        'music_api')
+        template = {'demands': ['vG'] * 100}
+        self.plan = self.Plan('plan', 3600, '1', template)
+        row = self.row()
+        self.assertTrue(codec.is_compressed(row['template']))
+        self.assertFalse(codec.is_compressed(row['solution']))
+        self.assertEqual(template,
+                         self.Plan.query.one(self.plan.id).template)
@@ -0,0 +1,108 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the pooled candidates of a translation"""
+
+import collections
+import copy
+import json
+import unittest
+
+from conductor.common import candidate_pool
+
+
+def region(number, **values):
+    candidate = {'candidate_id': 'region{}'.format(number),
+                 'inventory_provider': 'aai', 'inventory_type': 'cloud',
+                 'location_id': 'region{}'.format(number),
+                 'cloud_owner': 'CloudOwner', 'latitude': '32.89',
+                 'longitude': '-97.04', 'cost': 1.0, 'uniqueness': 'true',
+                 'flavors': {'flavor1': 'small'}}
+    candidate.update(values)
+    return candidate
+
+
+class TestCandidatePool(unittest.TestCase):
+
+    def setUp(self):
+        # The first demand to have a candidate gives its pooled values
+        self.demands = collections.OrderedDict([
+            ('vG', {'candidates': [region(1), region(2), region(3)]}),
+            # The same regions at another cost, one without flavors
+            ('vGMuxInfra', {'candidates': [
+                region(3, cost=2.0), region(1, cost=2.0),
+                region(2, cost=2.0, uniqueness='false')]}),
+            ('vFW', {'candidates': [region(4), region(2, cost=1)]}),
+        ])
+        del self.demands['vGMuxInfra']['candidates'][1]['flavors']
+
+    def translation(self):
+        pool, demands = candidate_pool.encode(copy.deepcopy(self.demands))
+        # As stored in and read from Music
+        return json.loads(json.dumps({'candidate_pool': pool,
+                                      'demands': demands}))
+
+    def test_encode(self):
+        conductor_solver = self.translation()
+        self.assertTrue(candidate_pool.is_pooled(conductor_solver))
+        pool = candidate_pool.load(conductor_solver)
+        self.assertEqual(4, len(pool))
+        references = conductor_solver['demands']['vGMuxInfra']['candidates']
+        self.assertEqual({'cost': 2.0}, references['overrides'])
+        self.assertEqual([[1, {}, ['flavors']],
+                          [2, {'uniqueness': 'false'}, []]],
+                         references['changes'])
+
+    def test_decode(self):
+        conductor_solver = self.translation()
+        pool = candidate_pool.load(conductor_solver)
+        for name, demand in self.demands.items():
+            candidates = candidate_pool.decode(
+                conductor_solver['demands'][name]['candidates'], pool)
+            self.assertEqual(demand['candidates'], candidates)
+            self.assertEqual(demand['candidates'],
+                             candidate_pool.demand_candidates(
+                                 conductor_solver, name))
+        # Types of equal values are kept
+        vfw = candidate_pool.demand_candidates(conductor_solver, 'vFW')
+        self.assertIsInstance(vfw[1]['cost'], int)
+
+        # Demands do not share the mutable values of a candidate
+        vg = candidate_pool.demand_candidates(conductor_solver, 'vG', pool)
+        vg[0]['flavors']['flavor1'] = 'large'
+        self.assertEqual(
+            {'flavor1': 'small'},
+            candidate_pool.demand_candidates(conductor_solver, 'vGMuxInfra',
+                                             pool)[0]['flavors'])
+
+    def test_plain(self):
+        conductor_solver = {'demands': copy.deepcopy(self.demands)}
+        self.assertFalse(candidate_pool.is_pooled(conductor_solver))
+        self.assertIsNone(candidate_pool.load(conductor_solver))
+        self.assertEqual(self.demands['vG']['candidates'],
+                         candidate_pool.demand_candidates(conductor_solver,
+                                                          'vG'))
+
+    def test_missing_pool(self):
+        conductor_solver = self.translation()
+        del conductor_solver['candidate_pool']
+        self.assertRaises(ValueError, candidate_pool.demand_candidates,
+                          conductor_solver, 'vG')
+        conductor_solver = self.translation()
+        conductor_solver['candidate_pool']['candidate_pool'] = 0
+        self.assertRaises(ValueError, candidate_pool.load, conductor_solver)
@@ -0,0 +1,81 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+import json
+import math
+import unittest
+
+from conductor.common import candidate_table
+
+
+class TestCandidateTable(unittest.TestCase):
+
+    def setUp(self):
+        self.candidates = [
+            {'candidate_id': 'c1', 'inventory_provider': 'aai',
+             'latitude': '32.897480', 'longitude': '-97.040443',
+             'cost': 1.0, 'uniqueness': 'true',
+             'flavor_map': {'vnfc': 'small'}},
+            {'candidate_id': 'c2', 'inventory_provider': 'aai',
+             'latitude': '32.897480', 'longitude': '-97.040443',
+             'cost': 1, 'uniqueness': True},
+            {'candidate_id': 'c3', 'inventory_provider': 'aai',
+             'latitude': None, 'cost': 'n/a', 'node_index': 7},
+        ]
+
+    def test_rows(self):
+        table = candidate_table.CandidateTable(self.candidates)
+        self.assertEqual(3, len(table))
+        self.assertEqual(self.candidates, table.rows())
+        # Equal values of the same type are kept once
+        self.assertIs(table.row(0)['latitude'], table.row(1)['latitude'])
+        self.assertEqual(1.0, table.row(0)['cost'])
+        self.assertIsInstance(table.row(1)['cost'], int)
+        self.assertIs(True, table.row(1)['uniqueness'])
+
+        self.assertEqual('c2', table.get(1, 'candidate_id'))
+        self.assertEqual('x', table.get(1, 'node_index', 'x'))
+        self.assertEqual([None, None, 7], table.column('node_index'))
+
+        table.set(1, 'node_index', 8)
+        self.assertEqual(8, table.row(1)['node_index'])
+        self.assertEqual(3, table.append({'candidate_id': 'c4'}))
+        self.assertEqual({'candidate_id': 'c4'}, table.row(3))
+
+    def test_floats(self):
+        table = candidate_table.CandidateTable(self.candidates)
+        costs = table.floats('cost')
+        self.assertEqual([1.0, 1.0], list(costs[:2]))
+        self.assertTrue(math.isnan(costs[2]))
+        self.assertEqual((32.89748, -97.040443), table.coordinates(0))
+        self.assertIsNone(table.coordinates(2))
+        table.set(2, 'cost', '2.5')
+        self.assertEqual(2.5, table.floats('cost')[2])
+
+    def test_encode(self):
+        encoded = json.loads(json.dumps(
+            candidate_table.encode(self.candidates)))
+        self.assertTrue(candidate_table.is_encoded(encoded))
+        self.assertEqual(self.candidates, candidate_table.decode(encoded))
+        self.assertIs(self.candidates,
+                      candidate_table.decode(self.candidates))
+
+        encoded['columns'][0].pop()
+        self.assertRaises(ValueError, candidate_table.decode, encoded)
+        encoded[candidate_table.ENCODING] = 0
+        self.assertRaises(ValueError, candidate_table.decode, encoded)
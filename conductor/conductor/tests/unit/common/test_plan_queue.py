@@ -0,0 +1,143 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the plan queue"""
+
+import socket
+import time
+import unittest
+
+import mock
+from oslo_config import cfg
+
+from conductor.common.models import plan
+from conductor.common.music import api
+from conductor.common.music.model import base
+from conductor.common import plan_queue
+
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestPlanQueue(unittest.TestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('mock', True, 'music_api')
+        cfg.CONF.set_override('ports', {'translator': str(free_port())},
+                              'plan_queue')
+        self.addCleanup(cfg.CONF.clear_override, 'ports', 'plan_queue')
+        self.addCleanup(cfg.CONF.clear_override, 'notify', 'plan_queue')
+        api.MockAPI().keyspace_create('plan_queue')
+        self.Plan = base.create_dynamic_model(
+            keyspace='plan_queue', baseclass=plan.Plan, classname='Plan')
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.close()
+
+    def make_queue(self, worker_id=0, lease=60):
+        queue = plan_queue.PlanQueue(
+            cfg.CONF, self.Plan, 'translator', worker_id,
+            queued=self.Plan.TEMPLATE, claimed=self.Plan.TRANSLATING,
+            lease=lease, poll_interval=1)
+        self.queues.append(queue)
+        return queue
+
+    def make_plan(self, status=None):
+        return self.Plan('plan', 3600, '1', {'x': 1},
+                         status=status or self.Plan.TEMPLATE)
+
+    def test_fetch(self):
+        queue = self.make_queue()
+        claimed = self.make_plan(self.Plan.TRANSLATING)
+        second = self.make_plan()
+        first = self.make_plan()
+        with mock.patch.object(plan, 'current_time_millis',
+                               side_effect=[1000, 2000]):
+            first.update()
+            second.update()
+        self.make_plan(self.Plan.SOLVED)
+
+        with mock.patch.object(self.Plan, '__init__') as init:
+            entries = queue.fetch()
+        init.assert_not_called()
+        self.assertEqual([first.id, second.id, claimed.id],
+                         [entry.id for entry in entries])
+        self.assertEqual([self.Plan.TEMPLATE, self.Plan.TEMPLATE,
+                          self.Plan.TRANSLATING],
+                         [entry.status for entry in entries])
+
+        loaded = queue.load(entries[0])
+        self.assertEqual({'x': 1}, loaded.template)
+        # The plan was claimed since it was fetched
+        self.assertIn('SUCCESS', queue.claim(loaded))
+        self.assertIsNone(queue.load(entries[0]))
+
+    def test_claim(self):
+        queues = [self.make_queue(0), self.make_queue(1)]
+        self.make_plan()
+        plans = [queue.load(queue.fetch()[0]) for queue in queues]
+        self.assertIn('SUCCESS', queues[0].claim(plans[0]))
+        self.assertIn('FAILURE', queues[1].claim(plans[1]))
+        self.assertEqual(self.Plan.TRANSLATING,
+                         self.Plan.query.one(plans[0].id).status)
+
+        # More plans may be queued, the winner looks again at once
+        with mock.patch('select.select') as select:
+            queues[0].wait()
+        select.assert_not_called()
+
+    def test_lease(self):
+        queue = self.make_queue(lease=60)
+        claimed = self.make_plan()
+        queue.claim(claimed)
+        entry = queue.fetch()[0]
+        self.assertFalse(queue.expired(entry))
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertTrue(queue.expired(entry))
+
+        queue.release(queue.load(entry))
+        self.assertEqual([self.Plan.TEMPLATE],
+                         [fetched.status for fetched in queue.fetch()])
+
+    def test_wake_on_enqueue(self):
+        cfg.CONF.set_override('idle_scan_interval', 30, 'plan_queue')
+        self.addCleanup(cfg.CONF.clear_override, 'idle_scan_interval',
+                        'plan_queue')
+        queue = self.make_queue()
+        queue._listen()
+        self.make_plan()
+        start = time.time()
+        queue.wait()
+        self.assertLess(time.time() - start, 5)
+
+    def test_no_notification(self):
+        cfg.CONF.set_override('notify', False, 'plan_queue')
+        queue = self.make_queue()
+        with mock.patch('socket.socket.sendto') as sendto:
+            self.make_plan()
+        sendto.assert_not_called()
+        with mock.patch('time.sleep') as sleep:
+            queue.wait()
+        sleep.assert_called_once_with(1)
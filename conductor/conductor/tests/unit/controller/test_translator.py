@@ -20,11 +20,14 @@
 
 import mock
 import os
+import threading
+import time
 import unittest
 import uuid
 
 import yaml
 from conductor import __file__ as conductor_root
+from conductor.common import candidate_pool
 from conductor.controller.translator import Translator
 from conductor.controller.translator import TranslatorException
 from conductor.data.plugins.triage_translator.triage_translator import TraigeTranslator
@@ -301,6 +304,116 @@ class TestNoExceptionTranslator(unittest.TestCase):
 
         self.assertEquals(self.Translator.parse_demands(demands), rtn)
 
+    @patch('conductor.common.music.messaging.component.RPCClient.call')
+    def test_parse_demands_concurrently(self, mock_call):
+        demands = {
+            name: [{"inventory_provider": "aai",
+                    "inventory_type": "cloud"}]
+            for name in ("vG", "vGMuxInfra", "vFW")
+        }
+        arrived = []
+        condition = threading.Condition()
+
+        def resolve(ctxt, method, args):
+            # Each call waits for the others, calls made one after
+            # another would all time out
+            name = list(args['demands'])[0]
+            with condition:
+                arrived.append(name)
+                condition.notify_all()
+                deadline = time.time() + 5
+                while len(arrived) < len(demands) and \
+                        time.time() < deadline:
+                    condition.wait(deadline - time.time())
+                overlapped = len(arrived) == len(demands)
+            candidate = {'candidate_id': name, 'overlapped': overlapped}
+            return {'resolved_demands': {name: [candidate]},
+                    'dropped_candidates': [{'name': name}]}
+        mock_call.side_effect = resolve
+
+        with patch.object(TraigeTranslator, 'thefinalCallTrans') as trans:
+            parsed = self.Translator.parse_demands(demands)
+        self.assertEqual(
+            {name: {'candidates': [{'candidate_id': name,
+                                    'overlapped': True}]}
+             for name in demands}, parsed)
+        # Triage is merged in the order of the demands, whatever the
+        # order the calls completed in
+        triage = trans.call_args[0][0]
+        self.assertEqual([[{'name': name}] for name in demands],
+                         triage['translator_triage'])
+
+    @patch('conductor.common.music.messaging.component.RPCClient.call')
+    def test_parse_demands_one_at_a_time(self, mock_call):
+        cfg.CONF.set_override('resolve_workers', 1, 'controller')
+        self.addCleanup(cfg.CONF.clear_override, 'resolve_workers',
+                        'controller')
+        demands = {
+            name: [{"inventory_provider": "aai",
+                    "inventory_type": "cloud"}]
+            for name in ("vG", "vGMuxInfra")
+        }
+        threads = set()
+
+        def resolve(ctxt, method, args):
+            threads.add(threading.current_thread())
+            name = list(args['demands'])[0]
+            return {'resolved_demands': {name: [{'candidate_id': name}]}}
+        mock_call.side_effect = resolve
+
+        with patch.object(TraigeTranslator, 'thefinalCallTrans'):
+            self.Translator.parse_demands(demands)
+        self.assertEqual({threading.current_thread()}, threads)
+
+    @patch('conductor.common.music.messaging.component.RPCClient.call')
+    def test_parse_demands_unresolved(self, mock_call):
+        demands = {
+            name: [{"inventory_provider": "aai",
+                    "inventory_type": "cloud"}]
+            for name in ("vG", "vGMuxInfra")
+        }
+
+        def resolve(ctxt, method, args):
+            name = list(args['demands'])[0]
+            if name == 'vG':
+                return {'resolved_demands': None}
+            return {'resolved_demands': {name: [{'candidate_id': name}]},
+                    'dropped_candidates': [{'name': name}]}
+        mock_call.side_effect = resolve
+
+        with patch.object(TraigeTranslator, 'thefinalCallTrans') as trans:
+            self.assertRaises(TranslatorException,
+                              self.Translator.parse_demands, demands)
+        self.assertEqual([[{'name': 'vGMuxInfra'}]],
+                         trans.call_args[0][0]['translator_triage'])
+
+    @patch('conductor.common.music.messaging.component.RPCClient.call')
+    def test_parse_locations_resolved(self, mock_call):
+        locations = {
+            'customer_loc': {'latitude': 32.89748, 'longitude': -97.040443},
+            'host_loc': {'host_name': 'host1'},
+            'clli_loc': {'clli_code': 'clli1'},
+        }
+
+        def resolve(ctxt, method, args):
+            return {'resolved_location': {
+                'latitude': args.get('host_name') or args.get('clli_code'),
+                'longitude': 0}}
+        mock_call.side_effect = resolve
+
+        self.assertEqual(
+            {'customer_loc': {'latitude': 32.89748,
+                              'longitude': -97.040443},
+             'host_loc': {'latitude': 'host1', 'longitude': 0},
+             'clli_loc': {'latitude': 'clli1', 'longitude': 0}},
+            self.Translator.parse_locations(locations))
+        self.assertEqual(2, mock_call.call_count)
+
+        mock_call.side_effect = None
+        mock_call.return_value = None
+        self.assertRaises(TranslatorException,
+                          self.Translator.parse_locations, locations)
+
     def test_parse_constraints(self):
         constraints = {'constraint_loc': {
             'type': 'distance_to_location',
@@ -821,6 +934,7 @@ class TestNoExceptionTranslator(unittest.TestCase):
                 "plan_id": '',
                 "locations": {},
                 "request_type": '',
+                "search_algorithm": '',
                 "demands": {},
                 "constraints": {},
                 "objective": {},
@@ -844,6 +958,41 @@ class TestNoExceptionTranslator(unittest.TestCase):
         self.Translator.do_translation()
         self.assertEquals(self.Translator._translation, expected_format)
 
+    @patch('conductor.controller.translator.Translator.parse_constraints')
+    @patch('conductor.controller.translator.Translator.parse_reservations')
+    @patch('conductor.controller.translator.Translator.parse_demands')
+    @patch('conductor.controller.translator.Translator.parse_optimization')
+    @patch('conductor.controller.translator.Translator.parse_locations')
+    def test_do_translation_pooled(self, mock_loc, mock_opt,
+                                   mock_dmd, mock_resv, mock_cons):
+        cfg.CONF.set_override('pool_candidates', True, 'controller')
+        self.addCleanup(cfg.CONF.clear_override, 'pool_candidates',
+                        'controller')
+        region = {'candidate_id': 'region1', 'inventory_provider': 'aai',
+                  'inventory_type': 'cloud', 'cost': 1.0}
+        demands = {'vG': {'candidates': [region]},
+                   'vGMuxInfra': {'candidates': [region]}}
+        self.Translator._valid = True
+        self.Translator._version = ''
+        self.Translator._plan_id = ''
+        self.Translator._parameters = {}
+        self.Translator._locations = {}
+        self.Translator._demands = {}
+        self.Translator._constraints = {}
+        self.Translator._optmization = {}
+        self.Translator._reservations = {}
+        mock_loc.return_value = {}
+        mock_resv.return_value = {}
+        mock_dmd.return_value = demands
+        mock_opt.return_value = {}
+        mock_cons.return_value = {}
+        self.Translator.do_translation()
+        conductor_solver = self.Translator._translation['conductor_solver']
+        self.assertEqual(1, len(candidate_pool.load(conductor_solver)))
+        for name in demands:
+            self.assertEqual([region], candidate_pool.demand_candidates(
+                conductor_solver, name))
+
     @patch('conductor.controller.translator.Translator.create_components')
     @patch('conductor.controller.translator.Translator.validate_components')
     @patch('conductor.controller.translator.Translator.do_translation')
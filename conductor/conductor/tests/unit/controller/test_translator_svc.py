@@ -25,6 +25,7 @@ import futurist
 
 from mock import patch
 from mock import PropertyMock
+from prometheus_client import REGISTRY
 from conductor.controller.translator_svc import TranslatorService
 from conductor.common.models import plan
 from conductor.common.music import api
@@ -85,8 +86,12 @@ class TestTranslatorServiceNoException(unittest.TestCase):
                    new_callable=PropertyMock) as mock_ok:
             mock_ok.return_value = False
         mock_error.return_value = 'error'
+        translations = REGISTRY.get_sample_value(
+            'translation_seconds_count', {'status': 'error'}) or 0
         self.translator_svc.translate(self.mock_plan)
         self.assertEquals(self.mock_plan.status, 'error')
+        self.assertEqual(translations + 1, REGISTRY.get_sample_value(
+            'translation_seconds_count', {'status': 'error'}))
 
     def test_millisec_to_sec(self):
         self.assertEquals(self.translator_svc.millisec_to_sec(1000), 1)
@@ -17,11 +17,16 @@
 # -------------------------------------------------------------------------
 #
 import json
+import os
+import shutil
+import tempfile
+import time
 import unittest
 import copy
 
 import conductor.data.plugins.inventory_provider.aai as aai
 import mock
+from conductor.data.plugins.inventory_provider import hpa_utils
 from conductor.data.plugins.inventory_provider.aai import AAI
 from conductor.data.plugins.triage_translator.triage_translator import TraigeTranslator
 from oslo_config import cfg
@@ -342,6 +347,175 @@ class TestAAI(unittest.TestCase):
         self.assertEqual(results_json, self.aai_ep.resolve_demands(demands_list, plan_info=plan_info,
                                          triage_translator_data=triage_translator_data))
 
+    def vnf_requests(self):
+        """Service demands, and A&AI responses for their generic-vnfs"""
+        self.aai_ep.conf.HPA_enabled = True
+        self.aai_ep.version = 'v14'
+        path = './conductor/tests/unit/data/plugins/inventory_provider/'
+        demands_list = json.loads(open(path + 'service_demand_list.json').read())
+        generic_vnf = json.loads(open(
+            path + 'vfmodule_service_generic_vnf_list.json').read())[0]
+        v_server = json.loads(open(path + 'vfmodule_vserver.json').read())
+        complex_response = json.loads(open(path + 'vfmodule_complex.json').read())
+        region_response = json.loads(open(path + 'vfmodule_region.json').read())
+
+        # Three vnfs on the same vserver, the last of another customer
+        generic_vnf_list = []
+        for i in range(3):
+            vnf = copy.deepcopy(generic_vnf)
+            vnf['vnf-id'] = 'vnf{}'.format(i)
+            vnf['vnf-name'] = 'vnf-name{}'.format(i)
+            generic_vnf_list.append(vnf)
+        customer = generic_vnf_list[2]['relationship-list']['relationship'][0]
+        for data in customer['relationship-data']:
+            if data['relationship-key'] == 'customer.global-customer-id':
+                data['relationship-value'] = 'Other'
+
+        bodies = {
+            'model-invariant-id': {'generic-vnf': generic_vnf_list},
+            'equipment-role': {'generic-vnf': []},
+            '/cloud-regions/?cloud-region-id=': {
+                'cloud-region': [region_response]},
+            '/vservers/vserver/': v_server,
+            '/cloud-region/?cloud-owner=': region_response,
+            '/complexes/complex/clli1': complex_response,
+        }
+
+        def request(method, path, headers, data):
+            response = mock.MagicMock()
+            response.status_code = 404
+            for key, body in bodies.items():
+                if key in path:
+                    response.status_code = 200
+                    response.json.side_effect = \
+                        lambda body=body: copy.deepcopy(body)
+            return response
+        return demands_list, request
+
+    def test_resolve_demands_concurrent(self):
+        self.addCleanup(self.conf.clear_override, 'resolve_workers', 'aai')
+        self.addCleanup(self.conf.clear_override, 'resolve_memo', 'aai')
+        demands_list, request = self.vnf_requests()
+
+        results = []
+        for workers, memo in ((1, False), (1, True), (4, True)):
+            self.conf.set_override('resolve_workers', workers, 'aai')
+            self.conf.set_override('resolve_memo', memo, 'aai')
+            self.aai_ep._aai_complex_cache.clear()
+            self.aai_ep._plan_memos.clear()
+            self.aai_ep.rest = mock.MagicMock()
+            self.aai_ep.rest.request.side_effect = request
+            self.aai_ep.triage_translator = mock.MagicMock()
+            resolved = self.aai_ep.resolve_demands(
+                copy.deepcopy(demands_list),
+                plan_info={'plan_name': 'name', 'plan_id': 'id'},
+                triage_translator_data=None)
+            results.append((resolved,
+                            self.aai_ep.triage_translator.mock_calls,
+                            [c[1]['path'] for c in
+                             self.aai_ep.rest.request.call_args_list]))
+
+        self.assertEqual(2, len(results[0][0]['vPGN']))
+        for resolved, triage, paths in results:
+            self.assertEqual(results[0][0], resolved)
+            self.assertEqual(results[0][1], triage)
+            # The vserver shared by the vnfs is fetched once
+            self.assertEqual(
+                1, len([p for p in paths if '/vservers/vserver/' in p]))
+            self.assertEqual(len(paths), len(set(paths)))
+        self.assertIsNone(self.aai_ep._resolve_memo.responses)
+
+    def test_resolve_demands_plan_memo(self):
+        demands_list, request = self.vnf_requests()
+        self.aai_ep.rest = mock.MagicMock()
+        self.aai_ep.rest.request.side_effect = request
+        self.aai_ep.triage_translator = mock.MagicMock()
+
+        def resolve(plan_id):
+            # The translator sends the demands of a plan one at a time
+            self.aai_ep._aai_complex_cache.clear()
+            for name, requirements in demands_list.items():
+                self.aai_ep.resolve_demands(
+                    {name: copy.deepcopy(requirements)},
+                    plan_info={'plan_name': 'name', 'plan_id': plan_id},
+                    triage_translator_data=None)
+
+        def vserver_requests():
+            return len([c for c in self.aai_ep.rest.request.call_args_list
+                        if '/vservers/vserver/' in c[1]['path']])
+
+        demands_list['vPGN2'] = demands_list['vPGN']
+        resolve('p1')
+        # The vserver shared by the demands is fetched once for the plan
+        self.assertEqual(1, vserver_requests())
+        resolve('p2')
+        self.assertEqual(2, vserver_requests())
+
+        # Plans are forgotten once their demands are not resolved anymore
+        later = time.time() + self.conf.aai.resolve_memo_ttl + 1
+        with mock.patch('time.time', return_value=later):
+            resolve('p3')
+        self.assertEqual(['p3'], list(self.aai_ep._plan_memos))
+
+    def test_request_response_cache(self):
+        self.conf.set_override('response_cache', True, 'aai')
+        self.addCleanup(self.conf.clear_override, 'response_cache', 'aai')
+        self.aai_ep = AAI()
+        cache = self.aai_ep._response_cache
+        vserver = {'vserver-id': 'v1', 'resource-version': '1',
+                   'relationship-list': {}}
+        path = '/v14/cloud-infrastructure/cloud-regions/cloud-region/o/r/' \
+               'tenants/tenant/t/vservers/vserver/v1'
+
+        def request(method, path, headers, data):
+            response = mock.MagicMock()
+            response.status_code = 200
+            response.json.return_value = copy.deepcopy(vserver)
+            return response
+
+        self.aai_ep.rest = mock.MagicMock()
+        self.aai_ep.rest.request.side_effect = request
+
+        self.assertEqual(vserver, self.aai_ep._request(
+            path=path + '?depth=2').json())
+        self.assertEqual(vserver, self.aai_ep._request(
+            path=path + '?depth=2').json())
+        self.assertEqual(1, self.aai_ep.rest.request.call_count)
+
+        # Not cached: other methods and resource types
+        self.aai_ep._request('put', path=path, data={})
+        self.aai_ep._request(path='/v14/business/customers')
+        self.assertEqual(3, self.aai_ep.rest.request.call_count)
+
+        # Expired with its children, fetched again: A&AI does not change
+        # the resource-version when they change
+        cache.get(path + '?depth=2').expires = 0
+        self.assertEqual(vserver, self.aai_ep._request(
+            path=path + '?depth=2').json())
+        self.assertEqual(path + '?depth=2', self.aai_ep.rest.request.
+                         call_args[1]['path'])
+        self.assertFalse(cache.get(path + '?depth=2').expired())
+
+        # Expired and unchanged, only the depth=0 form is fetched
+        self.aai_ep._request(path=path)
+        entry = cache.get(path)
+        entry.expires = 0
+        self.assertEqual(vserver, self.aai_ep._request(path=path).json())
+        self.assertEqual(path + '?depth=0', self.aai_ep.rest.request.
+                         call_args[1]['path'])
+        self.assertFalse(entry.expired())
+
+        # Expired and changed, fetched again
+        entry.expires = 0
+        vserver['resource-version'] = '2'
+        self.assertEqual('2', self.aai_ep._request(
+            path=path).json()['resource-version'])
+        self.assertEqual(path, self.aai_ep.rest.request.
+                         call_args[1]['path'])
+        self.assertEqual(
+            {'hit': 1, 'miss': 4, 'revalidated': 1, 'hit_rate': 1 / 3.0},
+            cache.stats()['vserver'])
+
     def test_get_complex(self):
 
         complex_json_file = './conductor/tests/unit/data/plugins/inventory_provider/_request_get_complex.json'
@@ -443,6 +617,167 @@ class TestAAI(unittest.TestCase):
         self.assertEqual(None,
                          self.aai_ep._refresh_cache())
 
+    def test_refresh_cache_incremental(self):
+        regions_response_file = './conductor/tests/unit/data/plugins/inventory_provider/cache_regions.json'
+        regions_response = json.loads(open(regions_response_file).read())
+        region = regions_response['cloud-region'][0]
+        other_region = copy.deepcopy(region)
+        other_region['cloud-region-id'] = 'other-region'
+        regions_response['cloud-region'].append(other_region)
+
+        complex_json_file = './conductor/tests/unit/data/plugins/inventory_provider/_cached_complex.json'
+        complex_json = json.loads(open(complex_json_file).read())
+        complex_json['complex-name'] = 'c1'
+
+        response = mock.MagicMock()
+        response.status_code = 200
+        response.ok = True
+        response.json.return_value = regions_response
+        mock.patch.object(AAI, '_request', return_value=response).start()
+        mock.patch.object(AAI, '_get_complex',
+                          return_value=complex_json).start()
+        get_flavors = mock.patch.object(AAI, '_get_flavors',
+                                        return_value={'flavor': []}).start()
+        self.aai_ep.conf.HPA_enabled = True
+
+        self.aai_ep._refresh_regions()
+        self.assertEqual(2, get_flavors.call_count)
+        self.assertEqual(set(['mtunj1a', 'other-region']),
+                         set(self.aai_ep._aai_cache['cloud_region']))
+        old_cache = self.aai_ep._aai_cache
+
+        # Only the region with a new resource-version is fetched again
+        other_region['resource-version'] = '2'
+        self.aai_ep._refresh_regions()
+        self.assertEqual(3, get_flavors.call_count)
+        get_flavors.assert_called_with(other_region['cloud-owner'],
+                                       'other-region')
+        self.assertIsNot(old_cache, self.aai_ep._aai_cache)
+        self.assertIs(old_cache['cloud_region']['mtunj1a'],
+                      self.aai_ep._aai_cache['cloud_region']['mtunj1a'])
+
+        # Entries older than cache_entry_max_age are fetched again
+        later = time.time() + \
+            self.aai_ep.conf.aai.cache_entry_max_age * 60 + 1
+        with mock.patch('time.time', return_value=later):
+            self.aai_ep._refresh_regions()
+        self.assertEqual(5, get_flavors.call_count)
+        self.assertEqual({'mtunj1a': later, 'other-region': later},
+                         self.aai_ep._aai_cache_fetched)
+
+    def test_refresh_cache_in_background(self):
+        self.aai_ep._aai_cache = {'cloud_region': {'r1': {}}}
+        self.aai_ep.last_refresh_time = 1
+        refresh = mock.patch.object(AAI, '_refresh_regions').start()
+
+        # The stale cache is served while the refresh runs
+        self.assertEqual({'r1': {}}, self.aai_ep._get_regions())
+        self.aai_ep._refresh_thread.join()
+        refresh.assert_called_once_with()
+
+    def test_refresh_cache_in_background_failure(self):
+        self.aai_ep._aai_cache = {'cloud_region': {'r1': {}}}
+        self.aai_ep.last_refresh_time = 1
+        mock.patch.object(AAI, '_refresh_regions',
+                          side_effect=ValueError('boom')).start()
+        log = mock.patch.object(aai.LOG, 'exception').start()
+        self.assertEqual({'r1': {}}, self.aai_ep._get_regions())
+        self.aai_ep._refresh_thread.join()
+        self.assertEqual(1, log.call_count)
+        self.assertEqual({'r1': {}}, self.aai_ep._get_regions())
+
+    def test_refresh_cache_flavor_index(self):
+        regions_response_file = './conductor/tests/unit/data/plugins/inventory_provider/cache_regions.json'
+        regions_response = json.loads(open(regions_response_file).read())
+        region = regions_response['cloud-region'][0]
+        other_region = copy.deepcopy(region)
+        other_region['cloud-region-id'] = 'other-region'
+        regions_response['cloud-region'].append(other_region)
+
+        complex_json_file = './conductor/tests/unit/data/plugins/inventory_provider/_cached_complex.json'
+        complex_json = json.loads(open(complex_json_file).read())
+        complex_json['complex-name'] = 'c1'
+        flavor_json_file = \
+            './conductor/tests/unit/data/plugins/inventory_provider/hpa_flavors.json'
+        flavor_json = json.loads(open(flavor_json_file).read())
+
+        response = mock.MagicMock()
+        response.status_code = 200
+        response.ok = True
+        response.json.return_value = regions_response
+        mock.patch.object(AAI, '_request', return_value=response).start()
+        mock.patch.object(AAI, '_get_complex',
+                          return_value=complex_json).start()
+        mock.patch.object(AAI, '_get_flavors',
+                          return_value=flavor_json).start()
+        self.aai_ep.conf.HPA_enabled = True
+
+        self.aai_ep._refresh_regions()
+        index = self.aai_ep._aai_flavor_index
+        self.assertEqual(set(['mtunj1a', 'other-region']), set(index))
+        self.assertEqual(5, len(index['mtunj1a'].flavors))
+        self.assertTrue(index['mtunj1a'].matches(flavor_json))
+
+        # Unchanged regions keep their index
+        other_region['resource-version'] = '2'
+        self.aai_ep._refresh_regions()
+        self.assertIs(index['mtunj1a'],
+                      self.aai_ep._aai_flavor_index['mtunj1a'])
+        self.assertIsNot(index['other-region'],
+                         self.aai_ep._aai_flavor_index['other-region'])
+
+    def test_refresh_cache_snapshot(self):
+        regions_response_file = './conductor/tests/unit/data/plugins/inventory_provider/cache_regions.json'
+        regions_response = json.loads(open(regions_response_file).read())
+        complex_json_file = './conductor/tests/unit/data/plugins/inventory_provider/_cached_complex.json'
+        complex_json = json.loads(open(complex_json_file).read())
+        complex_json['complex-name'] = 'c1'
+        flavor_json_file = \
+            './conductor/tests/unit/data/plugins/inventory_provider/hpa_flavors.json'
+        flavor_json = json.loads(open(flavor_json_file).read())
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        snapshot_file = os.path.join(directory, 'aai_cache.json.gz')
+        self.conf.set_override('cache_snapshot_file', snapshot_file, 'aai')
+        self.addCleanup(self.conf.clear_override, 'cache_snapshot_file',
+                        'aai')
+        self.addCleanup(setattr, self.aai_ep.conf, 'HPA_enabled',
+                        self.aai_ep.conf.HPA_enabled)
+        self.aai_ep.conf.HPA_enabled = True
+
+        response = mock.MagicMock()
+        response.status_code = 200
+        response.json.return_value = regions_response
+        mock.patch.object(AAI, '_request', return_value=response).start()
+        mock.patch.object(AAI, '_get_complex',
+                          return_value=complex_json).start()
+        get_flavors = mock.patch.object(AAI, '_get_flavors',
+                                        return_value=flavor_json).start()
+        self.assertFalse(self.aai_ep._load_snapshot())
+        self.aai_ep._refresh_regions()
+        self.aai_ep._aai_complex_cache['clli1'] = {'complex-name': 'c1'}
+        self.aai_ep._write_snapshot(snapshot_file)
+
+        # A new worker serves the snapshot, and revalidates it
+        # without fetching the flavors of unchanged regions again
+        worker = AAI()
+        self.assertTrue(worker._load_snapshot())
+        self.assertEqual(self.aai_ep._aai_cache, worker._aai_cache)
+        self.assertEqual(self.aai_ep._aai_cache_versions,
+                         worker._aai_cache_versions)
+        self.assertEqual({'complex-name': 'c1'},
+                         worker._aai_complex_cache['clli1'])
+        self.assertTrue(worker._aai_flavor_index['mtunj1a'].matches(
+            flavor_json))
+        self.assertIsNone(worker.last_refresh_time)
+        worker._refresh_regions()
+        self.assertEqual(1, get_flavors.call_count)
+
+        # Snapshots of another configuration are not loaded
+        self.aai_ep.conf.HPA_enabled = False
+        self.assertFalse(AAI()._load_snapshot())
+
     def test_get_aai_rel_link(self):
 
         relatonship_response_file = './conductor/tests/unit/data/plugins/inventory_provider/relationship_list.json'
@@ -708,4 +1043,34 @@ tenant/3c6c471ada7747fe8ff7f28e100b61e8/vservers/vserver/00bddefc-126e-4e4f-a18d
         self.assertEqual(None, self.aai_ep.match_hpa(candidate_json['candidate_list'][1],
                                                      feature_json[5]))
 
+    def test_match_hpa_flavor_index(self):
+        flavor_json_file = \
+            './conductor/tests/unit/data/plugins/inventory_provider/hpa_flavors.json'
+        flavor_json = json.loads(open(flavor_json_file).read())
+        feature_json_file = \
+            './conductor/tests/unit/data/plugins/inventory_provider/hpa_req_features.json'
+        feature_json = json.loads(open(feature_json_file).read())
+        candidate_json_file = './conductor/tests/unit/data/candidate_list.json'
+        candidate_json = json.loads(open(candidate_json_file).read())
+        candidate = candidate_json['candidate_list'][1]
+        candidate['flavors'] = flavor_json
+
+        expected = [self.aai_ep.match_hpa(candidate, copy.deepcopy(features))
+                    for features in feature_json]
+
+        self.aai_ep._aai_flavor_index = {
+            candidate['location_id']:
+                hpa_utils.FlavorCapabilityIndex(flavor_json)}
+        with mock.patch.object(hpa_utils.yaml, 'load') as load:
+            self.assertEqual(expected, [
+                self.aai_ep.match_hpa(candidate, copy.deepcopy(features))
+                for features in feature_json])
+            load.assert_not_called()
+
+            # Flavors changed since the index was built, they are parsed
+            candidate['flavors'] = copy.deepcopy(flavor_json)
+            candidate['flavors']['flavor'][0]['resource-version'] = '1'
+            self.aai_ep.match_hpa(candidate, feature_json[0])
+            self.assertTrue(load.called)
+
 
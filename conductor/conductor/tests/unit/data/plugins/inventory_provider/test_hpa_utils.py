@@ -60,6 +60,34 @@ class TestHPAUtils(unittest.TestCase):
         self.assertEqual(True,
                          hpa_utils.match_all_operator(big_list, small_list))
 
+    def test_flavor_capability_index(self):
+        capability = {'hpa-feature': 'numa', 'hpa-version': 'v1',
+                      'architecture': 'generic',
+                      'hpa-feature-attributes': [
+                          {'hpa-attribute-key': 'numaMem-0',
+                           'hpa-attribute-value': '{value: "2", unit: "GB"}'},
+                          {'hpa-attribute-key': 'numaCpu-0',
+                           'hpa-attribute-value': 'not a mapping'}]}
+        flavors = {'flavor': [
+            {'flavor-id': 'f1', 'flavor-name': 'numa',
+             'hpa-capabilities': {'hpa-capability': [capability]}},
+            {'flavor-id': 'f2', 'flavor-name': 'none'}]}
+        index = hpa_utils.FlavorCapabilityIndex(flavors)
+
+        self.assertIsNone(index.flavors[1].capability_keys)
+        values = index.flavors[0].features['numa'][0]
+        self.assertEqual(str(2 * 1024 * 1024 * 1024), values.get('numaMem-0'))
+        self.assertIsNone(values.get('numaCpu-0'))
+        self.assertNotIn('numaNodes', values)
+        key = hpa_utils.capability_key(capability)
+        self.assertEqual(set([0]), index.supporting([key]))
+        self.assertEqual(set([0]), index.supporting([]))
+        self.assertEqual(set(), index.supporting(
+            [key, (('hpa-feature', 'sriov'),)]))
+
+        self.assertTrue(index.matches(flavors))
+        self.assertFalse(index.matches({'flavor': flavors['flavor'][:1]}))
+
 
 if __name__ == "__main__":
     unittest.main()
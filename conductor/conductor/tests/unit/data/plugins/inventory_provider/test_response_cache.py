@@ -0,0 +1,141 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from conductor.data.plugins.inventory_provider import response_cache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_resource_type(self):
+        self.assertEqual('vserver', response_cache.resource_type(
+            '/v14/cloud-infrastructure/cloud-regions/cloud-region/o/r/'
+            'tenants/tenant/t/vservers/vserver/v?depth=2'))
+        self.assertEqual('generic-vnf', response_cache.resource_type(
+            '/v14/network/generic-vnfs/?model-invariant-id=x'))
+        self.assertEqual('flavor', response_cache.resource_type(
+            '/v14/cloud-infrastructure/cloud-regions/cloud-region/o/r/'
+            'flavors/?depth=all&nodes-only=true'))
+        self.assertEqual('query',
+                         response_cache.resource_type('/v14/query?format=id'))
+        self.assertIsNone(response_cache.resource_type(
+            '/v14/business/customers'))
+
+    def test_revalidation_path(self):
+        self.assertEqual('/v14/a/b?depth=0',
+                         response_cache.revalidation_path('/v14/a/b'))
+        # The resource-version does not change with the children
+        for depth in ('1', '2', 'all'):
+            self.assertIsNone(response_cache.revalidation_path(
+                '/v14/a/b?depth=' + depth))
+        self.assertIsNone(response_cache.revalidation_path('/v14/a?depth=0'))
+        self.assertIsNone(
+            response_cache.revalidation_path('/v14/a/?vnf-name=x'))
+
+    def test_lru_and_ttl(self):
+        cache = response_cache.ResponseCache(2, {'vserver': '60'})
+        self.assertEqual(60, cache.ttl('vserver'))
+        self.assertEqual(0, cache.ttl('customer'))
+        cache.put('a', 'vserver', {'resource-version': '1'})
+        cache.put('b', 'vserver', {})
+        self.assertEqual('1', cache.get('a').resource_version)
+        cache.put('c', 'vserver', {})
+        # b was the least recently used
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+        entry = cache.get('c')
+        self.assertFalse(entry.expired())
+        with mock.patch('time.time', return_value=entry.expires):
+            self.assertTrue(entry.expired())
+
+        response = response_cache.CachedResponse({'x': [1]})
+        response.json()['x'].append(2)
+        self.assertEqual({'x': [1]}, response.json())
+
+    def test_stats(self):
+        cache = response_cache.ResponseCache(2, {})
+        cache.record('vserver', response_cache.HIT)
+        cache.record('vserver', response_cache.REVALIDATED)
+        cache.record('vserver', response_cache.MISS)
+        cache.record('vserver', response_cache.MISS)
+        self.assertEqual({'vserver': {'hit': 1, 'miss': 2, 'revalidated': 1,
+                                      'hit_rate': 0.5}},
+                         cache.stats())
+
+    def test_directory(self):
+        ttls = {'vserver': '60', 'complex': '60'}
+        cache = response_cache.ResponseCache(10, ttls, self.directory)
+        cache.put('a', 'vserver', {'resource-version': '1', 'x': 1})
+        cache.put('b', 'complex', {'x': 2})
+
+        # Another worker finds the entries on disk
+        other = response_cache.ResponseCache(10, ttls, self.directory)
+        entry = other.get('a')
+        self.assertEqual({'resource-version': '1', 'x': 1}, entry.body)
+        self.assertEqual('vserver', entry.resource_type)
+        self.assertEqual('1', entry.resource_version)
+
+        # Expired entries without a resource-version are dropped
+        with mock.patch('time.time', return_value=entry.expires + 1):
+            self.assertIsNone(other.get('b'))
+            self.assertTrue(other.get('a').expired())
+
+        other.discard('a')
+        self.assertIsNone(response_cache.ResponseCache(
+            10, ttls, self.directory).get('a'))
+
+    def test_prune(self):
+        cache = response_cache.ResponseCache(10, {'vserver': '60'},
+                                             self.directory, max_files=2)
+        for i, key in enumerate(('a', 'b', 'c')):
+            cache.put(key, 'vserver', {'x': i})
+            os.utime(cache._file(key), (1000 + i, 1000 + i))
+        left_over = os.path.join(self.directory, 'x.tmp')
+        open(left_over, 'w').close()
+        os.utime(left_over, (0, 0))
+        writing = os.path.join(self.directory, 'y.tmp')
+        open(writing, 'w').close()
+
+        # The first write pruned, the next ones wait for the interval
+        self.assertEqual(5, len(os.listdir(self.directory)))
+        cache.prune()
+        # The least recently written file is removed
+        self.assertEqual(sorted([os.path.basename(cache._file('b')),
+                                 os.path.basename(cache._file('c')),
+                                 'y.tmp']),
+                         sorted(os.listdir(self.directory)))
+
+        with mock.patch('time.time',
+                        return_value=time.time() +
+                        response_cache.PRUNE_INTERVAL):
+            cache.put('d', 'vserver', {'x': 3})
+        self.assertEqual(2, len([n for n in os.listdir(self.directory)
+                                 if n.endswith('.json')]))
+        self.assertIsNotNone(cache._read('d'))
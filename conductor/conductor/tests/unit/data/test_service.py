@@ -18,15 +18,20 @@
 #
 import copy
 import json
+import time
 import unittest
 import uuid
 
+import conductor.common.prometheus_metrics as PC
 import conductor.data.service as service
 import mock
 import stevedore
+from eventlet import patcher as eventlet_patcher
 import yaml
+from conductor.common import candidate_table
 from conductor.common.utils import conductor_logging_util as log_util
 from conductor.data.plugins.inventory_provider import extensions as ip_ext
+from conductor.data.plugins.inventory_provider import hpa_utils
 from conductor.data.plugins.service_controller import extensions as sc_ext
 from conductor.data.plugins.vim_controller import extensions as vc_ext
 from conductor.data.service import DataEndpoint
@@ -104,6 +109,19 @@ class TestDataEndpoint(unittest.TestCase):
                          self.data_ep.get_candidates_from_service(None,
                                                                   req_json))
 
+    @mock.patch.object(service.LOG, 'debug')
+    @mock.patch.object(stevedore.ExtensionManager, 'map_method')
+    def test_get_candidates_from_service_table(self, ext_mock, debug_mock):
+        req_json_file = './conductor/tests/unit/data/constraints.json'
+        req_json = yaml.safe_load(open(req_json_file).read())
+        candidate_list = req_json['candidate_list']
+        ext_mock.return_value = [candidate_list]
+        req_json['candidate_list'] = json.loads(json.dumps(
+            candidate_table.encode(candidate_list)))
+        self.assertEqual({'response': candidate_list, 'error': False},
+                         self.data_ep.get_candidates_from_service(
+                             None, req_json))
+
     def test_get_candidate_discard_set(self):
         req_json_file = './conductor/tests/unit/data/constraints.json'
         req_json = yaml.safe_load(open(req_json_file).read())
@@ -157,6 +175,50 @@ class TestDataEndpoint(unittest.TestCase):
                          self.data_ep.get_inventory_group_candidates(None,
                                                                      arg=req_json))
 
+    @mock.patch.object(service.LOG, 'warning')
+    @mock.patch.object(service.LOG, 'error')
+    @mock.patch.object(service.LOG, 'debug')
+    @mock.patch.object(stevedore.ExtensionManager, 'map_method')
+    @mock.patch.object(stevedore.ExtensionManager, 'names')
+    def test_get_inventory_group_pairs(self, names_mock, map_mock,
+                                       debug_mock, error_mock, warning_mock):
+        names_mock.return_value = ['aai']
+        map_mock.return_value = [[['instance-1', 'instance-2'],
+                                  ['instance-1', 'instance-3']]]
+        expected = {'response': {'instance-1': ['instance-2', 'instance-3'],
+                                 'instance-2': ['instance-1'],
+                                 'instance-3': ['instance-1']},
+                    'error': False}
+        self.assertEqual(expected,
+                         self.data_ep.get_inventory_group_pairs(None, {}))
+        map_mock.assert_called_once_with(
+            'get_inventory_group_pairs', service_description='DHV_VVIG_PAIR')
+
+        # Kept until the refresh interval is over
+        map_mock.return_value = [[['instance-1', 'instance-4']]]
+        self.assertEqual(expected,
+                         self.data_ep.get_inventory_group_pairs(None, {}))
+        self.assertEqual(1, map_mock.call_count)
+        later = time.time() + cfg.CONF.data.inventory_group_refresh_interval
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(
+                {'instance-1': ['instance-4'], 'instance-4': ['instance-1']},
+                self.data_ep.get_inventory_group_pairs(None, {})['response'])
+
+            # Failed refreshes keep the previous pairs
+            map_mock.return_value = [None]
+            self.data_ep.inventory_groups['DHV_VVIG_PAIR'] = (
+                0, self.data_ep.inventory_groups['DHV_VVIG_PAIR'][1])
+            self.assertEqual(
+                {'instance-1': ['instance-4'], 'instance-4': ['instance-1']},
+                self.data_ep.get_inventory_group_pairs(None, {})['response'])
+        self.assertEqual(3, map_mock.call_count)
+        self.assertTrue(warning_mock.called)
+
+        self.data_ep.inventory_groups.clear()
+        self.assertEqual({'response': {}, 'error': True},
+                         self.data_ep.get_inventory_group_pairs(None, {}))
+
     @mock.patch.object(service.LOG, 'error')
     @mock.patch.object(service.LOG, 'debug')
     @mock.patch.object(service.LOG, 'info')
@@ -214,7 +276,8 @@ class TestDataEndpoint(unittest.TestCase):
         }
         logutil_mock.return_value = uuid.uuid4()
         ext_mock.return_value = []
-        expected_response = {'response': {'resolved_demands': None, 'trans': {'plan_id': None,
+        expected_response = {'response': {'resolved_demands': None, 'dropped_candidates': None,
+                                          'trans': {'plan_id': None,
                                                                                       'plan_name': None,
                                                                                       'translator_triage': []}},
                              'error': True}
@@ -228,6 +291,7 @@ class TestDataEndpoint(unittest.TestCase):
                          { 'customer-id': 'some_company', 'provisioning-status': 'provisioned' },
                      'inventory_provider': 'aai', 'inventory_type': 'service', 'service_type': 'vG' },
                    { 'inventory_provider': 'aai', 'inventory_type': 'cloud' } ],
+              'dropped_candidates': [],
               'trans': { 'plan_id': 'plan_abc', 'plan_name': 'plan_name', 'translator_triage': [ [] ] } } }
         self.assertEqual(expected_response,
                          self.data_ep.resolve_demands(ctxt, req_json))
@@ -252,6 +316,7 @@ class TestDataEndpoint(unittest.TestCase):
         ext_mock.return_value = [return_value]
         expected_response = \
             {'response': {'trans': {'translator_triage': [ [] ], 'plan_name': 'plan_name', 'plan_id': 'plan_abc'},
+                          'dropped_candidates': [],
                           'resolved_demands': [{'service_resource_id': 'vFW-SINK-XX', 'vlan_key': 'vlan_key',
                                                 'inventory_provider': 'aai', 'inventory_type': 'vfmodule',
                                                 'excluded_candidates': [
@@ -274,6 +339,69 @@ class TestDataEndpoint(unittest.TestCase):
         self.assertEqual(expected_response,
                          self.data_ep.resolve_demands(ctxt, req_json))
 
+    def test_get_candidates_with_hpa_processes(self):
+        if eventlet_patcher.is_monkey_patched('thread'):
+            # The API tests green the threads of the process pool
+            self.skipTest("threads are monkey patched by eventlet")
+        self.addCleanup(cfg.CONF.clear_override, 'hpa_match_workers', 'data')
+        self.addCleanup(cfg.CONF.clear_override, 'hpa_match_chunk_size',
+                        'data')
+        req_json_file = './conductor/tests/unit/data/candidate_list.json'
+        req_json = yaml.safe_load(open(req_json_file).read())
+        flavor_json_file = \
+            './conductor/tests/unit/data/plugins/inventory_provider/hpa_flavors.json'
+        flavor_json = json.loads(open(flavor_json_file).read())
+        feature_json_file = \
+            './conductor/tests/unit/data/plugins/inventory_provider/hpa_req_features.json'
+        feature_json = json.loads(open(feature_json_file).read())
+        hpa_json_file = './conductor/tests/unit/data/hpa_constraints.json'
+        hpa_json = yaml.safe_load(open(hpa_json_file).read())
+        (constraint_id, constraint_info) = \
+            hpa_json["conductor_solver"]["constraints"][0].items()[0]
+        evaluate = constraint_info['properties']['evaluate'][0]
+
+        # Cloud candidates with more and more flavors
+        candidate_list = [req_json['candidate_list'][0]]
+        for i in range(7):
+            candidate = copy.deepcopy(req_json['candidate_list'][1])
+            candidate['candidate_id'] = 'region{}'.format(i)
+            candidate['vim-id'] = 'owner_region{}'.format(i)
+            candidate['flavors'] = {'flavor': flavor_json['flavor'][:i % 5]}
+            candidate_list.append(candidate)
+
+        self.data_ep.ip_ext_manager = HpaMatchManager()
+        responses = []
+        increments = []
+        # The processes are started once, and serve the following calls
+        for workers, chunk_size in ((0, 200), (2, 2), (2, 2)):
+            cfg.CONF.set_override('hpa_match_workers', workers, 'data')
+            cfg.CONF.set_override('hpa_match_chunk_size', chunk_size, 'data')
+            pool = self.data_ep.hpa_match_pool
+            service._start_data_worker(0, 0, mock.Mock(
+                endpoints=[self.data_ep]))
+            if workers:
+                self.assertIsNotNone(self.data_ep.hpa_match_pool)
+                if pool is None:
+                    self.addCleanup(self.data_ep.hpa_match_pool.terminate)
+                else:
+                    self.assertIs(pool, self.data_ep.hpa_match_pool)
+            else:
+                self.assertIsNone(self.data_ep.hpa_match_pool)
+            args = generate_args(candidate_list, copy.deepcopy(feature_json[2]),
+                                 evaluate['id'], evaluate['type'],
+                                 copy.deepcopy(evaluate['directives']))
+            before = PC.counter_values(PC.HPA_MATCH_COUNTERS)
+            responses.append(self.data_ep.get_candidates_with_hpa(None, args))
+            increments.append(
+                PC.counter_increments(PC.HPA_MATCH_COUNTERS, before))
+
+        self.assertEqual(4, len(responses[0]['response']))
+        self.assertEqual(responses[0], responses[1])
+        self.assertEqual(responses[0], responses[2])
+        self.assertTrue(increments[0])
+        self.assertEqual(increments[0], increments[1])
+        self.assertEqual(increments[0], increments[2])
+
     @mock.patch.object(service.LOG, 'error')
     @mock.patch.object(service.LOG, 'info')
     @mock.patch.object(stevedore.ExtensionManager, 'names')
@@ -386,6 +514,17 @@ class TestDataEndpoint(unittest.TestCase):
                                                                        args))
 
 
+class HpaMatchManager(object):
+    """Inventory provider manager matching HPA without A&AI"""
+
+    def map_method(self, method, candidate, features):
+        hpa_provider = hpa_utils.HpaMatchProvider(candidate, features)
+        return [hpa_provider.match_flavor()]
+
+    def names(self):
+        return ['aai']
+
+
 def generate_args(candidate_list, flavorProperties, vf_id, model_type, directives):
     arg_candidate_list = copy.deepcopy(candidate_list)
     args = {"candidate_list": arg_candidate_list,
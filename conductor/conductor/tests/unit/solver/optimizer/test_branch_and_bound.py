@@ -0,0 +1,221 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the branch and bound search"""
+
+import itertools
+import random
+import unittest
+
+import mock
+from oslo_config import cfg
+
+from conductor.solver.optimizer import branch_and_bound
+from conductor.solver.optimizer.constraints import hpa
+from conductor.solver.optimizer import decision_path as dpath
+from conductor.solver.optimizer import fit_first
+from conductor.solver.optimizer import optimizer
+from conductor.solver.request import demand
+from conductor.solver.request.functions import distance_between
+from conductor.solver.request.functions import hpa_score
+from conductor.solver.request import objective
+from conductor.solver.utils import constraint_engine_interface as cei
+
+
+class TestBranchAndBound(unittest.TestCase):
+
+    @mock.patch('conductor.common.music.model.base.Base.table_create')
+    def setUp(self, table_create):
+        self.bnb = branch_and_bound.BranchAndBound(cfg.CONF)
+        self.bnb.triageSolver = mock.MagicMock()
+
+    def tearDown(self):
+        cfg.CONF.clear_override('solver_timeout', 'solver')
+        cfg.CONF.clear_override('search_algorithm', 'solver')
+
+    def make_request(self, seed, demands=3, candidates=6):
+        rng = random.Random(seed)
+        customer = demand.Location('customer')
+        customer.value = (40.7128, -74.0059)
+        obj = objective.Objective()
+        obj.goal = 'min'
+        obj.operation = 'sum'
+
+        def add_operand(function, loc_a, loc_z, weight):
+            function.loc_a = loc_a
+            function.loc_z = loc_z
+            operand = objective.Operand()
+            operand.operation = 'product'
+            operand.weight = weight
+            operand.function = function
+            obj.operand_list.append(operand)
+
+        demand_list = []
+        for d in range(demands):
+            dmd = demand.Demand('d{}'.format(d))
+            for c in range(candidates):
+                candidate_id = '{}-{}'.format(dmd.name, c)
+                dmd.resources[candidate_id] = {
+                    'candidate_id': candidate_id,
+                    'location_id': candidate_id,
+                    'cost': rng.uniform(0.0, 100.0),
+                    'hpa_score': str(rng.uniform(0.0, 500.0)),
+                    'latitude': str(rng.uniform(-60.0, 70.0)),
+                    'longitude': str(rng.uniform(-180.0, 180.0))}
+            add_operand(distance_between.DistanceBetween(
+                'distance_between'), customer, dmd, 0.1)
+            if demand_list:
+                add_operand(distance_between.DistanceBetween(
+                    'distance_between'), demand_list[-1], dmd, 1.0)
+            demand_list.append(dmd)
+        add_operand(hpa_score.HPAScore('hpa_score'), None, None, 1.0)
+
+        request = mock.MagicMock()
+        request.demands = dict((d.name, d) for d in demand_list)
+        request.constraints = {}
+        request.objective = obj
+        request.cei = cei.ConstraintEngineInterface(None)
+        request.constraint_cache = None
+        return demand_list, request
+
+    def brute_force(self, demand_list, request):
+        best = None
+        for candidates in itertools.product(
+                *[list(d.resources.values()) for d in demand_list]):
+            path = dpath.DecisionPath()
+            path.set_decisions(dict(
+                (d.name, c) for d, c in zip(demand_list, candidates)))
+            request.objective.compute(path, request)
+            if best is None or path.total_value < best:
+                best = path.total_value
+        return best
+
+    @mock.patch('conductor.common.music.model.base.Base.table_create')
+    def test_optimal(self, table_create):
+        for seed in range(5):
+            demand_list, request = self.make_request(seed)
+            expected = self.brute_force(demand_list, request)
+
+            greedy = fit_first.FitFirst(cfg.CONF)
+            greedy.triageSolver = mock.MagicMock()
+            greedy_path = greedy.search(list(demand_list),
+                                        request.objective, request)
+            path = self.bnb.search(list(demand_list), request.objective,
+                                   request)
+            self.assertTrue(self.bnb.optimal)
+            self.assertAlmostEqual(expected, path.total_value, places=6)
+            self.assertLessEqual(path.total_value,
+                                 greedy_path.total_value + 1e-6)
+            self.assertEqual(set(request.demands), set(path.decisions))
+
+    def test_optimal_with_hpa_constraint(self):
+        # Only the HPA constraints add hpa_score, to the candidates they
+        # return, as the data service does
+        capabilities = [{'mandatory': 'True', 'score': '0'},
+                        {'mandatory': 'False', 'score': '3000'},
+                        {'mandatory': 'False', 'score': '20000'}]
+        for seed in range(5):
+            demand_list, request = self.make_request(seed)
+            rng = random.Random(seed)
+            scores = {}
+            for dmd in demand_list:
+                for candidate in dmd.resources.values():
+                    del candidate['hpa_score']
+                    scores[candidate['candidate_id']] = rng.choice(
+                        [0, 3000, 20000, 23000])
+                dmd.constraint_list.append(hpa.HPA(
+                    'hpa_' + dmd.name, 'hpa', [dmd.name],
+                    _properties={'evaluate': [{
+                        'id': 'vm', 'type': 'vnfc', 'directives': [],
+                        'flavorProperties': capabilities}]}))
+            request.cei.get_candidates_with_hpa = mock.MagicMock(
+                side_effect=lambda id, type, directives, candidates,
+                flavor_properties: [
+                    dict(c, hpa_score=scores[c['candidate_id']])
+                    for c in candidates])
+
+            scored = []
+            for dmd in demand_list:
+                copy = demand.Demand(dmd.name)
+                copy.resources = dict(
+                    (key, dict(c, hpa_score=scores[key]))
+                    for key, c in dmd.resources.items())
+                scored.append(copy)
+            expected = self.brute_force(scored, request)
+
+            path = self.bnb.search(list(demand_list), request.objective,
+                                   request)
+            self.assertTrue(self.bnb.optimal)
+            self.assertAlmostEqual(expected, path.total_value, places=6)
+
+    def test_optimal_with_tables(self):
+        demand_list, request = self.make_request(7)
+        expected = self.brute_force(demand_list, request)
+        request.objective.precompute(request.demands, request.cei, 1000)
+        path = self.bnb.search(list(demand_list), request.objective,
+                               request)
+        self.assertAlmostEqual(expected, path.total_value, places=6)
+        # Most of the tree is pruned
+        self.assertLess(self.bnb.expanded, 6 + 6 * 6)
+
+    def test_heuristic_is_admissible(self):
+        demand_list, request = self.make_request(3)
+        request.objective.compute_bounds(request.demands, request)
+        path = dpath.DecisionPath()
+        path.set_decisions({})
+        bound = request.objective.heuristic_to_go(path, request)
+        self.assertLessEqual(bound, self.brute_force(demand_list, request))
+
+        path.decisions['d1'] = demand_list[1].resources['d1-0']
+        request.objective.compute(path, request)
+        bound = request.objective.heuristic_to_go(path, request)
+        demand_list[1].resources = {'d1-0': path.decisions['d1']}
+        self.assertLessEqual(path.cumulated_value + bound,
+                             self.brute_force(demand_list, request) + 1e-6)
+
+    def test_timeout(self):
+        demand_list, request = self.make_request(1)
+        cfg.CONF.set_override('solver_timeout', 1, 'solver')
+        with mock.patch.object(branch_and_bound, 'time') as clock:
+            clock.time.side_effect = itertools.count(0, 10)
+            path = self.bnb.search(list(demand_list), request.objective,
+                                   request)
+        # The fit first solution is returned
+        self.assertFalse(self.bnb.optimal)
+        self.assertEqual(set(request.demands), set(path.decisions))
+
+    def test_optimizer_selection(self):
+        demand_list, request = self.make_request(2)
+        request.plan_id = 'p1'
+        request.search_algorithm = None
+        opt = optimizer.Optimizer(cfg.CONF, _requests={'p1': request})
+        self.assertEqual('fit_first', opt._search_algorithm(request))
+        request.search_algorithm = 'branch_and_bound'
+        self.assertEqual('branch_and_bound',
+                         opt._search_algorithm(request))
+        request.search_algorithm = 'unknown'
+        self.assertEqual('fit_first', opt._search_algorithm(request))
+        cfg.CONF.set_override('search_algorithm', 'branch_and_bound',
+                              'solver')
+        request.search_algorithm = ''
+        self.assertEqual('branch_and_bound',
+                         opt._search_algorithm(request))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the candidate filtering helpers of constraints"""
+
+import unittest
+
+from conductor.solver.optimizer.constraints import constraint
+
+
+class TestCandidateFiltering(unittest.TestCase):
+
+    def setUp(self):
+        self.candidates = [
+            {'candidate_id': 'c{}'.format(i),
+             constraint.NODE_INDEX: constraint.next_node_index()}
+            for i in range(4)]
+
+    def test_select_candidates(self):
+        # Copies returned by the data service match by id
+        select_list = [dict(self.candidates[2], flavor='f1'),
+                       dict(self.candidates[0])]
+        self.assertEqual([self.candidates[0], self.candidates[2]],
+                         constraint.select_candidates(self.candidates,
+                                                      select_list))
+
+    def test_reject_candidates(self):
+        self.assertEqual(self.candidates[1:3],
+                         constraint.reject_candidates(
+                             self.candidates,
+                             [self.candidates[3], self.candidates[0]]))
+
+    def test_without_ids(self):
+        candidates = [{'candidate_id': 'c1'}, {'candidate_id': 'c2'}]
+        self.assertEqual(
+            candidates[1:],
+            constraint.select_candidates(candidates,
+                                         [{'candidate_id': 'c2'}]))
+        self.assertEqual(
+            candidates[:1],
+            constraint.reject_candidates(candidates,
+                                         [{'candidate_id': 'c2'}]))
+
+    def test_next_node_index(self):
+        self.assertLess(constraint.next_node_index(),
+                        constraint.next_node_index())
+
+
+if __name__ == '__main__':
+    unittest.main()
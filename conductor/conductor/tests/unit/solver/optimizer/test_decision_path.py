@@ -36,6 +36,35 @@ class TestDecisionPath(unittest.TestCase):
         self.assertEqual(0.0, self.decisionPath.total_value)
         self.assertEqual(0.0, self.decisionPath.total_cost)
 
+    def test_set_decisions_shares_candidates(self):
+        candidate = {'candidate_id': 'c1'}
+        prior = {'vG': candidate}
+        self.decisionPath.set_decisions(prior)
+        self.decisionPath.decisions['vGMuX'] = {'candidate_id': 'm1'}
+        self.assertEqual(['vG'], list(prior))
+        self.assertIs(candidate, self.decisionPath.decisions['vG'])
+
+    def test_extend(self):
+        candidate = {'candidate_id': 'c1'}
+        self.decisionPath.set_decisions({})
+        path = self.decisionPath.extend('vG', candidate)
+        self.assertEqual({}, self.decisionPath.decisions)
+        self.assertIs(candidate, path.decisions['vG'])
+
+    def test_decide_undo(self):
+        c1 = {'candidate_id': 'c1'}
+        c2 = {'candidate_id': 'c2'}
+        m1 = {'candidate_id': 'm1'}
+        self.decisionPath.set_decisions({'vG': c1})
+        mark = self.decisionPath.mark()
+        self.decisionPath.decide('vG', c2)
+        self.decisionPath.decide('vGMuX', m1)
+        self.assertEqual({'vG': c2, 'vGMuX': m1},
+                         self.decisionPath.decisions)
+        self.decisionPath.undo(mark)
+        self.assertEqual({'vG': c1}, self.decisionPath.decisions)
+        self.assertEqual(0, self.decisionPath.mark())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the inventory group constraint"""
+
+import unittest
+
+import mock
+
+from conductor.solver.optimizer.constraints import inventory_group
+from conductor.solver.request import parser
+
+
+class TestInventoryGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.constraint = inventory_group.InventoryGroup(
+            'pair', 'inventory_group', ['vG', 'vGMux'])
+        self.request = parser.Parser()
+        self.request.cei = mock.Mock()
+        self.request.cei.get_inventory_group_pairs.return_value = {
+            'mux-1': ['vg-1', 'vg-3'], 'vg-1': ['mux-1'],
+            'vg-3': ['mux-1'], 'mux-2': ['vg-2'], 'vg-2': ['mux-2']}
+        self.candidates = [{'candidate_id': 'vg-{}'.format(i)}
+                           for i in range(1, 4)]
+
+    def path(self, decisions):
+        decision_path = mock.Mock()
+        decision_path.current_demand.name = 'vG'
+        decision_path.decisions = decisions
+        return decision_path
+
+    def test_other_demand_unresolved(self):
+        self.assertEqual(self.candidates, self.constraint.solve(
+            self.path({}), self.candidates, self.request))
+        self.request.cei.get_inventory_group_pairs.assert_not_called()
+
+    def test_pairs_fetched_once(self):
+        for mux, expected in (('mux-1', ['vg-1', 'vg-3']),
+                              ('mux-2', ['vg-2']),
+                              ('mux-3', [])):
+            decision_path = self.path({'vGMux': {'candidate_id': mux}})
+            self.assertEqual(
+                expected,
+                [c['candidate_id'] for c in self.constraint.solve(
+                    decision_path, self.candidates, self.request)])
+        self.request.cei.get_inventory_group_pairs.assert_called_once_with()
+
+    def test_no_pairs(self):
+        self.request.cei.get_inventory_group_pairs.return_value = None
+        decision_path = self.path({'vGMux': {'candidate_id': 'mux-1'}})
+        self.assertEqual([], self.constraint.solve(
+            decision_path, self.candidates, self.request))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the optimizer"""
+
+import copy
+import random
+import unittest
+
+import mock
+from oslo_config import cfg
+
+from prometheus_client import REGISTRY
+
+from conductor.solver.optimizer.constraints import vim_fit
+from conductor.solver.optimizer import optimizer
+from conductor.solver.request import demand
+from conductor.solver.request.functions import distance_between
+from conductor.solver.request import objective
+from conductor.solver.utils import constraint_engine_interface as cei
+
+
+class TestOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        customer = demand.Location('customer')
+        customer.value = (40.7128, -74.0059)
+        self.demands = {}
+        obj = objective.Objective()
+        obj.goal = 'min'
+        obj.operation = 'sum'
+        for name in ('vG', 'vGMuX'):
+            dmd = demand.Demand(name)
+            for i in range(4):
+                candidate_id = '{}-{}'.format(name, i)
+                dmd.resources[candidate_id] = {
+                    'candidate_id': candidate_id, 'cost': float(i),
+                    'location_id': candidate_id,
+                    'uniqueness': 'true', 'latitude': '40.7128',
+                    'longitude': str(-74.0059 + i)}
+            self.demands[name] = dmd
+
+            function = distance_between.DistanceBetween('distance_between')
+            function.loc_a = customer
+            function.loc_z = dmd
+            operand = objective.Operand()
+            operand.operation = 'product'
+            operand.weight = 1.0
+            operand.function = function
+            obj.operand_list.append(operand)
+
+        self.request = mock.MagicMock()
+        self.request.demands = self.demands
+        self.request.constraints = {}
+        self.request.objective = obj
+        self.request.cei = cei.ConstraintEngineInterface(None)
+        self.request.constraint_cache = None
+        self.candidates = dict(
+            (c['candidate_id'], c) for d in self.demands.values()
+            for c in d.resources.values())
+
+    @mock.patch('conductor.solver.optimizer.search.TriageData')
+    @mock.patch.object(copy, 'deepcopy')
+    def test_get_solution(self, deepcopy, triage_data):
+        opt = optimizer.Optimizer(cfg.CONF, _requests={'r': self.request})
+        solutions = opt.get_solution(3)
+
+        self.assertEqual(3, len(solutions))
+        for i, solution in enumerate(solutions):
+            self.assertEqual({'vG', 'vGMuX'}, set(solution))
+            for name, candidate in solution.items():
+                self.assertEqual('{}-{}'.format(name, i),
+                                 candidate['candidate_id'])
+                # The solutions refer to the candidates of the plan
+                self.assertIs(self.candidates[candidate['candidate_id']],
+                              candidate)
+        # The unique candidates of the solutions were removed
+        self.assertEqual(['vG-3'], list(self.demands['vG'].resources))
+        deepcopy.assert_not_called()
+
+    def make_request(self, seed):
+        rng = random.Random(seed)
+        obj = objective.Objective()
+        obj.goal = 'min'
+        obj.operation = 'sum'
+        demands = {}
+        previous = None
+        for name in ('d0', 'd1', 'd2'):
+            dmd = demand.Demand(name)
+            for i in range(5):
+                candidate_id = '{}-{}'.format(name, i)
+                dmd.resources[candidate_id] = {
+                    'candidate_id': candidate_id, 'location_id': candidate_id,
+                    'cost': rng.uniform(0, 100),
+                    'uniqueness': rng.choice(['true', 'false']),
+                    'latitude': str(rng.uniform(-60, 70)),
+                    'longitude': str(rng.uniform(-180, 180))}
+            demands[name] = dmd
+            if previous is not None:
+                function = distance_between.DistanceBetween(
+                    'distance_between')
+                function.loc_a = previous
+                function.loc_z = dmd
+                operand = objective.Operand()
+                operand.operation = 'product'
+                operand.weight = 1.0
+                operand.function = function
+                obj.operand_list.append(operand)
+            previous = dmd
+
+        request = mock.MagicMock()
+        request.demands = demands
+        request.constraints = {}
+        request.objective = obj
+        request.cei = cei.ConstraintEngineInterface(None)
+        request.constraint_cache = None
+        request.search_algorithm = None
+        return request
+
+    @mock.patch('conductor.solver.optimizer.search.TriageData')
+    def test_incremental_solutions(self, triage_data):
+        self.addCleanup(cfg.CONF.clear_override, 'incremental_solutions',
+                        'solver')
+        for seed in range(5):
+            solutions = {}
+            for incremental in (False, True):
+                cfg.CONF.set_override('incremental_solutions', incremental,
+                                      'solver')
+                request = self.make_request(seed)
+                opt = optimizer.Optimizer(cfg.CONF,
+                                          _requests={'r': request})
+                with mock.patch.object(
+                        optimizer.fit_first.FitFirst, '_solve_constraints',
+                        autospec=True,
+                        side_effect=lambda self, path, request: list(
+                            path.current_demand.resources.values())):
+                    solutions[incremental] = [
+                        sorted((name, c['candidate_id'])
+                               for name, c in solution.items())
+                        for solution in opt.get_solution(6)]
+            self.assertEqual(6, len(solutions[False]))
+            self.assertEqual(solutions[False], solutions[True])
+
+    @mock.patch('conductor.solver.optimizer.search.TriageData')
+    def test_incremental_solutions_vim_fit(self, triage_data):
+        self.addCleanup(cfg.CONF.clear_override, 'incremental_solutions',
+                        'solver')
+
+        def vim_capacity(candidates, vim_request):
+            # Two candidates of each demand fit, when one is left all do
+            return [c for c in candidates
+                    if c['candidate_id'][-1] in '34']
+
+        for seed in range(5):
+            solutions = {}
+            for incremental in (False, True):
+                cfg.CONF.set_override('incremental_solutions', incremental,
+                                      'solver')
+                request = self.make_request(seed)
+                for name, dmd in request.demands.items():
+                    for candidate in dmd.resources.values():
+                        candidate['uniqueness'] = 'true'
+                    dmd.constraint_list.append(vim_fit.VimFit(
+                        'vim_' + name, 'vim_fit', [name],
+                        _properties={'request': {'vCPU': 1}}))
+                request.cei.get_candidates_with_vim_capacity = \
+                    mock.MagicMock(side_effect=vim_capacity)
+                opt = optimizer.Optimizer(cfg.CONF,
+                                          _requests={'r': request})
+                solutions[incremental] = [
+                    sorted((name, c['candidate_id'])
+                           for name, c in solution.items())
+                    for solution in opt.get_solution(4)]
+            # Once the fitting candidates are used, the others are kept
+            self.assertEqual(4, len(solutions[False]))
+            self.assertEqual(solutions[False], solutions[True])
+
+    @mock.patch('conductor.solver.optimizer.search.TriageData')
+    def test_search_effort(self, triage_data):
+        self.addCleanup(cfg.CONF.clear_override, 'incremental_solutions',
+                        'solver')
+        for incremental in (False, True):
+            cfg.CONF.set_override('incremental_solutions', incremental,
+                                  'solver')
+            searches = REGISTRY.get_sample_value(
+                'fit_first_search_depth_count') or 0
+            deepest = REGISTRY.get_sample_value(
+                'fit_first_search_depth_bucket', {'le': '2.0'}) or 0
+            opt = optimizer.Optimizer(cfg.CONF,
+                                      _requests={'r': self.make_request(0)})
+            with mock.patch.object(
+                    optimizer.fit_first.FitFirst, '_solve_constraints',
+                    autospec=True,
+                    side_effect=lambda self, path, request: list(
+                        path.current_demand.resources.values())):
+                self.assertEqual(2, len(opt.get_solution(2)))
+            # One search per solution, or one kept across solutions
+            self.assertEqual(1 if incremental else 2,
+                             REGISTRY.get_sample_value(
+                                 'fit_first_search_depth_count') - searches)
+            # Every search decided the three demands
+            self.assertEqual(deepest, REGISTRY.get_sample_value(
+                'fit_first_search_depth_bucket', {'le': '2.0'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (C) 2019 IBM.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for constraint evaluation in search"""
+
+import unittest
+
+import mock
+from oslo_config import cfg
+
+from conductor.common import candidate_table
+from conductor.solver.optimizer.constraints import attribute
+from conductor.solver.optimizer.constraints import constraint as cstr
+from conductor.solver.optimizer.constraints import vim_fit
+from conductor.solver.optimizer import search
+from conductor.solver.utils import constraint_cache
+from conductor.solver.utils import constraint_engine_interface as cei
+
+
+class TestSearchConstraints(unittest.TestCase):
+
+    @mock.patch('conductor.common.music.model.base.Base.table_create')
+    def setUp(self, table_create_mock):
+        cfg.CONF.set_override('batch_constraints', True, 'solver')
+        self.search = search.Search(cfg.CONF)
+        self.search.triageSolver = mock.MagicMock()
+
+        self.attribute = attribute.Attribute(
+            'attr', 'attribute', ['vG'],
+            _properties={'evaluate': {'cloud-version': '1.0'}})
+        self.vim_fit = vim_fit.VimFit(
+            'vim', 'vim_fit', ['vG'],
+            _properties={'request': {'vCPU': 10}})
+
+        self.decision_path = mock.MagicMock()
+        self.decision_path.current_demand.name = 'vG'
+        self.decision_path.current_demand.resources = {
+            'c1': {'candidate_id': 'c1', 'cost': 2},
+            'c2': {'candidate_id': 'c2', 'cost': 1},
+        }
+        self.decision_path.current_demand.constraint_list = [
+            self.attribute, self.vim_fit]
+
+        self.client = mock.MagicMock()
+        self.request = mock.MagicMock()
+        self.request.cei = cei.ConstraintEngineInterface(self.client)
+        self.request.constraint_cache = None
+
+    def tearDown(self):
+        cfg.CONF.clear_override('batch_constraints', 'solver')
+
+    def test_batch(self):
+        def call_batch(ctxt, calls, pipe, pipe_value):
+            # vim_fit found no capacity, so the attribute result is kept
+            return [[dict(c) for c in pipe_value
+                     if c['candidate_id'] == 'c2'], []]
+        self.client.call_batch.side_effect = call_batch
+
+        result = self.search._solve_constraints(self.decision_path,
+                                                self.request)
+        self.assertEqual(['c2'], [c['candidate_id'] for c in result])
+        self.client.call.assert_not_called()
+        calls = self.client.call_batch.call_args[1]['calls']
+        self.assertEqual(['get_candidates_by_attributes',
+                          'get_candidates_with_vim_capacity'],
+                         [call['method'] for call in calls])
+        self.assertEqual('candidate_list',
+                         self.client.call_batch.call_args[1]['pipe'])
+
+    def test_batch_compact_candidates(self):
+        def call_batch(ctxt, calls, pipe, pipe_value):
+            candidate_list = candidate_table.decode(pipe_value)
+            return [[c for c in candidate_list
+                     if c['candidate_id'] == 'c2'], []]
+        self.client.call_batch.side_effect = call_batch
+        self.request.cei.compact_candidates = True
+
+        result = self.search._solve_constraints(self.decision_path,
+                                                self.request)
+        self.assertEqual(['c2'], [c['candidate_id'] for c in result])
+        self.assertTrue(candidate_table.is_encoded(
+            self.client.call_batch.call_args[1]['pipe_value']))
+
+    def test_batch_stopped_early(self):
+        self.client.call_batch.return_value = [[]]
+
+        result = self.search._solve_constraints(self.decision_path,
+                                                self.request)
+        self.assertEqual([], result)
+        self.client.call.assert_not_called()
+
+    def test_batch_unsupported(self):
+        def call(ctxt, method, args):
+            return [dict(c) for c in args['candidate_list']
+                    if c['candidate_id'] == 'c1']
+        self.client.call_batch.return_value = None
+        self.client.call.side_effect = call
+
+        result = self.search._solve_constraints(self.decision_path,
+                                                self.request)
+        self.assertEqual(['c1'], [c['candidate_id'] for c in result])
+        self.assertEqual(2, self.client.call.call_count)
+
+    def test_batch_disabled(self):
+        cfg.CONF.set_override('batch_constraints', False, 'solver')
+        self.client.call.return_value = []
+
+        self.search._solve_constraints(self.decision_path, self.request)
+        self.client.call_batch.assert_not_called()
+
+    def test_cache(self):
+        cfg.CONF.set_override('batch_constraints', False, 'solver')
+        self.request.constraint_cache = constraint_cache.ConstraintCache(10)
+
+        def call(ctxt, method, args):
+            c2 = [c for c in args['candidate_list']
+                  if c['candidate_id'] == 'c2']
+            if method == 'get_candidates_with_vim_capacity':
+                return [dict(c, vim_id='v1') for c in c2]
+            return c2
+        self.client.call.side_effect = call
+
+        first = self.search._solve_constraints(self.decision_path,
+                                               self.request)
+        second = self.search._solve_constraints(self.decision_path,
+                                                self.request)
+        self.assertEqual(2, self.client.call.call_count)
+        self.assertEqual(['c2'], [c['candidate_id'] for c in first])
+        self.assertEqual(['c2'], [c['candidate_id'] for c in second])
+        self.assertEqual('v1', second[0]['vim_id'])
+        self.assertEqual(2, self.request.constraint_cache.hits)
+
+    def test_cache_skips_batch(self):
+        self.request.constraint_cache = constraint_cache.ConstraintCache(10)
+        c2 = {'candidate_id': 'c2', 'cost': 1}
+        self.client.call_batch.return_value = [[c2], []]
+
+        first = self.search._solve_constraints(self.decision_path,
+                                               self.request)
+        second = self.search._solve_constraints(self.decision_path,
+                                                self.request)
+        self.assertEqual(1, self.client.call_batch.call_count)
+        self.assertEqual(first, second)
+
+    def test_assign_node_id(self):
+        candidates = list(
+            self.decision_path.current_demand.resources.values())
+        self.search.assignNodeId(candidates, 'vG')
+        indexes = [c[cstr.NODE_INDEX] for c in candidates]
+        self.assertEqual(2, len(set(indexes)))
+        # The ids are kept for the following searches
+        self.search.assignNodeId(candidates, 'vG')
+        self.assertEqual(indexes, [c[cstr.NODE_INDEX] for c in candidates])
+
+    def test_dropped_candidate(self):
+        candidates = sorted(self.decision_path.current_demand.resources
+                            .values(), key=lambda c: c['candidate_id'])
+        self.search.assignNodeId(candidates, 'vG')
+        # The data service returns copies, which may carry extra data
+        after = [dict(candidates[1], vim_id='v1')]
+        self.search.dropped_candidate(candidates, after, 'attr', 'vG')
+        dropped = self.search.triageSolver.droppedCadidatesStatus
+        dropped.assert_called_once_with([candidates[0]])
+        self.assertEqual([{'constraint_name_dropped': 'attr', 'name': 'vG'}],
+                         candidates[0]['constraints'])
+        self.assertEqual([], candidates[1]['constraints'])
+
+    @mock.patch('conductor.common.music.model.base.Base.table_create')
+    def test_triage_records_per_search(self, table_create_mock):
+        candidates = sorted(self.decision_path.current_demand.resources
+                            .values(), key=lambda c: c['candidate_id'])
+        self.search.assignNodeId(candidates, 'vG')
+        self.search.dropped_candidate(candidates, candidates[1:], 'attr',
+                                      'vG')
+        # Kept for the rest of the search
+        self.search.assignNodeId(candidates, 'vG')
+        self.assertEqual(1, len(candidates[0]['constraints']))
+
+        # The next search of the plan does not see them again
+        following = search.Search(cfg.CONF)
+        following.triageSolver = mock.MagicMock()
+        following.assignNodeId(candidates, 'vG')
+        self.assertEqual([[], []], [c['constraints'] for c in candidates])
+        self.assertEqual(['vG|c1', 'vG|c2'],
+                         [c['node_id'] for c in candidates])
+
+
+if __name__ == '__main__':
+    unittest.main()
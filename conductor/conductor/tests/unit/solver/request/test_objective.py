@@ -0,0 +1,125 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (c) 2015-2017 AT&T Intellectual Property
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the objective function"""
+
+import unittest
+
+import mock
+
+from conductor.solver.request import demand
+from conductor.solver.request.functions import distance_between
+from conductor.solver.request.functions import hpa_score
+from conductor.solver.request import objective
+from conductor.solver.utils import constraint_engine_interface as cei
+
+
+class TestObjective(unittest.TestCase):
+
+    def setUp(self):
+        customer = demand.Location('customer')
+        customer.value = (40.7128, -74.0059)
+        vg = demand.Demand('vG')
+        vgmux = demand.Demand('vGMuX')
+        self.demands = {'vG': vg, 'vGMuX': vgmux}
+
+        self.objective = objective.Objective()
+        self.objective.goal = 'min'
+        self.objective.operation = 'sum'
+        self.add_operand(distance_between.DistanceBetween(
+            'distance_between'), customer, vg, 1.0)
+        self.add_operand(distance_between.DistanceBetween(
+            'distance_between'), vgmux, vg, 2.0)
+        self.add_operand(distance_between.DistanceBetween(
+            'distance_between'), vg, customer, 0.5)
+        self.add_operand(hpa_score.HPAScore('hpa_score'), None, None, 1.0)
+
+        self.candidates = [
+            {'candidate_id': 'c1', 'cost': 1.0, 'hpa_score': '2',
+             'latitude': '51.5074', 'longitude': '-0.1278'},
+            {'candidate_id': 'c2', 'cost': 2.0,
+             'latitude': '35.6762', 'longitude': '139.6503'},
+            {'candidate_id': 'c3', 'cost': 0.0,
+             'latitude': '40.7128', 'longitude': '-74.0059'},
+        ]
+        vg.resources = dict((c['candidate_id'], c) for c in self.candidates)
+        self.decision_path = mock.MagicMock()
+        self.decision_path.heuristic_to_go_value = 0.0
+        self.decision_path.decisions = {
+            'vGMuX': {'candidate_id': 'm1', 'cost': 1.0, 'hpa_score': '1',
+                      'latitude': '-33.8688', 'longitude': '151.2093'}}
+        vgmux.resources = {'m1': self.decision_path.decisions['vGMuX'],
+                           'm2': {'candidate_id': 'm2', 'cost': 1.0}}
+        self.request = mock.MagicMock()
+        self.request.cei = cei.ConstraintEngineInterface(mock.MagicMock())
+
+    def add_operand(self, function, loc_a, loc_z, weight):
+        function.loc_a = loc_a
+        function.loc_z = loc_z
+        operand = objective.Operand()
+        operand.operation = 'product'
+        operand.weight = weight
+        operand.function = function
+        self.objective.operand_list.append(operand)
+
+    def test_compute_candidates(self):
+        values = self.objective.compute_candidates(
+            self.decision_path, 'vG', self.candidates, self.request)
+
+        self.assertEqual(['vGMuX'], list(self.decision_path.decisions))
+        self.assertEqual(len(self.candidates), len(values))
+        for candidate, value in zip(self.candidates, values):
+            self.decision_path.decisions['vG'] = candidate
+            self.objective.compute(self.decision_path, self.request)
+            self.assertAlmostEqual(self.decision_path.total_value, value,
+                                   places=6)
+
+    def test_precompute(self):
+        expected = self.objective.compute_candidates(
+            self.decision_path, 'vG', self.candidates, self.request)
+        self.objective.precompute(self.demands, self.request.cei, 100)
+        self.assertEqual(
+            [True, True, True, False],
+            [op.table is not None for op in self.objective.operand_list])
+
+        # The tables are used, without looking locations up again
+        with mock.patch.object(self.request.cei,
+                               'get_candidate_location') as location:
+            values = self.objective.compute_candidates(
+                self.decision_path, 'vG', self.candidates, self.request)
+            self.decision_path.decisions['vG'] = self.candidates[1]
+            self.objective.compute(self.decision_path, self.request)
+            location.assert_not_called()
+        for value, expected_value in zip(values, expected):
+            self.assertAlmostEqual(expected_value, value, places=6)
+        self.assertAlmostEqual(expected[1], self.decision_path.total_value,
+                               places=6)
+
+        # m2 has no coordinates, so it is evaluated as before
+        self.assertEqual({'m1': 0},
+                         self.objective.operand_list[1].ordinals['vGMuX'])
+
+    def test_precompute_max_size(self):
+        self.objective.precompute(self.demands, self.request.cei, 2)
+        self.assertEqual(
+            [None, None, None, None],
+            [op.table for op in self.objective.operand_list])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -87,6 +87,16 @@ class TestHPA(unittest.TestCase):
                          self.hpa.solve(mock_decision_path,
                                         self.candidate_list, request_mock))
 
+    def test_max_score(self):
+        # The capabilities of the test constraint have no score
+        self.assertEqual(0, self.hpa.max_score())
+        self.hpa.properties = {'evaluate': [
+            {'flavorProperties': [{'mandatory': 'True', 'score': '5'},
+                                  {'mandatory': 'False', 'score': '3'},
+                                  {'mandatory': 'false', 'score': 'x'}]},
+            {'flavorProperties': [{'mandatory': 'False', 'score': '4'}]}]}
+        self.assertEqual(7, self.hpa.max_score())
+
 
 if __name__ == "__main__":
     unittest.main()
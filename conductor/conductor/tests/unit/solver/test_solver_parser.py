@@ -17,9 +17,11 @@
 # -------------------------------------------------------------------------
 #
 
+import json
 import mock
 import unittest
 
+from conductor.common import candidate_pool
 from conductor.common.music import api
 from conductor.solver.request import demand
 from conductor.solver.request.parser import Parser as SolverRequestParser
@@ -147,6 +149,27 @@ class TestSolverParser(unittest.TestCase):
         returned_constraints = [c.name for c in self.sp.demands['d1'].constraint_list]
         self.assertNotEqual(sorted(returned_constraints), ['c1', 'c3'])
 
+    def test_parse_pooled_template(self):
+        def region(number, cost):
+            return {'candidate_id': 'region{}'.format(number),
+                    'inventory_provider': 'aai', 'inventory_type': 'cloud',
+                    'location_id': 'region{}'.format(number),
+                    'latitude': '32.89', 'longitude': '-97.04',
+                    'cost': cost}
+        demands = {'vG': {'candidates': [region(1, 1.0), region(2, 1.0)]},
+                   'vGMuxInfra': {'candidates': [region(2, 2.0)]}}
+        pool, pooled = candidate_pool.encode(demands)
+        template = json.loads(json.dumps({'conductor_solver': {
+            'request_type': '', 'locations': {}, 'constraints': {},
+            'candidate_pool': pool, 'demands': pooled}}))
+
+        parser = SolverRequestParser()
+        parser.parse_template(template)
+        for name, demand_ in demands.items():
+            self.assertEqual(
+                dict((c['candidate_id'], c) for c in demand_['candidates']),
+                parser.demands[name].resources)
+
     def tearDown(self):
         self.sp.constraints = {}
         self.sp.demands = {}
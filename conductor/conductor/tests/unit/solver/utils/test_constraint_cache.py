@@ -0,0 +1,101 @@
+#
+# -------------------------------------------------------------------------
+#   Copyright (C) 2019 IBM.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# -------------------------------------------------------------------------
+#
+"""Test classes for the solver constraint cache"""
+
+import unittest
+
+import mock
+
+from conductor.solver.utils import constraint_cache
+
+
+def make_constraint(name, independent=True):
+    constraint = mock.MagicMock()
+    constraint.name = name
+    constraint.constraint_type = 'attribute'
+    constraint.decision_independent = independent
+    return constraint
+
+
+class TestConstraintCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = constraint_cache.ConstraintCache(2)
+        self.constraint = make_constraint('c1')
+        self.candidates = [{'node_id': 'vG|a'}, {'node_id': 'vG|b'}]
+
+    def test_not_cacheable(self):
+        self.assertIsNone(self.cache.key(make_constraint('c2', False),
+                                         'vG', self.candidates))
+        cache = constraint_cache.ConstraintCache(0)
+        self.assertIsNone(cache.key(self.constraint, 'vG', self.candidates))
+
+    def test_filter(self):
+        key = self.cache.key(self.constraint, 'vG', self.candidates)
+        self.assertIsNone(self.cache.get(key, self.constraint,
+                                         self.candidates))
+        self.cache.put(key, self.candidates, self.candidates[1:])
+
+        # Same ids, new objects: the lookup's own candidates come back
+        candidates = [{'node_id': 'vG|a'}, {'node_id': 'vG|b'}]
+        key = self.cache.key(self.constraint, 'vG', candidates)
+        result = self.cache.get(key, self.constraint, candidates)
+        self.assertEqual([candidates[1]], result)
+        self.assertIs(candidates[1], result[0])
+        self.assertEqual({'hits': 1, 'misses': 1, 'entries': 1},
+                         self.cache.stats())
+
+    def test_filter_in_place(self):
+        key = self.cache.key(self.constraint, 'vG', self.candidates)
+        self.cache.put(key, list(self.candidates), self.candidates[:1],
+                       in_place=True)
+        result = self.cache.get(key, self.constraint, self.candidates)
+        self.assertIs(self.candidates, result)
+        self.assertEqual([{'node_id': 'vG|a'}], self.candidates)
+
+    def test_rebuilt_candidates(self):
+        key = self.cache.key(self.constraint, 'vG', self.candidates)
+        rebuilt = [{'node_id': 'vG|a', 'flavor_map': {'x': 'y'}}]
+        self.cache.put(key, self.candidates, rebuilt)
+        rebuilt[0]['flavor_map']['x'] = 'z'
+
+        first = self.cache.get(key, self.constraint, self.candidates)
+        self.assertEqual([{'node_id': 'vG|a', 'flavor_map': {'x': 'y'}}],
+                         first)
+        first[0]['flavor_map']['x'] = 'z'
+        second = self.cache.get(key, self.constraint, self.candidates)
+        self.assertEqual({'x': 'y'}, second[0]['flavor_map'])
+
+    def test_lru(self):
+        keys = []
+        for name in ('c1', 'c2', 'c3'):
+            if name == 'c3':
+                # Touch c1 so that c2 is the least recently used
+                self.cache.get(keys[0], self.constraint, self.candidates)
+            key = self.cache.key(make_constraint(name), 'vG',
+                                 self.candidates)
+            self.cache.put(key, self.candidates, [])
+            keys.append(key)
+        self.assertIn(keys[0], self.cache)
+        self.assertNotIn(keys[1], self.cache)
+        self.assertIn(keys[2], self.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
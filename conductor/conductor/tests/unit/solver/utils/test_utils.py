@@ -17,6 +17,9 @@
 # -------------------------------------------------------------------------
 #
 import unittest
+
+import mock
+
 import conductor.solver.utils.utils as utils
 
 class TestUtils(unittest.TestCase):
@@ -30,5 +33,42 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(1.242742, utils.convert_km_to_miles(2.0))
         self.assertEqual(2.0, utils.convert_miles_to_km(1.242742))
 
+    def _check_batch(self):
+        src = (40.7128, -74.0059)
+        dst = [(40.7128, -74.0059), (51.5074, -0.1278), (-33.8688, 151.2093),
+               (35.6762, 139.6503)]
+
+        distances = utils.compute_air_distances(src, dst)
+        self.assertEqual(len(dst), len(distances))
+        for loc, distance in zip(dst, distances):
+            self.assertAlmostEqual(utils.compute_air_distance(src, loc),
+                                   distance, places=6)
+
+        matrix = utils.compute_air_distance_matrix(dst[:2], dst)
+        self.assertEqual(2, len(matrix))
+        for loc, row in zip(dst[:2], matrix):
+            self.assertEqual(utils.compute_air_distances(loc, dst), row)
+
+        self.assertEqual([], utils.compute_air_distances(src, []))
+        self.assertEqual([[]], utils.compute_air_distance_matrix([src], []))
+
+    def test_batch(self):
+        self._check_batch()
+
+    def test_batch_without_numpy(self):
+        with mock.patch.object(utils, 'numpy', None):
+            self._check_batch()
+
+    def test_latency_scores(self):
+        src = (40.7128, -74.0059)
+        dst = [(51.5074, -0.1278, 'GB'), (35.6762, 139.6503, 'JP')]
+        region_group = {'GB': 1, 'JP': 0}
+        scores = utils.compute_latency_scores(src, dst, region_group,
+                                              utils.Coordinates(dst))
+        for loc, score in zip(dst, scores):
+            self.assertAlmostEqual(
+                utils.compute_latency_score(src, loc, region_group),
+                score, places=6)
+
 if __name__ == "__main__":
     unittest.main()
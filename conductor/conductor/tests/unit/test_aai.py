@@ -17,10 +17,13 @@ class TestConstaintAccessDistance(unittest.TestCase, AccessDistance):
                                "locations": {},
                                "obj_func_param": {},
                                "cei": "null",
+                               "constraint_cache": "null",
+                               "inventory_group_pairs": "null",
                                "region_gen": "null",
                                "region_group": {},
                                "request_id": "null",
                                "request_type": "null",
+                               "search_algorithm": "null",
                                "objective": "null",
                                "constraints": {}
                               }